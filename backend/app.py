@@ -1,18 +1,37 @@
 """
 Aplicación Flask principal para el sistema de RRHH.
 """
-from flask import Flask, jsonify, request
+import os
+import shutil
+import tempfile
+from functools import wraps
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
-from database import get_db, init_db
+from database import empresa_actual, get_db, init_db, motor
 from models.user import User
 from models.empleado import Empleado
 from models.contrato import Contrato
 from models.asistencia import Asistencia
 from models.capacitacion import Capacitacion
+from models.curso import Curso
 from models.evaluacion import Evaluacion
 from models.nomina import Nomina
 from models.vacacion_permiso import VacacionPermiso
+from models.saldo_vacaciones import SaldoVacaciones
 from config import get_config
+from inspeccion_db import inspeccionar
+from mantenimiento import iniciar_programador
+from respaldo import crear_respaldo, listar_respaldos
+import reportes
+import importacion_empleados
+import exportacion
+import lotes
+import trabajos
+import cambios
+import eventos
+import replica
+import empresas
+from migraciones import TABLAS_CAMBIOS
 
 # Crear la aplicación Flask
 app = Flask(__name__)
@@ -25,6 +44,94 @@ config_class.init_app(app)
 # Configurar CORS con los orígenes permitidos
 CORS(app, origins=app.config['CORS_ORIGINS'])
 
+# Rutas que no dependen de la base de datos de una empresa
+_RUTAS_SIN_EMPRESA = ('/api/health',)
+
+
+@app.before_request
+def dirigir_a_empresa():
+    """
+    Con EMPRESAS_ACTIVAS, dirige las conexiones de la petición a la base de
+    datos de su empresa (cabecera EMPRESAS_CABECERA o subdominio de
+    EMPRESAS_DOMINIO, ver empresas.py). La administración (/api/admin/) y
+    el health check no necesitan empresa.
+    """
+    if (not app.config['EMPRESAS_ACTIVAS'] or request.method == 'OPTIONS'
+            or request.path in _RUTAS_SIN_EMPRESA or request.path.startswith('/api/admin/')):
+        return None
+    try:
+        nombre = empresas.resolver(request.headers.get(app.config['EMPRESAS_CABECERA']), request.host)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    if nombre is None:
+        origen = f" o un subdominio de {app.config['EMPRESAS_DOMINIO']}" if app.config['EMPRESAS_DOMINIO'] else ''
+        return jsonify({
+            'status': 'error',
+            'message': f"Falta la empresa: indicarla en la cabecera {app.config['EMPRESAS_CABECERA']}{origen}"
+        }), 400
+    try:
+        empresa = empresas.obtener(nombre)
+    except empresas.EmpresaDesconocida as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error al abrir la base de datos de la empresa: {str(e)}'
+        }), 500
+    g.empresa = empresa
+    g.token_empresa = empresa_actual.set(empresa)
+    return None
+
+
+@app.after_request
+def marcar_empresa(respuesta):
+    """Indica la empresa en la respuesta y la mantiene en las respuestas en streaming."""
+    empresa = g.get('empresa')
+    if empresa is not None:
+        if respuesta.is_streamed:
+            # Las respuestas en streaming leen después de salir de la vista
+            respuesta.response = empresas.iterar(respuesta.response, empresa)
+        respuesta.headers['X-Empresa'] = empresa.id
+    return respuesta
+
+
+@app.teardown_request
+def liberar_empresa(error=None):
+    token = g.pop('token_empresa', None)
+    if token is not None:
+        try:
+            empresa_actual.reset(token)
+        except ValueError:
+            # Teardown en otro contexto (p. ej. al cerrar un stream)
+            empresa_actual.set(None)
+
+
+def ruta_de_informes(vista):
+    """
+    Marca una ruta de solo lectura como de informes: sus consultas se dirigen
+    a la réplica de lectura si se puede usar (ver replica.py) y, si fallan
+    allí, se repiten en la base de datos principal. La cabecera
+    X-Origen-Datos indica de dónde se leyó.
+    """
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        with replica.lecturas() as retraso:
+            respuesta = app.make_response(vista(*args, **kwargs))
+        if retraso is not None and respuesta.status_code >= 500:
+            app.logger.warning("Informe fallido en la réplica de lectura; se repite en la principal")
+            retraso = None
+            respuesta = app.make_response(vista(*args, **kwargs))
+        if respuesta.is_streamed:
+            # Las respuestas en streaming leen después de salir de la vista
+            respuesta.response = replica.iterar(respuesta.response, retraso is not None)
+        respuesta.headers['X-Origen-Datos'] = 'replica' if retraso is not None else 'principal'
+        if retraso is not None:
+            respuesta.headers['X-Retraso-Replica'] = str(int(retraso))
+        return respuesta
+    return envoltura
+
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -71,6 +178,203 @@ def test_database():
         }), 500
 
 
+@app.route('/api/database/estadisticas', methods=['GET'])
+def database_statistics():
+    """
+    Estadísticas de la base de datos sin recorrer las tablas.
+    
+    Los conteos de filas son aproximados (sqlite_stat1). Parámetros opcionales:
+    exacto=true (COUNT(*) por tabla) y tamanos=true (páginas por tabla e
+    índice). Para actualizar las estadísticas con ANALYZE usar POST.
+    """
+    try:
+        if request.args.get('analizar', 'false').lower() == 'true':
+            raise ValueError("analizar ya no se admite en GET; usar POST /api/database/estadisticas")
+        exacto = request.args.get('exacto', 'false').lower() == 'true'
+        tamanos = request.args.get('tamanos', 'false').lower() == 'true'
+        with get_db() as conn:
+            info = inspeccionar(conn, exacto=exacto, tamanos=tamanos)
+        return jsonify({'status': 'success', 'data': info}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error al obtener estadísticas de la base de datos: {str(e)}'
+        }), 500
+
+
+@app.route('/api/database/estadisticas', methods=['POST'])
+def analyze_database():
+    """
+    Ejecuta ANALYZE (con PRAGMA analysis_limit) para actualizar sqlite_stat1 y
+    devuelve las estadísticas resultantes. Cuerpo opcional: {"exacto": false,
+    "tamanos": false}.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        with get_db() as conn:
+            info = inspeccionar(conn, exacto=bool(data.get('exacto', False)),
+                                tamanos=bool(data.get('tamanos', False)), analizar_antes=True)
+        return jsonify({
+            'status': 'success',
+            'message': 'Estadísticas actualizadas',
+            'data': info
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error al actualizar las estadísticas de la base de datos: {str(e)}'
+        }), 500
+
+
+@app.route('/api/database/respaldos', methods=['POST'])
+def create_backup():
+    """
+    Crea un respaldo en caliente de la base de datos.
+    
+    Cuerpo opcional: {"comprimir": true, "verificar": true, "asincrono": false}
+    Con asincrono=true se encola como trabajo y responde 202.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if data.get('asincrono'):
+            return encolar_trabajo('respaldo', {'comprimir': bool(data.get('comprimir', True)),
+                                                'verificar': bool(data.get('verificar', True))})
+        resultado = crear_respaldo(comprimir=bool(data.get('comprimir', True)),
+                                   verificar=bool(data.get('verificar', True)))
+        return jsonify({
+            'status': 'success',
+            'message': 'Respaldo creado correctamente',
+            'data': resultado
+        }), 201
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error al crear respaldo: {str(e)}'
+        }), 500
+
+
+@app.route('/api/database/respaldos', methods=['GET'])
+def get_backups():
+    """Lista los respaldos existentes."""
+    try:
+        respaldos = listar_respaldos()
+        return jsonify({'status': 'success', 'data': respaldos, 'count': len(respaldos)}), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error al listar respaldos: {str(e)}'
+        }), 500
+
+
+@app.route('/api/database/replica', methods=['GET'])
+def get_replica():
+    """Estado de la réplica de lectura de los informes (antigüedad, si se usa y por qué no)."""
+    try:
+        return jsonify({'status': 'success', 'data': replica.estado()}), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error al obtener el estado de la réplica: {str(e)}'
+        }), 500
+
+
+@app.route('/api/database/replica', methods=['POST'])
+def refresh_replica():
+    """
+    Copia ahora la base de datos principal a la réplica de lectura.
+    
+    Cuerpo opcional: {"asincrono": false}. Con asincrono=true se encola como
+    trabajo y responde 202.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if data.get('asincrono'):
+            return encolar_trabajo('refrescar_replica')
+        return jsonify({
+            'status': 'success',
+            'message': 'Réplica actualizada correctamente',
+            'data': replica.refrescar()
+        }), 201
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error al actualizar la réplica: {str(e)}'
+        }), 500
+
+
+@app.route('/api/admin/empresas', methods=['GET'])
+def list_empresas():
+    """Empresas con base de datos propia y conexiones abiertas de cada una en este proceso."""
+    try:
+        abiertas = {e['empresa']: e for e in empresas.abiertas()}
+        data = []
+        for id_empresa in empresas.registradas():
+            ruta = empresas.rutas_de(id_empresa).datos
+            data.append({
+                'empresa': id_empresa,
+                'archivo': str(ruta),
+                'bytes': empresas.tamanio(ruta) if ruta.exists() else None,
+                'abierta': id_empresa in abiertas,
+                'conexiones_libres': abiertas.get(id_empresa, {}).get('conexiones_libres', 0),
+                'conexiones_en_uso': abiertas.get(id_empresa, {}).get('conexiones_en_uso', 0)
+            })
+        return jsonify({'status': 'success', 'data': data, 'count': len(data)}), 200
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error al listar las empresas: {str(e)}'
+        }), 500
+
+
+@app.route('/api/admin/empresas', methods=['POST'])
+def create_empresa():
+    """
+    Da de alta una empresa con su propia base de datos.
+
+    Cuerpo: {"empresa": "acme"} (minúsculas, dígitos y guiones)
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        return jsonify({
+            'status': 'success',
+            'message': 'Empresa creada correctamente',
+            'data': empresas.crear(data.get('empresa'))
+        }), 201
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error al crear la empresa: {str(e)}'
+        }), 500
+
+
+@app.route('/api/admin/empresas/resumen', methods=['GET'])
+def get_resumen_empresas():
+    """
+    Cifras de cada empresa (empleados, departamentos, nómina del año),
+    consultadas en paralelo, y su suma.
+
+    Query params:
+        empresas: Lista separada por comas (por defecto todas)
+    """
+    try:
+        nombres = [e.strip() for e in request.args.get('empresas', '').split(',') if e.strip()]
+        return jsonify({
+            'status': 'success',
+            'data': empresas.resumen_agregado(nombres or None)
+        }), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error al obtener el resumen de las empresas: {str(e)}'
+        }), 500
+
+
 # ==================== RUTAS DE USUARIOS ====================
 
 @app.route('/api/users', methods=['GET'])
@@ -461,6 +765,88 @@ def delete_empleado(empleado_id):
         }), 500
 
 
+@app.route('/api/empleados/import', methods=['POST'])
+def import_empleados():
+    """
+    Importa empleados desde un CSV (o XLSX si openpyxl está instalado) leído
+    fila a fila. Acepta el archivo en el campo 'archivo' de un formulario
+    multipart o como cuerpo de la petición (text/csv).
+    Parámetros: dry_run=true (solo validar), omitir_errores=true (insertar
+    las filas válidas aunque otras fallen), formato=csv|xlsx y asincrono=true
+    (encolar la importación como trabajo y responder 202).
+    """
+    try:
+        archivo = request.files.get('archivo')
+        if archivo is not None:
+            flujo, nombre = archivo.stream, (archivo.filename or '').lower()
+        elif request.content_length:
+            flujo, nombre = request.stream, ''
+        else:
+            return jsonify({
+                'status': 'error',
+                'message': "No se proporcionó el archivo (campo 'archivo')"
+            }), 400
+
+        formato = request.args.get('formato') or ('xlsx' if nombre.endswith('.xlsx') else 'csv')
+        if formato not in importacion_empleados.formatos_disponibles():
+            return jsonify({
+                'status': 'error',
+                'message': f'Formato no soportado: {formato}. '
+                           f'Disponibles: {", ".join(importacion_empleados.formatos_disponibles())}'
+            }), 400
+
+        dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+        omitir_errores = request.args.get('omitir_errores', 'false').lower() == 'true'
+
+        # El archivo se copia por bloques a un temporal antes de abrir la
+        # transacción: una subida lenta no retiene el bloqueo de escritura y
+        # openpyxl recibe un archivo en el que puede hacer seek
+        descriptor, ruta = tempfile.mkstemp(suffix=f'.{formato}', prefix='importacion-')
+        try:
+            with os.fdopen(descriptor, 'wb') as destino:
+                shutil.copyfileobj(flujo, destino)
+        except BaseException:
+            os.remove(ruta)
+            raise
+
+        if request.args.get('asincrono', 'false').lower() == 'true':
+            # El temporal lo borra la tarea al terminar
+            return encolar_trabajo('importar_empleados', {
+                'ruta': ruta, 'formato': formato, 'dry_run': dry_run, 'omitir_errores': omitir_errores
+            })
+
+        try:
+            lector = importacion_empleados.leer_xlsx if formato == 'xlsx' else importacion_empleados.leer_csv
+            with open(ruta, 'rb') as archivo:
+                resultado = importacion_empleados.importar(lector(archivo), dry_run=dry_run,
+                                                           omitir_errores=omitir_errores)
+        finally:
+            os.remove(ruta)
+
+        if resultado['total_errores'] and not resultado['confirmado'] and not resultado['dry_run']:
+            return jsonify({
+                'status': 'error',
+                'message': f"{resultado['total_errores']} errores de validación; no se importó ningún empleado",
+                'data': resultado
+            }), 400
+
+        return jsonify({
+            'status': 'success',
+            'data': resultado
+        }), 200 if resultado['dry_run'] else 201
+
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error al importar empleados: {str(e)}'
+        }), 500
+
+
 # ==================== RUTAS DE CONTRATOS ====================
 
 @app.route('/api/contratos', methods=['POST'])
@@ -555,6 +941,29 @@ def get_contratos():
         }), 500
 
 
+@app.route('/api/contratos/por-vencer', methods=['GET'])
+def get_contratos_por_vencer():
+    """Obtiene los contratos que vencen en los próximos 'dias' días (por defecto 30)."""
+    try:
+        dias = request.args.get('dias', 30, type=int)
+        contratos = Contrato.get_por_vencer(dias, request.args.get('fecha'))
+        return jsonify({
+            'status': 'success',
+            'data': contratos,
+            'count': len(contratos)
+        }), 200
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error al obtener contratos por vencer: {str(e)}'
+        }), 500
+
+
 @app.route('/api/contratos/<int:contrato_id>', methods=['GET'])
 def get_contrato(contrato_id):
     """Obtiene un contrato por su ID."""
@@ -594,6 +1003,30 @@ def get_contratos_by_empleado(empleado_id):
         }), 500
 
 
+@app.route('/api/contratos/empleado/<int:empleado_id>/vigente', methods=['GET'])
+def get_contrato_vigente(empleado_id):
+    """Obtiene el contrato en vigor de un empleado (opcional: fecha=YYYY-MM-DD)."""
+    try:
+        contrato = Contrato.get_vigente(empleado_id, request.args.get('fecha'))
+        if contrato:
+            return jsonify({
+                'status': 'success',
+                'data': contrato
+            }), 200
+        else:
+            return jsonify({
+                'status': 'error',
+                'message': 'El empleado no tiene un contrato vigente'
+            }), 404
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Error al obtener contrato vigente: {str(e)}'
+        }), 500
+
+
 @app.route('/api/contratos/<int:contrato_id>', methods=['PUT'])
 def update_contrato(contrato_id):
     """Actualiza un contrato existente."""
@@ -711,10 +1144,12 @@ def create_asistencia():
 
 @app.route('/api/asistencias', methods=['GET'])
 def get_asistencias():
-    """Obtiene todas las asistencias."""
+    """Obtiene todas las asistencias. Parámetros opcionales: desde y hasta (YYYY-MM-DD)."""
     try:
-        asistencias = Asistencia.get_all()
+        asistencias = Asistencia.get_all(request.args.get('desde'), request.args.get('hasta'))
         return jsonify({'status': 'success', 'data': asistencias, 'count': len(asistencias)}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Error al obtener asistencias: {str(e)}'}), 500
 
@@ -731,10 +1166,13 @@ def get_asistencia(asistencia_id):
 
 @app.route('/api/asistencias/empleado/<int:empleado_id>', methods=['GET'])
 def get_asistencias_by_empleado(empleado_id):
-    """Obtiene todas las asistencias de un empleado."""
+    """Obtiene las asistencias de un empleado. Parámetros opcionales: desde y hasta (YYYY-MM-DD)."""
     try:
-        asistencias = Asistencia.get_by_empleado(empleado_id)
+        asistencias = Asistencia.get_by_empleado(empleado_id, request.args.get('desde'),
+                                                 request.args.get('hasta'))
         return jsonify({'status': 'success', 'data': asistencias, 'count': len(asistencias)}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Error al obtener asistencias: {str(e)}'}), 500
 
@@ -766,6 +1204,8 @@ def delete_asistencia(asistencia_id):
         if deleted:
             return jsonify({'status': 'success', 'message': 'Asistencia eliminada correctamente'}), 200
         return jsonify({'status': 'error', 'message': 'Asistencia no encontrada'}), 404
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Error al eliminar asistencia: {str(e)}'}), 500
 
@@ -803,6 +1243,36 @@ def get_capacitaciones():
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Error al obtener capacitaciones: {str(e)}'}), 500
 
+@app.route('/api/capacitaciones/cursos', methods=['GET'])
+def get_cursos():
+    """Obtiene el catálogo de cursos con sus capacitaciones y certificados."""
+    try:
+        cursos = Curso.get_all()
+        return jsonify({'status': 'success', 'data': cursos, 'count': len(cursos)}), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al obtener cursos: {str(e)}'}), 500
+
+@app.route('/api/capacitaciones/cursos/<int:curso_id>/completados', methods=['GET'])
+def get_completados_curso(curso_id):
+    """Obtiene los empleados certificados en un curso (certificado=false: los pendientes)."""
+    try:
+        certificado = request.args.get('certificado', 'true').lower() == 'true'
+        empleados = Curso.get_completados(curso_id, certificado)
+        if empleados is None:
+            return jsonify({'status': 'error', 'message': 'Curso no encontrado'}), 404
+        return jsonify({'status': 'success', 'data': empleados, 'count': len(empleados)}), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al obtener empleados del curso: {str(e)}'}), 500
+
+@app.route('/api/capacitaciones/tasas-departamento', methods=['GET'])
+def get_tasas_certificacion_departamento():
+    """Tasa de certificación por departamento (opcional: id_curso)."""
+    try:
+        tasas = Curso.get_tasas_departamento(request.args.get('id_curso', type=int))
+        return jsonify({'status': 'success', 'data': tasas, 'count': len(tasas)}), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al obtener tasas de certificación: {str(e)}'}), 500
+
 @app.route('/api/capacitaciones/<int:capacitacion_id>', methods=['GET'])
 def get_capacitacion(capacitacion_id):
     """Obtiene una capacitación por su ID."""
@@ -888,6 +1358,19 @@ def get_evaluaciones():
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Error al obtener evaluaciones: {str(e)}'}), 500
 
+@app.route('/api/evaluaciones/estadisticas', methods=['GET'])
+@ruta_de_informes
+def get_estadisticas_evaluaciones():
+    """Media, mediana, p10/p90 y tendencia del puntaje por grupo (agrupar, anio)."""
+    try:
+        data = reportes.evaluaciones(request.args.get('agrupar', 'departamento'),
+                                     request.args.get('anio', type=int))
+        return jsonify({'status': 'success', 'data': data, 'count': len(data['grupos'])}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al obtener estadísticas de evaluaciones: {str(e)}'}), 500
+
 @app.route('/api/evaluaciones/<int:evaluacion_id>', methods=['GET'])
 def get_evaluacion(evaluacion_id):
     """Obtiene una evaluación por su ID."""
@@ -968,9 +1451,9 @@ def create_nomina():
 
 @app.route('/api/nomina', methods=['GET'])
 def get_nomina():
-    """Obtiene todos los registros de nómina."""
+    """Obtiene todos los registros de nómina. Parámetro opcional: anio."""
     try:
-        nomina = Nomina.get_all()
+        nomina = Nomina.get_all(request.args.get('anio', type=int))
         return jsonify({'status': 'success', 'data': nomina, 'count': len(nomina)}), 200
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Error al obtener registros de nómina: {str(e)}'}), 500
@@ -988,9 +1471,9 @@ def get_nomina_by_id(nomina_id):
 
 @app.route('/api/nomina/empleado/<int:empleado_id>', methods=['GET'])
 def get_nomina_by_empleado(empleado_id):
-    """Obtiene todos los registros de nómina de un empleado."""
+    """Obtiene los registros de nómina de un empleado. Parámetro opcional: anio."""
     try:
-        nomina = Nomina.get_by_empleado(empleado_id)
+        nomina = Nomina.get_by_empleado(empleado_id, request.args.get('anio', type=int))
         return jsonify({'status': 'success', 'data': nomina, 'count': len(nomina)}), 200
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Error al obtener registros de nómina: {str(e)}'}), 500
@@ -1026,6 +1509,8 @@ def delete_nomina(nomina_id):
         if deleted:
             return jsonify({'status': 'success', 'message': 'Registro de nómina eliminado correctamente'}), 200
         return jsonify({'status': 'error', 'message': 'Registro de nómina no encontrado'}), 404
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Error al eliminar registro de nómina: {str(e)}'}), 500
 
@@ -1064,6 +1549,22 @@ def get_vacaciones_permisos():
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Error al obtener vacaciones/permisos: {str(e)}'}), 500
 
+@app.route('/api/vacaciones-permisos/ocupacion', methods=['GET'])
+def get_ocupacion_vacaciones():
+    """Obtiene quién está ausente cada día entre 'desde' y 'hasta' (opcional: id_departamento)."""
+    try:
+        desde = request.args.get('desde')
+        hasta = request.args.get('hasta')
+        if not desde or not hasta:
+            return jsonify({'status': 'error', 'message': 'desde y hasta son requeridos'}), 400
+        id_departamento = request.args.get('id_departamento', type=int)
+        ocupacion = VacacionPermiso.get_ocupacion(desde, hasta, id_departamento)
+        return jsonify({'status': 'success', 'data': ocupacion, 'count': len(ocupacion)}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al obtener ocupación: {str(e)}'}), 500
+
 @app.route('/api/vacaciones-permisos/<int:permiso_id>', methods=['GET'])
 def get_vacacion_permiso(permiso_id):
     """Obtiene un registro de vacación/permiso por su ID."""
@@ -1084,6 +1585,18 @@ def get_vacaciones_permisos_by_empleado(empleado_id):
     except Exception as e:
         return jsonify({'status': 'error', 'message': f'Error al obtener vacaciones/permisos: {str(e)}'}), 500
 
+@app.route('/api/vacaciones-permisos/saldo/<int:empleado_id>', methods=['GET'])
+def get_saldo_vacaciones(empleado_id):
+    """Obtiene el saldo de vacaciones de un empleado (opcional: movimientos=N)."""
+    try:
+        movimientos = request.args.get('movimientos', 0, type=int)
+        saldo = SaldoVacaciones.get_saldo(empleado_id, movimientos)
+        if not saldo:
+            return jsonify({'status': 'error', 'message': 'Empleado no encontrado'}), 404
+        return jsonify({'status': 'success', 'data': saldo}), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al obtener saldo de vacaciones: {str(e)}'}), 500
+
 @app.route('/api/vacaciones-permisos/<int:permiso_id>', methods=['PUT'])
 def update_vacacion_permiso(permiso_id):
     """Actualiza un registro de vacación/permiso."""
@@ -1118,10 +1631,297 @@ def delete_vacacion_permiso(permiso_id):
         return jsonify({'status': 'error', 'message': f'Error al eliminar vacación/permiso: {str(e)}'}), 500
 
 
+# ==================== RUTAS DE REPORTES ====================
+
+@app.route('/api/reportes/plantilla', methods=['GET'])
+@ruta_de_informes
+def get_reporte_plantilla():
+    """Plantilla, altas, bajas y rotación por departamento y mes (anios, id_departamento, hasta)."""
+    try:
+        data = reportes.plantilla(request.args.get('anios', 5, type=int),
+                                  request.args.get('id_departamento', type=int),
+                                  request.args.get('hasta'))
+        return jsonify({'status': 'success', 'data': data}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al generar el reporte de plantilla: {str(e)}'}), 500
+
+@app.route('/api/reportes/costos', methods=['GET'])
+@ruta_de_informes
+def get_reporte_costos():
+    """Coste mensual de nómina por departamento y total (anios, id_departamento, hasta)."""
+    try:
+        data = reportes.costos(request.args.get('anios', 5, type=int),
+                               request.args.get('id_departamento', type=int),
+                               request.args.get('hasta'))
+        return jsonify({'status': 'success', 'data': data}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al generar el reporte de costos: {str(e)}'}), 500
+
+
+# ==================== RUTAS DE EXPORTACIÓN ====================
+
+@app.route('/api/<recurso>/export', methods=['GET'])
+@ruta_de_informes
+def export_recurso(recurso):
+    """
+    Exporta un listado completo a CSV o XLSX en streaming (fetchmany por bloques).
+    Parámetros: format=csv|xlsx, id_empleado, desde y hasta (YYYY-MM-DD).
+    El CSV se comprime con gzip si el cliente envía Accept-Encoding: gzip.
+    """
+    try:
+        formato = (request.args.get('format') or request.args.get('formato') or 'csv').lower()
+        exportacion.validar(recurso, formato)
+        bloques = exportacion.exportar(
+            recurso, formato,
+            id_empleado=request.args.get('id_empleado', type=int),
+            desde=request.args.get('desde'),
+            hasta=request.args.get('hasta')
+        )
+        cabeceras = {'Content-Disposition': f'attachment; filename="{recurso}.{formato}"'}
+        # El XLSX ya va comprimido (zip); solo se comprime el CSV
+        if formato == 'csv' and 'gzip' in request.headers.get('Accept-Encoding', ''):
+            bloques = exportacion.comprimir_gzip(bloques)
+            cabeceras['Content-Encoding'] = 'gzip'
+            cabeceras['Vary'] = 'Accept-Encoding'
+        return Response(stream_with_context(bloques), headers=cabeceras,
+                        content_type=exportacion.TIPOS_CONTENIDO[formato])
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al exportar {recurso}: {str(e)}'}), 500
+
+
+# ==================== RUTAS DE OPERACIONES POR LOTES ====================
+
+@app.route('/api/<recurso>/batch-get', methods=['GET', 'POST'])
+def batch_get_recurso(recurso):
+    """
+    Obtiene varios registros por su ID en una sola llamada.
+    IDs en el cuerpo ({"ids": [1, 2, 3]}) o en la consulta (?ids=1,2,3).
+    """
+    try:
+        if request.method == 'POST':
+            ids = (request.get_json(silent=True) or {}).get('ids')
+        else:
+            ids = request.args.get('ids', '')
+        data = lotes.obtener_varios(recurso, ids)
+        return jsonify({'status': 'success', 'data': data, 'count': len(data['registros'])}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al obtener {recurso}: {str(e)}'}), 500
+
+
+@app.route('/api/<recurso>/bulk', methods=['PATCH'])
+def bulk_update_recurso(recurso):
+    """
+    Aplica los mismos cambios a muchas filas en una sola transacción.
+    Body: {"cambios": {...}, "ids": [...] y/o "filtro": {...}, "devolver": false}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        resultado = lotes.actualizar(recurso, data.get('cambios'), ids=data.get('ids'),
+                                     filtro=data.get('filtro'), devolver=bool(data.get('devolver')))
+        return jsonify({'status': 'success', 'message': f"{resultado['afectadas']} registros actualizados",
+                        'data': resultado}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al actualizar {recurso}: {str(e)}'}), 500
+
+
+@app.route('/api/<recurso>/bulk', methods=['DELETE'])
+def bulk_delete_recurso(recurso):
+    """
+    Elimina muchas filas en una sola transacción.
+    Body: {"ids": [...] y/o "filtro": {...}, "devolver": false}
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        resultado = lotes.eliminar(recurso, ids=data.get('ids'), filtro=data.get('filtro'),
+                                   devolver=bool(data.get('devolver')))
+        return jsonify({'status': 'success', 'message': f"{resultado['afectadas']} registros eliminados",
+                        'data': resultado}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al eliminar {recurso}: {str(e)}'}), 500
+
+
+# ==================== RUTAS DE TRABAJOS ====================
+
+def encolar_trabajo(tipo, parametros=None):
+    """Encola un trabajo, arranca los workers de este proceso y responde 202."""
+    id_trabajo = trabajos.encolar(tipo, parametros)
+    if app.config['TRABAJOS_WORKERS']:
+        trabajos.iniciar_workers()
+    return jsonify({
+        'status': 'success',
+        'message': 'Trabajo encolado',
+        'data': trabajos.obtener(id_trabajo)
+    }), 202, {'Location': f'/api/jobs/{id_trabajo}'}
+
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Encola un trabajo. Cuerpo: {"tipo": "respaldo", "parametros": {...}}"""
+    try:
+        data = request.get_json(silent=True) or {}
+        tipo = data.get('tipo')
+        if not tipo or tipo not in trabajos.TAREAS or not trabajos.TAREAS[tipo][2]:
+            publicas = sorted(t for t, (_, _, publica) in trabajos.TAREAS.items() if publica)
+            return jsonify({'status': 'error',
+                            'message': f'Tipo de trabajo no válido. Opciones: {", ".join(publicas)}'}), 400
+        return encolar_trabajo(tipo, data.get('parametros') or {})
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al encolar el trabajo: {str(e)}'}), 500
+
+
+@app.route('/api/jobs', methods=['GET'])
+def get_jobs():
+    """Lista los trabajos más recientes. Parámetros: estado, limite (por defecto 50)."""
+    try:
+        lista = trabajos.listar(request.args.get('estado'), request.args.get('limite', 50, type=int))
+        return jsonify({'status': 'success', 'data': lista, 'count': len(lista)}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al obtener los trabajos: {str(e)}'}), 500
+
+
+@app.route('/api/jobs/<int:trabajo_id>', methods=['GET'])
+def get_job(trabajo_id):
+    """Obtiene el estado, el progreso y el resultado de un trabajo."""
+    try:
+        trabajo = trabajos.obtener(trabajo_id)
+        if not trabajo:
+            return jsonify({'status': 'error', 'message': 'Trabajo no encontrado'}), 404
+        return jsonify({'status': 'success', 'data': trabajo}), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al obtener el trabajo: {str(e)}'}), 500
+
+
+@app.route('/api/jobs/<int:trabajo_id>/cancel', methods=['POST'])
+def cancel_job(trabajo_id):
+    """Cancela un trabajo pendiente o pide detener uno en curso."""
+    try:
+        trabajo = trabajos.obtener(trabajo_id)
+        if not trabajo:
+            return jsonify({'status': 'error', 'message': 'Trabajo no encontrado'}), 404
+        if trabajo['estado'] in trabajos.ESTADOS_FINALES:
+            return jsonify({'status': 'error', 'message': f"El trabajo ya está {trabajo['estado']}"}), 409
+        return jsonify({'status': 'success', 'message': 'Cancelación solicitada',
+                        'data': trabajos.cancelar(trabajo_id)}), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al cancelar el trabajo: {str(e)}'}), 500
+
+
+# ==================== RUTAS DEL REGISTRO DE CAMBIOS ====================
+
+def _tablas_cambios():
+    """Lee y valida el parámetro tablas=Empleados,Contratos."""
+    tablas = [t.strip() for t in request.args.get('tablas', '').split(',') if t.strip()]
+    desconocidas = [t for t in tablas if t not in TABLAS_CAMBIOS]
+    if desconocidas:
+        raise ValueError(f"Tablas no válidas: {', '.join(desconocidas)}. Opciones: {', '.join(TABLAS_CAMBIOS)}")
+    return tablas or None
+
+
+@app.route('/api/cambios', methods=['GET'])
+def get_cambios():
+    """
+    Cambios posteriores a un número de secuencia, para sincronización incremental.
+    Parámetros: desde (último seq procesado), limit, tablas (separadas por comas)
+    y esperar (segundos de long polling si no hay cambios).
+    """
+    try:
+        resultado = cambios.listar(
+            desde=request.args.get('desde', 0, type=int),
+            limite=request.args.get('limit', 100, type=int),
+            tablas=_tablas_cambios(),
+            esperar=request.args.get('esperar', 0, type=float)
+        )
+        return jsonify({'status': 'success', 'data': resultado, 'count': len(resultado['cambios'])}), 200
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al obtener los cambios: {str(e)}'}), 500
+
+
+@app.route('/api/cambios/stream', methods=['GET'])
+def stream_cambios():
+    """
+    Cambios como Server-Sent Events. Reanuda desde la cabecera Last-Event-ID
+    (o el parámetro desde) y admite el filtro tablas.
+    """
+    try:
+        desde = int(request.headers.get('Last-Event-ID') or request.args.get('desde', 0))
+        eventos = cambios.stream(desde, _tablas_cambios())
+        return Response(stream_with_context(eventos), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al abrir el stream de cambios: {str(e)}'}), 500
+
+
+# ==================== RUTAS DE EVENTOS EN VIVO ====================
+
+@app.route('/api/stream/eventos', methods=['GET'])
+def stream_eventos():
+    """
+    Eventos en vivo (Server-Sent Events) de asistencias y solicitudes.
+    Filtros: tipos (p. ej. asistencia,permiso.actualizado), id_empleado e
+    id_departamento. Reanuda desde la cabecera Last-Event-ID.
+    """
+    try:
+        tipos = [t.strip() for t in request.args.get('tipos', '').split(',') if t.strip()]
+        desconocidos = [t for t in tipos if not any(e == t or e.startswith(f'{t}.') for e in eventos.TIPOS)]
+        if desconocidos:
+            return jsonify({'status': 'error',
+                            'message': f"Tipos no válidos: {', '.join(desconocidos)}. Opciones: {', '.join(eventos.TIPOS)}"}), 400
+        ultimo = request.headers.get('Last-Event-ID') or request.args.get('desde')
+        flujo = eventos.stream(
+            tipos=tipos or None,
+            id_empleado=request.args.get('id_empleado', type=int),
+            id_departamento=request.args.get('id_departamento', type=int),
+            desde=int(ultimo) if ultimo else None
+        )
+        return Response(stream_with_context(flujo), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': f'Error al abrir el stream de eventos: {str(e)}'}), 500
+
+
 if __name__ == '__main__':
     # Inicializar la base de datos al arrancar
     init_db()
     
+    # Mantenimiento programado de la base de datos (solo en el proceso que sirve,
+    # no en el proceso vigilante del recargador de Flask). El mantenimiento,
+    # la réplica y la cola de trabajos solo existen con el motor SQLite
+    if app.config['MANTENIMIENTO_AUTOMATICO'] and motor.sqlite and (
+            not app.config['DEBUG'] or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        iniciar_programador()
+    
+    # Copias periódicas de la réplica de lectura de los informes
+    if app.config['REPLICA_ACTIVA'] and motor.sqlite and (
+            not app.config['DEBUG'] or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        replica.iniciar_replicador()
+    
+    # Workers de la cola de trabajos (también se arrancan al encolar el primero)
+    if app.config['TRABAJOS_WORKERS'] and motor.sqlite and (
+            not app.config['DEBUG'] or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        trabajos.iniciar_workers()
+    
     # Iniciar el servidor usando la configuración del entorno
     app.run(
         debug=app.config['DEBUG'],
@@ -0,0 +1,252 @@
+"""
+Archivo de las nóminas antiguas.
+
+Nomina crece sin límite y casi todo el trabajo diario toca los últimos
+meses. archivar() mueve por lotes las filas anteriores al horizonte
+(Config.ARCHIVO_MESES meses atrás) a la misma tabla en una base de datos
+aparte (Config.ARCHIVO_PATH) que se adjunta con ATTACH DATABASE solo
+cuando hace falta. La tabla principal se queda con el conjunto de trabajo
+y los recorridos y respaldos diarios no pagan por el histórico.
+(Asistencias se reparte por años en particiones.py.)
+
+El horizonte de cada tabla se guarda en Archivo_Horizontes: las lecturas
+con un rango de fechas posterior al horizonte solo consultan la tabla
+principal; el resto consulta la unión de ambas (fuente()). Las filas
+archivadas son de solo lectura. El archivo solo existe con el motor
+SQLite: con otros motores todas las filas están en la tabla principal.
+
+Uso:
+    python archivo.py [estado]
+    python archivo.py archivar [--meses N] [--lote N]
+"""
+import sys
+from datetime import date
+from typing import Callable, Dict, Iterable, Optional
+from database import get_connection, config, motor, rutas
+import replica
+
+# Tabla -> clave, columnas, condición "anterior al corte" (:corte = YYYY-MM-DD)
+# y columna de fecha comparable con el horizonte (None si no hay ninguna:
+# una nómina antigua puede tener cualquier fecha_pago)
+TABLAS: Dict[str, Dict] = {
+    'Nomina': {
+        'clave': 'id_nomina',
+        'columnas': ('id_nomina', 'id_empleado', 'mes', 'anio', 'salario_base', 'bonificaciones',
+                     'deducciones', 'salario_neto', 'fecha_pago', 'eliminado_en'),
+        # Por periodo (anio, mes); anio <= usa idx_nomina_periodo
+        'anterior': ("anio <= CAST(substr(:corte, 1, 4) AS INTEGER) AND mes IS NOT NULL "
+                     "AND printf('%04d-%02d-01', anio, mes) < :corte"),
+        'fecha': None,
+    },
+}
+
+ESQUEMA = 'archivo'
+
+
+def adjuntar(conn) -> None:
+    """
+    Adjunta la base de datos de archivo a la conexión (si no lo estaba) y
+    crea en ella las tablas que falten. No se puede llamar con una
+    transacción abierta, y no confirma ni deshace nada: el control de la
+    transacción queda en manos del llamador.
+    """
+    adjuntas = {row[1] for row in conn.execute("PRAGMA database_list").fetchall()}
+    if ESQUEMA in adjuntas:
+        return
+    conn.execute(f"ATTACH DATABASE ? AS {ESQUEMA}", (str(rutas().archivo),))
+    for tabla, definicion in TABLAS.items():
+        columnas = ', '.join(f"{c} {'INTEGER PRIMARY KEY' if c == definicion['clave'] else ''}"
+                             for c in definicion['columnas'])
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {ESQUEMA}.{tabla} (
+                {columnas},
+                archivado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {ESQUEMA}.idx_nomina_periodo ON Nomina (anio, mes)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {ESQUEMA}.idx_nomina_empleado ON Nomina (id_empleado)")
+
+
+def horizonte(conn, tabla: str) -> Optional[str]:
+    """Fecha (YYYY-MM-DD) antes de la cual las filas de la tabla pueden estar archivadas."""
+    if not motor.sqlite:
+        return None
+    row = conn.execute("SELECT hasta FROM Archivo_Horizontes WHERE tabla = ?", (tabla,)).fetchone()
+    return row[0] if row else None
+
+
+def incluye_archivo(conn, tabla: str, desde: Optional[str] = None) -> bool:
+    """
+    Indica si una lectura desde 'desde' (YYYY-MM-DD, en la fecha del
+    horizonte; None = sin límite) necesita el archivo, y si es así lo adjunta.
+    """
+    hasta = horizonte(conn, tabla)
+    if hasta is None or (desde is not None and desde >= hasta):
+        return False
+    adjuntar(conn)
+    return True
+
+
+def fuente(conn, tabla: str, desde: Optional[str] = None) -> str:
+    """
+    Devuelve la expresión FROM para leer la tabla: la tabla principal si
+    'desde' no llega al archivo, o la unión de la tabla principal y la
+    archivada. El resultado tiene las columnas de TABLAS, incluida eliminado_en.
+    """
+    if not incluye_archivo(conn, tabla, desde):
+        return tabla
+    columnas = ', '.join(TABLAS[tabla]['columnas'])
+    # SQLite lleva los WHERE externos a cada rama del UNION ALL (índices de ambas)
+    return (f"(SELECT {columnas} FROM main.{tabla} "
+            f"UNION ALL SELECT {columnas} FROM {ESQUEMA}.{tabla})")
+
+
+def archivada(conn, tabla: str, id_registro: int) -> bool:
+    """Indica si la fila está en el archivo (y por tanto es de solo lectura)."""
+    if horizonte(conn, tabla) is None:
+        return False
+    adjuntar(conn)
+    clave = TABLAS[tabla]['clave']
+    return conn.execute(f"SELECT 1 FROM {ESQUEMA}.{tabla} WHERE {clave} = ?",
+                        (id_registro,)).fetchone() is not None
+
+
+def corte(meses: Optional[int] = None, hoy: Optional[date] = None) -> str:
+    """Primer día del mes que queda 'meses' meses atrás (las filas anteriores se archivan)."""
+    meses = config.ARCHIVO_MESES if meses is None else meses
+    hoy = hoy or date.today()
+    indice = hoy.year * 12 + hoy.month - 1 - meses
+    return date(indice // 12, indice % 12 + 1, 1).isoformat()
+
+
+def _archivar_tabla(conn, tabla: str, hasta: str, lote: int,
+                    progreso: Optional[Callable[[str, int], None]]) -> int:
+    definicion = TABLAS[tabla]
+    clave, columnas = definicion['clave'], ', '.join(definicion['columnas'])
+
+    # El horizonte se mueve antes que las filas: mientras dura el movimiento
+    # las lecturas de ese rango ya consultan las dos tablas
+    conn.execute("""
+        INSERT INTO Archivo_Horizontes (tabla, hasta) VALUES (?, ?)
+        ON CONFLICT(tabla) DO UPDATE SET hasta = MAX(hasta, excluded.hasta),
+                                         actualizado_en = CURRENT_TIMESTAMP
+    """, (tabla, hasta))
+    conn.commit()
+
+    movidas = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ids = [row[0] for row in conn.execute(
+                f"SELECT {clave} FROM main.{tabla} WHERE {definicion['anterior']} LIMIT :lote",
+                {'corte': hasta, 'lote': lote})]
+            if not ids:
+                conn.execute("COMMIT")
+                return movidas
+            marcas = ', '.join('?' * len(ids))
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'Cambios'").fetchone()
+            ultimo_cambio = row[0] if row else 0
+            # OR REPLACE: si un corte a mitad de COMMIT dejó la fila en los dos
+            # archivos (cada archivo WAL confirma por separado), se repite sin error
+            conn.execute(f"""
+                INSERT OR REPLACE INTO {ESQUEMA}.{tabla} ({columnas})
+                SELECT {columnas} FROM main.{tabla} WHERE {clave} IN ({marcas})
+            """, ids)
+            conn.execute(f"DELETE FROM main.{tabla} WHERE {clave} IN ({marcas})", ids)
+            # Archivar no es borrar: se descartan los DELETE que los triggers
+            # acaban de anotar en el registro de cambios
+            conn.execute("DELETE FROM Cambios WHERE seq > ?", (ultimo_cambio,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        movidas += len(ids)
+        if progreso:
+            progreso(tabla, movidas)
+
+
+def archivar(meses: Optional[int] = None, lote: Optional[int] = None,
+             tablas: Optional[Iterable[str]] = None,
+             progreso: Optional[Callable[[str, int], None]] = None) -> Dict:
+    """
+    Mueve al archivo, por lotes de Config.ARCHIVO_LOTE filas (una transacción
+    cada uno), las filas anteriores al corte de 'meses' meses.
+
+    Args:
+        meses: Meses que se quedan en las tablas principales (por defecto Config.ARCHIVO_MESES)
+        lote: Filas por transacción (por defecto Config.ARCHIVO_LOTE)
+        tablas: Tablas a archivar (por defecto todas las de TABLAS)
+        progreso: Función (tabla, filas movidas) llamada tras cada lote
+
+    Returns:
+        Dict por tabla con el horizonte ('hasta') y las filas 'archivadas'
+    """
+    motor.requiere_sqlite("El archivo de nóminas")
+    hasta = corte(meses)
+    lote = lote or config.ARCHIVO_LOTE
+    tablas = list(tablas or TABLAS)
+    for tabla in tablas:
+        if tabla not in TABLAS:
+            raise ValueError(f"Tabla no archivable: {tabla}. Disponibles: {', '.join(TABLAS)}")
+
+    conn = get_connection()
+    try:
+        adjuntar(conn)
+        with replica.movimiento():
+            return {tabla: {'hasta': hasta, 'archivadas': _archivar_tabla(conn, tabla, hasta, lote, progreso)}
+                    for tabla in tablas}
+    finally:
+        conn.close()
+
+
+def estado() -> Dict:
+    """Filas en las tablas principales y en el archivo, y horizonte de cada tabla."""
+    conn = get_connection()
+    try:
+        adjuntar(conn)
+        return {
+            'archivo': str(rutas().archivo),
+            'tablas': {tabla: {
+                'horizonte': horizonte(conn, tabla),
+                'principal': conn.execute(f"SELECT COUNT(*) FROM main.{tabla}").fetchone()[0],
+                'archivadas': conn.execute(f"SELECT COUNT(*) FROM {ESQUEMA}.{tabla}").fetchone()[0],
+            } for tabla in TABLAS}
+        }
+    finally:
+        conn.close()
+
+
+def main(argv=None) -> bool:
+    """Punto de entrada de la línea de comandos."""
+    argv = sys.argv[1:] if argv is None else argv
+    comando = argv[0] if argv and not argv[0].startswith('--') else 'estado'
+
+    print("=" * 60)
+    print("ARCHIVO DE NÓMINA")
+    print("=" * 60)
+
+    try:
+        motor.requiere_sqlite("El archivo de nóminas")
+        if comando == 'archivar':
+            meses = int(argv[argv.index('--meses') + 1]) if '--meses' in argv else None
+            lote = int(argv[argv.index('--lote') + 1]) if '--lote' in argv else None
+            for tabla, r in archivar(meses, lote).items():
+                print(f"[OK] {tabla}: {r['archivadas']} filas anteriores a {r['hasta']} archivadas")
+        elif comando == 'estado':
+            r = estado()
+            print(f"[INFO] Archivo: {r['archivo']}")
+            for tabla, datos in r['tablas'].items():
+                print(f"  {tabla:<12} principal={datos['principal']:>10} archivadas={datos['archivadas']:>10}"
+                      f" horizonte={datos['horizonte'] or '-'}")
+        else:
+            print(f"[ERROR] Comando desconocido: {comando}")
+            return False
+    except Exception as e:
+        print(f"[ERROR] {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,133 @@
+"""
+Avisos de vencimiento de contratos.
+
+Proceso diario (por ejemplo desde cron) que, en una sola sentencia
+INSERT ... SELECT sobre el índice parcial idx_contratos_vencimiento, escribe
+en la bandeja de salida Notificaciones_Salida un aviso por cada contrato que
+vence dentro de alguno de los umbrales de Config.CONTRATOS_AVISOS_DIAS
+(por defecto 30, 60 y 90 días). Cada aviso tiene una clave única
+(contrato, fecha_fin, umbral), de modo que ejecutarlo varias veces el mismo
+día no duplica notificaciones y un contrato prorrogado vuelve a avisar.
+
+Uso:
+    python avisos_contratos.py [generar] [--fecha YYYY-MM-DD]
+    python avisos_contratos.py pendientes
+"""
+import sys
+import time
+from typing import Dict, List, Optional
+from database import get_db, config, motor
+from models.contrato import fecha_referencia
+
+TIPO_AVISO = 'contrato_por_vencer'
+
+
+def parsear_umbrales(valor: str) -> List[int]:
+    """Convierte '30,60,90' en [30, 60, 90]."""
+    umbrales = sorted({int(u) for u in valor.split(',') if u.strip()})
+    if not umbrales or umbrales[0] <= 0:
+        raise ValueError("CONTRATOS_AVISOS_DIAS debe contener enteros positivos")
+    return umbrales
+
+
+def generar_avisos(fecha: Optional[str] = None, umbrales: Optional[List[int]] = None) -> Dict:
+    """
+    Escribe en la bandeja de salida los avisos de vencimiento pendientes.
+
+    Args:
+        fecha: Fecha de referencia (YYYY-MM-DD, por defecto hoy)
+        umbrales: Días antes del vencimiento (por defecto Config.CONTRATOS_AVISOS_DIAS)
+
+    Returns:
+        Dict con los avisos nuevos, los umbrales usados y la duración
+    """
+    motor.requiere_sqlite("Los avisos de vencimiento de contratos")
+    hoy = fecha_referencia(fecha)
+    umbrales = umbrales or parsear_umbrales(config.CONTRATOS_AVISOS_DIAS)
+    # Cada contrato cae en el umbral más pequeño que cubre sus días restantes
+    caso = ' '.join(f"WHEN dias <= {int(u)} THEN {int(u)}" for u in umbrales)
+
+    inicio = time.perf_counter()
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            INSERT OR IGNORE INTO Notificaciones_Salida (tipo, clave, id_empleado, payload)
+            SELECT :tipo, id_contrato || ':' || fecha_fin || ':' || umbral, id_empleado,
+                   json_object('id_contrato', id_contrato, 'id_empleado', id_empleado,
+                               'nombre', nombre, 'apellido', apellido, 'correo', correo,
+                               'tipo_contrato', tipo_contrato, 'fecha_fin', fecha_fin,
+                               'dias_restantes', dias, 'umbral', umbral)
+            FROM (
+                SELECT *, CASE {caso} END AS umbral
+                FROM (
+                    SELECT c.id_contrato, c.id_empleado, e.nombre, e.apellido, e.correo,
+                           c.tipo_contrato, c.fecha_fin,
+                           CAST(julianday(c.fecha_fin) - julianday(:hoy) AS INTEGER) AS dias
+                    FROM Contratos c
+                    JOIN Empleados e ON e.id_empleado = c.id_empleado
+                    WHERE c.fecha_fin IS NOT NULL
+                      AND c.fecha_fin >= :hoy
+                      AND c.fecha_fin <= date(:hoy, '+' || :maximo || ' days')
+                )
+            )
+        """, {
+            'tipo': TIPO_AVISO,
+            'hoy': hoy,
+            'maximo': umbrales[-1]
+        })
+        nuevos = cursor.rowcount
+
+    return {
+        'avisos_nuevos': nuevos,
+        'umbrales': umbrales,
+        'duracion_ms': int((time.perf_counter() - inicio) * 1000)
+    }
+
+
+def listar_pendientes(limite: int = 100) -> List[Dict]:
+    """Devuelve las notificaciones de la bandeja de salida aún no enviadas."""
+    motor.requiere_sqlite("Los avisos de vencimiento de contratos")
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id_notificacion, tipo, clave, id_empleado, payload, creada_en, intentos
+            FROM Notificaciones_Salida
+            WHERE enviada_en IS NULL
+            ORDER BY id_notificacion
+            LIMIT ?
+        """, (limite,))
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def main(argv=None) -> bool:
+    """Punto de entrada de la línea de comandos."""
+    argv = sys.argv[1:] if argv is None else argv
+    comando = argv[0] if argv and not argv[0].startswith('--') else 'generar'
+    fecha = argv[argv.index('--fecha') + 1] if '--fecha' in argv else None
+
+    print("=" * 60)
+    print("AVISOS DE VENCIMIENTO DE CONTRATOS")
+    print("=" * 60)
+
+    try:
+        if comando == 'generar':
+            r = generar_avisos(fecha)
+            print(f"[OK] {r['avisos_nuevos']} avisos nuevos en la bandeja de salida "
+                  f"(umbrales {r['umbrales']}, {r['duracion_ms']} ms)")
+        elif comando == 'pendientes':
+            pendientes = listar_pendientes()
+            for aviso in pendientes:
+                print(f"  - #{aviso['id_notificacion']} {aviso['tipo']} {aviso['clave']}")
+            print(f"[INFO] {len(pendientes)} notificaciones pendientes")
+        else:
+            print(f"[ERROR] Comando desconocido: {comando}")
+            return False
+    except Exception as e:
+        print(f"[ERROR] Error al generar los avisos: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
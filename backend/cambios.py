@@ -0,0 +1,227 @@
+"""
+Registro de cambios (change data capture) de las tablas de RRHH.
+
+Los triggers creados por la migración 11 escriben en la tabla Cambios una
+fila por cada INSERT, UPDATE o DELETE, con la fila completa en JSON y un
+número de secuencia (seq) creciente. Como SQLite serializa las escrituras,
+el orden de seq coincide con el orden de confirmación: un consumidor que
+guarda el último seq procesado y pide los cambios posteriores no se salta
+ninguno. La sincronización cuesta O(cambios), no O(tabla).
+
+Para esperar cambios nuevos sin consultar la tabla en bucle se usa
+PRAGMA data_version, que solo cambia cuando otra conexión confirma una
+escritura.
+
+Uso:
+    python cambios.py [listar] [--desde SEQ] [--limite N]
+    python cambios.py purgar [--dias N]
+"""
+import json
+import sys
+import time
+from typing import Dict, Iterator, List, Optional
+from database import get_connection, get_db, config, motor
+
+
+def _condiciones(desde: int, tablas: Optional[List[str]]):
+    sql, params = "seq > ?", [desde]
+    if tablas:
+        sql += f" AND tabla IN ({', '.join('?' * len(tablas))})"
+        params.extend(tablas)
+    return sql, params
+
+
+def _leer(conn, desde: int, limite: int, tablas: Optional[List[str]]) -> Dict:
+    condicion, params = _condiciones(desde, tablas)
+    # Una sola transacción de lectura: las filas y el seq máximo salen de la
+    # misma instantánea
+    conn.execute("BEGIN")
+    try:
+        # Se pide una fila de más para saber si quedan cambios sin devolver
+        rows = conn.execute(f"""
+            SELECT seq, tabla, operacion, id_registro, datos, creado_en
+            FROM Cambios
+            WHERE {condicion}
+            ORDER BY seq
+            LIMIT ?
+        """, params + [limite + 1]).fetchall()
+        minimo = conn.execute("SELECT MIN(seq) FROM Cambios").fetchone()[0]
+        # Último seq asignado (sigue ahí aunque se purguen todos los cambios)
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'Cambios'").fetchone()
+        maximo = row[0] if row else 0
+    finally:
+        conn.execute("COMMIT")
+
+    hay_mas = len(rows) > limite
+    rows = rows[:limite]
+    if hay_mas:
+        ultimo = rows[-1]['seq']
+    else:
+        # Sin más filas, todo hasta el máximo ya está revisado (aunque el
+        # filtro por tablas no haya devuelto nada)
+        ultimo = max(desde, maximo)
+    return {
+        'cambios': [{
+            'seq': row['seq'],
+            'tabla': row['tabla'],
+            'operacion': row['operacion'],
+            'id_registro': row['id_registro'],
+            'datos': json.loads(row['datos']),
+            'creado_en': row['creado_en']
+        } for row in rows],
+        # Siguiente valor de 'desde' para el consumidor
+        'ultimo': ultimo,
+        'hay_mas': hay_mas,
+        # Hay cambios posteriores a 'desde' que ya se purgaron: el consumidor
+        # debe resincronizar
+        'reiniciar': desde < (minimo - 1 if minimo is not None else maximo)
+    }
+
+
+def listar(desde: int = 0, limite: int = 100, tablas: Optional[List[str]] = None,
+           esperar: float = 0) -> Dict:
+    """
+    Devuelve los cambios posteriores a 'desde', en orden de secuencia.
+
+    Args:
+        desde: Último seq procesado por el consumidor (0 = desde el principio)
+        limite: Máximo de cambios (hasta Config.CAMBIOS_LIMITE_MAX)
+        tablas: Limitar a estas tablas (opcional)
+        esperar: Segundos que se espera a que haya cambios si no hay ninguno
+            (long polling, hasta Config.CAMBIOS_ESPERA_MAX)
+
+    Returns:
+        Dict con los cambios, el 'ultimo' seq devuelto (siguiente 'desde'),
+        si 'hay_mas' y si hay que 'reiniciar' la sincronización
+    """
+    motor.requiere_sqlite("El registro de cambios")
+    if desde < 0:
+        raise ValueError("'desde' no puede ser negativo")
+    if limite < 1 or limite > config.CAMBIOS_LIMITE_MAX:
+        raise ValueError(f"'limit' debe estar entre 1 y {config.CAMBIOS_LIMITE_MAX}")
+    esperar = min(max(esperar, 0), config.CAMBIOS_ESPERA_MAX)
+
+    conn = get_connection()
+    try:
+        resultado = _leer(conn, desde, limite, tablas)
+        if resultado['cambios'] or not esperar:
+            return resultado
+        fin = time.monotonic() + esperar
+        for _ in _esperar_escrituras(conn, fin):
+            resultado = _leer(conn, desde, limite, tablas)
+            if resultado['cambios']:
+                break
+        return resultado
+    finally:
+        conn.close()
+
+
+def _esperar_escrituras(conn, fin: float) -> Iterator[None]:
+    """
+    Genera un valor cada vez que otra conexión confirma una escritura
+    (PRAGMA data_version), hasta el instante 'fin'.
+    """
+    version = conn.execute("PRAGMA data_version").fetchone()[0]
+    while time.monotonic() < fin:
+        time.sleep(config.CAMBIOS_INTERVALO)
+        nueva = conn.execute("PRAGMA data_version").fetchone()[0]
+        if nueva != version:
+            version = nueva
+            yield
+
+
+def stream(desde: int = 0, tablas: Optional[List[str]] = None,
+           latido: Optional[float] = None) -> Iterator[str]:
+    """
+    Genera los cambios como Server-Sent Events ('id' = seq, evento 'cambio')
+    a partir de 'desde', y sigue enviando los nuevos a medida que se
+    confirman. Cada 'latido' segundos sin cambios envía un comentario para
+    mantener viva la conexión.
+    """
+    motor.requiere_sqlite("El registro de cambios")
+    latido = latido or config.CAMBIOS_LATIDO
+    conn = get_connection()
+    try:
+        ultimo_envio = time.monotonic()
+        pendiente = True
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        while True:
+            if pendiente:
+                resultado = _leer(conn, desde, config.CAMBIOS_LIMITE_MAX, tablas)
+                if resultado['reiniciar']:
+                    yield "event: reiniciar\ndata: {}\n\n"
+                for cambio in resultado['cambios']:
+                    yield f"id: {cambio['seq']}\nevent: cambio\ndata: {json.dumps(cambio)}\n\n"
+                if resultado['cambios']:
+                    ultimo_envio = time.monotonic()
+                desde = resultado['ultimo']
+                pendiente = resultado['hay_mas']
+                if pendiente:
+                    continue
+            if time.monotonic() - ultimo_envio >= latido:
+                ultimo_envio = time.monotonic()
+                yield ": latido\n\n"
+            time.sleep(config.CAMBIOS_INTERVALO)
+            nueva = conn.execute("PRAGMA data_version").fetchone()[0]
+            if nueva != version:
+                version = nueva
+                pendiente = True
+    finally:
+        conn.close()
+
+
+def purgar(dias: Optional[int] = None) -> Dict:
+    """
+    Elimina los cambios con más de 'dias' días (por defecto
+    Config.CAMBIOS_RETENCION_DIAS). Los consumidores que se queden atrás
+    recibirán 'reiniciar'.
+    """
+    dias = config.CAMBIOS_RETENCION_DIAS if dias is None else dias
+    with get_db() as conn:
+        limite = conn.execute("SELECT datetime('now', ?)", (f"-{dias} days",)).fetchone()[0]
+        # creado_en crece con seq: el primer cambio reciente marca el corte
+        # (recorrido por la clave primaria, sin índice sobre creado_en)
+        row = conn.execute("""
+            SELECT seq FROM Cambios WHERE creado_en >= ? ORDER BY seq LIMIT 1
+        """, (limite,)).fetchone()
+        if row is None:
+            eliminados = conn.execute("DELETE FROM Cambios").rowcount
+        else:
+            eliminados = conn.execute("DELETE FROM Cambios WHERE seq < ?", (row['seq'],)).rowcount
+    return {'eliminados': eliminados, 'anteriores_a': limite}
+
+
+def main(argv=None) -> bool:
+    """Punto de entrada de la línea de comandos."""
+    argv = sys.argv[1:] if argv is None else argv
+    comando = argv[0] if argv and not argv[0].startswith('--') else 'listar'
+
+    print("=" * 60)
+    print("REGISTRO DE CAMBIOS")
+    print("=" * 60)
+
+    try:
+        if comando == 'listar':
+            desde = int(argv[argv.index('--desde') + 1]) if '--desde' in argv else 0
+            limite = int(argv[argv.index('--limite') + 1]) if '--limite' in argv else 100
+            r = listar(desde, limite)
+            for cambio in r['cambios']:
+                print(f"  {cambio['seq']:>8} {cambio['operacion']:<6} {cambio['tabla']} #{cambio['id_registro']}")
+            print(f"[INFO] {len(r['cambios'])} cambios; siguiente desde={r['ultimo']}"
+                  f"{' (hay más)' if r['hay_mas'] else ''}")
+        elif comando == 'purgar':
+            dias = int(argv[argv.index('--dias') + 1]) if '--dias' in argv else None
+            r = purgar(dias)
+            print(f"[OK] {r['eliminados']} cambios anteriores a {r['anteriores_a']} eliminados")
+        else:
+            print(f"[ERROR] Comando desconocido: {comando}")
+            return False
+    except Exception as e:
+        print(f"[ERROR] {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -21,6 +21,29 @@ class Config:
     DATABASE_DIR = BASE_DIR / 'database'
     DATABASE_NAME = os.getenv('DATABASE_NAME', 'rrhh.db')
     DATABASE_PATH = DATABASE_DIR / DATABASE_NAME
+
+    # Motor de almacenamiento: 'sqlite' (archivo DATABASE_PATH) o 'postgresql'
+    # (servidor en DATABASE_URL, con un pool de hasta DB_POOL_MAX conexiones)
+    DATABASE_ENGINE = os.getenv('DATABASE_ENGINE', 'sqlite').lower()
+    DATABASE_URL = os.getenv('DATABASE_URL', '')
+    DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 1))
+    DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+    DB_POOL_ESPERA = float(os.getenv('DB_POOL_ESPERA', 30))  # segundos esperando una conexión libre
+
+    # Base de datos de archivo (filas antiguas de Nomina, adjunta con ATTACH)
+    ARCHIVO_NAME = os.getenv('ARCHIVO_NAME', 'rrhh_archivo.db')
+    ARCHIVO_PATH = DATABASE_DIR / ARCHIVO_NAME
+    
+    # Réplica de solo lectura para los informes (copia con la API de backup)
+    REPLICA_NAME = os.getenv('REPLICA_NAME', 'rrhh_replica.db')
+    REPLICA_PATH = DATABASE_DIR / REPLICA_NAME
+    
+    # Particiones anuales de Asistencias (una base de datos por año cerrado)
+    PARTICIONES_DIR = Path(os.getenv('PARTICIONES_DIR', DATABASE_DIR / 'particiones'))
+    
+    # Multiempresa: cada filial en EMPRESAS_DIR/<empresa>/ con sus propios
+    # DATABASE_NAME, ARCHIVO_NAME, REPLICA_NAME y particiones/
+    EMPRESAS_DIR = Path(os.getenv('EMPRESAS_DIR', DATABASE_DIR / 'empresas'))
     
     # Configuración de seguridad
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -44,6 +67,91 @@ class Config:
     # Configuración de paginación
     ITEMS_PER_PAGE = int(os.getenv('ITEMS_PER_PAGE', 10))
     
+    # Modelo de lectura desnormalizado de empleados (tabla empleados_vista)
+    EMPLEADOS_VISTA = os.getenv('EMPLEADOS_VISTA', 'True').lower() == 'true'
+    
+    # Tamaño de lote para las copias de datos de las migraciones
+    MIGRACIONES_LOTE = int(os.getenv('MIGRACIONES_LOTE', 5000))
+    
+    # Consolidación de las tablas antiguas employees/attendance
+    CONSOLIDACION_LOTE = int(os.getenv('CONSOLIDACION_LOTE', 1000))
+    CONSOLIDACION_PAUSA = float(os.getenv('CONSOLIDACION_PAUSA', 0.05))  # segundos entre lotes
+    
+    # Mantenimiento programado de la base de datos (optimize, vacuum, checkpoint)
+    MANTENIMIENTO_AUTOMATICO = os.getenv('MANTENIMIENTO_AUTOMATICO', 'False').lower() == 'true'
+    MANTENIMIENTO_VENTANA = os.getenv('MANTENIMIENTO_VENTANA', '02:00-05:00')
+    MANTENIMIENTO_INTERVALO_CHECKPOINT = int(os.getenv('MANTENIMIENTO_INTERVALO_CHECKPOINT', 900))  # segundos
+    MANTENIMIENTO_PAGINAS_VACUUM = int(os.getenv('MANTENIMIENTO_PAGINAS_VACUUM', 0))  # 0 = todas
+    
+    # Respaldos en caliente (API de backup de SQLite)
+    RESPALDOS_DIR = Path(os.getenv('RESPALDOS_DIR', BASE_DIR / 'backups'))
+    RESPALDOS_RETENCION = int(os.getenv('RESPALDOS_RETENCION', 7))
+    RESPALDOS_PAGINAS_POR_PASO = int(os.getenv('RESPALDOS_PAGINAS_POR_PASO', 256))
+    RESPALDOS_PAUSA = float(os.getenv('RESPALDOS_PAUSA', 0.01))  # segundos entre lotes
+    
+    # Máximo de ausentes simultáneos por departamento en vacaciones/permisos (0 = sin límite)
+    VACACIONES_MAX_AUSENTES_DEPARTAMENTO = int(os.getenv('VACACIONES_MAX_AUSENTES_DEPARTAMENTO', 0))
+    
+    # Saldo de vacaciones: días por año (devengo mensual) y empleados por lote al reconstruir
+    VACACIONES_DIAS_ANUALES = float(os.getenv('VACACIONES_DIAS_ANUALES', 15))
+    VACACIONES_SALDOS_LOTE = int(os.getenv('VACACIONES_SALDOS_LOTE', 500))
+    
+    # Avisos de vencimiento de contratos (días antes de fecha_fin, separados por comas)
+    CONTRATOS_AVISOS_DIAS = os.getenv('CONTRATOS_AVISOS_DIAS', '30,60,90')
+    
+    # Segundos que se guarda en caché el contrato vigente de cada empleado (0 = sin caché)
+    CONTRATOS_CACHE_TTL = int(os.getenv('CONTRATOS_CACHE_TTL', 60))
+    
+    # Importación masiva de empleados: filas por executemany y errores máximos en el informe
+    IMPORTACION_LOTE = int(os.getenv('IMPORTACION_LOTE', 1000))
+    IMPORTACION_MAX_ERRORES = int(os.getenv('IMPORTACION_MAX_ERRORES', 1000))
+    
+    # Filas por fetchmany al exportar listados a CSV/XLSX
+    EXPORTACION_LOTE = int(os.getenv('EXPORTACION_LOTE', 1000))
+    
+    # Operaciones por lotes: IDs máximos por petición y por consulta IN (...)
+    LOTES_MAX_IDS = int(os.getenv('LOTES_MAX_IDS', 1000))
+    LOTES_BLOQUE = int(os.getenv('LOTES_BLOQUE', 500))
+    
+    # Cola de trabajos en segundo plano
+    TRABAJOS_WORKERS = int(os.getenv('TRABAJOS_WORKERS', 2))  # hilos por proceso (0 = ninguno)
+    TRABAJOS_INTERVALO = float(os.getenv('TRABAJOS_INTERVALO', 2))  # segundos entre consultas de la cola
+    TRABAJOS_REINTENTOS = int(os.getenv('TRABAJOS_REINTENTOS', 3))
+    TRABAJOS_REINTENTO_ESPERA = int(os.getenv('TRABAJOS_REINTENTO_ESPERA', 30))  # segundos (se duplica en cada intento)
+    TRABAJOS_EXPIRACION = int(os.getenv('TRABAJOS_EXPIRACION', 600))  # segundos sin latido para dar un trabajo por abandonado
+    
+    # Registro de cambios (CDC) para sincronización incremental
+    CAMBIOS_LIMITE_MAX = int(os.getenv('CAMBIOS_LIMITE_MAX', 1000))  # cambios por petición
+    CAMBIOS_ESPERA_MAX = int(os.getenv('CAMBIOS_ESPERA_MAX', 30))  # segundos de long polling
+    CAMBIOS_INTERVALO = float(os.getenv('CAMBIOS_INTERVALO', 0.5))  # segundos entre comprobaciones de escrituras
+    CAMBIOS_LATIDO = int(os.getenv('CAMBIOS_LATIDO', 15))  # segundos entre latidos del stream SSE
+    CAMBIOS_RETENCION_DIAS = int(os.getenv('CAMBIOS_RETENCION_DIAS', 30))
+    
+    # Eventos en vivo (SSE) de asistencias y solicitudes
+    EVENTOS_BUFFER = int(os.getenv('EVENTOS_BUFFER', 100))  # eventos en cola por cliente antes de desconectarlo
+    EVENTOS_LATIDO = int(os.getenv('EVENTOS_LATIDO', 15))  # segundos entre latidos
+    EVENTOS_INTERVALO = float(os.getenv('EVENTOS_INTERVALO', 0.2))  # segundos entre comprobaciones de eventos nuevos
+    EVENTOS_RETENCION_HORAS = int(os.getenv('EVENTOS_RETENCION_HORAS', 24))
+    
+    # Archivo de nóminas antiguas
+    ARCHIVO_MESES = int(os.getenv('ARCHIVO_MESES', 24))  # meses que se quedan en la tabla principal
+    ARCHIVO_LOTE = int(os.getenv('ARCHIVO_LOTE', 1000))  # filas movidas por transacción
+    PARTICIONES_LOTE = int(os.getenv('PARTICIONES_LOTE', 1000))  # filas movidas por transacción al cerrar un año
+    
+    # Réplica de lectura de los informes
+    REPLICA_ACTIVA = os.getenv('REPLICA_ACTIVA', 'False').lower() == 'true'
+    REPLICA_INTERVALO = int(os.getenv('REPLICA_INTERVALO', 60))  # segundos entre copias
+    REPLICA_MAX_RETRASO = int(os.getenv('REPLICA_MAX_RETRASO', 300))  # antigüedad máxima (s) para usarla
+    
+    # Multiempresa: la empresa de cada petición sale de la cabecera
+    # EMPRESAS_CABECERA o del subdominio de EMPRESAS_DOMINIO
+    EMPRESAS_ACTIVAS = os.getenv('EMPRESAS_ACTIVAS', 'False').lower() == 'true'
+    EMPRESAS_CABECERA = os.getenv('EMPRESAS_CABECERA', 'X-Empresa')
+    EMPRESAS_DOMINIO = os.getenv('EMPRESAS_DOMINIO', '').lower()  # p. ej. rrhh.example.com
+    EMPRESAS_ABIERTAS = int(os.getenv('EMPRESAS_ABIERTAS', 16))  # empresas con conexiones abiertas (LRU)
+    EMPRESAS_CONEXIONES = int(os.getenv('EMPRESAS_CONEXIONES', 4))  # conexiones libres por empresa
+    EMPRESAS_PARALELO = int(os.getenv('EMPRESAS_PARALELO', 4))  # hilos de las consultas agregadas
+    
     @staticmethod
     def init_app(app):
         """Inicializa la aplicación con la configuración."""
@@ -93,6 +201,11 @@ class TestingConfig(Config):
     # Base de datos de prueba en memoria o archivo temporal
     DATABASE_NAME = 'test_rrhh.db'
     DATABASE_PATH = Path('/tmp') / DATABASE_NAME
+    ARCHIVO_PATH = Path('/tmp') / 'test_rrhh_archivo.db'
+    PARTICIONES_DIR = Path('/tmp') / 'test_rrhh_particiones'
+    REPLICA_PATH = Path('/tmp') / 'test_rrhh_replica.db'
+    EMPRESAS_DIR = Path('/tmp') / 'test_rrhh_empresas'
+    RESPALDOS_DIR = Path('/tmp') / 'test_rrhh_respaldos'
     
     # CORS permisivo para testing
     CORS_ORIGINS = ['*']
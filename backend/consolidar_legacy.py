@@ -0,0 +1,492 @@
+"""
+Consolidación de las tablas antiguas 'employees' y 'attendance' en las tablas
+Empleados y Asistencias.
+
+El proceso es en línea (la aplicación sigue funcionando mientras corre):
+
+1. iniciar:   crea las tablas de correspondencia de IDs y los triggers de
+              doble escritura, que replican en Empleados/Asistencias cualquier
+              escritura que siga llegando a las tablas antiguas.
+2. backfill:  copia las filas antiguas por lotes, cada lote en su propia
+              transacción y con una pausa entre lotes para no bloquear a otros
+              escritores. Es idempotente: solo copia filas sin correspondencia.
+3. verificar: compara conteos y una suma de verificación SHA-256 de las filas
+              antiguas con correspondencia, proyectadas al nuevo esquema,
+              frente a sus filas de destino. Las filas fusionadas con una que
+              ya existía (mismo correo, o mismo empleado y fecha) solo se
+              comparan por su clave, porque conservan los datos de la fila
+              existente. Las filas sin correspondencia se informan aparte.
+4. retirar:   si la verificación es correcta y no quedan filas sin
+              correspondencia (o se indica --descartar-sin-correspondencia),
+              elimina triggers, tablas de correspondencia y las tablas antiguas.
+
+Uso:
+    python consolidar_legacy.py [iniciar|backfill|verificar|retirar|todo]
+                                [--descartar-sin-correspondencia]
+"""
+import hashlib
+import sys
+import time
+from typing import Dict, List, Optional
+from database import get_connection, config
+from migraciones import existe_tabla
+
+
+# Proyección de una fila de 'attendance' a la columna observaciones de Asistencias
+_OBSERVACIONES_ATTENDANCE = """
+    CASE WHEN {a}.status IS NULL OR {a}.status = 'present' THEN {a}.notes
+         ELSE {a}.status || COALESCE(': ' || {a}.notes, '')
+    END
+"""
+
+# IDs de filas sin correspondencia que se incluyen en el informe de verificar()
+_MAX_IDS_INFORME = 100
+
+_TRIGGERS = ('trg_employees_dual_ins', 'trg_employees_dual_upd', 'trg_employees_dual_del',
+             'trg_attendance_dual_ins', 'trg_attendance_dual_upd', 'trg_attendance_dual_del')
+
+
+def hay_tablas_legacy(conn) -> bool:
+    """Indica si todavía existe alguna de las tablas antiguas."""
+    return existe_tabla(conn, 'employees') or existe_tabla(conn, 'attendance')
+
+
+def _crear_correspondencias(conn) -> None:
+    """
+    Crea las tablas de correspondencia de IDs. 'fusionado' marca las filas
+    antiguas que se asociaron a una fila que ya existía en la tabla nueva en
+    lugar de copiarse.
+    """
+    for tabla, destino in (('consolidacion_empleados', 'id_empleado'),
+                           ('consolidacion_asistencias', 'id_asistencia')):
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {tabla} (
+                id_legacy INTEGER PRIMARY KEY,
+                {destino} INTEGER NOT NULL,
+                fusionado INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        columnas = [row[1] for row in conn.execute(f"PRAGMA table_info({tabla})")]
+        if 'fusionado' not in columnas:
+            conn.execute(f"ALTER TABLE {tabla} ADD COLUMN fusionado INTEGER NOT NULL DEFAULT 0")
+
+
+def iniciar(conn) -> None:
+    """Crea las tablas de correspondencia y (re)crea los triggers de doble escritura."""
+    _crear_correspondencias(conn)
+    for trigger in _TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    if existe_tabla(conn, 'employees'):
+        conn.execute("""
+            CREATE TRIGGER trg_employees_dual_ins
+            AFTER INSERT ON employees
+            BEGIN
+                INSERT OR REPLACE INTO consolidacion_empleados (id_legacy, id_empleado, fusionado)
+                SELECT NEW.id, MIN(id_empleado), 1 FROM Empleados WHERE correo = NEW.email
+                HAVING COUNT(*) > 0;
+                INSERT INTO Empleados (nombre, apellido, correo, telefono,
+                                       fecha_ingreso, id_departamento, id_puesto)
+                SELECT NEW.first_name, NEW.last_name, NEW.email, NEW.phone,
+                       NEW.hire_date, NEW.department_id,
+                       (SELECT id_puesto FROM Puestos WHERE nombre_puesto = NEW.position)
+                WHERE NOT EXISTS (SELECT 1 FROM consolidacion_empleados WHERE id_legacy = NEW.id);
+                INSERT OR IGNORE INTO consolidacion_empleados (id_legacy, id_empleado)
+                VALUES (NEW.id, last_insert_rowid());
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER trg_employees_dual_upd
+            AFTER UPDATE ON employees
+            BEGIN
+                UPDATE Empleados SET
+                    nombre = NEW.first_name,
+                    apellido = NEW.last_name,
+                    correo = NEW.email,
+                    telefono = NEW.phone,
+                    fecha_ingreso = NEW.hire_date,
+                    id_departamento = NEW.department_id,
+                    id_puesto = (SELECT id_puesto FROM Puestos WHERE nombre_puesto = NEW.position)
+                WHERE id_empleado = (SELECT id_empleado FROM consolidacion_empleados
+                                     WHERE id_legacy = OLD.id);
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER trg_employees_dual_del
+            AFTER DELETE ON employees
+            BEGIN
+                DELETE FROM Empleados
+                WHERE id_empleado = (SELECT id_empleado FROM consolidacion_empleados
+                                     WHERE id_legacy = OLD.id);
+                DELETE FROM consolidacion_empleados WHERE id_legacy = OLD.id;
+            END
+        """)
+
+    if existe_tabla(conn, 'attendance'):
+        conn.execute(f"""
+            CREATE TRIGGER trg_attendance_dual_ins
+            AFTER INSERT ON attendance
+            WHEN EXISTS (SELECT 1 FROM consolidacion_empleados WHERE id_legacy = NEW.employee_id)
+            BEGIN
+                INSERT OR REPLACE INTO consolidacion_asistencias (id_legacy, id_asistencia, fusionado)
+                SELECT NEW.id, MIN(s.id_asistencia), 1
+                FROM Asistencias s
+                JOIN consolidacion_empleados m ON m.id_empleado = s.id_empleado
+                WHERE m.id_legacy = NEW.employee_id AND s.fecha = NEW.date
+                HAVING COUNT(*) > 0;
+                INSERT INTO Asistencias (id_empleado, fecha, hora_entrada, hora_salida, observaciones)
+                SELECT m.id_empleado, NEW.date, NEW.check_in, NEW.check_out,
+                       {_OBSERVACIONES_ATTENDANCE.format(a='NEW')}
+                FROM consolidacion_empleados m
+                WHERE m.id_legacy = NEW.employee_id
+                  AND NOT EXISTS (SELECT 1 FROM consolidacion_asistencias WHERE id_legacy = NEW.id);
+                INSERT OR IGNORE INTO consolidacion_asistencias (id_legacy, id_asistencia)
+                VALUES (NEW.id, last_insert_rowid());
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER trg_attendance_dual_upd
+            AFTER UPDATE ON attendance
+            BEGIN
+                UPDATE Asistencias SET
+                    id_empleado = COALESCE(
+                        (SELECT id_empleado FROM consolidacion_empleados
+                         WHERE id_legacy = NEW.employee_id), id_empleado),
+                    fecha = NEW.date,
+                    hora_entrada = NEW.check_in,
+                    hora_salida = NEW.check_out,
+                    observaciones = {_OBSERVACIONES_ATTENDANCE.format(a='NEW')}
+                WHERE id_asistencia = (SELECT id_asistencia FROM consolidacion_asistencias
+                                       WHERE id_legacy = OLD.id);
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER trg_attendance_dual_del
+            AFTER DELETE ON attendance
+            BEGIN
+                DELETE FROM Asistencias
+                WHERE id_asistencia = (SELECT id_asistencia FROM consolidacion_asistencias
+                                       WHERE id_legacy = OLD.id);
+                DELETE FROM consolidacion_asistencias WHERE id_legacy = OLD.id;
+            END
+        """)
+
+
+def _siguiente_limite(conn, tabla: str, mapa: str, desde: int, lote: int) -> Optional[int]:
+    """Clave máxima del siguiente lote de filas sin correspondencia."""
+    return conn.execute(f"""
+        SELECT MAX(id) FROM (
+            SELECT id FROM {tabla}
+            WHERE id > ? AND id NOT IN (SELECT id_legacy FROM {mapa})
+            ORDER BY id LIMIT ?
+        )
+    """, (desde, lote)).fetchone()[0]
+
+
+def _backfill_employees(conn, desde: int, hasta: int) -> int:
+    # Empleados que ya existen en la tabla nueva con el mismo correo
+    conn.execute("""
+        INSERT OR IGNORE INTO consolidacion_empleados (id_legacy, id_empleado, fusionado)
+        SELECT e.id, (SELECT MIN(id_empleado) FROM Empleados WHERE correo = e.email), 1
+        FROM employees e
+        WHERE e.id > ? AND e.id <= ?
+          AND EXISTS (SELECT 1 FROM Empleados WHERE correo = e.email)
+    """, (desde, hasta))
+    cursor = conn.execute("""
+        INSERT INTO Empleados (nombre, apellido, correo, telefono,
+                               fecha_ingreso, id_departamento, id_puesto)
+        SELECT e.first_name, e.last_name, e.email, e.phone, e.hire_date, e.department_id,
+               (SELECT id_puesto FROM Puestos WHERE nombre_puesto = e.position)
+        FROM employees e
+        WHERE e.id > ? AND e.id <= ?
+          AND e.id NOT IN (SELECT id_legacy FROM consolidacion_empleados)
+        ORDER BY e.id
+    """, (desde, hasta))
+    copiadas = max(cursor.rowcount, 0)
+    conn.execute("""
+        INSERT OR IGNORE INTO consolidacion_empleados (id_legacy, id_empleado)
+        SELECT e.id, (SELECT MIN(id_empleado) FROM Empleados WHERE correo = e.email)
+        FROM employees e
+        WHERE e.id > ? AND e.id <= ?
+    """, (desde, hasta))
+    return copiadas
+
+
+def _backfill_attendance(conn, desde: int, hasta: int) -> int:
+    # Asistencias que ya existen para el mismo empleado y fecha
+    conn.execute("""
+        INSERT OR IGNORE INTO consolidacion_asistencias (id_legacy, id_asistencia, fusionado)
+        SELECT a.id, (SELECT MIN(s.id_asistencia) FROM Asistencias s
+                      WHERE s.id_empleado = m.id_empleado AND s.fecha = a.date), 1
+        FROM attendance a
+        JOIN consolidacion_empleados m ON m.id_legacy = a.employee_id
+        WHERE a.id > ? AND a.id <= ?
+          AND EXISTS (SELECT 1 FROM Asistencias s
+                      WHERE s.id_empleado = m.id_empleado AND s.fecha = a.date)
+    """, (desde, hasta))
+    cursor = conn.execute(f"""
+        INSERT INTO Asistencias (id_empleado, fecha, hora_entrada, hora_salida, observaciones)
+        SELECT m.id_empleado, a.date, a.check_in, a.check_out,
+               {_OBSERVACIONES_ATTENDANCE.format(a='a')}
+        FROM attendance a
+        JOIN consolidacion_empleados m ON m.id_legacy = a.employee_id
+        WHERE a.id > ? AND a.id <= ?
+          AND a.id NOT IN (SELECT id_legacy FROM consolidacion_asistencias)
+        ORDER BY a.id
+    """, (desde, hasta))
+    copiadas = max(cursor.rowcount, 0)
+    conn.execute("""
+        INSERT OR IGNORE INTO consolidacion_asistencias (id_legacy, id_asistencia)
+        SELECT a.id, (SELECT MIN(s.id_asistencia) FROM Asistencias s
+                      WHERE s.id_empleado = m.id_empleado AND s.fecha = a.date)
+        FROM attendance a
+        JOIN consolidacion_empleados m ON m.id_legacy = a.employee_id
+        WHERE a.id > ? AND a.id <= ?
+    """, (desde, hasta))
+    return copiadas
+
+
+def backfill(conn, lote: Optional[int] = None, pausa: Optional[float] = None) -> Dict[str, int]:
+    """
+    Copia por lotes las filas antiguas que aún no tienen correspondencia.
+
+    Args:
+        conn: Conexión en modo de transacciones manuales (isolation_level=None)
+        lote: Filas por lote (por defecto Config.CONSOLIDACION_LOTE)
+        pausa: Segundos de espera entre lotes (por defecto Config.CONSOLIDACION_PAUSA)
+
+    Returns:
+        Dict con las filas copiadas por tabla
+    """
+    lote = lote or config.CONSOLIDACION_LOTE
+    pausa = config.CONSOLIDACION_PAUSA if pausa is None else pausa
+    resultado = {}
+
+    # attendance depende de la correspondencia de employees, por eso va después
+    for tabla, mapa, copiar in (
+        ('employees', 'consolidacion_empleados', _backfill_employees),
+        ('attendance', 'consolidacion_asistencias', _backfill_attendance),
+    ):
+        if not existe_tabla(conn, tabla):
+            continue
+        total, desde = 0, 0
+        while True:
+            hasta = _siguiente_limite(conn, tabla, mapa, desde, lote)
+            if hasta is None:
+                break
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                total += copiar(conn, desde, hasta)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            desde = hasta
+            print(f"  [{tabla}] {total} filas copiadas (hasta id {desde})")
+            if pausa:
+                time.sleep(pausa)
+        resultado[tabla] = total
+
+    return resultado
+
+
+def _suma_verificacion(cursor) -> Dict:
+    """Cuenta y calcula el SHA-256 de las filas de un cursor leyendo por bloques."""
+    h = hashlib.sha256()
+    filas = 0
+    while True:
+        bloque = cursor.fetchmany(1000)
+        if not bloque:
+            break
+        for row in bloque:
+            h.update(repr(tuple(row)).encode('utf-8'))
+            filas += 1
+    return {'filas': filas, 'sha256': h.hexdigest()}
+
+
+def _solo_copiadas(mapa: str, *columnas: str) -> str:
+    """Columnas que solo se comparan en las filas copiadas (no en las fusionadas)."""
+    return ', '.join(f"CASE WHEN {mapa}.fusionado = 0 THEN {c} END" for c in columnas)
+
+
+def _sin_correspondencia(conn, tabla: str, mapa: str) -> Dict:
+    """Filas antiguas que no tienen fila de destino (y por tanto no se verifican)."""
+    ids: List[int] = [row[0] for row in conn.execute(f"""
+        SELECT id FROM {tabla}
+        WHERE id NOT IN (SELECT id_legacy FROM {mapa})
+        ORDER BY id
+    """)]
+    return {'filas': len(ids), 'ids': ids[:_MAX_IDS_INFORME]}
+
+
+def _fusionadas(conn, mapa: str) -> int:
+    return conn.execute(f"SELECT COUNT(*) FROM {mapa} WHERE fusionado = 1").fetchone()[0]
+
+
+def verificar(conn) -> Dict:
+    """
+    Compara las filas antiguas con correspondencia con sus filas de destino
+    en Empleados y Asistencias. Las fusionadas con una fila existente solo se
+    comparan por su clave (correo; empleado y fecha).
+
+    Returns:
+        Dict con 'consistente' y, por tabla, conteos y sumas de verificación
+        de origen y destino, filas fusionadas y filas sin correspondencia
+    """
+    _crear_correspondencias(conn)
+    resultado = {'consistente': True}
+
+    if existe_tabla(conn, 'employees'):
+        origen = _suma_verificacion(conn.execute(f"""
+            SELECT e.id, m.fusionado, e.email,
+                   {_solo_copiadas('m', 'e.first_name', 'e.last_name', 'e.phone',
+                                   'e.hire_date', 'e.department_id')}
+            FROM employees e
+            JOIN consolidacion_empleados m ON m.id_legacy = e.id
+            ORDER BY e.id
+        """))
+        destino = _suma_verificacion(conn.execute(f"""
+            SELECT m.id_legacy, m.fusionado, n.correo,
+                   {_solo_copiadas('m', 'n.nombre', 'n.apellido', 'n.telefono',
+                                   'n.fecha_ingreso', 'n.id_departamento')}
+            FROM consolidacion_empleados m
+            JOIN Empleados n ON n.id_empleado = m.id_empleado
+            ORDER BY m.id_legacy
+        """))
+        resultado['employees'] = {
+            'origen': origen,
+            'destino': destino,
+            'fusionadas': _fusionadas(conn, 'consolidacion_empleados'),
+            'sin_correspondencia': _sin_correspondencia(conn, 'employees', 'consolidacion_empleados'),
+        }
+        resultado['consistente'] &= origen == destino
+
+    if existe_tabla(conn, 'attendance'):
+        origen = _suma_verificacion(conn.execute(f"""
+            SELECT a.id, m.fusionado, me.id_empleado, a.date,
+                   {_solo_copiadas('m', 'a.check_in', 'a.check_out',
+                                   _OBSERVACIONES_ATTENDANCE.format(a='a'))}
+            FROM attendance a
+            JOIN consolidacion_asistencias m ON m.id_legacy = a.id
+            LEFT JOIN consolidacion_empleados me ON me.id_legacy = a.employee_id
+            ORDER BY a.id
+        """))
+        destino = _suma_verificacion(conn.execute(f"""
+            SELECT m.id_legacy, m.fusionado, s.id_empleado, s.fecha,
+                   {_solo_copiadas('m', 's.hora_entrada', 's.hora_salida', 's.observaciones')}
+            FROM consolidacion_asistencias m
+            JOIN Asistencias s ON s.id_asistencia = m.id_asistencia
+            ORDER BY m.id_legacy
+        """))
+        resultado['attendance'] = {
+            'origen': origen,
+            'destino': destino,
+            'fusionadas': _fusionadas(conn, 'consolidacion_asistencias'),
+            'sin_correspondencia': _sin_correspondencia(conn, 'attendance', 'consolidacion_asistencias'),
+        }
+        resultado['consistente'] &= origen == destino
+
+    return resultado
+
+
+def filas_sin_correspondencia(resultado: Dict) -> int:
+    """Total de filas antiguas sin correspondencia de un resultado de verificar()."""
+    return sum(resultado[tabla]['sin_correspondencia']['filas']
+               for tabla in ('employees', 'attendance') if tabla in resultado)
+
+
+def retirar(conn, descartar_sin_correspondencia: bool = False) -> bool:
+    """
+    Elimina las tablas antiguas si la verificación es correcta.
+
+    Args:
+        conn: Conexión en modo de transacciones manuales (isolation_level=None)
+        descartar_sin_correspondencia: Retirar aunque queden filas antiguas sin
+            correspondencia (se pierden)
+
+    Returns:
+        True si se retiraron, False si la verificación falló o quedan filas
+        sin correspondencia
+    """
+    resultado = verificar(conn)
+    if not resultado['consistente']:
+        return False
+    if filas_sin_correspondencia(resultado) and not descartar_sin_correspondencia:
+        return False
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for trigger in _TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        conn.execute("DROP TABLE IF EXISTS attendance")
+        conn.execute("DROP TABLE IF EXISTS employees")
+        conn.execute("DROP TABLE IF EXISTS consolidacion_asistencias")
+        conn.execute("DROP TABLE IF EXISTS consolidacion_empleados")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return True
+
+
+def main(argv=None) -> bool:
+    """Punto de entrada de la línea de comandos."""
+    argv = sys.argv[1:] if argv is None else argv
+    descartar = '--descartar-sin-correspondencia' in argv
+    argumentos = [a for a in argv if not a.startswith('--')]
+    comando = argumentos[0] if argumentos else 'todo'
+
+    print("=" * 60)
+    print("CONSOLIDACION DE TABLAS ANTIGUAS (employees, attendance)")
+    print("=" * 60)
+
+    conn = get_connection()
+    conn.isolation_level = None  # Control manual de transacciones
+    try:
+        if not hay_tablas_legacy(conn):
+            print("[INFO] No hay tablas antiguas que consolidar.")
+            return True
+
+        if comando in ('iniciar', 'backfill', 'todo'):
+            iniciar(conn)
+            print("[OK] Doble escritura activada")
+        if comando in ('backfill', 'todo'):
+            copiadas = backfill(conn)
+            print(f"[OK] Backfill completado: {copiadas}")
+        if comando in ('verificar', 'retirar', 'todo'):
+            resultado = verificar(conn)
+            for tabla in ('employees', 'attendance'):
+                if tabla in resultado:
+                    datos = resultado[tabla]
+                    origen, destino = datos['origen'], datos['destino']
+                    print(f"  {tabla}: origen {origen['filas']} filas, destino {destino['filas']} filas "
+                          f"({datos['fusionadas']} fusionadas), "
+                          f"checksum {'OK' if origen == destino else 'DISTINTO'}")
+                    sin = datos['sin_correspondencia']
+                    if sin['filas']:
+                        print(f"  [!] {tabla}: {sin['filas']} filas sin correspondencia "
+                              f"(ids {sin['ids']}{'...' if sin['filas'] > len(sin['ids']) else ''})")
+            if not resultado['consistente']:
+                print("[!] Las tablas no coinciden; no se retiran las tablas antiguas.")
+                return False
+            print("[OK] Verificación correcta")
+        if comando in ('retirar', 'todo'):
+            if not retirar(conn, descartar):
+                print("[!] Quedan filas sin correspondencia; no se retiran las tablas antiguas "
+                      "(usar --descartar-sin-correspondencia para retirarlas igualmente).")
+                return False
+            print("[OK] Tablas antiguas retiradas")
+        if comando not in ('iniciar', 'backfill', 'verificar', 'retirar', 'todo'):
+            print(f"[ERROR] Comando desconocido: {comando}")
+            return False
+    except Exception as e:
+        print(f"[ERROR] Error durante la consolidación: {str(e)}")
+        return False
+    finally:
+        conn.close()
+
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -1,11 +1,14 @@
 """
-Módulo para manejar la conexión a la base de datos SQLite.
+Módulo para manejar la conexión a la base de datos (SQLite por defecto o
+PostgreSQL, ver motores.py).
 """
-import sqlite3
 import os
 from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
+from typing import NamedTuple, Optional
 from config import get_config
+import motores
 
 # Obtener configuración del entorno
 config = get_config()
@@ -15,17 +18,61 @@ DB_DIR = config.DATABASE_DIR
 DB_DIR.mkdir(exist_ok=True)
 DB_PATH = config.DATABASE_PATH
 
+# Motor de almacenamiento de Config.DATABASE_ENGINE
+motor = motores.crear(config)
+
+# Réplica de solo lectura a la que se dirigen las conexiones abiertas en
+# las rutas de informes (la fija replica.py; None = base de datos principal)
+ruta_lecturas: ContextVar = ContextVar('ruta_lecturas', default=None)
+
+# Empresa (empresas.Empresa) a cuya base de datos se dirigen las conexiones
+# con Config.EMPRESAS_ACTIVAS (la fija empresas.py; None = DATABASE_PATH)
+empresa_actual: ContextVar = ContextVar('empresa_actual', default=None)
+
+
+class Rutas(NamedTuple):
+    """Archivos de una base de datos y de los que dependen de ella."""
+    datos: Path
+    archivo: Path
+    particiones: Path
+    replica: Path
+    respaldos: Path
+
+
+# Rutas de la base de datos única (o de la que se usa fuera de una empresa)
+RUTAS = Rutas(Path(config.DATABASE_PATH), Path(config.ARCHIVO_PATH), Path(config.PARTICIONES_DIR),
+              Path(config.REPLICA_PATH), Path(config.RESPALDOS_DIR))
+
+
+def rutas() -> Rutas:
+    """Rutas de la base de datos del contexto actual (la de la empresa, si hay una)."""
+    empresa = empresa_actual.get()
+    return RUTAS if empresa is None else empresa.rutas
+
+
+def id_empresa() -> Optional[str]:
+    """Empresa del contexto actual (None fuera de una empresa), para las cachés en proceso."""
+    empresa = empresa_actual.get()
+    return None if empresa is None else empresa.id
+
 
 def get_connection():
     """
-    Crea y retorna una conexión a la base de datos SQLite.
+    Crea y retorna una conexión a la base de datos (a la réplica de solo
+    lectura o a la base de datos de la empresa si el contexto actual lo
+    indica, ver replica.py y empresas.py). Con PostgreSQL la conexión sale
+    del pool y close() la devuelve.
     
     Returns:
-        sqlite3.Connection: Conexión a la base de datos
+        Conexión con la interfaz de sqlite3.Connection
     """
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row  # Permite acceder a las columnas por nombre
-    return conn
+    replica = ruta_lecturas.get()
+    if replica is not None:
+        return motor.conectar(replica, solo_lectura=True)
+    empresa = empresa_actual.get()
+    if empresa is not None:
+        return empresa.motor.conectar()
+    return motor.conectar()
 
 
 @contextmanager
@@ -35,7 +82,7 @@ def get_db():
     Asegura que la conexión se cierre correctamente después de usarla.
     
     Yields:
-        sqlite3.Connection: Conexión a la base de datos
+        Conexión a la base de datos
     """
     conn = get_connection()
     try:
@@ -48,6 +95,92 @@ def get_db():
         conn.close()
 
 
+def insertar(cursor, sql: str, params, clave: str) -> int:
+    """
+    Ejecuta un INSERT de una fila y devuelve el valor generado de la
+    columna 'clave': con RETURNING si el motor lo admite (PostgreSQL no
+    tiene lastrowid) o con cursor.lastrowid si no.
+    
+    Args:
+        cursor: Cursor de la transacción del llamador
+        sql: Sentencia INSERT sin RETURNING
+        params: Parámetros de la sentencia
+        clave: Columna de la clave generada (p. ej. 'id_empleado')
+        
+    Returns:
+        Valor de la clave de la fila insertada
+    """
+    if motor.returning:
+        return cursor.execute(f"{sql.rstrip().rstrip(';')} RETURNING {clave}", params).fetchone()[0]
+    cursor.execute(sql, params)
+    return cursor.lastrowid
+
+
+# Tablas, columnas e índices de las migraciones que usan los modelos, para
+# los motores distintos de SQLite (las funciones solo de SQLite, como el
+# registro de cambios o el índice R*Tree, no tienen equivalente aquí)
+_ESQUEMA_OTROS_MOTORES = [
+    "ALTER TABLE Asistencias ADD COLUMN IF NOT EXISTS eliminado_en TIMESTAMP",
+    "ALTER TABLE Nomina ADD COLUMN IF NOT EXISTS eliminado_en TIMESTAMP",
+    """
+    CREATE TABLE IF NOT EXISTS Cursos (
+        id_curso INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre_curso TEXT NOT NULL,
+        institucion TEXT,
+        clave TEXT NOT NULL UNIQUE
+    )
+    """,
+    "ALTER TABLE Capacitaciones ADD COLUMN IF NOT EXISTS id_curso INTEGER REFERENCES Cursos(id_curso)",
+    """
+    CREATE TABLE IF NOT EXISTS Vacaciones_Saldos (
+        id_empleado INTEGER PRIMARY KEY,
+        dias_devengados REAL NOT NULL DEFAULT 0,
+        dias_consumidos REAL NOT NULL DEFAULT 0,
+        saldo REAL NOT NULL DEFAULT 0,
+        meses_devengados INTEGER NOT NULL DEFAULT 0,
+        actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (id_empleado) REFERENCES Empleados(id_empleado)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Vacaciones_Saldo_Movimientos (
+        id_movimiento INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_empleado INTEGER NOT NULL,
+        fecha DATE NOT NULL,
+        tipo TEXT NOT NULL,
+        dias REAL NOT NULL,
+        saldo REAL NOT NULL,
+        id_permiso INTEGER,
+        creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (id_empleado) REFERENCES Empleados(id_empleado)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Eventos (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT NOT NULL,
+        id_empleado INTEGER,
+        id_departamento INTEGER,
+        datos TEXT NOT NULL,
+        creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_empleados_correo ON Empleados (correo)",
+    "CREATE INDEX IF NOT EXISTS idx_empleados_correo_minusculas ON Empleados (lower(correo))",
+    "CREATE INDEX IF NOT EXISTS idx_asistencias_empleado_fecha ON Asistencias (id_empleado, fecha)",
+    "CREATE INDEX IF NOT EXISTS idx_asistencias_fecha ON Asistencias (fecha)",
+    "CREATE INDEX IF NOT EXISTS idx_vacaciones_empleado_inicio ON Vacaciones_Permisos (id_empleado, fecha_inicio)",
+    "CREATE INDEX IF NOT EXISTS idx_vacaciones_periodo ON Vacaciones_Permisos (fecha_inicio, fecha_fin)",
+    "CREATE INDEX IF NOT EXISTS idx_saldo_movimientos_empleado ON Vacaciones_Saldo_Movimientos (id_empleado, id_movimiento)",
+    "CREATE INDEX IF NOT EXISTS idx_saldo_movimientos_permiso ON Vacaciones_Saldo_Movimientos (id_permiso)",
+    "CREATE INDEX IF NOT EXISTS idx_contratos_vencimiento ON Contratos (fecha_fin, id_empleado) WHERE fecha_fin IS NOT NULL",
+    "CREATE INDEX IF NOT EXISTS idx_contratos_empleado_vigencia ON Contratos (id_empleado, fecha_inicio, fecha_fin)",
+    "CREATE INDEX IF NOT EXISTS idx_nomina_periodo ON Nomina (anio, mes)",
+    "CREATE INDEX IF NOT EXISTS idx_evaluaciones_fecha ON Evaluaciones (fecha, id_empleado, puntaje)",
+    "CREATE INDEX IF NOT EXISTS idx_capacitaciones_curso_certificado ON Capacitaciones (id_curso, certificado, id_empleado)",
+]
+
+
 def init_db():
     """
     Inicializa la base de datos creando las tablas necesarias.
@@ -55,8 +188,14 @@ def init_db():
     with get_db() as conn:
         cursor = conn.cursor()
         
+        # auto_vacuum solo se puede activar así antes de crear la primera tabla;
+        # en bases existentes usar: python mantenimiento.py --convertir-auto-vacuum
+        if motor.sqlite:
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            cursor.execute("PRAGMA journal_mode = WAL")
+        
         # Tabla de usuarios
-        cursor.execute("""
+        cursor.execute(motor.ddl("""
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 username TEXT UNIQUE NOT NULL,
@@ -64,61 +203,29 @@ def init_db():
                 password TEXT NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
-        """)
+        """))
         
         # Tabla de departamentos (actualizada con nombres en español)
-        cursor.execute("""
+        cursor.execute(motor.ddl("""
             CREATE TABLE IF NOT EXISTS Departamentos (
                 id_departamento INTEGER PRIMARY KEY AUTOINCREMENT,
                 nombre_departamento TEXT NOT NULL,
                 descripcion TEXT
             )
-        """)
+        """))
         
         # Tabla de puestos
-        cursor.execute("""
+        cursor.execute(motor.ddl("""
             CREATE TABLE IF NOT EXISTS Puestos (
                 id_puesto INTEGER PRIMARY KEY AUTOINCREMENT,
                 nombre_puesto TEXT NOT NULL,
                 nivel TEXT,
                 salario_base REAL
             )
-        """)
-        
-        # Tabla de empleados
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS employees (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                first_name TEXT NOT NULL,
-                last_name TEXT NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                phone TEXT,
-                department_id INTEGER,
-                position TEXT,
-                hire_date DATE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (department_id) REFERENCES departments(id)
-            )
-        """)
-        
-        # Tabla de asistencia
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS attendance (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_id INTEGER NOT NULL,
-                date DATE NOT NULL,
-                check_in TIME,
-                check_out TIME,
-                status TEXT DEFAULT 'present',
-                notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (employee_id) REFERENCES employees(id),
-                UNIQUE(employee_id, date)
-            )
-        """)
+        """))
         
         # Tabla de Empleados (nueva estructura con más campos)
-        cursor.execute("""
+        cursor.execute(motor.ddl("""
             CREATE TABLE IF NOT EXISTS Empleados (
                 id_empleado INTEGER PRIMARY KEY AUTOINCREMENT,
                 nombre TEXT NOT NULL,
@@ -136,10 +243,10 @@ def init_db():
                 FOREIGN KEY (id_departamento) REFERENCES Departamentos(id_departamento),
                 FOREIGN KEY (id_puesto) REFERENCES Puestos(id_puesto)
             )
-        """)
+        """))
         
         # Tabla de Contratos
-        cursor.execute("""
+        cursor.execute(motor.ddl("""
             CREATE TABLE IF NOT EXISTS Contratos (
                 id_contrato INTEGER PRIMARY KEY AUTOINCREMENT,
                 id_empleado INTEGER NOT NULL,
@@ -150,10 +257,10 @@ def init_db():
                 condiciones TEXT,
                 FOREIGN KEY (id_empleado) REFERENCES Empleados(id_empleado)
             )
-        """)
+        """))
         
         # Tabla de Asistencias
-        cursor.execute("""
+        cursor.execute(motor.ddl("""
             CREATE TABLE IF NOT EXISTS Asistencias (
                 id_asistencia INTEGER PRIMARY KEY AUTOINCREMENT,
                 id_empleado INTEGER NOT NULL,
@@ -163,10 +270,10 @@ def init_db():
                 observaciones TEXT,
                 FOREIGN KEY (id_empleado) REFERENCES Empleados(id_empleado)
             )
-        """)
+        """))
         
         # Tabla de Capacitaciones
-        cursor.execute("""
+        cursor.execute(motor.ddl("""
             CREATE TABLE IF NOT EXISTS Capacitaciones (
                 id_capacitacion INTEGER PRIMARY KEY AUTOINCREMENT,
                 id_empleado INTEGER NOT NULL,
@@ -177,10 +284,10 @@ def init_db():
                 certificado INTEGER DEFAULT 0,
                 FOREIGN KEY (id_empleado) REFERENCES Empleados(id_empleado)
             )
-        """)
+        """))
         
         # Tabla de Evaluaciones
-        cursor.execute("""
+        cursor.execute(motor.ddl("""
             CREATE TABLE IF NOT EXISTS Evaluaciones (
                 id_evaluacion INTEGER PRIMARY KEY AUTOINCREMENT,
                 id_empleado INTEGER NOT NULL,
@@ -190,10 +297,10 @@ def init_db():
                 observaciones TEXT,
                 FOREIGN KEY (id_empleado) REFERENCES Empleados(id_empleado)
             )
-        """)
+        """))
         
         # Tabla de Nómina
-        cursor.execute("""
+        cursor.execute(motor.ddl("""
             CREATE TABLE IF NOT EXISTS Nomina (
                 id_nomina INTEGER PRIMARY KEY AUTOINCREMENT,
                 id_empleado INTEGER NOT NULL,
@@ -206,10 +313,10 @@ def init_db():
                 fecha_pago DATE,
                 FOREIGN KEY (id_empleado) REFERENCES Empleados(id_empleado)
             )
-        """)
+        """))
         
         # Tabla de Vacaciones y Permisos
-        cursor.execute("""
+        cursor.execute(motor.ddl("""
             CREATE TABLE IF NOT EXISTS Vacaciones_Permisos (
                 id_permiso INTEGER PRIMARY KEY AUTOINCREMENT,
                 id_empleado INTEGER NOT NULL,
@@ -221,10 +328,28 @@ def init_db():
                 observaciones TEXT,
                 FOREIGN KEY (id_empleado) REFERENCES Empleados(id_empleado)
             )
-        """)
+        """))
+        
+        if motor.sqlite:
+            # Modelo de lectura desnormalizado de empleados (opcional)
+            from vista_empleados import crear_vista_empleados, eliminar_vista_empleados
+            if config.EMPLEADOS_VISTA:
+                crear_vista_empleados(cursor)
+            else:
+                eliminar_vista_empleados(cursor)
+        else:
+            # Las migraciones usan PRAGMA, triggers y R*Tree de SQLite: en los
+            # demás motores se crea directamente el esquema de los modelos
+            for sentencia in _ESQUEMA_OTROS_MOTORES:
+                cursor.execute(motor.ddl(sentencia))
         
         conn.commit()
-        print("Base de datos inicializada correctamente.")
+    
+    # Aplicar las migraciones versionadas pendientes
+    if motor.sqlite:
+        from migraciones import aplicar_migraciones
+        aplicar_migraciones()
+    print("Base de datos inicializada correctamente.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,418 @@
+"""
+Una base de datos por empresa (filial).
+
+Con Config.EMPRESAS_ACTIVAS cada empresa tiene su directorio
+Config.EMPRESAS_DIR/<empresa>/ con su base de datos (Config.DATABASE_NAME),
+su archivo de nóminas, su réplica de lectura y sus particiones de
+asistencias, y sus respaldos en Config.RESPALDOS_DIR/<empresa>/. Cada
+archivo se queda pequeño y los bloqueos de escritura de una empresa no
+detienen a las demás.
+
+La empresa de cada petición sale de la cabecera Config.EMPRESAS_CABECERA o
+del subdominio de Config.EMPRESAS_DOMINIO (resolver()); app.py la fija en
+database.empresa_actual y todas las conexiones de la petición van a su base
+de datos. Una empresa existe si existe su directorio (crear()); la primera
+vez que un proceso la usa se ejecuta init_db() sobre su base de datos, que
+crea las tablas y aplica las migraciones pendientes.
+
+Se conservan las conexiones de las Config.EMPRESAS_ABIERTAS empresas usadas
+más recientemente (hasta Config.EMPRESAS_CONEXIONES libres por empresa); al
+abrir otra se cierran las de la usada hace más tiempo. agregar() ejecuta una
+consulta en varias empresas en paralelo para los resúmenes de
+administración. Solo con el motor SQLite.
+
+Uso:
+    python empresas.py [listar]
+    python empresas.py crear <empresa>
+    python empresas.py resumen
+    python empresas.py en <empresa> <script.py> [argumentos]
+"""
+import importlib
+import logging
+import re
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from database import Rutas, config, empresa_actual, get_db, init_db, motor, rutas
+from motores import MotorSQLiteAgrupado
+
+logger = logging.getLogger(__name__)
+
+# Identificador de empresa: una etiqueta DNS, para que sirva como subdominio
+_PATRON = re.compile(r'^[a-z0-9](?:[a-z0-9-]{0,38}[a-z0-9])?$')
+
+# Campos numéricos de resumen() que se suman en el total
+_CAMPOS_TOTAL = ('empleados', 'empleados_activos', 'departamentos', 'nominas_anio', 'nomina_neta_anio', 'bytes')
+
+
+class EmpresaDesconocida(ValueError):
+    """La empresa pedida no tiene directorio en Config.EMPRESAS_DIR."""
+
+
+class Empresa:
+    """Una empresa abierta: las rutas y el pool de conexiones de su base de datos."""
+
+    def __init__(self, id_empresa: str):
+        self.id = id_empresa
+        self.rutas = rutas_de(id_empresa)
+        self.motor = MotorSQLiteAgrupado(self.rutas.datos, config.EMPRESAS_CONEXIONES)
+
+
+# Empresas con conexiones abiertas, de la usada hace más tiempo a la más reciente
+_abiertas: 'OrderedDict[str, Empresa]' = OrderedDict()
+_abiertas_lock = threading.Lock()
+
+# Empresas cuya base de datos ya pasó por init_db() en este proceso
+_inicializadas: set = set()
+_bloqueos_inicio: Dict[str, threading.Lock] = {}
+
+
+def validar(nombre) -> str:
+    """Normaliza el identificador de una empresa; ValueError si no es válido."""
+    id_empresa = str(nombre or '').strip().lower()
+    if not _PATRON.match(id_empresa):
+        raise ValueError(f"Empresa no válida: {nombre!r} (minúsculas, dígitos y guiones, hasta 40 caracteres)")
+    return id_empresa
+
+
+def rutas_de(id_empresa: str) -> Rutas:
+    """Rutas de la base de datos de una empresa y de sus archivos dependientes."""
+    directorio = Path(config.EMPRESAS_DIR) / id_empresa
+    return Rutas(directorio / config.DATABASE_NAME, directorio / Path(config.ARCHIVO_PATH).name,
+                 directorio / 'particiones', directorio / Path(config.REPLICA_PATH).name,
+                 Path(config.RESPALDOS_DIR) / id_empresa)
+
+
+def existe(id_empresa: str) -> bool:
+    return (Path(config.EMPRESAS_DIR) / id_empresa).is_dir()
+
+
+def registradas() -> List[str]:
+    """Empresas con directorio en Config.EMPRESAS_DIR, por orden alfabético."""
+    directorio = Path(config.EMPRESAS_DIR)
+    if not directorio.is_dir():
+        return []
+    return sorted(d.name for d in directorio.iterdir() if d.is_dir() and _PATRON.match(d.name))
+
+
+def ambitos() -> List[Optional[str]]:
+    """
+    Bases de datos que recorren las tareas en segundo plano (cola de
+    trabajos, mantenimiento, réplica): cada empresa con
+    Config.EMPRESAS_ACTIVAS, o la base de datos única (None) sin ella.
+    """
+    return registradas() if config.EMPRESAS_ACTIVAS else [None]
+
+
+def _inicializar(empresa: Empresa) -> None:
+    """Ejecuta init_db() sobre la base de datos de la empresa la primera vez en el proceso."""
+    if empresa.id in _inicializadas and empresa.rutas.datos.exists():
+        return
+    with _abiertas_lock:
+        bloqueo = _bloqueos_inicio.setdefault(empresa.id, threading.Lock())
+    with bloqueo:
+        if empresa.id in _inicializadas and empresa.rutas.datos.exists():
+            return
+        token = empresa_actual.set(empresa)
+        try:
+            init_db()
+        finally:
+            empresa_actual.reset(token)
+        _inicializadas.add(empresa.id)
+        logger.info("Base de datos de la empresa %s inicializada: %s", empresa.id, empresa.rutas.datos)
+
+
+def _abrir(id_empresa: str) -> Empresa:
+    """Abre (sin guardarla entre las abiertas) una empresa existente, ya inicializada."""
+    motor.requiere_sqlite("Las bases de datos por empresa")
+    if not existe(id_empresa):
+        raise EmpresaDesconocida(f"La empresa {id_empresa} no existe")
+    empresa = Empresa(id_empresa)
+    _inicializar(empresa)
+    return empresa
+
+
+def obtener(nombre) -> Empresa:
+    """
+    Devuelve la empresa abierta, abriéndola (e inicializando su base de
+    datos) si no lo estaba. Si con ella se supera Config.EMPRESAS_ABIERTAS
+    se cierran las conexiones de la usada hace más tiempo.
+
+    Raises:
+        ValueError: Identificador no válido
+        EmpresaDesconocida: La empresa no existe
+    """
+    id_empresa = validar(nombre)
+    with _abiertas_lock:
+        empresa = _abiertas.get(id_empresa)
+        if empresa is not None:
+            _abiertas.move_to_end(id_empresa)
+    if empresa is not None:
+        _inicializar(empresa)
+        return empresa
+
+    nueva = _abrir(id_empresa)
+    cerrar = []
+    with _abiertas_lock:
+        # Otro hilo pudo abrirla mientras tanto
+        empresa = _abiertas.setdefault(id_empresa, nueva)
+        _abiertas.move_to_end(id_empresa)
+        while len(_abiertas) > max(1, config.EMPRESAS_ABIERTAS):
+            cerrar.append(_abiertas.popitem(last=False)[1])
+    if empresa is not nueva:
+        cerrar.append(nueva)
+    for vieja in cerrar:
+        vieja.motor.cerrar()
+    return empresa
+
+
+def abiertas() -> List[Dict]:
+    """Empresas con conexiones abiertas en este proceso, de la más reciente a la más antigua."""
+    with _abiertas_lock:
+        empresas = list(reversed(_abiertas.values()))
+    return [{'empresa': e.id, 'conexiones_libres': e.motor.libres, 'conexiones_en_uso': e.motor.prestadas}
+            for e in empresas]
+
+
+def crear(nombre) -> Dict:
+    """Da de alta una empresa: crea su directorio e inicializa su base de datos."""
+    motor.requiere_sqlite("Las bases de datos por empresa")
+    id_empresa = validar(nombre)
+    if existe(id_empresa):
+        raise ValueError(f"La empresa {id_empresa} ya existe")
+    Path(config.EMPRESAS_DIR, id_empresa).mkdir(parents=True)
+    empresa = obtener(id_empresa)
+    return {'empresa': id_empresa, 'archivo': str(empresa.rutas.datos)}
+
+
+@contextmanager
+def usar(nombre: Optional[str]) -> Iterator[Optional[Empresa]]:
+    """
+    Dirige a la base de datos de la empresa las conexiones que se abran
+    dentro del bloque (con None, a la base de datos única).
+    """
+    empresa = obtener(nombre) if nombre is not None else None
+    token = empresa_actual.set(empresa)
+    try:
+        yield empresa
+    finally:
+        empresa_actual.reset(token)
+
+
+@contextmanager
+def visitar(nombre: Optional[str]) -> Iterator[Optional[Empresa]]:
+    """
+    Como usar(), para las tareas en segundo plano y las consultas
+    agregadas: no cuenta como uso reciente ni desplaza de las abiertas a
+    las empresas de las peticiones. Si la empresa no estaba abierta, se
+    abre solo para el bloque y se cierran sus conexiones al salir.
+    """
+    if nombre is None:
+        with usar(None):
+            yield None
+        return
+    id_empresa = validar(nombre)
+    with _abiertas_lock:
+        empresa = _abiertas.get(id_empresa)
+    temporal = empresa is None
+    if temporal:
+        empresa = _abrir(id_empresa)
+    else:
+        _inicializar(empresa)
+    token = empresa_actual.set(empresa)
+    try:
+        yield empresa
+    finally:
+        empresa_actual.reset(token)
+        if temporal:
+            empresa.motor.cerrar()
+
+
+def iterar(generador: Iterator, empresa: Optional[Empresa]) -> Iterator:
+    """
+    Recorre un generador (respuesta en streaming) con sus conexiones
+    dirigidas a la empresa, que se fija solo mientras avanza el generador.
+    """
+    @contextmanager
+    def dirigido():
+        token = empresa_actual.set(empresa)
+        try:
+            yield
+        finally:
+            empresa_actual.reset(token)
+
+    try:
+        while True:
+            with dirigido():
+                try:
+                    valor = next(generador)
+                except StopIteration:
+                    return
+            yield valor
+    finally:
+        close = getattr(generador, 'close', None)
+        if close:
+            with dirigido():
+                close()
+
+
+def resolver(cabecera: Optional[str], host: Optional[str]) -> Optional[str]:
+    """
+    Empresa de una petición: el subdominio de Config.EMPRESAS_DOMINIO en el
+    host (acme.rrhh.example.com -> acme) o, si no lo hay, el valor de la
+    cabecera. None si no hay ninguno.
+
+    Raises:
+        ValueError: La cabecera indica otra empresa que el subdominio
+    """
+    cabecera = (cabecera or '').strip() or None
+    subdominio = None
+    dominio = config.EMPRESAS_DOMINIO.strip('.')
+    nombre = (host or '').split(':')[0].lower().rstrip('.')
+    if dominio and nombre.endswith(f".{dominio}"):
+        subdominio = nombre[:-len(dominio) - 1]
+        if not subdominio or '.' in subdominio:
+            subdominio = None
+    if subdominio is None:
+        return cabecera
+    if cabecera is not None and cabecera.lower() != subdominio:
+        raise ValueError(f"La cabecera {config.EMPRESAS_CABECERA} ({cabecera}) no coincide "
+                         f"con la empresa del subdominio ({subdominio})")
+    return subdominio
+
+
+def agregar(funcion: Callable[[], object], nombres: Optional[Iterable[str]] = None) -> Dict:
+    """
+    Ejecuta funcion() en la base de datos de cada empresa (todas si no se
+    indican), hasta Config.EMPRESAS_PARALELO a la vez. Las empresas que no
+    estaban abiertas se abren solo para la consulta, sin desplazar de las
+    abiertas a las que están en uso. El fallo de una empresa no detiene
+    las demás.
+
+    Returns:
+        {'resultados': {empresa: valor}, 'errores': {empresa: mensaje}}
+    """
+    ids = [validar(n) for n in nombres] if nombres is not None else registradas()
+
+    def ejecutar(id_empresa: str):
+        with visitar(id_empresa):
+            return funcion()
+
+    resultados, errores = {}, {}
+    if not ids:
+        return {'resultados': resultados, 'errores': errores}
+    with ThreadPoolExecutor(max_workers=max(1, min(config.EMPRESAS_PARALELO, len(ids))),
+                            thread_name_prefix='empresas') as ejecutor:
+        futuros = {id_empresa: ejecutor.submit(ejecutar, id_empresa) for id_empresa in ids}
+    for id_empresa, futuro in futuros.items():
+        try:
+            resultados[id_empresa] = futuro.result()
+        except Exception as e:
+            logger.warning("Consulta agregada fallida en la empresa %s: %s", id_empresa, e)
+            errores[id_empresa] = str(e)
+    return {'resultados': resultados, 'errores': errores}
+
+
+def tamanio(ruta: Path) -> int:
+    """Tamaño de la base de datos con su -wal (las escrituras aún sin checkpoint)."""
+    wal = ruta.with_name(f"{ruta.name}-wal")
+    return ruta.stat().st_size + (wal.stat().st_size if wal.exists() else 0)
+
+
+def resumen() -> Dict:
+    """Cifras principales de la base de datos del contexto actual."""
+    anio = date.today().year
+    with get_db() as conn:
+        empleados = conn.execute("""
+            SELECT COUNT(*), COALESCE(SUM(estado = 'Activo'), 0) FROM Empleados
+        """).fetchone()
+        departamentos = conn.execute("SELECT COUNT(*) FROM Departamentos").fetchone()[0]
+        nomina = conn.execute("""
+            SELECT COUNT(*), COALESCE(SUM(salario_neto), 0) FROM Nomina
+            WHERE anio = ? AND eliminado_en IS NULL
+        """, (anio,)).fetchone()
+    return {
+        'empleados': empleados[0],
+        'empleados_activos': empleados[1],
+        'departamentos': departamentos,
+        'anio': anio,
+        'nominas_anio': nomina[0],
+        'nomina_neta_anio': round(nomina[1], 2),
+        'bytes': tamanio(rutas().datos)
+    }
+
+
+def resumen_agregado(nombres: Optional[Iterable[str]] = None) -> Dict:
+    """resumen() de cada empresa, calculado en paralelo, y la suma de todas."""
+    agregado = agregar(resumen, nombres)
+    total = {campo: 0 for campo in _CAMPOS_TOTAL}
+    for cifras in agregado['resultados'].values():
+        for campo in _CAMPOS_TOTAL:
+            total[campo] += cifras[campo]
+    total['nomina_neta_anio'] = round(total['nomina_neta_anio'], 2)
+    return {'empresas': agregado['resultados'], 'total': total, 'errores': agregado['errores']}
+
+
+def main(argv=None) -> bool:
+    """Punto de entrada de la línea de comandos."""
+    argv = sys.argv[1:] if argv is None else argv
+    comando = argv[0] if argv else 'listar'
+
+    if comando == 'en':
+        # Ejecuta el main() de otro script sobre la base de datos de la empresa
+        if len(argv) < 3:
+            print("[ERROR] Uso: python empresas.py en <empresa> <script.py> [argumentos]")
+            return False
+        try:
+            modulo = importlib.import_module(Path(argv[2]).stem)
+            with usar(argv[1]) as empresa:
+                print(f"[INFO] Empresa {empresa.id}: {empresa.rutas.datos}")
+                return bool(modulo.main(argv[3:]))
+        except Exception as e:
+            print(f"[ERROR] {str(e)}")
+            return False
+
+    print("=" * 60)
+    print("BASES DE DATOS POR EMPRESA")
+    print("=" * 60)
+
+    try:
+        if comando == 'listar':
+            ids = registradas()
+            for id_empresa in ids:
+                ruta = rutas_de(id_empresa).datos
+                print(f"  {id_empresa:<40} {tamanio(ruta) if ruta.exists() else '-':>12} bytes")
+            print(f"[INFO] {len(ids)} empresas en {config.EMPRESAS_DIR}")
+        elif comando == 'crear':
+            if len(argv) < 2:
+                print("[ERROR] Uso: python empresas.py crear <empresa>")
+                return False
+            r = crear(argv[1])
+            print(f"[OK] Empresa {r['empresa']} creada: {r['archivo']}")
+        elif comando == 'resumen':
+            r = resumen_agregado()
+            for id_empresa, cifras in r['empresas'].items():
+                print(f"  {id_empresa:<30} {cifras['empleados_activos']:>6} activos de {cifras['empleados']:>6}"
+                      f"  nómina {cifras['anio']}: {cifras['nomina_neta_anio']:>14.2f}")
+            for id_empresa, error in r['errores'].items():
+                print(f"[ERROR] {id_empresa}: {error}")
+            print(f"[INFO] Total: {r['total']['empleados_activos']} activos de {r['total']['empleados']}, "
+                  f"nómina neta {r['total']['nomina_neta_anio']:.2f}")
+            return not r['errores']
+        else:
+            print(f"[ERROR] Comando desconocido: {comando}")
+            return False
+    except Exception as e:
+        print(f"[ERROR] {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,285 @@
+"""
+Eventos en vivo (Server-Sent Events) de asistencias y solicitudes.
+
+Los modelos publican eventos con publicar() dentro de su propia transacción:
+el evento se guarda en la tabla Eventos y solo existe si la operación se
+confirma. En cada proceso un hilo Distribuidor sigue la tabla (con
+PRAGMA data_version, sin consultarla mientras no haya escrituras) y reparte
+los eventos nuevos a los clientes conectados a ese proceso, de modo que un
+evento publicado en un worker llega a los clientes de todos los workers.
+Con bases de datos por empresa (empresas.py) hay un Distribuidor por
+empresa, que se detiene cuando se va su último cliente.
+
+Cada cliente tiene una cola acotada (Config.EVENTOS_BUFFER). Si no la vacía
+a tiempo se le desconecta con el evento 'desconectado'; al reconectar con
+Last-Event-ID recibe lo que se perdió desde la tabla (o 'reiniciar' si esos
+eventos ya se purgaron).
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+from database import get_connection, get_db, config, empresa_actual, id_empresa, motor
+
+logger = logging.getLogger(__name__)
+
+TIPOS = ('asistencia.creada', 'asistencia.actualizada', 'permiso.actualizado')
+
+
+def publicar(cursor, tipo: str, datos: Dict, id_empleado: Optional[int] = None) -> None:
+    """
+    Publica un evento dentro de la transacción del llamador. El departamento
+    del empleado se guarda con el evento para poder filtrar por él.
+    """
+    cursor.execute("""
+        INSERT INTO Eventos (tipo, id_empleado, id_departamento, datos)
+        VALUES (?, ?, (SELECT id_departamento FROM Empleados WHERE id_empleado = ?), ?)
+    """, (tipo, id_empleado, id_empleado, json.dumps(datos, default=str)))
+    repartidor = _distribuidores.get(id_empresa())
+    if repartidor is not None:
+        repartidor.despertar()
+
+
+def _fila_a_evento(row) -> Dict:
+    return {
+        'seq': row['seq'],
+        'tipo': row['tipo'],
+        'id_empleado': row['id_empleado'],
+        'id_departamento': row['id_departamento'],
+        'datos': json.loads(row['datos']),
+        'creado_en': row['creado_en']
+    }
+
+
+class Suscriptor:
+    """Cliente conectado al stream, con sus filtros y su cola acotada."""
+
+    def __init__(self, tipos: Optional[Iterable[str]] = None, id_empleado: Optional[int] = None,
+                 id_departamento: Optional[int] = None, capacidad: Optional[int] = None):
+        self.tipos = tuple(tipos) if tipos else None
+        self.id_empleado = id_empleado
+        self.id_departamento = id_departamento
+        self.cola: queue.Queue = queue.Queue(maxsize=capacidad or config.EVENTOS_BUFFER)
+        self.desconectado = False
+
+    def acepta(self, evento: Dict) -> bool:
+        """Indica si el evento pasa los filtros del cliente ('asistencia' acepta 'asistencia.*')."""
+        if self.tipos and not any(evento['tipo'] == t or evento['tipo'].startswith(f"{t}.")
+                                  for t in self.tipos):
+            return False
+        if self.id_empleado is not None and evento['id_empleado'] != self.id_empleado:
+            return False
+        if self.id_departamento is not None and evento['id_departamento'] != self.id_departamento:
+            return False
+        return True
+
+    def entregar(self, evento: Dict) -> None:
+        """Encola el evento; si la cola está llena el cliente queda desconectado."""
+        try:
+            self.cola.put_nowait(evento)
+        except queue.Full:
+            self.desconectado = True
+
+
+class Distribuidor(threading.Thread):
+    """Hilo que sigue la tabla Eventos y reparte los nuevos a los suscriptores del proceso."""
+
+    def __init__(self, intervalo: Optional[float] = None):
+        super().__init__(name='eventos-distribuidor', daemon=True)
+        self.intervalo = intervalo or config.EVENTOS_INTERVALO
+        self._suscriptores: List[Suscriptor] = []
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        # Aviso de los eventos publicados en este proceso para esta empresa
+        self._despertar = threading.Event()
+        self._ultima_purga = 0.0
+        # El hilo nuevo no hereda el contexto: sigue la base de datos de la empresa actual
+        self.empresa = empresa_actual.get()
+        self.clave = id_empresa()
+        with get_db() as conn:
+            self.ultimo = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM Eventos").fetchone()[0]
+
+    def suscribir(self, suscriptor: Suscriptor) -> Suscriptor:
+        with self._lock:
+            self._suscriptores.append(suscriptor)
+        return suscriptor
+
+    def cancelar(self, suscriptor: Suscriptor) -> None:
+        """Da de baja al cliente; sin clientes, el distribuidor se detiene."""
+        with _distribuidor_lock:
+            with self._lock:
+                if suscriptor in self._suscriptores:
+                    self._suscriptores.remove(suscriptor)
+                vacio = not self._suscriptores
+            if vacio:
+                self.detener()
+                if _distribuidores.get(self.clave) is self:
+                    del _distribuidores[self.clave]
+
+    def clientes(self) -> int:
+        with self._lock:
+            return len(self._suscriptores)
+
+    def despertar(self) -> None:
+        self._despertar.set()
+
+    def detener(self) -> None:
+        self._detener.set()
+        self._despertar.set()
+
+    def repartir(self, conn) -> int:
+        """Lee los eventos posteriores al último repartido y los entrega."""
+        total = 0
+        while True:
+            rows = conn.execute("""
+                SELECT seq, tipo, id_empleado, id_departamento, datos, creado_en
+                FROM Eventos WHERE seq > ? ORDER BY seq LIMIT 500
+            """, (self.ultimo,)).fetchall()
+            if not rows:
+                return total
+            with self._lock:
+                suscriptores = list(self._suscriptores)
+            for row in rows:
+                evento = _fila_a_evento(row)
+                for suscriptor in suscriptores:
+                    if not suscriptor.desconectado and suscriptor.acepta(evento):
+                        suscriptor.entregar(evento)
+                self.ultimo = row['seq']
+            total += len(rows)
+
+    def purgar(self, conn) -> int:
+        """Elimina los eventos más antiguos que Config.EVENTOS_RETENCION_HORAS."""
+        row = conn.execute("""
+            SELECT seq FROM Eventos WHERE creado_en >= datetime('now', ?) ORDER BY seq LIMIT 1
+        """, (f"-{config.EVENTOS_RETENCION_HORAS} hours",)).fetchone()
+        sql, params = ("DELETE FROM Eventos WHERE seq < ?", (row[0],)) if row else ("DELETE FROM Eventos", ())
+        eliminados = conn.execute(sql, params).rowcount
+        conn.commit()
+        return eliminados
+
+    def run(self) -> None:
+        empresa_actual.set(self.empresa)
+        conn = get_connection()
+        try:
+            version = None
+            while not self._detener.is_set():
+                try:
+                    nueva = conn.execute("PRAGMA data_version").fetchone()[0]
+                    # data_version no cambia con las escrituras de esta misma
+                    # conexión, pero el aviso local (_despertar) sí obliga a leer
+                    if nueva != version or self._despertar.is_set():
+                        version = nueva
+                        self._despertar.clear()
+                        self.repartir(conn)
+                    if time.monotonic() - self._ultima_purga >= 3600:
+                        self._ultima_purga = time.monotonic()
+                        self.purgar(conn)
+                except Exception:
+                    logger.exception("Error al repartir los eventos")
+                self._despertar.wait(self.intervalo)
+        finally:
+            conn.close()
+
+
+_distribuidores: Dict[Optional[str], Distribuidor] = {}
+_distribuidor_lock = threading.Lock()
+
+
+def suscribir(suscriptor: Suscriptor) -> Distribuidor:
+    """
+    Suscribe al cliente al distribuidor de este proceso para la empresa
+    actual (arrancándolo si no hay ninguno en marcha) y lo devuelve.
+    """
+    with _distribuidor_lock:
+        repartidor = _distribuidores.get(id_empresa())
+        if repartidor is None or not repartidor.is_alive():
+            repartidor = _distribuidores[id_empresa()] = Distribuidor()
+            repartidor.start()
+        repartidor.suscribir(suscriptor)
+        return repartidor
+
+
+def _formatear(evento: Dict) -> str:
+    return f"id: {evento['seq']}\nevent: {evento['tipo']}\ndata: {json.dumps(evento)}\n\n"
+
+
+def _purgados(desde: int) -> bool:
+    """Indica si ya se purgaron eventos posteriores a 'desde' (como en cambios.py)."""
+    with get_db() as conn:
+        minimo = conn.execute("SELECT MIN(seq) FROM Eventos").fetchone()[0]
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'Eventos'").fetchone()
+    maximo = row[0] if row else 0
+    return desde < (minimo - 1 if minimo is not None else maximo)
+
+
+def _historial(suscriptor: Suscriptor, desde: int) -> Iterator[Dict]:
+    """
+    Eventos guardados posteriores a 'desde' que pasan los filtros (para
+    reanudar), leídos por páginas hasta alcanzar el último guardado.
+    """
+    pagina = config.EVENTOS_BUFFER * 10
+    while True:
+        with get_db() as conn:
+            rows = conn.execute("""
+                SELECT seq, tipo, id_empleado, id_departamento, datos, creado_en
+                FROM Eventos WHERE seq > ? ORDER BY seq LIMIT ?
+            """, (desde, pagina)).fetchall()
+        for evento in map(_fila_a_evento, rows):
+            desde = evento['seq']
+            if suscriptor.acepta(evento):
+                yield evento
+        if len(rows) < pagina:
+            return
+
+
+def stream(tipos: Optional[Iterable[str]] = None, id_empleado: Optional[int] = None,
+           id_departamento: Optional[int] = None, desde: Optional[int] = None,
+           latido: Optional[float] = None) -> Iterator[str]:
+    """
+    Genera los eventos del cliente como Server-Sent Events, con un latido
+    cada 'latido' segundos sin eventos. Con 'desde' (Last-Event-ID) envía
+    primero los eventos guardados posteriores a ese id, o 'reiniciar' si
+    algunos ya se purgaron.
+    """
+    motor.requiere_sqlite("El stream de eventos")
+    latido = latido or config.EVENTOS_LATIDO
+    suscriptor = Suscriptor(tipos, id_empleado, id_departamento)
+    # Suscribirse antes de leer el historial para no perder eventos entre medias
+    repartidor = suscribir(suscriptor)
+    try:
+        ultimo = 0
+        if desde is not None:
+            if _purgados(desde):
+                yield "event: reiniciar\ndata: {}\n\n"
+            ultimo = desde
+            while True:
+                for evento in _historial(suscriptor, ultimo):
+                    ultimo = evento['seq']
+                    yield _formatear(evento)
+                if not suscriptor.desconectado:
+                    break
+                # La cola se llenó durante la reanudación: lo que no cupo
+                # está en la tabla, así que se vacía y se sigue leyendo de ella
+                while not suscriptor.cola.empty():
+                    suscriptor.cola.get_nowait()
+                suscriptor.desconectado = False
+        yield ": conectado\n\n"
+        while True:
+            try:
+                # Un cliente desconectado recibe lo que ya tenía en cola y el
+                # aviso; al reconectar sigue desde su Last-Event-ID
+                evento = suscriptor.cola.get(block=not suscriptor.desconectado, timeout=latido)
+            except queue.Empty:
+                if suscriptor.desconectado:
+                    yield f"event: desconectado\ndata: {json.dumps({'motivo': 'cliente lento'})}\n\n"
+                    return
+                yield ": latido\n\n"
+                continue
+            if evento['seq'] <= ultimo:
+                continue
+            ultimo = evento['seq']
+            yield _formatear(evento)
+    finally:
+        repartidor.cancelar(suscriptor)
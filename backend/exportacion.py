@@ -0,0 +1,191 @@
+"""
+Exportación en streaming de los listados a CSV o XLSX.
+
+Las filas se leen del cursor en bloques de Config.EXPORTACION_LOTE con
+fetchmany y se escriben a medida que llegan, de modo que exportar tablas
+grandes (Asistencias, Nomina) no carga el conjunto de datos en memoria.
+El CSV se envía por bloques (comprimido con gzip si el cliente lo acepta);
+el XLSX se escribe con openpyxl en modo write_only a un archivo temporal
+que luego se envía por bloques.
+"""
+import csv
+import io
+import os
+import tempfile
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from database import get_connection, config
+import archivo
+import particiones
+
+try:
+    import openpyxl
+except ImportError:  # La exportación a XLSX es opcional
+    openpyxl = None
+
+# Recurso de la API -> (tabla, columnas, columna de fecha para desde/hasta)
+RECURSOS: Dict[str, Tuple[str, Tuple[str, ...], Optional[str]]] = {
+    'empleados': ('Empleados', ('id_empleado', 'nombre', 'apellido', 'fecha_nacimiento', 'genero',
+                                'estado_civil', 'direccion', 'telefono', 'correo', 'fecha_ingreso',
+                                'estado', 'id_departamento', 'id_puesto'), 'fecha_ingreso'),
+    'contratos': ('Contratos', ('id_contrato', 'id_empleado', 'tipo_contrato', 'fecha_inicio',
+                                'fecha_fin', 'salario', 'condiciones'), 'fecha_inicio'),
+    'asistencias': ('Asistencias', ('id_asistencia', 'id_empleado', 'fecha', 'hora_entrada',
+                                    'hora_salida', 'observaciones'), 'fecha'),
+    'capacitaciones': ('Capacitaciones', ('id_capacitacion', 'id_empleado', 'nombre_curso',
+                                          'institucion', 'fecha_inicio', 'fecha_fin',
+                                          'certificado', 'id_curso'), 'fecha_inicio'),
+    'evaluaciones': ('Evaluaciones', ('id_evaluacion', 'id_empleado', 'fecha', 'evaluador',
+                                      'puntaje', 'observaciones'), 'fecha'),
+    'nomina': ('Nomina', ('id_nomina', 'id_empleado', 'mes', 'anio', 'salario_base',
+                          'bonificaciones', 'deducciones', 'salario_neto', 'fecha_pago'), 'fecha_pago'),
+    'vacaciones-permisos': ('Vacaciones_Permisos', ('id_permiso', 'id_empleado', 'tipo',
+                                                    'fecha_solicitud', 'fecha_inicio', 'fecha_fin',
+                                                    'estado', 'observaciones'), 'fecha_inicio'),
+}
+
+TIPOS_CONTENIDO = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Tamaño de los bloques al enviar el archivo XLSX temporal
+_BLOQUE_ARCHIVO = 64 * 1024
+
+
+def formatos_disponibles() -> List[str]:
+    """Formatos de exportación disponibles en este entorno."""
+    return ['csv', 'xlsx'] if openpyxl is not None else ['csv']
+
+
+def validar(recurso: str, formato: str) -> None:
+    """Comprueba el recurso y el formato antes de empezar a enviar la respuesta."""
+    if recurso not in RECURSOS:
+        raise ValueError(f"Recurso no exportable: {recurso}. Disponibles: {', '.join(RECURSOS)}")
+    if formato not in formatos_disponibles():
+        raise ValueError(f"Formato no soportado: {formato}. "
+                         f"Disponibles: {', '.join(formatos_disponibles())}")
+
+
+def _consultas(conn, recurso: str, id_empleado: Optional[int], desde: Optional[str],
+               hasta: Optional[str]) -> Iterator[Tuple[str, list]]:
+    """
+    Genera las consultas del recurso, una por tabla de origen. Con las
+    particiones de asistencias, cada grupo se adjunta al pedir su primera
+    consulta: la anterior debe haberse leído entera.
+    """
+    tabla, columnas, columna_fecha = RECURSOS[recurso]
+    condiciones, params = [], []
+    origenes: Iterable[str] = [tabla]
+    if tabla == particiones.TABLA:
+        condiciones.append("eliminado_en IS NULL")
+        # Una consulta por año cerrado del rango y al final la tabla principal
+        origenes = (origen for tablas in particiones.grupos(conn, desde, hasta) for origen in tablas)
+    elif tabla in archivo.TABLAS:
+        condiciones.append("eliminado_en IS NULL")
+        # Primero las filas archivadas (las más antiguas) y luego las actuales
+        comparable = columna_fecha == archivo.TABLAS[tabla]['fecha']
+        if archivo.incluye_archivo(conn, tabla, desde if comparable else None):
+            origenes = [f"{archivo.ESQUEMA}.{tabla}", f"main.{tabla}"]
+    if id_empleado is not None:
+        condiciones.append("id_empleado = ?")
+        params.append(id_empleado)
+    if desde:
+        condiciones.append(f"{columna_fecha} >= ?")
+        params.append(desde)
+    if hasta:
+        condiciones.append(f"{columna_fecha} <= ?")
+        params.append(hasta)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    # Orden por clave primaria: recorrido de la tabla sin ordenación temporal
+    for origen in origenes:
+        yield f"SELECT {', '.join(columnas)} FROM {origen} {where} ORDER BY {columnas[0]}", params
+
+
+def filas(recurso: str, id_empleado: Optional[int] = None, desde: Optional[str] = None,
+          hasta: Optional[str] = None, lote: Optional[int] = None) -> Iterator[List[tuple]]:
+    """
+    Recorre el recurso en bloques de filas leídos con fetchmany.
+
+    La conexión se abre al empezar a iterar y se cierra al terminar (o si el
+    cliente corta la descarga).
+    """
+    lote = lote or config.EXPORTACION_LOTE
+    conn = get_connection()
+    try:
+        for sql, params in _consultas(conn, recurso, id_empleado, desde, hasta):
+            cursor = conn.execute(sql, params)
+            while True:
+                bloque = cursor.fetchmany(lote)
+                if not bloque:
+                    break
+                yield [tuple(row) for row in bloque]
+    finally:
+        conn.close()
+
+
+def generar_csv(recurso: str, **filtros) -> Iterator[bytes]:
+    """Genera el CSV (UTF-8 con BOM para Excel) bloque a bloque."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write('\ufeff')
+    escritor.writerow(RECURSOS[recurso][1])
+    for bloque in filas(recurso, **filtros):
+        escritor.writerows(bloque)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def generar_xlsx(recurso: str, **filtros) -> Iterator[bytes]:
+    """
+    Genera el XLSX con openpyxl en modo write_only (memoria constante) en un
+    archivo temporal y lo envía por bloques.
+    """
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet(title=recurso[:31])
+    hoja.append(list(RECURSOS[recurso][1]))
+    for bloque in filas(recurso, **filtros):
+        for fila in bloque:
+            hoja.append(fila)
+
+    descriptor, ruta = tempfile.mkstemp(suffix='.xlsx')
+    os.close(descriptor)
+    try:
+        libro.save(ruta)
+        with open(ruta, 'rb') as archivo:
+            while True:
+                datos = archivo.read(_BLOQUE_ARCHIVO)
+                if not datos:
+                    break
+                yield datos
+    finally:
+        os.remove(ruta)
+
+
+def comprimir_gzip(bloques: Iterator[bytes]) -> Iterator[bytes]:
+    """Comprime un flujo de bloques con gzip sin acumularlo."""
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for bloque in bloques:
+        comprimido = compresor.compress(bloque)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+def exportar(recurso: str, formato: str = 'csv', **filtros) -> Iterator[bytes]:
+    """
+    Genera la exportación de un recurso.
+
+    Args:
+        recurso: Clave de RECURSOS (p. ej. 'asistencias')
+        formato: 'csv' o 'xlsx'
+        **filtros: id_empleado, desde y hasta (sobre la columna de fecha del recurso)
+
+    Returns:
+        Iterador de bloques de bytes del archivo
+    """
+    validar(recurso, formato)
+    return generar_xlsx(recurso, **filtros) if formato == 'xlsx' else generar_csv(recurso, **filtros)
@@ -0,0 +1,264 @@
+"""
+Importación masiva de empleados desde CSV o XLSX.
+
+El archivo se lee fila a fila (sin cargarlo entero en memoria), cada fila se
+valida (campos obligatorios, fechas, enteros, correo) y los departamentos y
+puestos se comprueban contra catálogos cargados una sola vez. Las filas
+válidas se insertan con executemany en bloques de Config.IMPORTACION_LOTE
+dentro de una única transacción. En modo simulación (dry_run) se hace todo
+el proceso y al final se deshace la transacción.
+
+Por defecto la importación es todo o nada: si alguna fila tiene errores no
+se inserta ninguna. Con omitir_errores=True se insertan las válidas.
+
+Uso:
+    python importacion_empleados.py archivo.csv [--dry-run] [--omitir-errores]
+"""
+import codecs
+import csv
+import io
+import re
+import sys
+import time
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from database import get_db, config
+
+try:
+    import openpyxl
+except ImportError:  # La lectura de XLSX es opcional
+    openpyxl = None
+
+# Columnas admitidas en el archivo (en cualquier orden; las demás se ignoran)
+COLUMNAS = ('nombre', 'apellido', 'fecha_nacimiento', 'genero', 'estado_civil',
+            'direccion', 'telefono', 'correo', 'fecha_ingreso', 'estado',
+            'id_departamento', 'id_puesto')
+OBLIGATORIAS = ('nombre', 'apellido')
+FECHAS = ('fecha_nacimiento', 'fecha_ingreso')
+
+_CORREO = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+def formatos_disponibles() -> List[str]:
+    """Formatos de archivo que se pueden importar en este entorno."""
+    return ['csv', 'xlsx'] if openpyxl is not None else ['csv']
+
+
+def leer_csv(flujo) -> Iterator[Tuple[int, Dict]]:
+    """
+    Recorre un CSV (binario, UTF-8 con o sin BOM, separado por ',' o ';')
+    devolviendo (número de línea, fila) sin leerlo entero.
+    """
+    texto = codecs.getreader('utf-8-sig')(flujo) if not isinstance(flujo, io.TextIOBase) else flujo
+    cabecera = texto.readline()
+    if not cabecera.strip():
+        raise ValueError("El archivo está vacío")
+    separador = ';' if cabecera.count(';') > cabecera.count(',') else ','
+    columnas = [c.strip().lower() for c in next(csv.reader([cabecera], delimiter=separador))]
+    for numero, valores in enumerate(csv.reader(texto, delimiter=separador), start=2):
+        if not any(v.strip() for v in valores):
+            continue
+        yield numero, dict(zip(columnas, valores))
+
+
+def leer_xlsx(flujo) -> Iterator[Tuple[int, Dict]]:
+    """Recorre la primera hoja de un XLSX en modo de solo lectura (openpyxl)."""
+    if openpyxl is None:
+        raise ValueError("La importación de XLSX requiere openpyxl (pip install openpyxl)")
+    libro = openpyxl.load_workbook(flujo, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        cabecera = next(filas, None)
+        if not cabecera:
+            raise ValueError("El archivo está vacío")
+        columnas = [str(c or '').strip().lower() for c in cabecera]
+        for numero, valores in enumerate(filas, start=2):
+            if all(v is None or str(v).strip() == '' for v in valores):
+                continue
+            yield numero, {columna: valor for columna, valor in zip(columnas, valores)}
+    finally:
+        libro.close()
+
+
+def _texto(valor) -> Optional[str]:
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    texto = str(valor).strip()
+    return texto or None
+
+
+def validar_fila(fila: Dict, departamentos: set, puestos: set) -> Tuple[Dict, List[Tuple[str, str]]]:
+    """
+    Valida y normaliza una fila.
+
+    Returns:
+        Tupla (valores normalizados, lista de errores (campo, mensaje))
+    """
+    valores: Dict = {}
+    errores: List[Tuple[str, str]] = []
+
+    for columna in COLUMNAS:
+        crudo = fila.get(columna)
+        if columna in FECHAS and isinstance(crudo, (datetime, date)):
+            valores[columna] = (crudo.date() if isinstance(crudo, datetime) else crudo).isoformat()
+        else:
+            valores[columna] = _texto(crudo)
+
+    for columna in OBLIGATORIAS:
+        if not valores[columna]:
+            errores.append((columna, "es obligatorio"))
+
+    for columna in FECHAS:
+        if valores[columna]:
+            try:
+                datetime.strptime(valores[columna], '%Y-%m-%d')
+            except ValueError:
+                errores.append((columna, "debe tener el formato YYYY-MM-DD"))
+
+    for columna, catalogo in (('id_departamento', departamentos), ('id_puesto', puestos)):
+        if valores[columna] is None:
+            continue
+        try:
+            valores[columna] = int(valores[columna])
+        except ValueError:
+            errores.append((columna, "debe ser un número entero"))
+            continue
+        if valores[columna] not in catalogo:
+            errores.append((columna, f"no existe ({valores[columna]})"))
+
+    if valores['correo']:
+        if not _CORREO.match(valores['correo']):
+            errores.append(('correo', "no es un correo válido"))
+
+    return valores, errores
+
+
+def importar(filas: Iterable[Tuple[int, Dict]], dry_run: bool = False,
+             omitir_errores: bool = False, lote: Optional[int] = None,
+             progreso: Optional[Callable[[int], None]] = None) -> Dict:
+    """
+    Valida e inserta empleados en una única transacción.
+
+    Args:
+        filas: Iterable de (número de línea, fila), p. ej. leer_csv(archivo)
+        dry_run: Si es True, valida e inserta pero deshace la transacción al final
+        omitir_errores: Si es True, inserta las filas válidas aunque otras fallen
+        lote: Filas por executemany (por defecto Config.IMPORTACION_LOTE)
+        progreso: Función opcional que recibe las filas leídas tras cada bloque
+
+    Returns:
+        Dict con filas leídas, válidas, insertadas, errores por fila (hasta
+        Config.IMPORTACION_MAX_ERRORES) y si se confirmó la transacción
+    """
+    lote = lote or config.IMPORTACION_LOTE
+    max_errores = config.IMPORTACION_MAX_ERRORES
+    inicio = time.perf_counter()
+    resumen = {'filas': 0, 'validas': 0, 'insertadas': 0, 'errores': [],
+               'total_errores': 0, 'dry_run': dry_run, 'confirmado': False}
+
+    def registrar_error(numero: int, campo: str, mensaje: str) -> None:
+        resumen['total_errores'] += 1
+        if len(resumen['errores']) < max_errores:
+            resumen['errores'].append({'fila': numero, 'campo': campo, 'mensaje': mensaje})
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+        # Catálogos cargados una sola vez para toda la importación
+        departamentos = {row[0] for row in cursor.execute("SELECT id_departamento FROM Departamentos")}
+        puestos = {row[0] for row in cursor.execute("SELECT id_puesto FROM Puestos")}
+        correos_archivo = set()
+        pendientes: List[Tuple[int, Dict]] = []
+
+        def insertar_lote() -> None:
+            # Correos que ya existen en la base de datos, sin distinguir
+            # mayúsculas, igual que dentro del archivo (índice idx_empleados_correo_minusculas)
+            correos = [v['correo'].lower() for _, v in pendientes if v['correo']]
+            existentes = set()
+            for i in range(0, len(correos), 500):
+                bloque = correos[i:i + 500]
+                existentes.update(row[0] for row in cursor.execute(
+                    f"SELECT lower(correo) FROM Empleados WHERE lower(correo) IN ({', '.join('?' * len(bloque))})",
+                    bloque))
+            validas = []
+            for numero, valores in pendientes:
+                if valores['correo'] and valores['correo'].lower() in existentes:
+                    registrar_error(numero, 'correo', f"ya existe un empleado con el correo {valores['correo']}")
+                else:
+                    validas.append(tuple(valores[c] for c in COLUMNAS))
+            resumen['validas'] += len(validas)
+            if validas and (omitir_errores or resumen['total_errores'] == 0):
+                cursor.executemany(f"""
+                    INSERT INTO Empleados ({', '.join(COLUMNAS)})
+                    VALUES ({', '.join('?' * len(COLUMNAS))})
+                """, validas)
+                resumen['insertadas'] += len(validas)
+            pendientes.clear()
+            if progreso is not None:
+                progreso(resumen['filas'])
+
+        for numero, fila in filas:
+            resumen['filas'] += 1
+            valores, errores = validar_fila(fila, departamentos, puestos)
+            if valores['correo'] and not errores:
+                if valores['correo'].lower() in correos_archivo:
+                    errores.append(('correo', f"correo repetido en el archivo ({valores['correo']})"))
+                correos_archivo.add(valores['correo'].lower())
+            for campo, mensaje in errores:
+                registrar_error(numero, campo, mensaje)
+            if not errores:
+                pendientes.append((numero, valores))
+            if len(pendientes) >= lote:
+                insertar_lote()
+        if pendientes:
+            insertar_lote()
+
+        if dry_run or (resumen['total_errores'] and not omitir_errores):
+            conn.rollback()
+            if not dry_run:
+                resumen['insertadas'] = 0
+        else:
+            resumen['confirmado'] = True
+
+    resumen['errores'].sort(key=lambda error: error['fila'])
+    resumen['duracion_ms'] = int((time.perf_counter() - inicio) * 1000)
+    return resumen
+
+
+def main(argv=None) -> bool:
+    """Punto de entrada de la línea de comandos."""
+    argv = sys.argv[1:] if argv is None else argv
+    archivos = [a for a in argv if not a.startswith('--')]
+
+    print("=" * 60)
+    print("IMPORTACION DE EMPLEADOS")
+    print("=" * 60)
+
+    if not archivos:
+        print("[ERROR] Uso: python importacion_empleados.py archivo.csv|archivo.xlsx "
+              "[--dry-run] [--omitir-errores]")
+        return False
+
+    try:
+        with open(archivos[0], 'rb') as flujo:
+            lector = leer_xlsx if archivos[0].lower().endswith('.xlsx') else leer_csv
+            r = importar(lector(flujo), dry_run='--dry-run' in argv,
+                         omitir_errores='--omitir-errores' in argv)
+    except Exception as e:
+        print(f"[ERROR] Error durante la importación: {str(e)}")
+        return False
+
+    for error in r['errores']:
+        print(f"  [!] Fila {error['fila']}, {error['campo']}: {error['mensaje']}")
+    if r['total_errores'] > len(r['errores']):
+        print(f"  [!] ... y {r['total_errores'] - len(r['errores'])} errores más")
+    estado = 'simulación' if r['dry_run'] else ('confirmada' if r['confirmado'] else 'deshecha')
+    print(f"[{'OK' if r['confirmado'] or (r['dry_run'] and not r['total_errores']) else 'ERROR'}] "
+          f"{r['filas']} filas, {r['validas']} válidas, {r['insertadas']} insertadas "
+          f"({estado}, {r['duracion_ms']} ms)")
+    return r['total_errores'] == 0 or r['confirmado']
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
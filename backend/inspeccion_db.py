@@ -0,0 +1,196 @@
+"""
+Inspección rápida del esquema y las estadísticas de la base de datos.
+
+En lugar de ejecutar SELECT COUNT(*) sobre cada tabla (que recorre la tabla
+completa y mantiene un bloqueo de lectura mientras tanto), los conteos de
+filas se leen de sqlite_stat1, que ANALYZE mantiene. Los tamaños por tabla e
+índice se obtienen de la tabla virtual dbstat si SQLite la incluye. El conteo
+exacto y los tamaños (que recorren todas las páginas) solo se calculan cuando
+se piden explícitamente.
+
+Uso:
+    python inspeccion_db.py [--exacto] [--analizar] [--tamanos]
+"""
+import os
+import sys
+from typing import Dict, List, Optional
+from database import get_db, motor, rutas
+
+
+def analizar(conn, limite: int = 1000) -> None:
+    """
+    Ejecuta ANALYZE con un límite de filas por índice para que sea rápido
+    incluso en bases de datos grandes. Actualiza sqlite_stat1.
+
+    Args:
+        conn: Conexión abierta
+        limite: Valor de PRAGMA analysis_limit (0 para un análisis completo)
+    """
+    conn.execute(f"PRAGMA analysis_limit = {int(limite)}")
+    conn.execute("ANALYZE")
+
+
+def _filas_aproximadas(conn) -> Dict[str, int]:
+    """Filas por tabla según sqlite_stat1 (vacío si nunca se ejecutó ANALYZE)."""
+    existe = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='sqlite_stat1'"
+    ).fetchone()
+    if not existe:
+        return {}
+    # El primer entero de 'stat' es el número de filas de la tabla
+    cursor = conn.execute("""
+        SELECT tbl, MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 GROUP BY tbl
+    """)
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def _tamanos_dbstat(conn) -> Optional[Dict[str, Dict]]:
+    """
+    Páginas, bytes, bytes sin usar y celdas hoja por tabla/índice según dbstat.
+    Devuelve None si SQLite no se compiló con la tabla virtual dbstat.
+    """
+    try:
+        cursor = conn.execute("""
+            SELECT name,
+                   COUNT(*) AS paginas,
+                   SUM(pgsize) AS bytes,
+                   SUM(unused) AS sin_usar,
+                   SUM(CASE WHEN pagetype = 'leaf' THEN ncell ELSE 0 END) AS celdas
+            FROM dbstat
+            GROUP BY name
+        """)
+    except Exception:
+        return None
+    return {row[0]: {
+        'paginas': row[1],
+        'bytes': row[2],
+        'sin_usar': row[3],
+        'celdas': row[4]
+    } for row in cursor.fetchall()}
+
+
+def inspeccionar(conn, exacto: bool = False, tamanos: bool = False,
+                 analizar_antes: bool = False) -> Dict:
+    """
+    Reúne información del archivo, las páginas y cada tabla de la base de datos.
+
+    Args:
+        conn: Conexión abierta
+        exacto: Si es True, cuenta las filas con COUNT(*) (lento en tablas grandes)
+        tamanos: Si es True, incluye páginas y bytes por tabla e índice (dbstat,
+            recorre el archivo completo)
+        analizar_antes: Si es True, ejecuta ANALYZE antes de leer las estadísticas
+
+    Returns:
+        Dict con las claves 'archivo', 'paginas' y 'tablas'
+    """
+    motor.requiere_sqlite("La inspección de la base de datos")
+    if analizar_antes:
+        analizar(conn)
+
+    tamano_pagina = conn.execute("PRAGMA page_size").fetchone()[0]
+    total_paginas = conn.execute("PRAGMA page_count").fetchone()[0]
+    paginas_libres = conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    filas_stat = _filas_aproximadas(conn)
+    dbstat = _tamanos_dbstat(conn) if tamanos else None
+
+    cursor = conn.execute("""
+        SELECT name, type, tbl_name FROM sqlite_master
+        WHERE (type = 'table' AND name NOT LIKE 'sqlite_%') OR type = 'index'
+        ORDER BY tbl_name, type DESC, name
+    """)
+    objetos = cursor.fetchall()
+
+    tablas: List[Dict] = []
+    por_nombre: Dict[str, Dict] = {}
+    for nombre, tipo, tabla in objetos:
+        if tipo == 'table':
+            info = {'nombre': nombre, 'filas': None, 'fuente_filas': None, 'indices': []}
+            if exacto:
+                info['filas'] = conn.execute(f'SELECT COUNT(*) FROM "{nombre}"').fetchone()[0]
+                info['fuente_filas'] = 'exacto'
+            elif nombre in filas_stat:
+                info['filas'] = filas_stat[nombre]
+                info['fuente_filas'] = 'sqlite_stat1'
+            elif dbstat is not None and nombre in dbstat:
+                # Las celdas de las páginas hoja de una tabla rowid son sus filas
+                info['filas'] = dbstat[nombre]['celdas']
+                info['fuente_filas'] = 'dbstat'
+            if dbstat is not None and nombre in dbstat:
+                info.update(_tamano_objeto(dbstat[nombre]))
+            tablas.append(info)
+            por_nombre[nombre] = info
+        elif tabla in por_nombre:
+            indice = {'nombre': nombre}
+            if dbstat is not None and nombre in dbstat:
+                indice.update(_tamano_objeto(dbstat[nombre]))
+            por_nombre[tabla]['indices'].append(indice)
+
+    return {
+        'archivo': {
+            'ruta': str(rutas().datos),
+            'bytes': os.path.getsize(rutas().datos) if os.path.exists(rutas().datos) else None
+        },
+        'paginas': {
+            'tamano_pagina': tamano_pagina,
+            'total': total_paginas,
+            'libres': paginas_libres,
+            'fragmentacion': round(paginas_libres / total_paginas, 4) if total_paginas else 0.0,
+            'bytes_libres': paginas_libres * tamano_pagina
+        },
+        'estadisticas_disponibles': bool(filas_stat),
+        'tablas': tablas
+    }
+
+
+def _tamano_objeto(stat: Dict) -> Dict:
+    """Tamaño y ocupación de una tabla o índice a partir de su fila de dbstat."""
+    return {
+        'paginas': stat['paginas'],
+        'bytes': stat['bytes'],
+        'ocupacion': round(1 - stat['sin_usar'] / stat['bytes'], 4) if stat['bytes'] else None
+    }
+
+
+def main(argv=None) -> bool:
+    """Punto de entrada de la línea de comandos."""
+    argv = sys.argv[1:] if argv is None else argv
+
+    print("=" * 60)
+    print("INSPECCION DE LA BASE DE DATOS")
+    print("=" * 60)
+
+    try:
+        with get_db() as conn:
+            info = inspeccionar(conn,
+                                exacto='--exacto' in argv,
+                                tamanos='--tamanos' in argv,
+                                analizar_antes='--analizar' in argv)
+    except Exception as e:
+        print(f"[ERROR] Error al inspeccionar la base de datos: {str(e)}")
+        return False
+
+    paginas = info['paginas']
+    print(f"  Archivo: {info['archivo']['ruta']} ({info['archivo']['bytes']} bytes)")
+    print(f"  Páginas: {paginas['total']} de {paginas['tamano_pagina']} bytes, "
+          f"{paginas['libres']} libres ({paginas['fragmentacion']:.1%})")
+    if not info['estadisticas_disponibles']:
+        print("  [!] Sin estadísticas de ANALYZE; usa --analizar para generarlas.")
+    print()
+
+    for tabla in info['tablas']:
+        filas = '?' if tabla['filas'] is None else f"~{tabla['filas']}"
+        if tabla['fuente_filas'] == 'exacto':
+            filas = str(tabla['filas'])
+        tamano = f", {tabla['paginas']} páginas" if 'paginas' in tabla else ''
+        print(f"  - {tabla['nombre']:30} {filas:>10} filas{tamano}")
+        for indice in tabla['indices']:
+            tamano = f"{indice['paginas']} páginas" if 'paginas' in indice else ''
+            print(f"      índice {indice['nombre']:30} {tamano}")
+
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,404 @@
+"""
+Operaciones por lotes sobre los recursos de la API.
+
+Obtener N registros por su ID con N llamadas a /api/<recurso>/<id> abre N
+conexiones y hace N consultas. Aquí se resuelven todos con una sola
+conexión y consultas WHERE id IN (...) por bloques de Config.LOTES_BLOQUE
+IDs, devolviendo los registros en el orden pedido e indicando los IDs que
+no existen.
+
+Las actualizaciones y eliminaciones masivas (por lista de IDs o por
+filtros) se ejecutan como sentencias UPDATE/DELETE sobre el conjunto, en
+una sola transacción, en lugar de pasar fila a fila por update()/delete().
+Los efectos que los modelos aplican al modificar una fila (libro de saldos
+de vacaciones, eventos en vivo, caché de contratos vigentes) se aplican
+igualmente a las filas afectadas, obtenidas con RETURNING (o, si el motor
+no lo admite, leyéndolas por clave en la misma transacción). Las filas
+archivadas o de años cerrados son de solo lectura: no se modifican y se
+informan como 'omitidas'.
+"""
+from typing import Dict, List, Optional, Tuple
+from database import get_db, config, motor
+import archivo
+import particiones
+from eventos import publicar
+from exportacion import RECURSOS as RECURSOS_EXPORTACION
+from models import contrato as modelo_contrato
+from models.saldo_vacaciones import SaldoVacaciones, fecha_guardada
+from models.vacacion_permiso import ESTADOS, VacacionPermiso
+
+# Recurso de la API -> (tabla, columnas); la primera columna es el ID.
+# Mismas columnas que devuelve get_by_id() de cada modelo.
+RECURSOS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    recurso: (tabla, columnas) for recurso, (tabla, columnas, _) in RECURSOS_EXPORTACION.items()
+}
+RECURSOS['users'] = ('users', ('id', 'username', 'email', 'created_at'))
+
+# Columnas de fecha para los filtros 'desde'/'hasta' de las operaciones masivas
+COLUMNAS_FECHA: Dict[str, str] = {
+    recurso: columna_fecha for recurso, (_, _, columna_fecha) in RECURSOS_EXPORTACION.items()
+}
+
+# Columnas que no se pueden cambiar por lotes porque se derivan de otras
+# (id_curso sale de nombre_curso e institucion). Los usuarios (contraseñas
+# con hash, nombres únicos) solo se leen por lotes.
+_NO_EDITABLES: Dict[str, set] = {
+    'capacitaciones': {'nombre_curso', 'institucion', 'id_curso'},
+}
+_SOLO_LECTURA = {'users'}
+
+# Tablas con borrado lógico (eliminado_en)
+_BORRADO_LOGICO = set(archivo.TABLAS) | {particiones.TABLA}
+
+# Columnas que referencian otra tabla -> (tabla, clave)
+_REFERENCIAS = {
+    'id_empleado': ('Empleados', 'id_empleado'),
+    'id_departamento': ('Departamentos', 'id_departamento'),
+    'id_puesto': ('Puestos', 'id_puesto'),
+}
+
+
+def validar_recurso(recurso: str) -> Tuple[str, Tuple[str, ...]]:
+    """Devuelve la tabla y las columnas del recurso o lanza ValueError."""
+    if recurso not in RECURSOS:
+        raise ValueError(f"Recurso no soportado: {recurso}. Disponibles: {', '.join(RECURSOS)}")
+    return RECURSOS[recurso]
+
+
+def validar_ids(ids) -> List[int]:
+    """
+    Normaliza la lista de IDs (enteros positivos, hasta Config.LOTES_MAX_IDS).
+    Acepta una lista o un texto separado por comas.
+    """
+    if isinstance(ids, str):
+        ids = [i for i in (parte.strip() for parte in ids.split(',')) if i]
+    if not isinstance(ids, list) or not ids:
+        raise ValueError("'ids' debe ser una lista no vacía de IDs")
+    if len(ids) > config.LOTES_MAX_IDS:
+        raise ValueError(f"Se admiten como máximo {config.LOTES_MAX_IDS} IDs por petición")
+    try:
+        normalizados = [int(i) for i in ids]
+    except (TypeError, ValueError):
+        raise ValueError("Todos los 'ids' deben ser números enteros")
+    if any(i < 1 or isinstance(original, bool) for i, original in zip(normalizados, ids)):
+        raise ValueError("Todos los 'ids' deben ser números enteros positivos")
+    return normalizados
+
+
+def _en_bloques(cursor, sql: str, ids: List[int], params: tuple = ()):
+    """Ejecuta 'sql' (con {marcas} para el IN) por bloques de IDs y genera las filas."""
+    unicos = list(dict.fromkeys(ids))
+    for i in range(0, len(unicos), config.LOTES_BLOQUE):
+        bloque = unicos[i:i + config.LOTES_BLOQUE]
+        yield from cursor.execute(sql.format(marcas=', '.join('?' * len(bloque))),
+                                  params + tuple(bloque))
+
+
+def obtener_varios(recurso: str, ids) -> Dict:
+    """
+    Obtiene varios registros de un recurso por su ID en una sola conexión.
+
+    Args:
+        recurso: Nombre del recurso en la API (empleados, contratos, ...)
+        ids: Lista de IDs (o texto separado por comas); los repetidos se
+            devuelven una vez por cada aparición
+
+    Returns:
+        Dict con los registros encontrados en el orden pedido y la lista
+        de IDs que no existen
+    """
+    tabla, columnas = validar_recurso(recurso)
+    ids = validar_ids(ids)
+    clave = columnas[0]
+
+    with get_db() as conn:
+        origenes, activas = [tabla], ''
+        # Por clave también se encuentran las filas archivadas o de años
+        # cerrados; las eliminadas (borrado lógico) no
+        if tabla in archivo.TABLAS:
+            origenes, activas = [archivo.fuente(conn, tabla)], ' AND eliminado_en IS NULL'
+        elif tabla == particiones.TABLA:
+            # Un grupo de particiones adjuntas cada vez (se adjunta al pedirlo)
+            origenes = (particiones.union(tablas) for tablas in particiones.grupos(conn, ids=ids))
+            activas = ' AND eliminado_en IS NULL'
+        encontrados = {}
+        for origen in origenes:
+            encontrados.update(
+                (row[clave], {columna: row[columna] for columna in columnas})
+                for row in _en_bloques(conn.cursor(), f"""
+                    SELECT {', '.join(columnas)}
+                    FROM {origen}
+                    WHERE {clave} IN ({{marcas}}){activas}
+                """, ids))
+
+    return {
+        'registros': [encontrados[i] for i in ids if i in encontrados],
+        'no_encontrados': list(dict.fromkeys(i for i in ids if i not in encontrados))
+    }
+
+
+def _criterios(recurso: str, columnas: Tuple[str, ...], filtro: Optional[Dict]) -> Tuple[str, list]:
+    """
+    Traduce el filtro ({columna: valor | [valores] | null}, más 'desde' y
+    'hasta' sobre la columna de fecha del recurso) a condiciones SQL.
+    """
+    if filtro is None:
+        return '', []
+    if not isinstance(filtro, dict):
+        raise ValueError("'filtro' debe ser un objeto {columna: valor}")
+    condiciones, params = [], []
+    for columna, valor in filtro.items():
+        if columna in ('desde', 'hasta'):
+            if not COLUMNAS_FECHA.get(recurso):
+                raise ValueError(f"El recurso {recurso} no admite filtrar por fechas")
+            condiciones.append(f"{COLUMNAS_FECHA[recurso]} {'>=' if columna == 'desde' else '<='} ?")
+            params.append(valor)
+        elif columna not in columnas:
+            raise ValueError(f"Columna desconocida en 'filtro': {columna}")
+        elif valor is None:
+            condiciones.append(f"{columna} IS NULL")
+        elif isinstance(valor, list):
+            if not valor:
+                raise ValueError(f"La lista de valores de '{columna}' no puede estar vacía")
+            condiciones.append(f"{columna} IN ({', '.join('?' * len(valor))})")
+            params.extend(valor)
+        else:
+            condiciones.append(f"{columna} = ?")
+            params.append(valor)
+    return ' AND '.join(condiciones), params
+
+
+def _sentencias(clave: str, ids: Optional[List[int]], condicion: str, params: list):
+    """
+    Genera (WHERE, parámetros) para ejecutar la operación: una sola vez con
+    el filtro o una vez por bloque de Config.LOTES_BLOQUE IDs.
+    """
+    if ids is None:
+        yield condicion, params
+        return
+    unicos = list(dict.fromkeys(ids))
+    for i in range(0, len(unicos), config.LOTES_BLOQUE):
+        bloque = unicos[i:i + config.LOTES_BLOQUE]
+        where = f"{clave} IN ({', '.join('?' * len(bloque))})"
+        yield (f"{where} AND {condicion}" if condicion else where), list(bloque) + params
+
+
+def _preparar(recurso: str, ids, filtro) -> Tuple[str, Tuple[str, ...], Optional[List[int]], str, list]:
+    tabla, columnas = validar_recurso(recurso)
+    if recurso in _SOLO_LECTURA:
+        raise ValueError(f"El recurso {recurso} no admite operaciones masivas")
+    if ids is None and not filtro:
+        raise ValueError("Indique 'ids' o un 'filtro' con al menos una condición")
+    ids = validar_ids(ids) if ids is not None else None
+    condicion, params = _criterios(recurso, columnas, filtro)
+    if tabla in _BORRADO_LOGICO:
+        # Solo filas vivas de la tabla principal: las archivadas y las de años
+        # cerrados son de solo lectura
+        condicion = ' AND '.join(filter(None, [condicion, "eliminado_en IS NULL"]))
+    return tabla, columnas, ids, condicion, params
+
+
+def _omitidas(conn, tabla: str, clave: str, ids: Optional[List[int]], condicion: str, params: list,
+              filtro: Optional[Dict]) -> Optional[Dict]:
+    """
+    Filas de solo lectura (archivadas o de años cerrados) que cumplen los
+    criterios y que la operación no modifica, o None si la tabla no tiene
+    filas de solo lectura. Adjunta el archivo o las particiones, así que se
+    llama antes de empezar la transacción.
+    """
+    if tabla == particiones.TABLA:
+        filtro = filtro or {}
+        # Un grupo de particiones adjuntas cada vez, sin la tabla principal
+        origenes = (origen for tablas in particiones.grupos(conn, filtro.get('desde'), filtro.get('hasta'), ids)
+                    for origen in tablas if particiones.es_particion(origen))
+    elif tabla in archivo.TABLAS:
+        origenes = [f"{archivo.ESQUEMA}.{tabla}"] if archivo.incluye_archivo(conn, tabla) else []
+    else:
+        return None
+    encontradas = []
+    for origen in origenes:
+        for where, valores in _sentencias(clave, ids, condicion, params):
+            encontradas.extend(row[0] for row in conn.execute(
+                f"SELECT {clave} FROM {origen} WHERE {where}", valores))
+    return {'filas': len(encontradas), 'ids': encontradas[:100]}
+
+
+def _modificar(cursor, tabla: str, columnas: Tuple[str, ...], sql: str, valores: list,
+               where: str, valores_where: list) -> List[Dict]:
+    """
+    Ejecuta el UPDATE o DELETE 'sql' y devuelve las filas afectadas: con
+    RETURNING si el motor lo admite o, si no, leyéndolas por clave en la
+    misma transacción (después de un UPDATE, antes de un DELETE).
+    """
+    if motor.returning:
+        return [dict(row) for row in cursor.execute(
+            f"{sql} RETURNING {', '.join(columnas)}", valores).fetchall()]
+    clave = columnas[0]
+    ids = [row[0] for row in cursor.execute(f"SELECT {clave} FROM {tabla} WHERE {where}", valores_where)]
+    consulta = f"SELECT {', '.join(columnas)} FROM {tabla} WHERE {clave} IN ({{marcas}})"
+    if sql.startswith('DELETE'):
+        filas = [dict(row) for row in _en_bloques(cursor, consulta, ids)]
+        cursor.execute(sql, valores)
+        return filas
+    cursor.execute(sql, valores)
+    return [dict(row) for row in _en_bloques(cursor, consulta, ids)]
+
+
+def _validar_cambios(cursor, recurso: str, columnas: Tuple[str, ...], cambios) -> Dict:
+    if not isinstance(cambios, dict) or not cambios:
+        raise ValueError("'cambios' debe ser un objeto {columna: valor} no vacío")
+    editables = set(columnas[1:]) - _NO_EDITABLES.get(recurso, set())
+    for columna, valor in cambios.items():
+        if columna not in editables:
+            raise ValueError(f"La columna '{columna}' no se puede modificar por lotes. "
+                             f"Modificables: {', '.join(c for c in columnas if c in editables)}")
+        if isinstance(valor, (dict, list)):
+            raise ValueError(f"El valor de '{columna}' debe ser un valor simple")
+        if columna in _REFERENCIAS and valor is not None:
+            tabla, clave = _REFERENCIAS[columna]
+            if not cursor.execute(f"SELECT 1 FROM {tabla} WHERE {clave} = ?", (valor,)).fetchone():
+                raise ValueError(f"No existe el registro de {tabla} con ID {valor}")
+    if recurso == 'asistencias' and 'fecha' in cambios:
+        particiones.comprobar_abierto(cursor, cambios['fecha'])
+    if recurso == 'vacaciones-permisos' and 'estado' in cambios and cambios['estado'] not in ESTADOS:
+        # Un estado desconocido devolvería los días de las aprobadas al saldo
+        # y seguiría bloqueando solapamientos
+        raise ValueError(f"Estado no válido: {cambios['estado']!r}. Válidos: {', '.join(ESTADOS)}")
+    return {c: (int(v) if isinstance(v, bool) else v) for c, v in cambios.items()}
+
+
+def actualizar(recurso: str, cambios: Dict, ids=None, filtro: Optional[Dict] = None,
+               devolver: bool = False) -> Dict:
+    """
+    Aplica los mismos cambios a todas las filas de un recurso que cumplen
+    los criterios, con sentencias UPDATE sobre el conjunto en una sola
+    transacción (si algo falla no se modifica ninguna fila).
+
+    Args:
+        recurso: Nombre del recurso en la API (empleados, contratos, ...)
+        cambios: {columna: nuevo valor}
+        ids: Lista de IDs a modificar (opcional si hay filtro)
+        filtro: {columna: valor | [valores] | null}, más 'desde'/'hasta'
+            sobre la fecha principal del recurso (se combina con ids)
+        devolver: Incluir las filas modificadas en el resultado
+
+    Returns:
+        Dict con el número de filas 'afectadas', las 'omitidas' por ser de
+        solo lectura (asistencias y nóminas) y, si se pidió, los 'registros'
+    """
+    tabla, columnas, ids, condicion, params = _preparar(recurso, ids, filtro)
+    clave = columnas[0]
+    registros = []
+    afectadas = 0
+
+    try:
+        with get_db() as conn:
+            omitidas = _omitidas(conn, tabla, clave, ids, condicion, params, filtro)
+            cursor = conn.cursor()
+            # Reservar la escritura desde el principio: las lecturas previas
+            # (estado anterior) y el UPDATE ven los mismos datos
+            motor.reservar_escritura(cursor, tabla)
+            cambios = _validar_cambios(cursor, recurso, columnas, cambios)
+            asignaciones = ', '.join(f"{columna} = ?" for columna in cambios)
+            con_filas = devolver or recurso in ('vacaciones-permisos', 'asistencias')
+
+            for where, valores in _sentencias(clave, ids, condicion, params):
+                anteriores = {}
+                if recurso == 'vacaciones-permisos':
+                    anteriores = {row[0]: row[1] for row in cursor.execute(
+                        f"SELECT id_permiso, estado FROM Vacaciones_Permisos WHERE {where}", valores)}
+                sql = f"UPDATE {tabla} SET {asignaciones} WHERE {where}"
+                if not con_filas:
+                    afectadas += cursor.execute(sql, list(cambios.values()) + valores).rowcount
+                    continue
+                filas = _modificar(cursor, tabla, columnas, sql, list(cambios.values()) + valores,
+                                   where, valores)
+                afectadas += len(filas)
+                _despues_de_actualizar(cursor, recurso, cambios, filas, anteriores)
+                if devolver:
+                    registros.extend(filas)
+    except motor.IntegrityError as e:
+        raise ValueError(f"Los cambios violan una restricción de {tabla}: {str(e)}")
+
+    if recurso == 'contratos' and afectadas:
+        modelo_contrato._invalidar_cache()
+
+    resultado = {'afectadas': afectadas}
+    if omitidas is not None:
+        resultado['omitidas'] = omitidas
+    if devolver:
+        resultado['registros'] = registros
+    return resultado
+
+
+def _despues_de_actualizar(cursor, recurso: str, cambios: Dict, filas: List[Dict],
+                           anteriores: Dict) -> None:
+    """Aplica a las filas modificadas lo mismo que update() del modelo."""
+    if recurso == 'vacaciones-permisos':
+        revalidar = {'id_empleado', 'fecha_inicio', 'fecha_fin', 'estado'} & set(cambios)
+        for fila in filas:
+            if revalidar:
+                # Como en update(): solo las fechas enviadas se validan de forma
+                # estricta; las guardadas admiten valores antiguos con hora
+                fechas = [cambios[c] if c in cambios else fecha_guardada(fila[c])
+                          for c in ('fecha_inicio', 'fecha_fin')]
+                VacacionPermiso._validar_periodo(cursor, fila['id_empleado'], *fechas, fila['estado'],
+                                                 excluir_id=fila['id_permiso'])
+            SaldoVacaciones.sincronizar(cursor, fila['id_permiso'])
+            publicar(cursor, 'permiso.actualizado',
+                     dict(fila, estado_anterior=anteriores.get(fila['id_permiso'])), fila['id_empleado'])
+    elif recurso == 'asistencias':
+        for fila in filas:
+            publicar(cursor, 'asistencia.actualizada', fila, fila['id_empleado'])
+
+
+def eliminar(recurso: str, ids=None, filtro: Optional[Dict] = None, devolver: bool = False) -> Dict:
+    """
+    Elimina todas las filas de un recurso que cumplen los criterios (ids
+    y/o filtro, como en actualizar()) en una sola transacción. Las
+    asistencias y nóminas se marcan como eliminadas (borrado lógico).
+
+    Returns:
+        Dict con el número de filas 'afectadas', las 'omitidas' por ser de
+        solo lectura (asistencias y nóminas) y, si se pidió, los
+        'registros' eliminados
+    """
+    tabla, columnas, ids, condicion, params = _preparar(recurso, ids, filtro)
+    registros = []
+    afectadas = 0
+
+    try:
+        with get_db() as conn:
+            omitidas = _omitidas(conn, tabla, columnas[0], ids, condicion, params, filtro)
+            cursor = conn.cursor()
+            motor.reservar_escritura(cursor, tabla)
+            con_filas = devolver or recurso == 'vacaciones-permisos'
+            for where, valores in _sentencias(columnas[0], ids, condicion, params):
+                if tabla in _BORRADO_LOGICO:
+                    # Borrado lógico, como delete() del modelo
+                    sql = f"UPDATE {tabla} SET eliminado_en = CURRENT_TIMESTAMP WHERE {where}"
+                else:
+                    sql = f"DELETE FROM {tabla} WHERE {where}"
+                if not con_filas:
+                    afectadas += cursor.execute(sql, valores).rowcount
+                    continue
+                filas = _modificar(cursor, tabla, columnas, sql, valores, where, valores)
+                afectadas += len(filas)
+                if recurso == 'vacaciones-permisos':
+                    # Reversa en el libro de saldos lo que descontaban
+                    for fila in filas:
+                        SaldoVacaciones.sincronizar(cursor, fila['id_permiso'])
+                if devolver:
+                    registros.extend(filas)
+    except motor.IntegrityError as e:
+        raise ValueError(f"No se pueden eliminar las filas de {tabla}: {str(e)}")
+
+    if recurso == 'contratos' and afectadas:
+        modelo_contrato._invalidar_cache()
+
+    resultado = {'afectadas': afectadas}
+    if omitidas is not None:
+        resultado['omitidas'] = omitidas
+    if devolver:
+        resultado['registros'] = registros
+    return resultado
@@ -0,0 +1,293 @@
+"""
+Mantenimiento programado de la base de datos SQLite.
+
+Ejecuta PRAGMA optimize (que a su vez lanza ANALYZE cuando las estadísticas
+están desactualizadas), VACUUM incremental para devolver al sistema las
+páginas liberadas tras borrar asistencias o nóminas, y checkpoints del WAL
+con truncado para que el archivo -wal no crezca sin límite.
+
+Puede ejecutarse una vez desde la línea de comandos o como hilo en segundo
+plano que solo actúa dentro de la ventana de poco tráfico configurada
+(Config.MANTENIMIENTO_VENTANA).
+
+Uso:
+    python mantenimiento.py [--sin-optimize] [--sin-vacuum] [--sin-checkpoint]
+                            [--convertir-auto-vacuum] [--programador]
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, time as dtime
+from typing import Dict, Optional, Tuple
+from database import get_connection, config, rutas
+from inspeccion_db import analizar
+import empresas
+
+logger = logging.getLogger(__name__)
+
+# Valor de PRAGMA auto_vacuum para el modo incremental
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def _tamano_archivo(ruta) -> int:
+    return os.path.getsize(ruta) if os.path.exists(ruta) else 0
+
+
+def _paginas(conn) -> Tuple[int, int, int]:
+    """Devuelve (tamaño de página, páginas totales, páginas libres)."""
+    return (conn.execute("PRAGMA page_size").fetchone()[0],
+            conn.execute("PRAGMA page_count").fetchone()[0],
+            conn.execute("PRAGMA freelist_count").fetchone()[0])
+
+
+def optimizar(conn) -> Dict:
+    """Ejecuta PRAGMA optimize (y ANALYZE si nunca se generaron estadísticas)."""
+    inicio = time.perf_counter()
+    sin_estadisticas = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='sqlite_stat1'"
+    ).fetchone() is None
+    if sin_estadisticas:
+        analizar(conn)
+    conn.execute("PRAGMA optimize")
+    return {
+        'analyze_inicial': sin_estadisticas,
+        'duracion_ms': int((time.perf_counter() - inicio) * 1000)
+    }
+
+
+def vacuum_incremental(conn, paginas: Optional[int] = None) -> Dict:
+    """
+    Libera páginas de la freelist con PRAGMA incremental_vacuum.
+
+    Args:
+        conn: Conexión abierta
+        paginas: Máximo de páginas a liberar (por defecto
+            Config.MANTENIMIENTO_PAGINAS_VACUUM; 0 libera todas)
+
+    Returns:
+        Dict con páginas liberadas, bytes recuperados y duración
+    """
+    paginas = config.MANTENIMIENTO_PAGINAS_VACUUM if paginas is None else paginas
+    inicio = time.perf_counter()
+    modo = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    tamano_pagina, total_antes, libres_antes = _paginas(conn)
+
+    if modo != AUTO_VACUUM_INCREMENTAL:
+        return {
+            'omitido': 'auto_vacuum no es INCREMENTAL (usa --convertir-auto-vacuum)',
+            'paginas_libres': libres_antes
+        }
+
+    # incremental_vacuum libera una página por paso; executescript lo ejecuta
+    # hasta el final (execute() solo daría el primer paso)
+    conn.executescript(f"PRAGMA incremental_vacuum({int(paginas)});" if paginas
+                       else "PRAGMA incremental_vacuum;")
+
+    _, total_despues, libres_despues = _paginas(conn)
+    return {
+        'paginas_liberadas': total_antes - total_despues,
+        'bytes_recuperados': (total_antes - total_despues) * tamano_pagina,
+        'paginas_libres_restantes': libres_despues,
+        'duracion_ms': int((time.perf_counter() - inicio) * 1000)
+    }
+
+
+def checkpoint(conn) -> Dict:
+    """Ejecuta PRAGMA wal_checkpoint(TRUNCATE) y mide el archivo -wal."""
+    inicio = time.perf_counter()
+    ruta_wal = f"{rutas().datos}-wal"
+    wal_antes = _tamano_archivo(ruta_wal)
+    ocupado, paginas_log, paginas_copiadas = conn.execute(
+        "PRAGMA wal_checkpoint(TRUNCATE)"
+    ).fetchone()
+    return {
+        'bloqueado': bool(ocupado),
+        'paginas_log': paginas_log,
+        'paginas_copiadas': paginas_copiadas,
+        'bytes_recuperados': max(wal_antes - _tamano_archivo(ruta_wal), 0),
+        'duracion_ms': int((time.perf_counter() - inicio) * 1000)
+    }
+
+
+def convertir_auto_vacuum(conn) -> Dict:
+    """
+    Activa auto_vacuum=INCREMENTAL en una base de datos existente. Requiere un
+    VACUUM completo, que reescribe el archivo: ejecutar fuera de horario.
+    """
+    inicio = time.perf_counter()
+    tamano_antes = _tamano_archivo(rutas().datos)
+    conn.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+    conn.execute("VACUUM")
+    return {
+        'bytes_recuperados': max(tamano_antes - _tamano_archivo(rutas().datos), 0),
+        'duracion_ms': int((time.perf_counter() - inicio) * 1000)
+    }
+
+
+def ejecutar_mantenimiento(optimize: bool = True, vacuum: bool = True,
+                           wal: bool = True) -> Dict:
+    """
+    Ejecuta los pasos de mantenimiento indicados y registra su resultado.
+
+    Returns:
+        Dict con el resultado de cada paso ejecutado
+    """
+    conn = get_connection()
+    conn.isolation_level = None  # VACUUM y los checkpoints no admiten transacciones
+    resultado = {}
+    try:
+        tamano_antes = _tamano_archivo(rutas().datos)
+        if optimize:
+            resultado['optimize'] = optimizar(conn)
+        if vacuum:
+            resultado['vacuum'] = vacuum_incremental(conn)
+        if wal:
+            resultado['checkpoint'] = checkpoint(conn)
+        resultado['bytes_archivo'] = _tamano_archivo(rutas().datos)
+        resultado['bytes_recuperados'] = max(tamano_antes - resultado['bytes_archivo'], 0)
+    finally:
+        conn.close()
+
+    for paso in ('optimize', 'vacuum', 'checkpoint'):
+        if paso in resultado:
+            logger.info("Mantenimiento %s: %s", paso, resultado[paso])
+    return resultado
+
+
+def parsear_ventana(ventana: str) -> Tuple[dtime, dtime]:
+    """Convierte 'HH:MM-HH:MM' en un par (inicio, fin)."""
+    inicio, fin = ventana.split('-')
+    return (datetime.strptime(inicio.strip(), '%H:%M').time(),
+            datetime.strptime(fin.strip(), '%H:%M').time())
+
+
+def en_ventana(ahora: datetime, ventana: str) -> bool:
+    """Indica si 'ahora' cae dentro de la ventana (admite ventanas que cruzan medianoche)."""
+    inicio, fin = parsear_ventana(ventana)
+    hora = ahora.time()
+    if inicio <= fin:
+        return inicio <= hora < fin
+    return hora >= inicio or hora < fin
+
+
+class ProgramadorMantenimiento(threading.Thread):
+    """
+    Hilo en segundo plano que, dentro de la ventana de poco tráfico, ejecuta el
+    mantenimiento completo una vez por ventana y un checkpoint del WAL cada
+    Config.MANTENIMIENTO_INTERVALO_CHECKPOINT segundos.
+    """
+
+    def __init__(self, ventana: Optional[str] = None,
+                 intervalo_checkpoint: Optional[int] = None):
+        super().__init__(name='mantenimiento-db', daemon=True)
+        self.ventana = ventana or config.MANTENIMIENTO_VENTANA
+        self.intervalo_checkpoint = intervalo_checkpoint or config.MANTENIMIENTO_INTERVALO_CHECKPOINT
+        self._detener = threading.Event()
+        self._ultimo_completo = None
+        self._ultimo_checkpoint = 0.0
+        parsear_ventana(self.ventana)  # Validar el formato al crear el hilo
+
+    def detener(self) -> None:
+        """Pide al hilo que termine en la siguiente iteración."""
+        self._detener.set()
+
+    def paso(self, ahora: Optional[datetime] = None) -> Optional[Dict]:
+        """Ejecuta lo que corresponda en este instante; devuelve el resultado o None."""
+        ahora = ahora or datetime.now()
+        if not en_ventana(ahora, self.ventana):
+            return None
+        try:
+            # Fecha en que empezó la ventana actual (puede ser ayer si cruza medianoche)
+            inicio_ventana = ahora.date()
+            if ahora.time() < parsear_ventana(self.ventana)[0]:
+                inicio_ventana -= timedelta(days=1)
+            if self._ultimo_completo != inicio_ventana:
+                self._ultimo_completo = inicio_ventana
+                self._ultimo_checkpoint = time.monotonic()
+                return self._ejecutar()
+            if time.monotonic() - self._ultimo_checkpoint >= self.intervalo_checkpoint:
+                self._ultimo_checkpoint = time.monotonic()
+                return self._ejecutar(optimize=False, vacuum=False, wal=True)
+        except Exception:
+            logger.exception("Error durante el mantenimiento de la base de datos")
+        return None
+
+    def _ejecutar(self, **pasos) -> Optional[Dict]:
+        """
+        Ejecuta el mantenimiento en la base de datos única o, con bases de
+        datos por empresa, en la de cada una (resultado por empresa).
+        """
+        resultados = {}
+        for empresa in empresas.ambitos():
+            try:
+                with empresas.visitar(empresa):
+                    resultados[empresa] = ejecutar_mantenimiento(**pasos)
+            except Exception:
+                logger.exception("Error durante el mantenimiento de la empresa %s", empresa)
+        return resultados.get(None) if not config.EMPRESAS_ACTIVAS else resultados
+
+    def run(self) -> None:
+        while not self._detener.is_set():
+            self.paso()
+            self._detener.wait(60)
+
+
+_programador: Optional[ProgramadorMantenimiento] = None
+
+
+def iniciar_programador() -> ProgramadorMantenimiento:
+    """Arranca (una sola vez por proceso) el hilo de mantenimiento."""
+    global _programador
+    if _programador is None or not _programador.is_alive():
+        _programador = ProgramadorMantenimiento()
+        _programador.start()
+    return _programador
+
+
+def main(argv=None) -> bool:
+    """Punto de entrada de la línea de comandos."""
+    argv = sys.argv[1:] if argv is None else argv
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    print("=" * 60)
+    print("MANTENIMIENTO DE LA BASE DE DATOS")
+    print("=" * 60)
+
+    try:
+        if '--programador' in argv:
+            programador = iniciar_programador()
+            print(f"[INFO] Programador activo en la ventana {programador.ventana}. Ctrl+C para salir.")
+            while programador.is_alive():
+                programador.join(1)
+            return True
+
+        if '--convertir-auto-vacuum' in argv:
+            conn = get_connection()
+            conn.isolation_level = None
+            try:
+                r = convertir_auto_vacuum(conn)
+            finally:
+                conn.close()
+            print(f"[OK] auto_vacuum=INCREMENTAL activado ({r['bytes_recuperados']} bytes "
+                  f"recuperados, {r['duracion_ms']} ms)")
+
+        resultado = ejecutar_mantenimiento(optimize='--sin-optimize' not in argv,
+                                           vacuum='--sin-vacuum' not in argv,
+                                           wal='--sin-checkpoint' not in argv)
+        for paso in ('optimize', 'vacuum', 'checkpoint'):
+            if paso in resultado:
+                print(f"  {paso}: {resultado[paso]}")
+        print(f"[OK] Mantenimiento completado ({resultado['bytes_recuperados']} bytes recuperados)")
+    except KeyboardInterrupt:
+        return True
+    except Exception as e:
+        print(f"[ERROR] Error durante el mantenimiento: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
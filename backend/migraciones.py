@@ -0,0 +1,729 @@
+"""
+Sistema de migraciones versionadas del esquema de la base de datos.
+
+Cada migración tiene un número de versión y se ejecuta dentro de su propia
+transacción. La versión aplicada se guarda en PRAGMA user_version (lectura
+instantánea al arrancar) y el historial en la tabla schema_version.
+
+Los movimientos de datos se hacen con INSERT ... SELECT. Para tablas grandes,
+copiar_en_lotes() copia por rangos de clave y guarda un punto de control en
+migracion_progreso después de cada lote, de modo que una migración
+interrumpida se reanuda sin volver a copiar lo ya copiado.
+
+Uso:
+    python migraciones.py            # aplica las migraciones pendientes
+    python migraciones.py estado     # muestra la versión actual y las pendientes
+"""
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+from database import get_connection, config, rutas
+
+
+# Registro de migraciones: versión -> (descripción, función)
+MIGRACIONES: Dict[int, Tuple[str, Callable]] = {}
+
+
+def migracion(version: int, descripcion: str):
+    """
+    Decorador que registra una función como migración del esquema.
+
+    La función recibe la conexión abierta (con una transacción en curso) y
+    debe ser idempotente en su parte DDL (IF NOT EXISTS), ya que si se
+    interrumpe a mitad de una copia por lotes se vuelve a ejecutar completa.
+    """
+    def decorador(funcion: Callable) -> Callable:
+        if version in MIGRACIONES:
+            raise ValueError(f"La migración {version} ya está registrada")
+        MIGRACIONES[version] = (descripcion, funcion)
+        return funcion
+    return decorador
+
+
+def _crear_tablas_control(conn) -> None:
+    """Crea las tablas de control del sistema de migraciones."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            descripcion TEXT NOT NULL,
+            aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duracion_ms INTEGER
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS migracion_progreso (
+            version INTEGER NOT NULL,
+            tarea TEXT NOT NULL,
+            ultima_clave INTEGER NOT NULL,
+            filas INTEGER NOT NULL DEFAULT 0,
+            completada INTEGER NOT NULL DEFAULT 0,
+            actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (version, tarea)
+        )
+    """)
+
+
+def version_actual(conn) -> int:
+    """Devuelve la versión del esquema guardada en PRAGMA user_version."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def pendientes(conn) -> List[int]:
+    """Devuelve las versiones registradas que aún no se han aplicado."""
+    actual = version_actual(conn)
+    return sorted(v for v in MIGRACIONES if v > actual)
+
+
+def existe_tabla(conn, nombre: str) -> bool:
+    """Indica si existe una tabla con el nombre dado."""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (nombre,)
+    ).fetchone()
+    return row is not None
+
+
+def copiar_en_lotes(conn, version: int, tarea: str, tabla_origen: str,
+                    clave: str, insert_select: Union[str, Sequence[str]],
+                    lote: Optional[int] = None) -> int:
+    """
+    Copia filas por lotes con un INSERT ... SELECT por rango de clave.
+
+    Confirma la transacción en curso antes de empezar y cada lote en su propia
+    transacción junto con su punto de control, por lo que una interrupción
+    pierde como mucho el lote en curso. Al terminar abre una nueva transacción
+    para que la migración continúe.
+
+    Args:
+        conn: Conexión abierta por aplicar_migraciones()
+        version: Versión de la migración que hace la copia
+        tarea: Nombre único de la copia dentro de la migración
+        tabla_origen: Tabla que se recorre por lotes
+        clave: Columna entera y creciente de tabla_origen (normalmente la PK)
+        insert_select: Sentencia INSERT ... SELECT ... FROM tabla_origen con
+            los marcadores {desde} y {hasta} en su cláusula WHERE, p. ej.
+            "INSERT INTO B (...) SELECT ... FROM A WHERE id > {desde} AND id <= {hasta}".
+            También admite una lista de sentencias con los mismos marcadores,
+            que se ejecutan en orden dentro de la transacción de cada lote
+            (las filas se cuentan con la primera)
+        lote: Número máximo de claves por lote (por defecto Config.MIGRACIONES_LOTE)
+
+    Returns:
+        Número total de filas copiadas por esta tarea (incluye ejecuciones previas)
+    """
+    lote = lote or config.MIGRACIONES_LOTE
+    sentencias = [insert_select] if isinstance(insert_select, str) else list(insert_select)
+
+    row = conn.execute("""
+        SELECT ultima_clave, filas, completada FROM migracion_progreso
+        WHERE version = ? AND tarea = ?
+    """, (version, tarea)).fetchone()
+    if row and row[2]:
+        return row[1]
+    desde, filas = (row[0], row[1]) if row else (0, 0)
+
+    maximo = conn.execute(f"SELECT MAX({clave}) FROM {tabla_origen}").fetchone()[0] or 0
+    conn.execute("COMMIT")
+
+    inicio = time.perf_counter()
+    while desde < maximo:
+        # Siguiente límite superior: la clave número `lote` a partir de `desde`
+        hasta = conn.execute(f"""
+            SELECT MAX({clave}) FROM (
+                SELECT {clave} FROM {tabla_origen}
+                WHERE {clave} > ? ORDER BY {clave} LIMIT ?
+            )
+        """, (desde, lote)).fetchone()[0]
+        if hasta is None:
+            break
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for i, sentencia in enumerate(sentencias):
+                cursor = conn.execute(sentencia.format(desde=int(desde), hasta=int(hasta)))
+                if i == 0:
+                    filas += max(cursor.rowcount, 0)
+            conn.execute("""
+                INSERT INTO migracion_progreso (version, tarea, ultima_clave, filas)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (version, tarea) DO UPDATE SET
+                    ultima_clave = excluded.ultima_clave,
+                    filas = excluded.filas,
+                    actualizado_en = CURRENT_TIMESTAMP
+            """, (version, tarea, hasta, filas))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        desde = hasta
+        print(f"  [{tarea}] {filas} filas copiadas (clave {desde}/{maximo}, "
+              f"{time.perf_counter() - inicio:.1f}s)")
+
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("""
+        INSERT INTO migracion_progreso (version, tarea, ultima_clave, filas, completada)
+        VALUES (?, ?, ?, ?, 1)
+        ON CONFLICT (version, tarea) DO UPDATE SET
+            completada = 1,
+            actualizado_en = CURRENT_TIMESTAMP
+    """, (version, tarea, desde, filas))
+    return filas
+
+
+def aplicar_migraciones(hasta: Optional[int] = None) -> List[int]:
+    """
+    Aplica en orden las migraciones pendientes.
+
+    Args:
+        hasta: Versión máxima a aplicar (por defecto todas)
+
+    Returns:
+        Lista de versiones aplicadas en esta ejecución
+    """
+    conn = get_connection()
+    conn.isolation_level = None  # Control manual de transacciones
+    aplicadas = []
+    try:
+        _crear_tablas_control(conn)
+
+        for version in pendientes(conn):
+            if hasta is not None and version > hasta:
+                break
+            descripcion, funcion = MIGRACIONES[version]
+            inicio = time.perf_counter()
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                funcion(conn)
+                duracion_ms = int((time.perf_counter() - inicio) * 1000)
+                conn.execute("""
+                    INSERT OR REPLACE INTO schema_version (version, descripcion, duracion_ms)
+                    VALUES (?, ?, ?)
+                """, (version, descripcion, duracion_ms))
+                conn.execute("DELETE FROM migracion_progreso WHERE version = ?", (version,))
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+            aplicadas.append(version)
+            print(f"[OK] Migración {version} aplicada: {descripcion} ({duracion_ms} ms)")
+    finally:
+        conn.close()
+
+    return aplicadas
+
+
+# ==================== MIGRACIONES ====================
+
+def crear_triggers_version(conn, tabla: str) -> None:
+    """
+    Registra la tabla en Versiones_Tabla y crea triggers que incrementan su
+    versión en cada INSERT, UPDATE o DELETE. Las cachés de informes usan la
+    versión como parte de la clave, así que se invalidan solas en todos los
+    procesos al cambiar los datos.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Versiones_Tabla (
+            tabla TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO Versiones_Tabla (tabla) VALUES (?)", (tabla,))
+    for evento in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_version_{tabla.lower()}_{evento.lower()}
+            AFTER {evento} ON {tabla}
+            BEGIN
+                UPDATE Versiones_Tabla SET version = version + 1 WHERE tabla = '{tabla}';
+            END
+        """)
+
+
+def crear_triggers_cambios(conn, tabla: str) -> None:
+    """
+    Crea (o vuelve a crear, si cambiaron las columnas) los triggers que
+    registran en Cambios cada INSERT, UPDATE o DELETE de la tabla con la
+    fila completa en JSON (la nueva, o la anterior en los DELETE).
+
+    En las tablas con borrado lógico (columna eliminado_en) el UPDATE que
+    marca la fila como eliminada se registra como DELETE.
+    """
+    info = conn.execute(f"PRAGMA table_info({tabla})").fetchall()
+    columnas = [row[1] for row in info]
+    clave = next((row[1] for row in info if row[5]), 'rowid')
+    for evento, fila in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+        nombre = f"trg_cambios_{tabla.lower()}_{evento.lower()}"
+        datos = ', '.join(f"'{columna}', {fila}.{columna}" for columna in columnas)
+        operacion = f"'{evento}'"
+        if evento == 'UPDATE' and 'eliminado_en' in columnas:
+            operacion = ("CASE WHEN OLD.eliminado_en IS NULL AND NEW.eliminado_en IS NOT NULL "
+                         "THEN 'DELETE' ELSE 'UPDATE' END")
+        conn.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+        conn.execute(f"""
+            CREATE TRIGGER {nombre}
+            AFTER {evento} ON {tabla}
+            BEGIN
+                INSERT INTO Cambios (tabla, operacion, id_registro, datos)
+                VALUES ('{tabla}', {operacion}, {fila}.{clave}, json_object({datos}));
+            END
+        """)
+
+
+@migracion(1, "Copiar la tabla antigua 'departments' a 'Departamentos'")
+def _m001_departments_a_departamentos(conn):
+    if not existe_tabla(conn, 'departments'):
+        return
+    copiar_en_lotes(conn, 1, 'departments', 'departments', 'id', """
+        INSERT OR IGNORE INTO Departamentos (id_departamento, nombre_departamento, descripcion)
+        SELECT id, name, description FROM departments
+        WHERE id > {desde} AND id <= {hasta}
+    """)
+
+
+@migracion(2, "Índices para la consolidación de employees/attendance")
+def _m002_indices_consolidacion(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_empleados_correo ON Empleados (correo)")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_asistencias_empleado_fecha
+        ON Asistencias (id_empleado, fecha)
+    """)
+
+
+def _crear_triggers_rtree_vacaciones(conn) -> None:
+    """
+    Triggers que mantienen Vacaciones_Permisos_rtree y relleno del índice
+    con las filas actuales. Cada fecha se lleva a su día (date()) antes de
+    pasarla a día juliano: los días julianos empiezan a mediodía y una
+    fecha antigua con hora ('YYYY-MM-DD HH:MM:SS') desde las 12:00 caería
+    en el día siguiente.
+    """
+    # Días julianos enteros: rtree_i32 los guarda sin pérdida de precisión
+    dias = """
+        CAST(julianday(date({p}.fecha_inicio)) AS INTEGER),
+        CAST(julianday(date({p}.fecha_fin)) AS INTEGER)
+    """
+    fechas_validas = """
+        date({p}.fecha_inicio) IS NOT NULL
+        AND date({p}.fecha_fin) IS NOT NULL
+        AND date({p}.fecha_fin) >= date({p}.fecha_inicio)
+    """
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_vacaciones_rtree_ins
+        AFTER INSERT ON Vacaciones_Permisos
+        WHEN {fechas_validas.format(p='NEW')}
+        BEGIN
+            INSERT INTO Vacaciones_Permisos_rtree (id_permiso, inicio, fin)
+            VALUES (NEW.id_permiso, {dias.format(p='NEW')});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_vacaciones_rtree_upd
+        AFTER UPDATE OF id_permiso, fecha_inicio, fecha_fin ON Vacaciones_Permisos
+        BEGIN
+            DELETE FROM Vacaciones_Permisos_rtree WHERE id_permiso = OLD.id_permiso;
+            INSERT INTO Vacaciones_Permisos_rtree (id_permiso, inicio, fin)
+            SELECT NEW.id_permiso, {dias.format(p='NEW')}
+            WHERE {fechas_validas.format(p='NEW')};
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_vacaciones_rtree_del
+        AFTER DELETE ON Vacaciones_Permisos
+        BEGIN
+            DELETE FROM Vacaciones_Permisos_rtree WHERE id_permiso = OLD.id_permiso;
+        END
+    """)
+    conn.execute("DELETE FROM Vacaciones_Permisos_rtree")
+    conn.execute(f"""
+        INSERT INTO Vacaciones_Permisos_rtree (id_permiso, inicio, fin)
+        SELECT v.id_permiso, {dias.format(p='v')}
+        FROM Vacaciones_Permisos v
+        WHERE {fechas_validas.format(p='v')}
+    """)
+
+
+@migracion(3, "Índice de intervalos R*Tree para Vacaciones_Permisos")
+def _m003_rtree_vacaciones(conn):
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS Vacaciones_Permisos_rtree
+        USING rtree_i32(id_permiso, inicio, fin)
+    """)
+    _crear_triggers_rtree_vacaciones(conn)
+    # Solapamientos de un mismo empleado: índice B-tree por empleado y fecha
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vacaciones_empleado_inicio
+        ON Vacaciones_Permisos (id_empleado, fecha_inicio)
+    """)
+
+
+@migracion(4, "Libro de saldos de vacaciones")
+def _m004_saldos_vacaciones(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Vacaciones_Saldos (
+            id_empleado INTEGER PRIMARY KEY,
+            dias_devengados REAL NOT NULL DEFAULT 0,
+            dias_consumidos REAL NOT NULL DEFAULT 0,
+            saldo REAL NOT NULL DEFAULT 0,
+            meses_devengados INTEGER NOT NULL DEFAULT 0,
+            actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (id_empleado) REFERENCES Empleados(id_empleado)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Vacaciones_Saldo_Movimientos (
+            id_movimiento INTEGER PRIMARY KEY AUTOINCREMENT,
+            id_empleado INTEGER NOT NULL,
+            fecha DATE NOT NULL,
+            tipo TEXT NOT NULL,
+            dias REAL NOT NULL,
+            saldo REAL NOT NULL,
+            id_permiso INTEGER,
+            creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (id_empleado) REFERENCES Empleados(id_empleado)
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_saldo_movimientos_empleado
+        ON Vacaciones_Saldo_Movimientos (id_empleado, id_movimiento)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_saldo_movimientos_permiso
+        ON Vacaciones_Saldo_Movimientos (id_permiso)
+    """)
+    # Los saldos de cada empleado se generan al consultarlos por primera vez
+    # o con: python saldos_vacaciones.py
+
+
+@migracion(5, "Vencimiento de contratos y bandeja de salida de notificaciones")
+def _m005_vencimiento_contratos(conn):
+    # Parcial: los contratos indefinidos (sin fecha_fin) nunca vencen
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_contratos_vencimiento
+        ON Contratos (fecha_fin, id_empleado)
+        WHERE fecha_fin IS NOT NULL
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Notificaciones_Salida (
+            id_notificacion INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL,
+            clave TEXT NOT NULL,
+            id_empleado INTEGER,
+            payload TEXT NOT NULL,
+            creada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            enviada_en TIMESTAMP,
+            intentos INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (tipo, clave)
+        )
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_notificaciones_pendientes
+        ON Notificaciones_Salida (id_notificacion)
+        WHERE enviada_en IS NULL
+    """)
+
+
+@migracion(6, "Índice de contratos vigentes por empleado")
+def _m006_contratos_vigentes(conn):
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_contratos_empleado_vigencia
+        ON Contratos (id_empleado, fecha_inicio, fecha_fin)
+    """)
+
+
+@migracion(7, "Versiones de tabla para la caché de informes e índice de nómina por periodo")
+def _m007_versiones_informes(conn):
+    for tabla in ('Empleados', 'Departamentos', 'Contratos', 'Nomina'):
+        crear_triggers_version(conn, tabla)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_nomina_periodo
+        ON Nomina (anio, mes)
+    """)
+
+
+@migracion(8, "Versiones e índice por fecha para las estadísticas de evaluaciones")
+def _m008_estadisticas_evaluaciones(conn):
+    for tabla in ('Evaluaciones', 'Puestos'):
+        crear_triggers_version(conn, tabla)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_evaluaciones_fecha
+        ON Evaluaciones (fecha, id_empleado, puntaje)
+    """)
+
+
+@migracion(9, "Catálogo normalizado de cursos para Capacitaciones")
+def _m009_catalogo_cursos(conn):
+    from models.curso import clave_curso
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Cursos (
+            id_curso INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre_curso TEXT NOT NULL,
+            institucion TEXT,
+            clave TEXT NOT NULL UNIQUE
+        )
+    """)
+    columnas = [row[1] for row in conn.execute("PRAGMA table_info(Capacitaciones)").fetchall()]
+    if 'id_curso' not in columnas:
+        conn.execute("ALTER TABLE Capacitaciones ADD COLUMN id_curso INTEGER REFERENCES Cursos(id_curso)")
+
+    # Una sola pasada por lotes: cada lote da de alta sus cursos (la primera
+    # grafía encontrada queda en el catálogo) y enlaza sus filas
+    conn.create_function('clave_curso', 2, clave_curso, deterministic=True)
+    copiar_en_lotes(conn, 9, 'cursos', 'Capacitaciones', 'id_capacitacion', [
+        """
+        INSERT OR IGNORE INTO Cursos (nombre_curso, institucion, clave)
+        SELECT TRIM(nombre_curso), NULLIF(TRIM(COALESCE(institucion, '')), ''),
+               clave_curso(nombre_curso, institucion)
+        FROM Capacitaciones
+        WHERE id_capacitacion > {desde} AND id_capacitacion <= {hasta}
+          AND clave_curso(nombre_curso, institucion) IS NOT NULL
+        ORDER BY id_capacitacion
+        """,
+        """
+        UPDATE Capacitaciones
+        SET id_curso = (SELECT id_curso FROM Cursos
+                        WHERE clave = clave_curso(Capacitaciones.nombre_curso,
+                                                  Capacitaciones.institucion))
+        WHERE id_capacitacion > {desde} AND id_capacitacion <= {hasta}
+        """
+    ])
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_capacitaciones_curso_certificado
+        ON Capacitaciones (id_curso, certificado, id_empleado)
+    """)
+
+
+@migracion(10, "Cola de trabajos en segundo plano")
+def _m010_cola_trabajos(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Trabajos (
+            id_trabajo INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL,
+            parametros TEXT NOT NULL DEFAULT '{}',
+            estado TEXT NOT NULL DEFAULT 'pendiente',
+            progreso REAL NOT NULL DEFAULT 0,
+            mensaje TEXT,
+            resultado TEXT,
+            error TEXT,
+            intentos INTEGER NOT NULL DEFAULT 0,
+            max_intentos INTEGER NOT NULL DEFAULT 1,
+            cancelar INTEGER NOT NULL DEFAULT 0,
+            worker TEXT,
+            disponible_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            iniciado_en TIMESTAMP,
+            actualizado_en TIMESTAMP,
+            terminado_en TIMESTAMP
+        )
+    """)
+    # Parciales: los workers solo recorren los trabajos pendientes o en curso
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_trabajos_pendientes
+        ON Trabajos (disponible_en, id_trabajo)
+        WHERE estado = 'pendiente'
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_trabajos_en_curso
+        ON Trabajos (actualizado_en)
+        WHERE estado = 'en_curso'
+    """)
+
+
+# Tablas de RRHH cuyos cambios se publican en el registro Cambios
+TABLAS_CAMBIOS = ('Departamentos', 'Puestos', 'Empleados', 'Contratos', 'Asistencias',
+                  'Capacitaciones', 'Cursos', 'Evaluaciones', 'Nomina', 'Vacaciones_Permisos')
+
+
+@migracion(11, "Registro de cambios (CDC) de las tablas de RRHH")
+def _m011_registro_cambios(conn):
+    # AUTOINCREMENT: los números de secuencia nunca se reutilizan tras purgar
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Cambios (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tabla TEXT NOT NULL,
+            operacion TEXT NOT NULL,
+            id_registro INTEGER,
+            datos TEXT NOT NULL,
+            creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    for tabla in TABLAS_CAMBIOS:
+        crear_triggers_cambios(conn, tabla)
+
+
+@migracion(12, "Eventos en vivo de asistencias y solicitudes")
+def _m012_eventos(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Eventos (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL,
+            id_empleado INTEGER,
+            id_departamento INTEGER,
+            datos TEXT NOT NULL,
+            creado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+@migracion(13, "Borrado lógico y archivo de Asistencias y Nomina")
+def _m013_archivo(conn):
+    for tabla in ('Asistencias', 'Nomina'):
+        columnas = [row[1] for row in conn.execute(f"PRAGMA table_info({tabla})").fetchall()]
+        if 'eliminado_en' not in columnas:
+            conn.execute(f"ALTER TABLE {tabla} ADD COLUMN eliminado_en TIMESTAMP")
+        crear_triggers_cambios(conn, tabla)
+    # Filas con fecha (o periodo, en Nomina) anterior a 'hasta' están en el archivo
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Archivo_Horizontes (
+            tabla TEXT PRIMARY KEY,
+            hasta DATE NOT NULL,
+            actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_asistencias_fecha ON Asistencias (fecha)")
+
+
+@migracion(14, "Particiones anuales de Asistencias")
+def _m014_particiones_asistencias(conn):
+    # Un año registrado aquí es de solo lectura; sus filas están en
+    # particiones/asistencias_AAAA.db (ver particiones.py)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Particiones_Asistencias (
+            anio INTEGER PRIMARY KEY,
+            archivo TEXT NOT NULL,
+            estado TEXT NOT NULL DEFAULT 'cerrando'
+                CHECK (estado IN ('cerrando', 'cerrada', 'abriendo')),
+            filas INTEGER,
+            id_min INTEGER,
+            id_max INTEGER,
+            cerrada_en TIMESTAMP
+        )
+    """)
+
+
+@migracion(15, "Control de la réplica de lectura")
+def _m015_replica(conn):
+    # movimientos/en_curso cuentan los traslados al archivo y a las particiones:
+    # una réplica copiada antes (o durante) uno de ellos no se usa (ver replica.py).
+    # copiada_en solo tiene valor en la réplica
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Replica_Control (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            movimientos INTEGER NOT NULL DEFAULT 0,
+            en_curso INTEGER NOT NULL DEFAULT 0,
+            copiada_en REAL
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO Replica_Control (id) VALUES (1)")
+
+
+@migracion(16, "Índice de correos sin distinguir mayúsculas")
+def _m016_correo_minusculas(conn):
+    # La importación comprueba los correos existentes con lower(correo)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_empleados_correo_minusculas
+        ON Empleados (lower(correo))
+    """)
+
+
+@migracion(17, "Asistencias archivadas de vuelta a la tabla principal")
+def _m017_asistencias_fuera_del_archivo(conn):
+    # Con la migración 13 las asistencias también se archivaban en
+    # rrhh_archivo.db; desde las particiones anuales (14) el archivo solo
+    # guarda Nomina y esas filas ya no se leían. Vuelven a la tabla
+    # principal; si su año está cerrado, el año queda en 'cerrando' para que
+    # 'python particiones.py cerrar AAAA' las lleve a su partición
+    conn.execute("DELETE FROM Archivo_Horizontes WHERE tabla = 'Asistencias'")
+    ruta = rutas().archivo
+    if not ruta.exists():
+        return
+    columnas = ('id_asistencia, id_empleado, fecha, hora_entrada, hora_salida, '
+                'observaciones, eliminado_en')
+    # ATTACH no se admite dentro de una transacción
+    conn.execute("COMMIT")
+    conn.execute("ATTACH DATABASE ? AS archivo_antiguo", (str(ruta),))
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("""
+                SELECT 1 FROM archivo_antiguo.sqlite_master WHERE type = 'table' AND name = 'Asistencias'
+            """).fetchone():
+                row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'Cambios'").fetchone()
+                # OR IGNORE: un archivado interrumpido pudo dejar la fila en los
+                # dos archivos; la de la tabla principal se conserva
+                devueltas = conn.execute(f"""
+                    INSERT OR IGNORE INTO main.Asistencias ({columnas})
+                    SELECT {columnas} FROM archivo_antiguo.Asistencias
+                """).rowcount
+                # Devolver filas no es darlas de alta: fuera del registro de cambios
+                conn.execute("DELETE FROM Cambios WHERE seq > ?", (row[0] if row else 0,))
+                anios = [r[0] for r in conn.execute("""
+                    SELECT anio FROM Particiones_Asistencias
+                    WHERE estado = 'cerrada' AND EXISTS (
+                        SELECT 1 FROM main.Asistencias
+                        WHERE fecha >= printf('%04d-01-01', anio) AND fecha < printf('%04d-01-01', anio + 1)
+                    )
+                """)]
+                conn.execute(f"""
+                    UPDATE Particiones_Asistencias SET estado = 'cerrando'
+                    WHERE anio IN ({', '.join('?' * len(anios))})
+                """, anios)
+                conn.execute("DROP TABLE archivo_antiguo.Asistencias")
+                print(f"  [INFO] {devueltas} asistencias devueltas del archivo a la tabla principal")
+                for anio in anios:
+                    print(f"  [!] El año {anio} está cerrado: ejecute 'python particiones.py cerrar {anio}'")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.execute("DETACH DATABASE archivo_antiguo")
+    conn.execute("BEGIN IMMEDIATE")
+
+
+@migracion(18, "Índice R*Tree de Vacaciones_Permisos por día de calendario")
+def _m018_rtree_vacaciones_por_dia(conn):
+    # Los triggers de la migración 3 pasaban las fechas con hora a día
+    # juliano sin date(): desde las 12:00 caían en el día siguiente
+    for trigger in ('trg_vacaciones_rtree_ins', 'trg_vacaciones_rtree_upd', 'trg_vacaciones_rtree_del'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    _crear_triggers_rtree_vacaciones(conn)
+
+
+def main(argv=None) -> bool:
+    """Punto de entrada de la línea de comandos."""
+    argv = sys.argv[1:] if argv is None else argv
+    comando = argv[0] if argv else 'aplicar'
+
+    print("=" * 60)
+    print("MIGRACIONES DEL ESQUEMA")
+    print("=" * 60)
+
+    try:
+        if comando == 'estado':
+            conn = get_connection()
+            try:
+                print(f"  Versión actual: {version_actual(conn)}")
+                for version in pendientes(conn):
+                    print(f"  Pendiente {version}: {MIGRACIONES[version][0]}")
+            finally:
+                conn.close()
+        elif comando == 'aplicar':
+            aplicadas = aplicar_migraciones()
+            if not aplicadas:
+                print("[INFO] El esquema ya está actualizado.")
+        else:
+            print(f"[ERROR] Comando desconocido: {comando}")
+            return False
+    except Exception as e:
+        print(f"[ERROR] Error durante la migración: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
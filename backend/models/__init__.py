@@ -5,11 +5,14 @@ from .user import User
 from .empleado import Empleado
 from .contrato import Contrato
 from .asistencia import Asistencia
+from .curso import Curso
 from .capacitacion import Capacitacion
 from .evaluacion import Evaluacion
 from .nomina import Nomina
 from .vacacion_permiso import VacacionPermiso
+from .saldo_vacaciones import SaldoVacaciones
 
 __all__ = ['User', 'Empleado', 'Contrato', 'Asistencia', 
-           'Capacitacion', 'Evaluacion', 'Nomina', 'VacacionPermiso']
+           'Curso', 'Capacitacion', 'Evaluacion', 'Nomina', 'VacacionPermiso',
+           'SaldoVacaciones']
 
@@ -1,8 +1,68 @@
 """
 Modelo para manejar asistencias en la base de datos.
+
+Los años cerrados están en particiones anuales (ver particiones.py): las
+lecturas por rango solo consultan las particiones que se solapan con él y
+las escrituras en un año cerrado se rechazan.
 """
-from database import get_db
-from typing import Optional, Dict, List
+from database import get_db, insertar
+from eventos import publicar
+from typing import Optional, Dict, List, Tuple
+import particiones
+
+_COLUMNAS = "id_asistencia, id_empleado, fecha, hora_entrada, hora_salida, observaciones"
+
+
+def _fila_a_dict(row) -> Dict:
+    return {
+        'id_asistencia': row['id_asistencia'],
+        'id_empleado': row['id_empleado'],
+        'fecha': row['fecha'],
+        'hora_entrada': row['hora_entrada'],
+        'hora_salida': row['hora_salida'],
+        'observaciones': row['observaciones']
+    }
+
+
+def _rango(desde: Optional[str], hasta: Optional[str]) -> Tuple[str, list]:
+    """Condiciones de las lecturas: sin eliminadas y dentro del rango de fechas."""
+    condiciones, params = ["eliminado_en IS NULL"], []
+    if desde:
+        condiciones.append("fecha >= ?")
+        params.append(desde)
+    if hasta:
+        condiciones.append("fecha <= ?")
+        params.append(hasta)
+    return ' AND '.join(condiciones), params
+
+
+def _leer_por_fecha(conn, condiciones: str, params: list, desde: Optional[str],
+                    hasta: Optional[str]) -> List[Dict]:
+    """
+    Lee las asistencias que cumplen las condiciones, de la más reciente a
+    la más antigua, con un grupo de particiones adjuntas cada vez.
+    """
+    filas = []
+    grupos = 0
+    for tablas in particiones.grupos(conn, desde, hasta):
+        grupos += 1
+        filas.extend(_fila_a_dict(row) for row in conn.execute(f"""
+            SELECT {_COLUMNAS}
+            FROM {particiones.union(tablas)}
+            WHERE {condiciones}
+            ORDER BY fecha DESC
+        """, params).fetchall())
+    if grupos > 1:
+        # Cada grupo viene ordenado por separado (las fechas nulas, al final)
+        filas.sort(key=lambda fila: (fila['fecha'] is not None, fila['fecha'] or ''), reverse=True)
+    return filas
+
+
+def _comprobar_no_cerrada(conn, asistencia_id: int) -> None:
+    anio = particiones.particion_de(conn, asistencia_id)
+    if anio is not None:
+        raise ValueError(f"La asistencia {asistencia_id} pertenece al año cerrado {anio} "
+                         f"y no se puede modificar")
 
 
 class Asistencia:
@@ -35,18 +95,19 @@ class Asistencia:
                 raise ValueError(f"El empleado con ID {id_empleado} no existe")
             
             # Insertar la nueva asistencia
-            cursor.execute("""
+            asistencia_id = insertar(cursor, """
                 INSERT INTO Asistencias (id_empleado, fecha, hora_entrada, hora_salida, observaciones)
                 VALUES (?, ?, ?, ?, ?)
-            """, (id_empleado, fecha, hora_entrada, hora_salida, observaciones))
-            
-            asistencia_id = cursor.lastrowid
+            """, (id_empleado, fecha, hora_entrada, hora_salida, observaciones), 'id_asistencia')
+            # Se comprueba después del INSERT, con la escritura ya reservada:
+            # un cierre del año no puede colarse entre la comprobación y el alta
+            particiones.comprobar_abierto(cursor, fecha)
             
             # Obtener la asistencia creada
             cursor.execute("SELECT * FROM Asistencias WHERE id_asistencia = ?", (asistencia_id,))
             row = cursor.fetchone()
             
-            return {
+            asistencia = {
                 'id_asistencia': row['id_asistencia'],
                 'id_empleado': row['id_empleado'],
                 'fecha': row['fecha'],
@@ -54,72 +115,42 @@ class Asistencia:
                 'hora_salida': row['hora_salida'],
                 'observaciones': row['observaciones']
             }
+            publicar(cursor, 'asistencia.creada', asistencia, row['id_empleado'])
+            return asistencia
     
     @staticmethod
-    def get_all() -> List[Dict]:
-        """Obtiene todas las asistencias."""
+    def get_all(desde: Optional[str] = None, hasta: Optional[str] = None) -> List[Dict]:
+        """
+        Obtiene todas las asistencias, opcionalmente entre dos fechas
+        (YYYY-MM-DD). Solo se consultan los años cerrados que toca el rango.
+        """
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id_asistencia, id_empleado, fecha, hora_entrada, hora_salida, observaciones
-                FROM Asistencias 
-                ORDER BY fecha DESC
-            """)
-            rows = cursor.fetchall()
-            
-            return [{
-                'id_asistencia': row['id_asistencia'],
-                'id_empleado': row['id_empleado'],
-                'fecha': row['fecha'],
-                'hora_entrada': row['hora_entrada'],
-                'hora_salida': row['hora_salida'],
-                'observaciones': row['observaciones']
-            } for row in rows]
+            condiciones, params = _rango(desde, hasta)
+            return _leer_por_fecha(conn, condiciones, params, desde, hasta)
     
     @staticmethod
     def get_by_id(asistencia_id: int) -> Optional[Dict]:
-        """Obtiene una asistencia por su ID."""
+        """Obtiene una asistencia por su ID (también si es de un año cerrado)."""
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id_asistencia, id_empleado, fecha, hora_entrada, hora_salida, observaciones
-                FROM Asistencias 
-                WHERE id_asistencia = ?
-            """, (asistencia_id,))
-            row = cursor.fetchone()
-            
-            if row:
-                return {
-                    'id_asistencia': row['id_asistencia'],
-                    'id_empleado': row['id_empleado'],
-                    'fecha': row['fecha'],
-                    'hora_entrada': row['hora_entrada'],
-                    'hora_salida': row['hora_salida'],
-                    'observaciones': row['observaciones']
-                }
+            # Solo se adjuntan las particiones cuyo rango de IDs lo contiene
+            for tablas in particiones.grupos(conn, ids=[asistencia_id]):
+                row = conn.execute(f"""
+                    SELECT {_COLUMNAS}
+                    FROM {particiones.union(tablas)}
+                    WHERE id_asistencia = ? AND eliminado_en IS NULL
+                """, (asistencia_id,)).fetchone()
+                if row:
+                    return _fila_a_dict(row)
             return None
     
     @staticmethod
-    def get_by_empleado(empleado_id: int) -> List[Dict]:
-        """Obtiene todas las asistencias de un empleado."""
+    def get_by_empleado(empleado_id: int, desde: Optional[str] = None,
+                        hasta: Optional[str] = None) -> List[Dict]:
+        """Obtiene las asistencias de un empleado, opcionalmente entre dos fechas."""
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id_asistencia, id_empleado, fecha, hora_entrada, hora_salida, observaciones
-                FROM Asistencias 
-                WHERE id_empleado = ?
-                ORDER BY fecha DESC
-            """, (empleado_id,))
-            rows = cursor.fetchall()
-            
-            return [{
-                'id_asistencia': row['id_asistencia'],
-                'id_empleado': row['id_empleado'],
-                'fecha': row['fecha'],
-                'hora_entrada': row['hora_entrada'],
-                'hora_salida': row['hora_salida'],
-                'observaciones': row['observaciones']
-            } for row in rows]
+            condiciones, params = _rango(desde, hasta)
+            return _leer_por_fecha(conn, f"id_empleado = ? AND {condiciones}", [empleado_id] + params,
+                                   desde, hasta)
     
     @staticmethod
     def update(asistencia_id: int, id_empleado: Optional[int] = None,
@@ -131,8 +162,12 @@ class Asistencia:
         with get_db() as conn:
             cursor = conn.cursor()
             
-            cursor.execute("SELECT * FROM Asistencias WHERE id_asistencia = ?", (asistencia_id,))
+            cursor.execute("""
+                SELECT id_asistencia FROM Asistencias
+                WHERE id_asistencia = ? AND eliminado_en IS NULL
+            """, (asistencia_id,))
             if not cursor.fetchone():
+                _comprobar_no_cerrada(conn, asistencia_id)
                 return None
             
             if id_empleado is not None:
@@ -163,6 +198,8 @@ class Asistencia:
                 params.append(asistencia_id)
                 query = f"UPDATE Asistencias SET {', '.join(updates)} WHERE id_asistencia = ?"
                 cursor.execute(query, params)
+                # Como en create(): la comprobación va tras la escritura
+                particiones.comprobar_abierto(cursor, fecha)
             
             cursor.execute("""
                 SELECT id_asistencia, id_empleado, fecha, hora_entrada, hora_salida, observaciones
@@ -171,7 +208,7 @@ class Asistencia:
             """, (asistencia_id,))
             row = cursor.fetchone()
             
-            return {
+            asistencia = {
                 'id_asistencia': row['id_asistencia'],
                 'id_empleado': row['id_empleado'],
                 'fecha': row['fecha'],
@@ -179,12 +216,23 @@ class Asistencia:
                 'hora_salida': row['hora_salida'],
                 'observaciones': row['observaciones']
             }
+            if updates:
+                publicar(cursor, 'asistencia.actualizada', asistencia, row['id_empleado'])
+            return asistencia
     
     @staticmethod
     def delete(asistencia_id: int) -> bool:
-        """Elimina una asistencia."""
+        """Elimina una asistencia (borrado lógico: se marca eliminado_en)."""
         with get_db() as conn:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM Asistencias WHERE id_asistencia = ?", (asistencia_id,))
-            return cursor.rowcount > 0
+            cursor.execute("""
+                UPDATE Asistencias SET eliminado_en = CURRENT_TIMESTAMP
+                WHERE id_asistencia = ? AND eliminado_en IS NULL
+            """, (asistencia_id,))
+            if cursor.rowcount == 0:
+                # Cerrar la transacción vacía antes de adjuntar particiones
+                conn.rollback()
+                _comprobar_no_cerrada(conn, asistencia_id)
+                return False
+            return True
 
@@ -1,7 +1,8 @@
 """
 Modelo para manejar capacitaciones en la base de datos.
 """
-from database import get_db
+from database import get_db, insertar
+from models.curso import Curso
 from typing import Optional, Dict, List
 
 
@@ -36,14 +37,13 @@ class Capacitacion:
                 raise ValueError(f"El empleado con ID {id_empleado} no existe")
             
             certificado_int = 1 if certificado else 0
+            id_curso = Curso.obtener_id(cursor, nombre_curso, institucion)
             
-            cursor.execute("""
+            capacitacion_id = insertar(cursor, """
                 INSERT INTO Capacitaciones (id_empleado, nombre_curso, institucion, 
-                                          fecha_inicio, fecha_fin, certificado)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (id_empleado, nombre_curso, institucion, fecha_inicio, fecha_fin, certificado_int))
-            
-            capacitacion_id = cursor.lastrowid
+                                          fecha_inicio, fecha_fin, certificado, id_curso)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (id_empleado, nombre_curso, institucion, fecha_inicio, fecha_fin, certificado_int, id_curso), 'id_capacitacion')
             
             cursor.execute("SELECT * FROM Capacitaciones WHERE id_capacitacion = ?", (capacitacion_id,))
             row = cursor.fetchone()
@@ -55,7 +55,8 @@ class Capacitacion:
                 'institucion': row['institucion'],
                 'fecha_inicio': row['fecha_inicio'],
                 'fecha_fin': row['fecha_fin'],
-                'certificado': bool(row['certificado'])
+                'certificado': bool(row['certificado']),
+                'id_curso': row['id_curso']
             }
     
     @staticmethod
@@ -65,7 +66,7 @@ class Capacitacion:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT id_capacitacion, id_empleado, nombre_curso, institucion,
-                       fecha_inicio, fecha_fin, certificado
+                       fecha_inicio, fecha_fin, certificado, id_curso
                 FROM Capacitaciones 
                 ORDER BY fecha_inicio DESC
             """)
@@ -78,7 +79,8 @@ class Capacitacion:
                 'institucion': row['institucion'],
                 'fecha_inicio': row['fecha_inicio'],
                 'fecha_fin': row['fecha_fin'],
-                'certificado': bool(row['certificado'])
+                'certificado': bool(row['certificado']),
+                'id_curso': row['id_curso']
             } for row in rows]
     
     @staticmethod
@@ -88,7 +90,7 @@ class Capacitacion:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT id_capacitacion, id_empleado, nombre_curso, institucion,
-                       fecha_inicio, fecha_fin, certificado
+                       fecha_inicio, fecha_fin, certificado, id_curso
                 FROM Capacitaciones 
                 WHERE id_capacitacion = ?
             """, (capacitacion_id,))
@@ -102,7 +104,8 @@ class Capacitacion:
                     'institucion': row['institucion'],
                     'fecha_inicio': row['fecha_inicio'],
                     'fecha_fin': row['fecha_fin'],
-                    'certificado': bool(row['certificado'])
+                    'certificado': bool(row['certificado']),
+                    'id_curso': row['id_curso']
                 }
             return None
     
@@ -113,7 +116,7 @@ class Capacitacion:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT id_capacitacion, id_empleado, nombre_curso, institucion,
-                       fecha_inicio, fecha_fin, certificado
+                       fecha_inicio, fecha_fin, certificado, id_curso
                 FROM Capacitaciones 
                 WHERE id_empleado = ?
                 ORDER BY fecha_inicio DESC
@@ -127,7 +130,8 @@ class Capacitacion:
                 'institucion': row['institucion'],
                 'fecha_inicio': row['fecha_inicio'],
                 'fecha_fin': row['fecha_fin'],
-                'certificado': bool(row['certificado'])
+                'certificado': bool(row['certificado']),
+                'id_curso': row['id_curso']
             } for row in rows]
     
     @staticmethod
@@ -142,7 +146,8 @@ class Capacitacion:
             cursor = conn.cursor()
             
             cursor.execute("SELECT * FROM Capacitaciones WHERE id_capacitacion = ?", (capacitacion_id,))
-            if not cursor.fetchone():
+            actual = cursor.fetchone()
+            if not actual:
                 return None
             
             if id_empleado is not None:
@@ -171,6 +176,13 @@ class Capacitacion:
             if certificado is not None:
                 updates.append("certificado = ?")
                 params.append(1 if certificado else 0)
+            if nombre_curso is not None or institucion is not None:
+                updates.append("id_curso = ?")
+                params.append(Curso.obtener_id(
+                    cursor,
+                    nombre_curso if nombre_curso is not None else actual['nombre_curso'],
+                    institucion if institucion is not None else actual['institucion']
+                ))
             
             if updates:
                 params.append(capacitacion_id)
@@ -179,7 +191,7 @@ class Capacitacion:
             
             cursor.execute("""
                 SELECT id_capacitacion, id_empleado, nombre_curso, institucion,
-                       fecha_inicio, fecha_fin, certificado
+                       fecha_inicio, fecha_fin, certificado, id_curso
                 FROM Capacitaciones 
                 WHERE id_capacitacion = ?
             """, (capacitacion_id,))
@@ -192,7 +204,8 @@ class Capacitacion:
                 'institucion': row['institucion'],
                 'fecha_inicio': row['fecha_inicio'],
                 'fecha_fin': row['fecha_fin'],
-                'certificado': bool(row['certificado'])
+                'certificado': bool(row['certificado']),
+                'id_curso': row['id_curso']
             }
     
     @staticmethod
@@ -1,13 +1,147 @@
 """
 Modelo para manejar contratos en la base de datos.
 """
-from database import get_db
-from typing import Optional, Dict, List
+import threading
+import time
+from database import get_db, id_empresa, insertar, config, motor
+from datetime import date, datetime
+from typing import Optional, Dict, List, Iterable
+
+# Caché en proceso de contratos vigentes: (empresa, id_empleado, fecha) -> (expira, contrato)
+_cache_vigentes: Dict[tuple, tuple] = {}
+_cache_lock = threading.Lock()
+_CACHE_MAX_ENTRADAS = 10000
+
+# Se incrementa en cada invalidación: una consulta que empezó antes de una
+# escritura no guarda en la caché el contrato que leyó
+_generacion = 0
+
+# Máximo de parámetros por consulta IN (límite de variables de SQLite)
+_TAMANO_BLOQUE = 500
+
+
+def fecha_referencia(fecha: Optional[str]) -> str:
+    """Fecha de referencia YYYY-MM-DD (hoy si no se indica); ValueError si no es válida."""
+    if not fecha:
+        return date.today().isoformat()
+    try:
+        return datetime.strptime(fecha, '%Y-%m-%d').date().isoformat()
+    except (TypeError, ValueError):
+        raise ValueError("fecha debe tener el formato YYYY-MM-DD")
+
+
+def _fila_a_dict(row) -> Dict:
+    return {
+        'id_contrato': row['id_contrato'],
+        'id_empleado': row['id_empleado'],
+        'tipo_contrato': row['tipo_contrato'],
+        'fecha_inicio': row['fecha_inicio'],
+        'fecha_fin': row['fecha_fin'],
+        'salario': row['salario'],
+        'condiciones': row['condiciones']
+    }
+
+
+def _invalidar_cache() -> None:
+    """Vacía la caché de contratos vigentes (se llama tras escribir contratos)."""
+    global _generacion
+    with _cache_lock:
+        _generacion += 1
+        _cache_vigentes.clear()
 
 
 class Contrato:
     """Clase para manejar operaciones de contratos."""
     
+    @staticmethod
+    def get_vigente(id_empleado: int, fecha: Optional[str] = None) -> Optional[Dict]:
+        """
+        Obtiene el contrato en vigor de un empleado en una fecha.
+        
+        Args:
+            id_empleado: ID del empleado
+            fecha: Fecha de referencia (YYYY-MM-DD, por defecto hoy)
+            
+        Returns:
+            Dict con los datos del contrato o None si no tiene contrato vigente
+        """
+        return Contrato.get_vigentes([id_empleado], fecha).get(id_empleado)
+    
+    @staticmethod
+    def get_vigentes(ids_empleado: Iterable[int], fecha: Optional[str] = None) -> Dict[int, Optional[Dict]]:
+        """
+        Obtiene el contrato en vigor de varios empleados con una consulta por
+        bloque de IDs en lugar de una por empleado.
+        
+        Un contrato está vigente si fecha_inicio <= fecha y fecha_fin es nula o
+        >= fecha; si hay varios, se toma el de fecha_inicio más reciente. Los
+        resultados se guardan en una caché en proceso durante
+        Config.CONTRATOS_CACHE_TTL segundos y se invalidan al escribir contratos.
+        
+        Args:
+            ids_empleado: IDs de los empleados
+            fecha: Fecha de referencia (YYYY-MM-DD, por defecto hoy)
+            
+        Returns:
+            Dict id_empleado -> contrato (None si no tiene contrato vigente)
+            
+        Raises:
+            ValueError: fecha no tiene el formato YYYY-MM-DD
+        """
+        fecha = fecha_referencia(fecha)
+        ttl = config.CONTRATOS_CACHE_TTL
+        ahora = time.monotonic()
+        empresa = id_empresa()
+        resultado: Dict[int, Optional[Dict]] = {}
+        faltantes = []
+        
+        with _cache_lock:
+            generacion = _generacion
+            for id_empleado in dict.fromkeys(ids_empleado):
+                entrada = _cache_vigentes.get((empresa, id_empleado, fecha))
+                if ttl > 0 and entrada and entrada[0] > ahora:
+                    resultado[id_empleado] = entrada[1]
+                else:
+                    faltantes.append(id_empleado)
+        
+        if faltantes:
+            encontrados: Dict[int, Dict] = {}
+            with get_db() as conn:
+                cursor = conn.cursor()
+                for i in range(0, len(faltantes), _TAMANO_BLOQUE):
+                    bloque = faltantes[i:i + _TAMANO_BLOQUE]
+                    # Índice (id_empleado, fecha_inicio, fecha_fin): búsqueda por
+                    # empleado y rango de fecha_inicio sin leer la tabla para filtrar
+                    cursor.execute(f"""
+                        SELECT id_contrato, id_empleado, tipo_contrato, fecha_inicio,
+                               fecha_fin, salario, condiciones
+                        FROM (
+                            SELECT c.*, ROW_NUMBER() OVER (
+                                PARTITION BY c.id_empleado
+                                ORDER BY c.fecha_inicio DESC, c.id_contrato DESC
+                            ) AS orden
+                            FROM Contratos c
+                            WHERE c.id_empleado IN ({', '.join('?' * len(bloque))})
+                              AND c.fecha_inicio <= ?
+                              AND (c.fecha_fin IS NULL OR c.fecha_fin >= ?)
+                        ) AS vigentes
+                        WHERE orden = 1
+                    """, (*bloque, fecha, fecha))
+                    for row in cursor.fetchall():
+                        encontrados[row['id_empleado']] = _fila_a_dict(row)
+            
+            with _cache_lock:
+                guardar = ttl > 0 and generacion == _generacion
+                if guardar and len(_cache_vigentes) + len(faltantes) > _CACHE_MAX_ENTRADAS:
+                    _cache_vigentes.clear()
+                for id_empleado in faltantes:
+                    contrato = encontrados.get(id_empleado)
+                    resultado[id_empleado] = contrato
+                    if guardar:
+                        _cache_vigentes[(empresa, id_empleado, fecha)] = (ahora + ttl, contrato)
+        
+        return resultado
+    
     @staticmethod
     def create(id_empleado: int, tipo_contrato: Optional[str] = None,
                fecha_inicio: Optional[str] = None,
@@ -37,27 +171,18 @@ class Contrato:
                 raise ValueError(f"El empleado con ID {id_empleado} no existe")
             
             # Insertar el nuevo contrato
-            cursor.execute("""
+            contrato_id = insertar(cursor, """
                 INSERT INTO Contratos (id_empleado, tipo_contrato, fecha_inicio,
                                      fecha_fin, salario, condiciones)
                 VALUES (?, ?, ?, ?, ?, ?)
-            """, (id_empleado, tipo_contrato, fecha_inicio, fecha_fin, salario, condiciones))
-            
-            contrato_id = cursor.lastrowid
+            """, (id_empleado, tipo_contrato, fecha_inicio, fecha_fin, salario, condiciones), 'id_contrato')
             
             # Obtener el contrato creado
             cursor.execute("SELECT * FROM Contratos WHERE id_contrato = ?", (contrato_id,))
             row = cursor.fetchone()
-            
-            return {
-                'id_contrato': row['id_contrato'],
-                'id_empleado': row['id_empleado'],
-                'tipo_contrato': row['tipo_contrato'],
-                'fecha_inicio': row['fecha_inicio'],
-                'fecha_fin': row['fecha_fin'],
-                'salario': row['salario'],
-                'condiciones': row['condiciones']
-            }
+        
+        _invalidar_cache()
+        return _fila_a_dict(row)
     
     @staticmethod
     def get_all() -> List[Dict]:
@@ -152,6 +277,53 @@ class Contrato:
                 'condiciones': row['condiciones']
             } for row in rows]
     
+    @staticmethod
+    def get_por_vencer(dias: int = 30, fecha: Optional[str] = None) -> List[Dict]:
+        """
+        Obtiene los contratos que vencen en los próximos días.
+        
+        Usa el índice parcial idx_contratos_vencimiento (solo contratos con
+        fecha_fin), por lo que no recorre los contratos indefinidos.
+        
+        Args:
+            dias: Ventana en días a partir de la fecha de referencia (1-365)
+            fecha: Fecha de referencia (YYYY-MM-DD, por defecto hoy)
+            
+        Returns:
+            Lista de contratos ordenados por fecha_fin, con el nombre del
+            empleado y los días restantes
+        """
+        if not 1 <= dias <= 365:
+            raise ValueError("dias debe estar entre 1 y 365")
+        fecha = fecha_referencia(fecha)
+        
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT c.id_contrato, c.id_empleado, e.nombre, e.apellido,
+                       c.tipo_contrato, c.fecha_inicio, c.fecha_fin, c.salario,
+                       {motor.dias_entre('c.fecha_fin', ':fecha')} AS dias_restantes
+                FROM Contratos c
+                JOIN Empleados e ON e.id_empleado = c.id_empleado
+                WHERE c.fecha_fin IS NOT NULL
+                  AND c.fecha_fin >= :fecha
+                  AND c.fecha_fin <= {motor.sumar_dias(':fecha', ':dias')}
+                ORDER BY c.fecha_fin, c.id_contrato
+            """, {'fecha': fecha, 'dias': int(dias)})
+            rows = cursor.fetchall()
+            
+            return [{
+                'id_contrato': row['id_contrato'],
+                'id_empleado': row['id_empleado'],
+                'nombre': row['nombre'],
+                'apellido': row['apellido'],
+                'tipo_contrato': row['tipo_contrato'],
+                'fecha_inicio': row['fecha_inicio'],
+                'fecha_fin': row['fecha_fin'],
+                'salario': row['salario'],
+                'dias_restantes': row['dias_restantes']
+            } for row in rows]
+    
     @staticmethod
     def update(contrato_id: int, id_empleado: Optional[int] = None,
                tipo_contrato: Optional[str] = None,
@@ -230,16 +402,10 @@ class Contrato:
                 WHERE id_contrato = ?
             """, (contrato_id,))
             row = cursor.fetchone()
-            
-            return {
-                'id_contrato': row['id_contrato'],
-                'id_empleado': row['id_empleado'],
-                'tipo_contrato': row['tipo_contrato'],
-                'fecha_inicio': row['fecha_inicio'],
-                'fecha_fin': row['fecha_fin'],
-                'salario': row['salario'],
-                'condiciones': row['condiciones']
-            }
+        
+        if updates:
+            _invalidar_cache()
+        return _fila_a_dict(row)
     
     @staticmethod
     def delete(contrato_id: int) -> bool:
@@ -255,6 +421,9 @@ class Contrato:
         with get_db() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM Contratos WHERE id_contrato = ?", (contrato_id,))
-            
-            return cursor.rowcount > 0
+            eliminado = cursor.rowcount > 0
+        
+        if eliminado:
+            _invalidar_cache()
+        return eliminado
 
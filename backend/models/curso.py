@@ -0,0 +1,157 @@
+"""
+Modelo para manejar el catálogo normalizado de cursos de capacitación.
+"""
+import re
+import threading
+import unicodedata
+from database import get_db, id_empresa
+from typing import Optional, Dict, List
+
+# Caché en proceso de (empresa, clave normalizada de un curso) -> id_curso
+_ids_curso: Dict[tuple, int] = {}
+_ids_lock = threading.Lock()
+
+
+def _invalidar_cache() -> None:
+    """Vacía la caché de IDs de cursos (p. ej. tras restaurar un respaldo)."""
+    with _ids_lock:
+        _ids_curso.clear()
+
+
+def clave_curso(nombre_curso: Optional[str], institucion: Optional[str]) -> Optional[str]:
+    """
+    Clave normalizada de un curso: nombre e institución sin acentos, en
+    minúsculas y con los espacios colapsados. Dos filas con la misma clave
+    son el mismo curso. Devuelve None si no hay nombre de curso.
+    """
+    def normalizar(texto: Optional[str]) -> str:
+        texto = unicodedata.normalize('NFKD', texto or '')
+        texto = ''.join(c for c in texto if not unicodedata.combining(c))
+        return re.sub(r'\s+', ' ', texto).strip().lower()
+
+    nombre = normalizar(nombre_curso)
+    if not nombre:
+        return None
+    return f"{nombre}|{normalizar(institucion)}"
+
+
+class Curso:
+    """Clase para manejar operaciones del catálogo de cursos."""
+
+    @staticmethod
+    def obtener_id(cursor, nombre_curso: Optional[str], institucion: Optional[str]) -> Optional[int]:
+        """
+        Devuelve el id_curso del catálogo para un nombre e institución,
+        creándolo si no existe (dentro de la transacción del llamador).
+        """
+        clave = clave_curso(nombre_curso, institucion)
+        if clave is None:
+            return None
+        with _ids_lock:
+            if (id_empresa(), clave) in _ids_curso:
+                return _ids_curso[(id_empresa(), clave)]
+
+        cursor.execute("""
+            INSERT INTO Cursos (nombre_curso, institucion, clave) VALUES (?, ?, ?)
+            ON CONFLICT (clave) DO NOTHING
+        """, (nombre_curso.strip(), (institucion or '').strip() or None, clave))
+        creado = cursor.rowcount > 0
+        cursor.execute("SELECT id_curso FROM Cursos WHERE clave = ?", (clave,))
+        id_curso = cursor.fetchone()['id_curso']
+        # Un curso recién creado no se guarda en caché: la transacción aún
+        # podría deshacerse
+        if not creado:
+            with _ids_lock:
+                _ids_curso[(id_empresa(), clave)] = id_curso
+        return id_curso
+
+    @staticmethod
+    def get_all() -> List[Dict]:
+        """
+        Obtiene el catálogo de cursos con el número de capacitaciones y de
+        certificados de cada uno.
+        """
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT cu.id_curso, cu.nombre_curso, cu.institucion,
+                       COALESCE(t.capacitaciones, 0) AS capacitaciones,
+                       COALESCE(t.certificados, 0) AS certificados
+                FROM Cursos cu
+                LEFT JOIN (
+                    SELECT id_curso, COUNT(*) AS capacitaciones, SUM(certificado) AS certificados
+                    FROM Capacitaciones
+                    WHERE id_curso IS NOT NULL
+                    GROUP BY id_curso
+                ) t ON t.id_curso = cu.id_curso
+                ORDER BY cu.nombre_curso
+            """)
+            return [dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def get_completados(id_curso: int, certificado: bool = True) -> Optional[List[Dict]]:
+        """
+        Obtiene los empleados que completaron (o no) un curso.
+
+        Args:
+            id_curso: ID del curso en el catálogo
+            certificado: True para los certificados, False para los pendientes
+
+        Returns:
+            Lista de empleados con sus fechas, o None si el curso no existe
+        """
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id_curso FROM Cursos WHERE id_curso = ?", (id_curso,))
+            if not cursor.fetchone():
+                return None
+
+            # Búsqueda por idx_capacitaciones_curso_certificado
+            cursor.execute("""
+                SELECT ca.id_capacitacion, ca.id_empleado, e.nombre, e.apellido,
+                       e.id_departamento, ca.fecha_inicio, ca.fecha_fin
+                FROM Capacitaciones ca
+                JOIN Empleados e ON e.id_empleado = ca.id_empleado
+                WHERE ca.id_curso = ? AND ca.certificado = ?
+                ORDER BY ca.fecha_fin DESC, ca.id_capacitacion
+            """, (id_curso, 1 if certificado else 0))
+            return [dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def get_tasas_departamento(id_curso: Optional[int] = None) -> List[Dict]:
+        """
+        Tasa de certificación por departamento: empleados del departamento con
+        al menos un certificado (del curso indicado o de cualquiera) sobre el
+        total de empleados del departamento.
+
+        Args:
+            id_curso: Limitar a un curso del catálogo (opcional)
+
+        Returns:
+            Lista con empleados, certificados y tasa por departamento
+        """
+        filtro = "certificado = 1 AND id_curso = ?" if id_curso is not None \
+            else "certificado = 1 AND id_curso IS NOT NULL"
+        params = (id_curso,) if id_curso is not None else ()
+
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT e.id_departamento, d.nombre_departamento,
+                       COUNT(*) AS empleados,
+                       COUNT(c.id_empleado) AS certificados
+                FROM Empleados e
+                LEFT JOIN Departamentos d ON d.id_departamento = e.id_departamento
+                LEFT JOIN (
+                    SELECT DISTINCT id_empleado FROM Capacitaciones WHERE {filtro}
+                ) c ON c.id_empleado = e.id_empleado
+                GROUP BY e.id_departamento, d.nombre_departamento
+                ORDER BY d.nombre_departamento
+            """, params)
+            return [{
+                'id_departamento': row['id_departamento'],
+                'nombre_departamento': row['nombre_departamento'],
+                'empleados': row['empleados'],
+                'certificados': row['certificados'],
+                'tasa': round(row['certificados'] / row['empleados'], 4) if row['empleados'] else 0.0
+            } for row in cursor.fetchall()]
@@ -1,7 +1,7 @@
 """
 Modelo para manejar empleados en la base de datos (tabla Empleados).
 """
-from database import get_db
+from database import get_db, insertar, config, motor
 from typing import Optional, Dict, List
 
 
@@ -44,16 +44,14 @@ class Empleado:
             cursor = conn.cursor()
             
             # Insertar el nuevo empleado
-            cursor.execute("""
+            empleado_id = insertar(cursor, """
                 INSERT INTO Empleados (nombre, apellido, fecha_nacimiento, genero,
                                      estado_civil, direccion, telefono, correo,
                                      fecha_ingreso, estado, id_departamento, id_puesto)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (nombre, apellido, fecha_nacimiento, genero, estado_civil,
                   direccion, telefono, correo, fecha_ingreso, estado,
-                  id_departamento, id_puesto))
-            
-            empleado_id = cursor.lastrowid
+                  id_departamento, id_puesto), 'id_empleado')
             
             # Obtener el empleado creado
             cursor.execute("SELECT * FROM Empleados WHERE id_empleado = ?", (empleado_id,))
@@ -80,9 +78,17 @@ class Empleado:
         """
         Obtiene todos los empleados de la base de datos.
         
+        Si el modelo de lectura empleados_vista está habilitado, cada empleado
+        incluye además nombre_departamento, nombre_puesto, nivel_puesto y
+        salario_base, leídos en un único recorrido indexado (solo con el
+        motor SQLite, que la mantiene con triggers).
+        
         Returns:
             Lista de diccionarios con los datos de los empleados
         """
+        if config.EMPLEADOS_VISTA and motor.sqlite:
+            return Empleado._get_all_vista()
+        
         with get_db() as conn:
             cursor = conn.cursor()
             cursor.execute("""
@@ -110,6 +116,41 @@ class Empleado:
                 'id_puesto': row['id_puesto']
             } for row in rows]
     
+    @staticmethod
+    def _get_all_vista() -> List[Dict]:
+        """Obtiene todos los empleados desde el modelo de lectura empleados_vista."""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id_empleado, nombre, apellido, fecha_nacimiento, genero,
+                       estado_civil, direccion, telefono, correo, fecha_ingreso,
+                       estado, id_departamento, nombre_departamento, id_puesto,
+                       nombre_puesto, nivel_puesto, salario_base
+                FROM empleados_vista
+                ORDER BY fecha_ingreso DESC
+            """)
+            rows = cursor.fetchall()
+            
+            return [{
+                'id_empleado': row['id_empleado'],
+                'nombre': row['nombre'],
+                'apellido': row['apellido'],
+                'fecha_nacimiento': row['fecha_nacimiento'],
+                'genero': row['genero'],
+                'estado_civil': row['estado_civil'],
+                'direccion': row['direccion'],
+                'telefono': row['telefono'],
+                'correo': row['correo'],
+                'fecha_ingreso': row['fecha_ingreso'],
+                'estado': row['estado'],
+                'id_departamento': row['id_departamento'],
+                'nombre_departamento': row['nombre_departamento'],
+                'id_puesto': row['id_puesto'],
+                'nombre_puesto': row['nombre_puesto'],
+                'nivel_puesto': row['nivel_puesto'],
+                'salario_base': row['salario_base']
+            } for row in rows]
+    
     @staticmethod
     def get_by_id(empleado_id: int) -> Optional[Dict]:
         """
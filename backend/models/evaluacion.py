@@ -1,7 +1,7 @@
 """
 Modelo para manejar evaluaciones en la base de datos.
 """
-from database import get_db
+from database import get_db, insertar
 from typing import Optional, Dict, List
 
 
@@ -33,12 +33,10 @@ class Evaluacion:
             if not cursor.fetchone():
                 raise ValueError(f"El empleado con ID {id_empleado} no existe")
             
-            cursor.execute("""
+            evaluacion_id = insertar(cursor, """
                 INSERT INTO Evaluaciones (id_empleado, fecha, evaluador, puntaje, observaciones)
                 VALUES (?, ?, ?, ?, ?)
-            """, (id_empleado, fecha, evaluador, puntaje, observaciones))
-            
-            evaluacion_id = cursor.lastrowid
+            """, (id_empleado, fecha, evaluador, puntaje, observaciones), 'id_evaluacion')
             
             cursor.execute("SELECT * FROM Evaluaciones WHERE id_evaluacion = ?", (evaluacion_id,))
             row = cursor.fetchone()
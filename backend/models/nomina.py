@@ -1,8 +1,43 @@
 """
 Modelo para manejar nómina en la base de datos.
 """
-from database import get_db
-from typing import Optional, Dict, List
+from database import get_db, insertar
+from models.contrato import Contrato
+from typing import Optional, Dict, List, Tuple
+import archivo
+
+_COLUMNAS = """id_nomina, id_empleado, mes, anio, salario_base, bonificaciones,
+               deducciones, salario_neto, fecha_pago"""
+
+
+def _fila_a_dict(row) -> Dict:
+    return {
+        'id_nomina': row['id_nomina'],
+        'id_empleado': row['id_empleado'],
+        'mes': row['mes'],
+        'anio': row['anio'],
+        'salario_base': row['salario_base'],
+        'bonificaciones': row['bonificaciones'],
+        'deducciones': row['deducciones'],
+        'salario_neto': row['salario_neto'],
+        'fecha_pago': row['fecha_pago']
+    }
+
+
+def _filtro_anio(anio: Optional[int]) -> Tuple[str, list]:
+    """Condiciones de las lecturas: sin eliminados y, si se indica, del año."""
+    if anio is None:
+        return "eliminado_en IS NULL", []
+    return "eliminado_en IS NULL AND anio = ?", [anio]
+
+
+def _inicio_anio(anio: Optional[int]) -> Optional[str]:
+    return f"{anio:04d}-01-01" if anio is not None else None
+
+
+def _comprobar_no_archivada(conn, nomina_id: int) -> None:
+    if archivo.archivada(conn, 'Nomina', nomina_id):
+        raise ValueError(f"El registro de nómina {nomina_id} está archivado y no se puede modificar")
 
 
 class Nomina:
@@ -23,7 +58,7 @@ class Nomina:
             id_empleado: ID del empleado
             mes: Mes del pago (1-12)
             anio: Año del pago
-            salario_base: Salario base
+            salario_base: Salario base (si se omite, el del contrato vigente en fecha_pago)
             bonificaciones: Bonificaciones
             deducciones: Deducciones
             salario_neto: Salario neto
@@ -39,14 +74,16 @@ class Nomina:
             if not cursor.fetchone():
                 raise ValueError(f"El empleado con ID {id_empleado} no existe")
             
-            cursor.execute("""
+            if salario_base is None:
+                contrato = Contrato.get_vigente(id_empleado, fecha_pago)
+                salario_base = contrato['salario'] if contrato else None
+            
+            nomina_id = insertar(cursor, """
                 INSERT INTO Nomina (id_empleado, mes, anio, salario_base, bonificaciones,
                                   deducciones, salario_neto, fecha_pago)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """, (id_empleado, mes, anio, salario_base, bonificaciones, 
-                  deducciones, salario_neto, fecha_pago))
-            
-            nomina_id = cursor.lastrowid
+                  deducciones, salario_neto, fecha_pago), 'id_nomina')
             
             cursor.execute("SELECT * FROM Nomina WHERE id_nomina = ?", (nomina_id,))
             row = cursor.fetchone()
@@ -64,82 +101,54 @@ class Nomina:
             }
     
     @staticmethod
-    def get_all() -> List[Dict]:
-        """Obtiene todos los registros de nómina."""
+    def get_all(anio: Optional[int] = None) -> List[Dict]:
+        """
+        Obtiene todos los registros de nómina, opcionalmente de un año.
+        El archivo solo se consulta si el año llega a él.
+        """
         with get_db() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id_nomina, id_empleado, mes, anio, salario_base, bonificaciones,
-                       deducciones, salario_neto, fecha_pago
-                FROM Nomina 
+            condiciones, params = _filtro_anio(anio)
+            cursor.execute(f"""
+                SELECT {_COLUMNAS}
+                FROM {archivo.fuente(conn, 'Nomina', _inicio_anio(anio))}
+                WHERE {condiciones}
                 ORDER BY anio DESC, mes DESC
-            """)
-            rows = cursor.fetchall()
-            
-            return [{
-                'id_nomina': row['id_nomina'],
-                'id_empleado': row['id_empleado'],
-                'mes': row['mes'],
-                'anio': row['anio'],
-                'salario_base': row['salario_base'],
-                'bonificaciones': row['bonificaciones'],
-                'deducciones': row['deducciones'],
-                'salario_neto': row['salario_neto'],
-                'fecha_pago': row['fecha_pago']
-            } for row in rows]
+            """, params)
+            return [_fila_a_dict(row) for row in cursor.fetchall()]
     
     @staticmethod
     def get_by_id(nomina_id: int) -> Optional[Dict]:
-        """Obtiene un registro de nómina por su ID."""
+        """Obtiene un registro de nómina por su ID (también si está archivado)."""
         with get_db() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id_nomina, id_empleado, mes, anio, salario_base, bonificaciones,
-                       deducciones, salario_neto, fecha_pago
+            cursor.execute(f"""
+                SELECT {_COLUMNAS}
                 FROM Nomina 
-                WHERE id_nomina = ?
+                WHERE id_nomina = ? AND eliminado_en IS NULL
             """, (nomina_id,))
             row = cursor.fetchone()
+            if row is None and archivo.archivada(conn, 'Nomina', nomina_id):
+                row = cursor.execute(f"""
+                    SELECT {_COLUMNAS} FROM archivo.Nomina
+                    WHERE id_nomina = ? AND eliminado_en IS NULL
+                """, (nomina_id,)).fetchone()
             
-            if row:
-                return {
-                    'id_nomina': row['id_nomina'],
-                    'id_empleado': row['id_empleado'],
-                    'mes': row['mes'],
-                    'anio': row['anio'],
-                    'salario_base': row['salario_base'],
-                    'bonificaciones': row['bonificaciones'],
-                    'deducciones': row['deducciones'],
-                    'salario_neto': row['salario_neto'],
-                    'fecha_pago': row['fecha_pago']
-                }
-            return None
+            return _fila_a_dict(row) if row else None
     
     @staticmethod
-    def get_by_empleado(empleado_id: int) -> List[Dict]:
-        """Obtiene todos los registros de nómina de un empleado."""
+    def get_by_empleado(empleado_id: int, anio: Optional[int] = None) -> List[Dict]:
+        """Obtiene los registros de nómina de un empleado, opcionalmente de un año."""
         with get_db() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id_nomina, id_empleado, mes, anio, salario_base, bonificaciones,
-                       deducciones, salario_neto, fecha_pago
-                FROM Nomina 
-                WHERE id_empleado = ?
+            condiciones, params = _filtro_anio(anio)
+            cursor.execute(f"""
+                SELECT {_COLUMNAS}
+                FROM {archivo.fuente(conn, 'Nomina', _inicio_anio(anio))}
+                WHERE id_empleado = ? AND {condiciones}
                 ORDER BY anio DESC, mes DESC
-            """, (empleado_id,))
-            rows = cursor.fetchall()
-            
-            return [{
-                'id_nomina': row['id_nomina'],
-                'id_empleado': row['id_empleado'],
-                'mes': row['mes'],
-                'anio': row['anio'],
-                'salario_base': row['salario_base'],
-                'bonificaciones': row['bonificaciones'],
-                'deducciones': row['deducciones'],
-                'salario_neto': row['salario_neto'],
-                'fecha_pago': row['fecha_pago']
-            } for row in rows]
+            """, [empleado_id] + params)
+            return [_fila_a_dict(row) for row in cursor.fetchall()]
     
     @staticmethod
     def update(nomina_id: int, id_empleado: Optional[int] = None,
@@ -154,8 +163,11 @@ class Nomina:
         with get_db() as conn:
             cursor = conn.cursor()
             
-            cursor.execute("SELECT * FROM Nomina WHERE id_nomina = ?", (nomina_id,))
+            cursor.execute("""
+                SELECT id_nomina FROM Nomina WHERE id_nomina = ? AND eliminado_en IS NULL
+            """, (nomina_id,))
             if not cursor.fetchone():
+                _comprobar_no_archivada(conn, nomina_id)
                 return None
             
             if id_empleado is not None:
@@ -218,9 +230,17 @@ class Nomina:
     
     @staticmethod
     def delete(nomina_id: int) -> bool:
-        """Elimina un registro de nómina."""
+        """Elimina un registro de nómina (borrado lógico: se marca eliminado_en)."""
         with get_db() as conn:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM Nomina WHERE id_nomina = ?", (nomina_id,))
-            return cursor.rowcount > 0
+            cursor.execute("""
+                UPDATE Nomina SET eliminado_en = CURRENT_TIMESTAMP
+                WHERE id_nomina = ? AND eliminado_en IS NULL
+            """, (nomina_id,))
+            if cursor.rowcount == 0:
+                # Cerrar la transacción vacía antes de adjuntar el archivo
+                conn.rollback()
+                _comprobar_no_archivada(conn, nomina_id)
+                return False
+            return True
 
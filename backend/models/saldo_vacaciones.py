@@ -0,0 +1,309 @@
+"""
+Modelo de saldo de vacaciones basado en un libro de movimientos.
+
+Cada empleado tiene una fila en Vacaciones_Saldos con el saldo actual y una
+serie de movimientos en Vacaciones_Saldo_Movimientos (devengos mensuales,
+consumos por vacaciones aprobadas y reversos), cada uno con el saldo
+acumulado tras aplicarlo. Consultar el saldo es una búsqueda por clave
+primaria; no se vuelven a sumar todas las solicitudes aprobadas.
+"""
+import calendar
+from database import get_db, config
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+# Tipos de solicitud que descuentan días del saldo
+TIPOS_DESCUENTAN = ('Vacación', 'Vacaciones')
+
+# Estado a partir del cual una solicitud consume días
+ESTADO_APROBADO = 'Aprobado'
+
+
+def fecha_guardada(valor) -> Optional[date]:
+    """
+    Fecha de una fila ya guardada: admite valores antiguos con hora
+    ('YYYY-MM-DD HH:MM:SS' o ISO) y devuelve None si falta o no es una
+    fecha válida. El libro de saldos y la ocupación de vacaciones leen
+    las fechas guardadas con esta misma función.
+    """
+    try:
+        return datetime.strptime(str(valor)[:10], '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def _sumar_meses(fecha: date, meses: int) -> date:
+    """Suma meses a una fecha ajustando al último día del mes si hace falta."""
+    mes = fecha.month - 1 + meses
+    anio, mes = fecha.year + mes // 12, mes % 12 + 1
+    return date(anio, mes, min(fecha.day, calendar.monthrange(anio, mes)[1]))
+
+
+def _dias_consumidos(permiso) -> float:
+    """Días que descuenta una solicitud en su estado actual (0 si no descuenta)."""
+    if permiso is None or permiso['estado'] != ESTADO_APROBADO \
+            or permiso['tipo'] not in TIPOS_DESCUENTAN:
+        return 0.0
+    inicio, fin = fecha_guardada(permiso['fecha_inicio']), fecha_guardada(permiso['fecha_fin'])
+    if not inicio or not fin or fin < inicio:
+        return 0.0
+    return float((fin - inicio).days + 1)
+
+
+class SaldoVacaciones:
+    """Clase para manejar el saldo de vacaciones de los empleados."""
+
+    @staticmethod
+    def _devengo_mensual() -> float:
+        return round(config.VACACIONES_DIAS_ANUALES / 12, 4)
+
+    @staticmethod
+    def _calcular_movimientos(fecha_ingreso: Optional[str], permisos: List,
+                              hasta: date) -> Tuple[List[Tuple], int]:
+        """
+        Calcula desde cero los movimientos de un empleado, ordenados por fecha.
+
+        Returns:
+            Tupla (movimientos [(fecha, tipo, dias, id_permiso)], meses devengados)
+        """
+        movimientos = []
+        meses = 0
+        ingreso = fecha_guardada(fecha_ingreso)
+        if ingreso:
+            devengo = SaldoVacaciones._devengo_mensual()
+            while _sumar_meses(ingreso, meses + 1) <= hasta:
+                meses += 1
+                movimientos.append((_sumar_meses(ingreso, meses).isoformat(), 'Devengo', devengo, None))
+        for permiso in permisos:
+            dias = _dias_consumidos(permiso)
+            if dias:
+                inicio = fecha_guardada(permiso['fecha_inicio']).isoformat()
+                movimientos.append((inicio, 'Consumo', -dias, permiso['id_permiso']))
+        movimientos.sort(key=lambda m: m[0])
+        return movimientos, meses
+
+    @staticmethod
+    def _guardar(cursor, id_empleado: int, movimientos: List[Tuple], meses: int) -> None:
+        """Inserta los movimientos con su saldo acumulado y la fila de resumen."""
+        saldo = devengados = consumidos = 0.0
+        filas = []
+        for fecha, tipo, dias, id_permiso in movimientos:
+            saldo = round(saldo + dias, 4)
+            if tipo == 'Devengo':
+                devengados += dias
+            else:
+                consumidos -= dias
+            filas.append((id_empleado, fecha, tipo, dias, saldo, id_permiso))
+        cursor.executemany("""
+            INSERT INTO Vacaciones_Saldo_Movimientos (id_empleado, fecha, tipo, dias, saldo, id_permiso)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, filas)
+        cursor.execute("""
+            INSERT INTO Vacaciones_Saldos (id_empleado, dias_devengados, dias_consumidos,
+                                           saldo, meses_devengados)
+            VALUES (?, ?, ?, ?, ?)
+        """, (id_empleado, round(devengados, 4), round(consumidos, 4), saldo, meses))
+
+    @staticmethod
+    def _reconstruir_empleado(cursor, id_empleado: int, hasta: date) -> None:
+        """Vuelve a generar el libro de un empleado a partir de sus solicitudes."""
+        cursor.execute("DELETE FROM Vacaciones_Saldo_Movimientos WHERE id_empleado = ?", (id_empleado,))
+        cursor.execute("DELETE FROM Vacaciones_Saldos WHERE id_empleado = ?", (id_empleado,))
+        cursor.execute("SELECT fecha_ingreso FROM Empleados WHERE id_empleado = ?", (id_empleado,))
+        empleado = cursor.fetchone()
+        if not empleado:
+            return
+        cursor.execute("""
+            SELECT id_permiso, tipo, estado, fecha_inicio, fecha_fin
+            FROM Vacaciones_Permisos WHERE id_empleado = ?
+        """, (id_empleado,))
+        movimientos, meses = SaldoVacaciones._calcular_movimientos(
+            empleado['fecha_ingreso'], cursor.fetchall(), hasta)
+        SaldoVacaciones._guardar(cursor, id_empleado, movimientos, meses)
+
+    @staticmethod
+    def _registrar(cursor, id_empleado: int, fecha: str, tipo: str, dias: float,
+                   id_permiso: Optional[int] = None) -> None:
+        """Añade un movimiento al libro y actualiza el saldo del empleado."""
+        cursor.execute("""
+            UPDATE Vacaciones_Saldos
+            SET saldo = ROUND(saldo + ?, 4),
+                dias_devengados = dias_devengados + ?,
+                dias_consumidos = dias_consumidos - ?,
+                meses_devengados = meses_devengados + ?,
+                actualizado_en = CURRENT_TIMESTAMP
+            WHERE id_empleado = ?
+        """, (dias, dias if tipo == 'Devengo' else 0, 0 if tipo == 'Devengo' else dias,
+              1 if tipo == 'Devengo' else 0, id_empleado))
+        cursor.execute("SELECT saldo FROM Vacaciones_Saldos WHERE id_empleado = ?", (id_empleado,))
+        saldo = cursor.fetchone()['saldo']
+        cursor.execute("""
+            INSERT INTO Vacaciones_Saldo_Movimientos (id_empleado, fecha, tipo, dias, saldo, id_permiso)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (id_empleado, fecha, tipo, dias, saldo, id_permiso))
+
+    @staticmethod
+    def _al_dia(cursor, id_empleado: int, hasta: Optional[date] = None) -> bool:
+        """
+        Deja el libro del empleado al día: lo genera si no existe y añade los
+        devengos mensuales pendientes. Devuelve False si el empleado no existe.
+        """
+        hasta = hasta or date.today()
+        cursor.execute("""
+            SELECT s.meses_devengados, e.fecha_ingreso
+            FROM Empleados e
+            LEFT JOIN Vacaciones_Saldos s ON s.id_empleado = e.id_empleado
+            WHERE e.id_empleado = ?
+        """, (id_empleado,))
+        row = cursor.fetchone()
+        if not row:
+            return False
+        if row['meses_devengados'] is None:
+            SaldoVacaciones._reconstruir_empleado(cursor, id_empleado, hasta)
+            return True
+
+        ingreso = fecha_guardada(row['fecha_ingreso'])
+        if ingreso:
+            meses = row['meses_devengados']
+            while _sumar_meses(ingreso, meses + 1) <= hasta:
+                meses += 1
+                SaldoVacaciones._registrar(cursor, id_empleado, _sumar_meses(ingreso, meses).isoformat(),
+                                           'Devengo', SaldoVacaciones._devengo_mensual())
+        return True
+
+    @staticmethod
+    def sincronizar(cursor, id_permiso: int) -> None:
+        """
+        Ajusta el libro tras crear, modificar o eliminar una solicitud, dentro
+        de la transacción del llamador. Compara lo que la solicitud debería
+        descontar con lo ya registrado y anota la diferencia como consumo o
+        reverso, por lo que es idempotente y cubre cambios de estado, fechas,
+        tipo o empleado.
+        """
+        cursor.execute("""
+            SELECT id_permiso, id_empleado, tipo, estado, fecha_inicio, fecha_fin
+            FROM Vacaciones_Permisos WHERE id_permiso = ?
+        """, (id_permiso,))
+        permiso = cursor.fetchone()
+        objetivo = {}
+        if permiso is not None:
+            objetivo[permiso['id_empleado']] = -_dias_consumidos(permiso)
+
+        cursor.execute("""
+            SELECT DISTINCT id_empleado FROM Vacaciones_Saldo_Movimientos WHERE id_permiso = ?
+        """, (id_permiso,))
+        empleados = set(objetivo) | {row['id_empleado'] for row in cursor.fetchall()}
+
+        hoy = date.today()
+        for id_empleado in empleados:
+            if not SaldoVacaciones._al_dia(cursor, id_empleado, hoy):
+                continue
+            cursor.execute("""
+                SELECT COALESCE(SUM(dias), 0) AS dias FROM Vacaciones_Saldo_Movimientos
+                WHERE id_permiso = ? AND id_empleado = ?
+            """, (id_permiso, id_empleado))
+            diferencia = round(objetivo.get(id_empleado, 0.0) - cursor.fetchone()['dias'], 4)
+            if diferencia:
+                SaldoVacaciones._registrar(cursor, id_empleado, hoy.isoformat(),
+                                           'Consumo' if diferencia < 0 else 'Reverso',
+                                           diferencia, id_permiso)
+
+    @staticmethod
+    def get_saldo(id_empleado: int, movimientos: int = 0) -> Optional[Dict]:
+        """
+        Obtiene el saldo de vacaciones de un empleado.
+
+        Args:
+            id_empleado: ID del empleado
+            movimientos: Número de movimientos recientes a incluir (0 = ninguno)
+
+        Returns:
+            Dict con el saldo o None si el empleado no existe
+        """
+        with get_db() as conn:
+            cursor = conn.cursor()
+            if not SaldoVacaciones._al_dia(cursor, id_empleado):
+                return None
+            cursor.execute("SELECT * FROM Vacaciones_Saldos WHERE id_empleado = ?", (id_empleado,))
+            row = cursor.fetchone()
+            saldo = {
+                'id_empleado': row['id_empleado'],
+                'dias_devengados': row['dias_devengados'],
+                'dias_consumidos': row['dias_consumidos'],
+                'saldo': row['saldo'],
+                'meses_devengados': row['meses_devengados'],
+                'dias_anuales': config.VACACIONES_DIAS_ANUALES,
+                'actualizado_en': row['actualizado_en']
+            }
+            if movimientos:
+                cursor.execute("""
+                    SELECT id_movimiento, fecha, tipo, dias, saldo, id_permiso
+                    FROM Vacaciones_Saldo_Movimientos
+                    WHERE id_empleado = ?
+                    ORDER BY id_movimiento DESC
+                    LIMIT ?
+                """, (id_empleado, movimientos))
+                saldo['movimientos'] = [dict(m) for m in cursor.fetchall()]
+            return saldo
+
+    @staticmethod
+    def reconstruir(lote: Optional[int] = None) -> Dict:
+        """
+        Recalcula el libro de todos los empleados en una sola pasada por lotes
+        de empleados (una transacción por lote, con executemany).
+
+        Args:
+            lote: Empleados por lote (por defecto Config.VACACIONES_SALDOS_LOTE)
+
+        Returns:
+            Dict con empleados procesados, movimientos generados y lotes
+        """
+        lote = lote or config.VACACIONES_SALDOS_LOTE
+        hoy = date.today()
+        resultado = {'empleados': 0, 'movimientos': 0, 'lotes': 0}
+
+        with get_db() as conn:
+            # Movimientos de empleados que ya no existen
+            conn.execute("""
+                DELETE FROM Vacaciones_Saldo_Movimientos
+                WHERE id_empleado NOT IN (SELECT id_empleado FROM Empleados)
+            """)
+            conn.execute("""
+                DELETE FROM Vacaciones_Saldos
+                WHERE id_empleado NOT IN (SELECT id_empleado FROM Empleados)
+            """)
+
+        ultimo = 0
+        while True:
+            with get_db() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT id_empleado, fecha_ingreso FROM Empleados
+                    WHERE id_empleado > ? ORDER BY id_empleado LIMIT ?
+                """, (ultimo, lote))
+                empleados = cursor.fetchall()
+                if not empleados:
+                    break
+                desde, ultimo = empleados[0]['id_empleado'], empleados[-1]['id_empleado']
+
+                cursor.execute("""
+                    SELECT id_permiso, id_empleado, tipo, estado, fecha_inicio, fecha_fin
+                    FROM Vacaciones_Permisos WHERE id_empleado BETWEEN ? AND ?
+                """, (desde, ultimo))
+                permisos: Dict[int, List] = {}
+                for permiso in cursor.fetchall():
+                    permisos.setdefault(permiso['id_empleado'], []).append(permiso)
+
+                cursor.execute("DELETE FROM Vacaciones_Saldo_Movimientos WHERE id_empleado BETWEEN ? AND ?",
+                               (desde, ultimo))
+                cursor.execute("DELETE FROM Vacaciones_Saldos WHERE id_empleado BETWEEN ? AND ?",
+                               (desde, ultimo))
+                for empleado in empleados:
+                    movimientos, meses = SaldoVacaciones._calcular_movimientos(
+                        empleado['fecha_ingreso'], permisos.get(empleado['id_empleado'], []), hoy)
+                    SaldoVacaciones._guardar(cursor, empleado['id_empleado'], movimientos, meses)
+                    resultado['movimientos'] += len(movimientos)
+                resultado['empleados'] += len(empleados)
+                resultado['lotes'] += 1
+
+        return resultado
@@ -1,7 +1,7 @@
 """
 Modelo para manejar usuarios en la base de datos.
 """
-from database import get_db
+from database import get_db, insertar
 from werkzeug.security import generate_password_hash, check_password_hash
 from typing import Optional, Dict, List
 from datetime import datetime
@@ -43,12 +43,10 @@ class User:
             password_hash = generate_password_hash(password)
             
             # Insertar el nuevo usuario
-            cursor.execute("""
+            user_id = insertar(cursor, """
                 INSERT INTO users (username, email, password)
                 VALUES (?, ?, ?)
-            """, (username, email, password_hash))
-            
-            user_id = cursor.lastrowid
+            """, (username, email, password_hash), 'id')
             
             # Obtener el usuario creado
             cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
@@ -1,13 +1,195 @@
 """
 Modelo para manejar vacaciones y permisos en la base de datos.
 """
-from database import get_db
-from typing import Optional, Dict, List
+import logging
+from database import get_db, insertar, config, motor
+from models.saldo_vacaciones import SaldoVacaciones, fecha_guardada
+from eventos import publicar
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, List, Union
+
+logger = logging.getLogger(__name__)
+
+# Estados de una solicitud (el libro de saldos solo descuenta las aprobadas)
+ESTADOS = ('Pendiente', 'Aprobado', 'Rechazado', 'Cancelado')
+
+# Estados que no cuentan como ausencia al buscar solapamientos
+ESTADOS_INACTIVOS = ('Rechazado', 'Cancelado')
+
+# Rango máximo (en días) de una consulta de ocupación
+MAX_DIAS_OCUPACION = 366
+
+
+def _parsear_fecha(valor: str, campo: str):
+    """Convierte una fecha YYYY-MM-DD o lanza ValueError con un mensaje claro."""
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError(f"{campo} debe tener el formato YYYY-MM-DD")
+
+
+def _fecha_periodo(valor: Union[str, date], campo: str) -> date:
+    """Fecha enviada por el cliente (estricta, YYYY-MM-DD) o ya leída de una fila guardada."""
+    return valor if isinstance(valor, date) else _parsear_fecha(valor, campo)
 
 
 class VacacionPermiso:
     """Clase para manejar operaciones de vacaciones y permisos."""
     
+    @staticmethod
+    def _ausencias(cursor, desde: str, hasta: str,
+                   id_departamento: Optional[int] = None,
+                   excluir_id: Optional[int] = None) -> List:
+        """
+        Solicitudes activas que se solapan con [desde, hasta], usando el índice
+        R*Tree Vacaciones_Permisos_rtree (O(log n + k)); con otros motores,
+        el índice idx_vacaciones_periodo (fecha_inicio, fecha_fin).
+        """
+        if motor.sqlite:
+            origen = """
+                FROM Vacaciones_Permisos_rtree r
+                JOIN Vacaciones_Permisos v ON v.id_permiso = r.id_permiso
+                JOIN Empleados e ON e.id_empleado = v.id_empleado
+                WHERE r.inicio <= CAST(julianday(date(?)) AS INTEGER)
+                  AND r.fin >= CAST(julianday(date(?)) AS INTEGER)
+            """
+        else:
+            origen = """
+                FROM Vacaciones_Permisos v
+                JOIN Empleados e ON e.id_empleado = v.id_empleado
+                WHERE v.fecha_inicio <= ? AND v.fecha_fin >= ?
+            """
+        query = f"""
+            SELECT v.id_permiso, v.id_empleado, e.nombre, e.apellido, v.tipo,
+                   v.estado, v.fecha_inicio, v.fecha_fin
+            {origen}
+              AND COALESCE(v.estado, '') NOT IN ({', '.join('?' * len(ESTADOS_INACTIVOS))})
+        """
+        params = [hasta, desde, *ESTADOS_INACTIVOS]
+        if id_departamento is not None:
+            query += " AND e.id_departamento = ?"
+            params.append(id_departamento)
+        if excluir_id is not None:
+            query += " AND v.id_permiso != ?"
+            params.append(excluir_id)
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    
+    @staticmethod
+    def _validar_periodo(cursor, id_empleado: int,
+                         fecha_inicio: Union[str, date, None], fecha_fin: Union[str, date, None],
+                         estado: Optional[str], excluir_id: Optional[int] = None) -> None:
+        """
+        Rechaza periodos inválidos, solapados con otra solicitud activa del
+        mismo empleado o que superen el máximo de ausentes del departamento
+        (Config.VACACIONES_MAX_AUSENTES_DEPARTAMENTO, 0 = sin límite).
+
+        Las fechas en texto son las que envía el cliente y deben tener el
+        formato YYYY-MM-DD; las de filas ya guardadas se pasan como date
+        (ver fecha_guardada), para no rechazar valores antiguos con hora.
+        """
+        if not fecha_inicio or not fecha_fin:
+            return
+        inicio = _fecha_periodo(fecha_inicio, 'fecha_inicio')
+        fin = _fecha_periodo(fecha_fin, 'fecha_fin')
+        fecha_inicio, fecha_fin = inicio.isoformat(), fin.isoformat()
+        if fin < inicio:
+            raise ValueError("La fecha de fin no puede ser anterior a la fecha de inicio")
+        if estado in ESTADOS_INACTIVOS:
+            return
+        
+        # Solapamiento con el mismo empleado (índice id_empleado, fecha_inicio)
+        cursor.execute(f"""
+            SELECT id_permiso, fecha_inicio, fecha_fin FROM Vacaciones_Permisos
+            WHERE id_empleado = ? AND fecha_inicio <= ? AND fecha_fin >= ?
+              AND id_permiso != ?
+              AND COALESCE(estado, '') NOT IN ({', '.join('?' * len(ESTADOS_INACTIVOS))})
+            LIMIT 1
+        """, (id_empleado, fecha_fin, fecha_inicio, excluir_id or 0, *ESTADOS_INACTIVOS))
+        solapada = cursor.fetchone()
+        if solapada:
+            raise ValueError(
+                f"El periodo se solapa con la solicitud {solapada['id_permiso']} "
+                f"({solapada['fecha_inicio']} a {solapada['fecha_fin']}) del mismo empleado"
+            )
+        
+        # Límite de ausentes simultáneos en el departamento
+        limite = config.VACACIONES_MAX_AUSENTES_DEPARTAMENTO
+        if limite <= 0:
+            return
+        cursor.execute("SELECT id_departamento FROM Empleados WHERE id_empleado = ?", (id_empleado,))
+        row = cursor.fetchone()
+        if not row or row['id_departamento'] is None:
+            return
+        filas = VacacionPermiso._ausencias(cursor, fecha_inicio, fecha_fin,
+                                           row['id_departamento'], excluir_id)
+        for dia in VacacionPermiso._por_dia(filas, inicio, fin):
+            if dia['total'] + 1 > limite:
+                raise ValueError(
+                    f"El departamento superaría el máximo de {limite} ausentes "
+                    f"simultáneos el {dia['fecha']}"
+                )
+    
+    @staticmethod
+    def _por_dia(filas: List, desde, hasta) -> List[Dict]:
+        """
+        Expande las solicitudes a una lista de ausentes por día entre desde y
+        hasta. Las filas guardadas con fechas que no se pueden interpretar se
+        omiten (se registran en el log) en lugar de hacer fallar la petición.
+        """
+        dias = (hasta - desde).days + 1
+        ausentes = [[] for _ in range(dias)]
+        for row in filas:
+            fecha_inicio = fecha_guardada(row['fecha_inicio'])
+            fecha_fin = fecha_guardada(row['fecha_fin'])
+            if fecha_inicio is None or fecha_fin is None:
+                logger.warning("Solicitud %s con fechas no válidas (%r, %r); se omite",
+                               row['id_permiso'], row['fecha_inicio'], row['fecha_fin'])
+                continue
+            inicio = max(fecha_inicio, desde)
+            fin = min(fecha_fin, hasta)
+            ausente = {
+                'id_empleado': row['id_empleado'],
+                'nombre': row['nombre'],
+                'apellido': row['apellido'],
+                'id_permiso': row['id_permiso'],
+                'tipo': row['tipo'],
+                'estado': row['estado']
+            }
+            for i in range((inicio - desde).days, (fin - desde).days + 1):
+                ausentes[i].append(ausente)
+        return [{
+            'fecha': (desde + timedelta(days=i)).isoformat(),
+            'total': len(lista),
+            'ausentes': lista
+        } for i, lista in enumerate(ausentes)]
+    
+    @staticmethod
+    def get_ocupacion(desde: str, hasta: str,
+                      id_departamento: Optional[int] = None) -> List[Dict]:
+        """
+        Obtiene quién está ausente cada día del rango indicado.
+        
+        Args:
+            desde: Fecha inicial (YYYY-MM-DD)
+            hasta: Fecha final (YYYY-MM-DD)
+            id_departamento: Filtrar por departamento (opcional)
+            
+        Returns:
+            Lista con un elemento por día: fecha, total y lista de ausentes
+        """
+        inicio = _parsear_fecha(desde, 'desde')
+        fin = _parsear_fecha(hasta, 'hasta')
+        if fin < inicio:
+            raise ValueError("'hasta' no puede ser anterior a 'desde'")
+        if (fin - inicio).days + 1 > MAX_DIAS_OCUPACION:
+            raise ValueError(f"El rango no puede superar {MAX_DIAS_OCUPACION} días")
+        
+        with get_db() as conn:
+            cursor = conn.cursor()
+            filas = VacacionPermiso._ausencias(cursor, desde, hasta, id_departamento)
+            return VacacionPermiso._por_dia(filas, inicio, fin)
+    
     @staticmethod
     def create(id_empleado: int, tipo: Optional[str] = None,
                fecha_solicitud: Optional[str] = None,
@@ -37,13 +219,14 @@ class VacacionPermiso:
             if not cursor.fetchone():
                 raise ValueError(f"El empleado con ID {id_empleado} no existe")
             
-            cursor.execute("""
+            VacacionPermiso._validar_periodo(cursor, id_empleado, fecha_inicio, fecha_fin, estado)
+            
+            permiso_id = insertar(cursor, """
                 INSERT INTO Vacaciones_Permisos (id_empleado, tipo, fecha_solicitud,
                                                 fecha_inicio, fecha_fin, estado, observaciones)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (id_empleado, tipo, fecha_solicitud, fecha_inicio, fecha_fin, estado, observaciones))
-            
-            permiso_id = cursor.lastrowid
+            """, (id_empleado, tipo, fecha_solicitud, fecha_inicio, fecha_fin, estado, observaciones), 'id_permiso')
+            SaldoVacaciones.sincronizar(cursor, permiso_id)
             
             cursor.execute("SELECT * FROM Vacaciones_Permisos WHERE id_permiso = ?", (permiso_id,))
             row = cursor.fetchone()
@@ -147,7 +330,8 @@ class VacacionPermiso:
             cursor = conn.cursor()
             
             cursor.execute("SELECT * FROM Vacaciones_Permisos WHERE id_permiso = ?", (permiso_id,))
-            if not cursor.fetchone():
+            actual = cursor.fetchone()
+            if not actual:
                 return None
             
             if id_empleado is not None:
@@ -155,6 +339,16 @@ class VacacionPermiso:
                 if not cursor.fetchone():
                     raise ValueError(f"El empleado con ID {id_empleado} no existe")
             
+            # Validar el periodo resultante contra las demás solicitudes
+            VacacionPermiso._validar_periodo(
+                cursor,
+                id_empleado if id_empleado is not None else actual['id_empleado'],
+                fecha_inicio if fecha_inicio is not None else fecha_guardada(actual['fecha_inicio']),
+                fecha_fin if fecha_fin is not None else fecha_guardada(actual['fecha_fin']),
+                estado if estado is not None else actual['estado'],
+                excluir_id=permiso_id
+            )
+            
             updates = []
             params = []
             
@@ -184,6 +378,7 @@ class VacacionPermiso:
                 params.append(permiso_id)
                 query = f"UPDATE Vacaciones_Permisos SET {', '.join(updates)} WHERE id_permiso = ?"
                 cursor.execute(query, params)
+                SaldoVacaciones.sincronizar(cursor, permiso_id)
             
             cursor.execute("""
                 SELECT id_permiso, id_empleado, tipo, fecha_solicitud, fecha_inicio,
@@ -193,7 +388,7 @@ class VacacionPermiso:
             """, (permiso_id,))
             row = cursor.fetchone()
             
-            return {
+            permiso = {
                 'id_permiso': row['id_permiso'],
                 'id_empleado': row['id_empleado'],
                 'tipo': row['tipo'],
@@ -203,6 +398,10 @@ class VacacionPermiso:
                 'estado': row['estado'],
                 'observaciones': row['observaciones']
             }
+            if updates:
+                publicar(cursor, 'permiso.actualizado',
+                         dict(permiso, estado_anterior=actual['estado']), row['id_empleado'])
+            return permiso
     
     @staticmethod
     def delete(permiso_id: int) -> bool:
@@ -210,5 +409,8 @@ class VacacionPermiso:
         with get_db() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM Vacaciones_Permisos WHERE id_permiso = ?", (permiso_id,))
-            return cursor.rowcount > 0
+            eliminado = cursor.rowcount > 0
+            if eliminado:
+                SaldoVacaciones.sincronizar(cursor, permiso_id)
+            return eliminado
 
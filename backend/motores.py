@@ -0,0 +1,425 @@
+"""
+Motores de almacenamiento: SQLite (por defecto) y PostgreSQL.
+
+Los modelos escriben el SQL con marcadores '?' o ':nombre', leen las
+columnas por nombre (row['columna']) y abren sus conexiones con
+database.get_db(). Cada motor entrega conexiones con esa misma interfaz
+(execute, executemany, cursor, commit, rollback, close) y resuelve lo que
+cambia entre dialectos:
+
+- Marcadores: en PostgreSQL '?' pasa a '%s' y ':nombre' a '%(nombre)s'
+  (traducir(), sin tocar los literales de texto).
+- Claves generadas: database.insertar() añade RETURNING en lugar de leer
+  cursor.lastrowid.
+- Esquema: ddl() adapta los CREATE TABLE de init_db() (AUTOINCREMENT,
+  REAL) y guarda fechas y horas como texto, igual que SQLite, para que los
+  modelos reciban los mismos valores con cualquier motor.
+- Expresiones: dias_entre() y sumar_dias() para la aritmética de fechas;
+  reservar_escritura() en lugar de BEGIN IMMEDIATE.
+- Conexiones: PostgreSQL las reparte desde un pool de Config.DB_POOL_MAX
+  por proceso (close() la devuelve al pool); SQLite abre una por
+  operación, que cuesta poco más que abrir un archivo, salvo las bases de
+  datos de cada empresa (MotorSQLiteAgrupado), que conservan unas pocas
+  conexiones abiertas.
+
+Las funciones construidas sobre características propias de SQLite (archivo
+y particiones con ATTACH, réplica y respaldos con la API de backup,
+triggers de cambios y de versiones, índice R*Tree, mantenimiento, cola de
+trabajos) solo están disponibles con el motor SQLite (requiere_sqlite()).
+"""
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+MOTORES = ('sqlite', 'postgresql')
+
+# Tokens de una sentencia SQL que traducir() tiene en cuenta; los literales,
+# identificadores entre comillas y comentarios se reconocen para no tocar
+# los '?' o ':' que contengan
+_TOKENS = re.compile(r"""
+      '(?:[^']|'')*'            # literal de texto
+    | "[^"]*"                   # identificador entre comillas
+    | --[^\n]*                  # comentario
+    | \?                        # marcador posicional
+    | (?<!:):([A-Za-z_]\w*)     # marcador con nombre (no '::tipo')
+    | %
+    | \bCURRENT_TIMESTAMP\b
+""", re.VERBOSE)
+
+# CURRENT_TIMESTAMP de SQLite: texto 'YYYY-MM-DD HH:MM:SS' en UTC
+_AHORA_POSTGRESQL = "(to_char(CURRENT_TIMESTAMP AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS'))"
+
+# Tipos de columna de SQLite -> PostgreSQL. REAL pasa a NUMERIC para que
+# ROUND(x, n) funcione igual; se lee como float (MotorPostgres)
+_TIPOS_POSTGRESQL = [
+    (re.compile(r"\bINTEGER PRIMARY KEY AUTOINCREMENT\b"), "INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY"),
+    (re.compile(r"\bREAL\b"), "NUMERIC"),
+    (re.compile(r"\b(?:DATE|TIMESTAMP|TIME)\b"), "TEXT"),
+]
+
+
+@lru_cache(maxsize=1024)
+def traducir(sql: str) -> str:
+    """
+    Traduce una sentencia escrita para sqlite3 al estilo de marcadores de
+    psycopg2: '?' -> '%s', ':nombre' -> '%(nombre)s', '%' -> '%%' y
+    CURRENT_TIMESTAMP -> texto UTC como el de SQLite.
+    """
+    def sustituir(m: re.Match) -> str:
+        token = m.group(0)
+        if token[0] in "'\"-":
+            return token.replace('%', '%%')
+        if token == '?':
+            return '%s'
+        if token == '%':
+            return '%%'
+        if m.group(1):
+            return f"%({m.group(1)})s"
+        return _AHORA_POSTGRESQL
+    return _TOKENS.sub(sustituir, sql)
+
+
+class Motor:
+    """Interfaz común de los motores de almacenamiento."""
+
+    nombre = ''
+    # Admite INSERT ... RETURNING (si no, database.insertar() usa lastrowid)
+    returning = True
+    # Excepción de las violaciones de restricciones (UNIQUE, FOREIGN KEY...)
+    IntegrityError: type = Exception
+
+    @property
+    def sqlite(self) -> bool:
+        return self.nombre == 'sqlite'
+
+    def conectar(self):
+        """Devuelve una conexión con la interfaz de sqlite3.Connection."""
+        raise NotImplementedError
+
+    def ddl(self, sql: str) -> Optional[str]:
+        """Adapta una sentencia de esquema al motor (None si no aplica)."""
+        return sql
+
+    def dias_entre(self, fin: str, inicio: str) -> str:
+        """Expresión SQL con los días (entero) de la fecha 'inicio' a la fecha 'fin'."""
+        raise NotImplementedError
+
+    def sumar_dias(self, fecha: str, dias: str) -> str:
+        """Expresión SQL con la fecha (YYYY-MM-DD) 'dias' días después de 'fecha'."""
+        raise NotImplementedError
+
+    def reservar_escritura(self, cursor, tabla: str) -> None:
+        """
+        Empieza la transacción reservando la escritura en 'tabla': las
+        lecturas que siguen y el UPDATE posterior ven los mismos datos.
+        """
+        raise NotImplementedError
+
+    def cerrar(self) -> None:
+        """Cierra las conexiones que el motor mantenga abiertas."""
+
+    def requiere_sqlite(self, funcion: str) -> None:
+        """Lanza RuntimeError si 'funcion' no está disponible con este motor."""
+        if not self.sqlite:
+            raise RuntimeError(f"{funcion}: no disponible con el motor {self.nombre} "
+                               f"(requiere DATABASE_ENGINE=sqlite)")
+
+
+class MotorSQLite(Motor):
+    """Un archivo SQLite; una conexión nueva por operación."""
+
+    nombre = 'sqlite'
+    returning = sqlite3.sqlite_version_info >= (3, 35, 0)
+    IntegrityError = sqlite3.IntegrityError
+
+    def __init__(self, ruta: Path):
+        self.ruta = Path(ruta)
+
+    def conectar(self, ruta: Optional[Path] = None, solo_lectura: bool = False) -> sqlite3.Connection:
+        """
+        Abre una conexión al archivo del motor (o a 'ruta'); con
+        solo_lectura, en modo de solo lectura (réplica de informes).
+        """
+        ruta = Path(ruta) if ruta is not None else self.ruta
+        if solo_lectura:
+            conn = sqlite3.connect(f"{ruta.resolve().as_uri()}?mode=ro", uri=True)
+        else:
+            conn = sqlite3.connect(str(ruta))
+        conn.row_factory = sqlite3.Row  # Permite acceder a las columnas por nombre
+        return conn
+
+    def dias_entre(self, fin: str, inicio: str) -> str:
+        return f"CAST(julianday({fin}) - julianday({inicio}) AS INTEGER)"
+
+    def sumar_dias(self, fecha: str, dias: str) -> str:
+        return f"date({fecha}, '+' || {dias} || ' days')"
+
+    def reservar_escritura(self, cursor, tabla: str) -> None:
+        cursor.execute("BEGIN IMMEDIATE")
+
+
+class ConexionAgrupada(sqlite3.Connection):
+    """Conexión de un MotorSQLiteAgrupado: close() la devuelve al pool."""
+
+    _motor: Optional['MotorSQLiteAgrupado'] = None
+    _prestada = False
+
+    def close(self) -> None:
+        """Devuelve la conexión al pool (se puede llamar varias veces)."""
+        if self._motor is None:
+            super().close()
+        elif self._prestada:
+            self._prestada = False
+            if not self._motor.devolver(self):
+                super().close()
+
+
+class MotorSQLiteAgrupado(MotorSQLite):
+    """
+    Un archivo SQLite que conserva abiertas hasta 'maximo' conexiones
+    libres (la base de datos de una empresa, ver empresas.py). Al
+    devolverse, cada conexión se deja como recién abierta: sin transacción,
+    sin bases de datos adjuntas y con los ajustes por defecto.
+    """
+
+    def __init__(self, ruta: Path, maximo: int):
+        super().__init__(ruta)
+        self.maximo = maximo
+        self._libres: List[ConexionAgrupada] = []
+        self._lock = threading.Lock()
+        self._cerrado = False
+        self.prestadas = 0
+
+    def conectar(self, ruta: Optional[Path] = None, solo_lectura: bool = False) -> sqlite3.Connection:
+        if ruta is not None or solo_lectura:
+            return super().conectar(ruta, solo_lectura)
+        with self._lock:
+            conn = self._libres.pop() if self._libres else None
+            self.prestadas += 1
+        if conn is None:
+            conn = sqlite3.connect(str(self.ruta), factory=ConexionAgrupada, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn._motor = self
+        conn._prestada = True
+        return conn
+
+    def devolver(self, conn: ConexionAgrupada) -> bool:
+        """Guarda la conexión entre las libres; False si hay que cerrarla."""
+        with self._lock:
+            self.prestadas -= 1
+            if self._cerrado or len(self._libres) >= self.maximo:
+                return False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.isolation_level = ''
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA busy_timeout = 5000")  # el de sqlite3.connect()
+            for row in conn.execute("PRAGMA database_list").fetchall():
+                if row[1] not in ('main', 'temp'):
+                    conn.execute(f'DETACH DATABASE "{row[1]}"')
+        except sqlite3.Error:
+            return False
+        with self._lock:
+            if self._cerrado:
+                return False
+            self._libres.append(conn)
+        return True
+
+    @property
+    def libres(self) -> int:
+        return len(self._libres)
+
+    def cerrar(self) -> None:
+        """Cierra las conexiones libres; las prestadas se cierran al devolverlas."""
+        with self._lock:
+            self._cerrado = True
+            libres, self._libres = self._libres, []
+        for conn in libres:
+            sqlite3.Connection.close(conn)
+
+
+class CursorPostgres:
+    """Cursor de psycopg2 con la interfaz de sqlite3.Cursor que usan los modelos."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql: str, params=()) -> 'CursorPostgres':
+        # Siempre con parámetros (aunque sean vacíos): psycopg2 solo
+        # convierte '%%' en '%' cuando hay parámetros
+        self._cursor.execute(traducir(sql), params if params is not None else ())
+        return self
+
+    def executemany(self, sql: str, filas) -> 'CursorPostgres':
+        self._cursor.executemany(traducir(sql), filas)
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size: Optional[int] = None):
+        return self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def lastrowid(self):
+        raise AttributeError("PostgreSQL no tiene lastrowid: usar database.insertar() (RETURNING)")
+
+    def close(self) -> None:
+        self._cursor.close()
+
+
+class ConexionPostgres:
+    """Conexión del pool con la interfaz de sqlite3.Connection que usan los modelos."""
+
+    def __init__(self, motor: 'MotorPostgres', conn):
+        self._motor = motor
+        self._conn = conn
+
+    def cursor(self) -> CursorPostgres:
+        # DictCursor: filas accesibles por nombre y por posición, como sqlite3.Row
+        return CursorPostgres(self._conn.cursor(cursor_factory=self._motor.extras.DictCursor))
+
+    def execute(self, sql: str, params=()) -> CursorPostgres:
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql: str, filas) -> CursorPostgres:
+        return self.cursor().executemany(sql, filas)
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def rollback(self) -> None:
+        self._conn.rollback()
+
+    def close(self) -> None:
+        """Devuelve la conexión al pool (se puede llamar varias veces)."""
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._motor.devolver(conn)
+
+
+class MotorPostgres(Motor):
+    """Servidor PostgreSQL; conexiones de un pool compartido por los hilos del proceso."""
+
+    nombre = 'postgresql'
+
+    def __init__(self, url: str, minimo: int = 1, maximo: int = 10, espera: float = 30):
+        try:
+            import psycopg2
+            import psycopg2.extensions
+            import psycopg2.extras
+            import psycopg2.pool
+        except ImportError:
+            raise RuntimeError("DATABASE_ENGINE=postgresql necesita el paquete psycopg2 "
+                               "(pip install psycopg2-binary)")
+        if not url:
+            raise RuntimeError("DATABASE_ENGINE=postgresql necesita DATABASE_URL")
+        self.psycopg2 = psycopg2
+        self.extras = psycopg2.extras
+        self.IntegrityError = psycopg2.IntegrityError
+        self.url = url
+        self.minimo = max(0, minimo)
+        self.maximo = max(1, maximo)
+        self.espera = espera
+        self._pool = None
+        self._lock = threading.Lock()
+        # ThreadedConnectionPool falla si no quedan conexiones; el semáforo
+        # hace esperar hasta DB_POOL_ESPERA segundos a que se libere una
+        self._libres = threading.BoundedSemaphore(self.maximo)
+        # Las columnas NUMERIC (REAL en SQLite) se leen como float, no Decimal
+        self._numeric_float = psycopg2.extensions.new_type(
+            psycopg2.extensions.DECIMAL.values, 'NUMERIC_FLOAT',
+            lambda valor, cursor: float(valor) if valor is not None else None)
+
+    def _obtener_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = self.psycopg2.pool.ThreadedConnectionPool(
+                    min(self.minimo, self.maximo), self.maximo, dsn=self.url)
+            return self._pool
+
+    def conectar(self) -> ConexionPostgres:
+        if not self._libres.acquire(timeout=self.espera):
+            raise RuntimeError(f"No hay conexiones libres en el pool de PostgreSQL después de "
+                               f"{self.espera} s (DB_POOL_MAX={self.maximo})")
+        try:
+            pool = self._obtener_pool()
+            conn = pool.getconn()
+            if conn.closed:
+                pool.putconn(conn, close=True)
+                conn = pool.getconn()
+            self.psycopg2.extensions.register_type(self._numeric_float, conn)
+        except Exception:
+            self._libres.release()
+            raise
+        return ConexionPostgres(self, conn)
+
+    def devolver(self, conn) -> None:
+        """Devuelve una conexión al pool, deshaciendo la transacción que quedara abierta."""
+        try:
+            descartar = bool(conn.closed)
+            if not descartar and conn.get_transaction_status() != self.psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except self.psycopg2.Error:
+                    descartar = True
+            with self._lock:
+                if self._pool is not None:
+                    self._pool.putconn(conn, close=descartar)
+                else:
+                    conn.close()
+        finally:
+            self._libres.release()
+
+    def ddl(self, sql: str) -> Optional[str]:
+        if sql.lstrip().upper().startswith('PRAGMA'):
+            return None
+        for patron, reemplazo in _TIPOS_POSTGRESQL:
+            sql = patron.sub(reemplazo, sql)
+        return sql
+
+    def dias_entre(self, fin: str, inicio: str) -> str:
+        return f"(CAST({fin} AS DATE) - CAST({inicio} AS DATE))"
+
+    def sumar_dias(self, fecha: str, dias: str) -> str:
+        return f"to_char(CAST({fecha} AS DATE) + CAST({dias} AS INTEGER), 'YYYY-MM-DD')"
+
+    def reservar_escritura(self, cursor, tabla: str) -> None:
+        # Excluye a los demás escritores de la tabla hasta el COMMIT, como
+        # BEGIN IMMEDIATE en SQLite (las lecturas siguen sin bloquearse)
+        cursor.execute(f"LOCK TABLE {tabla} IN SHARE ROW EXCLUSIVE MODE")
+
+    def cerrar(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+
+
+def crear(config) -> Motor:
+    """Crea el motor indicado en Config.DATABASE_ENGINE."""
+    if config.DATABASE_ENGINE == 'sqlite':
+        return MotorSQLite(config.DATABASE_PATH)
+    if config.DATABASE_ENGINE == 'postgresql':
+        return MotorPostgres(config.DATABASE_URL, config.DB_POOL_MIN, config.DB_POOL_MAX,
+                             config.DB_POOL_ESPERA)
+    raise ValueError(f"DATABASE_ENGINE no válido: {config.DATABASE_ENGINE}. "
+                     f"Disponibles: {', '.join(MOTORES)}")
@@ -0,0 +1,478 @@
+"""
+Particiones anuales de Asistencias.
+
+Asistencias tiene una fila por empleado y día y casi todas sus consultas
+son por rango de fechas. Cada año cerrado se guarda en su propia base de
+datos (Config.PARTICIONES_DIR/asistencias_AAAA.db) con la misma tabla e
+índices, y la tabla principal solo conserva los años abiertos. Las
+lecturas adjuntan con ATTACH DATABASE únicamente las particiones que se
+solapan con el rango pedido (grupos()), así que las consultas del año en
+curso no tocan el histórico. Si son más de las que SQLite puede adjuntar a
+la vez, se leen por grupos.
+
+Un año cerrado es de solo lectura: el modelo rechaza altas, cambios y
+bajas en él y el archivo de la partición queda sin permiso de escritura.
+Como ya no cambia, basta con respaldarlo una vez. Para corregirlo hay que
+reabrir el año (abrir()), lo que devuelve sus filas a la tabla principal.
+
+Las particiones se registran en Particiones_Asistencias. Solo existen con
+el motor SQLite: con otros motores todas las asistencias están en la
+tabla principal.
+
+Uso:
+    python particiones.py [listar]
+    python particiones.py cerrar AAAA [--lote N]
+    python particiones.py abrir AAAA [--lote N]
+    python particiones.py verificar
+"""
+import os
+import sqlite3
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from database import get_connection, config, motor, rutas
+import replica
+
+TABLA = 'Asistencias'
+COLUMNAS = ('id_asistencia', 'id_empleado', 'fecha', 'hora_entrada', 'hora_salida',
+            'observaciones', 'eliminado_en')
+_PREFIJO = 'asistencias_'
+
+
+def ruta(anio: int) -> Path:
+    """Archivo de la partición del año."""
+    return rutas().particiones / f"{_PREFIJO}{anio}.db"
+
+
+def esquema(anio: int) -> str:
+    """Nombre con el que se adjunta la partición del año."""
+    return f"{_PREFIJO}{anio}"
+
+
+def es_particion(tabla: str) -> bool:
+    """Indica si la tabla (esquema.tabla) es la de una partición y no la principal."""
+    return tabla.startswith(_PREFIJO)
+
+
+def _limites(anio: int) -> Tuple[str, str]:
+    return f"{anio:04d}-01-01", f"{anio + 1:04d}-01-01"
+
+
+def cerradas(conn) -> Dict[int, sqlite3.Row]:
+    """Particiones registradas (cerradas o a medio cerrar/abrir) por año."""
+    return {row['anio']: row for row in conn.execute("""
+        SELECT anio, archivo, estado, filas, id_min, id_max, cerrada_en
+        FROM Particiones_Asistencias ORDER BY anio
+    """).fetchall()}
+
+
+def comprobar_abierto(conn, fecha: Optional[str]) -> None:
+    """Lanza ValueError si la fecha (YYYY-MM-DD) pertenece a un año cerrado."""
+    if not motor.sqlite or not fecha or not str(fecha)[:4].isdigit():
+        return
+    anio = int(str(fecha)[:4])
+    if conn.execute("SELECT 1 FROM Particiones_Asistencias WHERE anio = ?", (anio,)).fetchone():
+        raise ValueError(f"El año {anio} está cerrado: sus asistencias son de solo lectura")
+
+
+def _limite_adjuntas(conn) -> int:
+    # Connection.getlimit existe desde Python 3.11; 10 es el límite por defecto de SQLite
+    if hasattr(conn, 'getlimit'):
+        return conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    return 10
+
+
+def _disponibles(conn) -> int:
+    """Particiones que se pueden adjuntar a la vez junto a las demás bases adjuntas."""
+    adjuntas = {row[1] for row in conn.execute("PRAGMA database_list").fetchall()}
+    otras = {nombre for nombre in adjuntas if nombre not in ('main', 'temp')
+             and not nombre.startswith(_PREFIJO)}
+    return _limite_adjuntas(conn) - len(otras)
+
+
+def adjuntar(conn, anios: Iterable[int]) -> List[str]:
+    """
+    Adjunta las particiones de los años indicados (suelta las demás) y
+    devuelve sus esquemas en orden cronológico. No se puede llamar con una
+    transacción abierta.
+    """
+    anios = sorted(set(anios))
+    necesarias = {esquema(anio) for anio in anios}
+    adjuntas = {row[1] for row in conn.execute("PRAGMA database_list").fetchall()}
+    for nombre in adjuntas - necesarias:
+        if nombre.startswith(_PREFIJO):
+            conn.execute(f"DETACH DATABASE {nombre}")
+    disponibles = _disponibles(conn)
+    if len(anios) > disponibles:
+        raise ValueError(f"No se pueden adjuntar {len(anios)} particiones a la vez "
+                         f"(como máximo {disponibles})")
+
+    for anio in anios:
+        if esquema(anio) in adjuntas:
+            continue
+        # ATTACH crearía una base vacía si el archivo no existe
+        if not ruta(anio).exists():
+            raise RuntimeError(f"No se encuentra la partición del año {anio}: {ruta(anio)}")
+        conn.execute(f"ATTACH DATABASE ? AS {esquema(anio)}", (str(ruta(anio)),))
+    return [esquema(anio) for anio in anios]
+
+
+def _anios(conn, desde: Optional[str], hasta: Optional[str],
+           ids: Optional[Iterable[int]]) -> List[int]:
+    """Años cerrados que se solapan con el rango de fechas (y, si se indican, con los IDs)."""
+    ids = list(ids) if ids is not None else None
+    anios = []
+    for anio, particion in cerradas(conn).items():
+        inicio, fin = _limites(anio)
+        if (desde and desde >= fin) or (hasta and hasta < inicio):
+            continue
+        # El rango de IDs solo se conoce cuando el cierre ha terminado
+        if ids is not None and particion['id_min'] is not None and not any(
+                particion['id_min'] <= i <= particion['id_max'] for i in ids):
+            continue
+        anios.append(anio)
+    return anios
+
+
+def grupos(conn, desde: Optional[str] = None, hasta: Optional[str] = None,
+           ids: Optional[Iterable[int]] = None) -> Iterator[List[str]]:
+    """
+    Tablas que hay que leer para el rango de fechas (y, si se indican, los
+    IDs): las particiones que se solapan, de la más antigua a la más
+    reciente, y al final la tabla principal. Se generan en grupos de tantas
+    particiones como SQLite puede adjuntar a la vez; cada grupo se adjunta
+    (soltando el anterior) al pedirlo, así que sus consultas deben terminar
+    antes de pedir el siguiente.
+    """
+    if not motor.sqlite:
+        yield [TABLA]
+        return
+    anios = _anios(conn, desde, hasta, ids)
+    if not anios:
+        adjuntar(conn, [])
+        yield [f"main.{TABLA}"]
+        return
+    tamano = max(1, _disponibles(conn))
+    for inicio in range(0, len(anios), tamano):
+        tablas = [f"{nombre}.{TABLA}" for nombre in adjuntar(conn, anios[inicio:inicio + tamano])]
+        if inicio + tamano >= len(anios):
+            tablas.append(f"main.{TABLA}")
+        yield tablas
+
+
+def union(tablas: List[str]) -> str:
+    """
+    Expresión FROM que lee las tablas de un grupo como una sola: la tabla
+    principal sola o la unión de todas. Tiene las columnas de COLUMNAS.
+    """
+    if len(tablas) == 1:
+        return tablas[0]
+    columnas = ', '.join(COLUMNAS)
+    # SQLite lleva los WHERE externos a cada rama del UNION ALL (índices de todas)
+    return '(' + ' UNION ALL '.join(f"SELECT {columnas} FROM {tabla}" for tabla in tablas) + ')'
+
+
+def particion_de(conn, asistencia_id: int) -> Optional[int]:
+    """Año cerrado en cuya partición está la asistencia, o None."""
+    for tablas in grupos(conn, ids=[asistencia_id]):
+        for tabla in tablas:
+            if es_particion(tabla) and conn.execute(
+                    f"SELECT 1 FROM {tabla} WHERE id_asistencia = ?", (asistencia_id,)).fetchone():
+                return int(tabla.split('.')[0][len(_PREFIJO):])
+    return None
+
+
+def _crear_tabla(conn, nombre: str) -> None:
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {nombre}.{TABLA} (
+            id_asistencia INTEGER PRIMARY KEY,
+            id_empleado INTEGER NOT NULL,
+            fecha DATE,
+            hora_entrada TIME,
+            hora_salida TIME,
+            observaciones TEXT,
+            eliminado_en TIMESTAMP
+        )
+    """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {nombre}.idx_asistencias_empleado_fecha "
+                 f"ON {TABLA} (id_empleado, fecha)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {nombre}.idx_asistencias_fecha ON {TABLA} (fecha)")
+    conn.commit()
+
+
+def _mover(conn, origen: str, destino: str, anio: int, lote: int,
+           progreso: Optional[Callable[[int, int], None]]) -> int:
+    """Mueve por lotes (una transacción cada uno) las filas del año de 'origen' a 'destino'."""
+    inicio, fin = _limites(anio)
+    columnas = ', '.join(COLUMNAS)
+    total = conn.execute(f"SELECT COUNT(*) FROM {origen} WHERE fecha >= ? AND fecha < ?",
+                         (inicio, fin)).fetchone()[0]
+    movidas = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ids = [row[0] for row in conn.execute(
+                f"SELECT id_asistencia FROM {origen} WHERE fecha >= ? AND fecha < ? LIMIT ?",
+                (inicio, fin, lote))]
+            if not ids:
+                conn.execute("COMMIT")
+                return movidas
+            marcas = ', '.join('?' * len(ids))
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'Cambios'").fetchone()
+            ultimo_cambio = row[0] if row else 0
+            # OR REPLACE: la transacción abarca dos archivos y un corte durante
+            # el COMMIT puede dejar el lote en ambos; al repetir no falla
+            conn.execute(f"""
+                INSERT OR REPLACE INTO {destino} ({columnas})
+                SELECT {columnas} FROM {origen} WHERE id_asistencia IN ({marcas})
+            """, ids)
+            conn.execute(f"DELETE FROM {origen} WHERE id_asistencia IN ({marcas})", ids)
+            # Mover filas entre particiones no es un cambio de los datos: se
+            # descartan las operaciones que los triggers acaban de anotar
+            conn.execute("DELETE FROM Cambios WHERE seq > ?", (ultimo_cambio,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        movidas += len(ids)
+        if progreso:
+            progreso(movidas, total)
+
+
+def cerrar(anio: int, lote: Optional[int] = None,
+           progreso: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """
+    Cierra un año anterior al actual: mueve sus asistencias de la tabla
+    principal a su partición, por lotes de Config.PARTICIONES_LOTE filas,
+    y deja el archivo de la partición en solo lectura. Si un cierre anterior
+    se interrumpió, lo continúa.
+
+    Args:
+        anio: Año a cerrar
+        lote: Filas por transacción (por defecto Config.PARTICIONES_LOTE)
+        progreso: Función (filas movidas, total) llamada tras cada lote
+
+    Returns:
+        Dict con el año, el archivo y las filas de la partición
+    """
+    motor.requiere_sqlite("El cierre de años de asistencias")
+    anio = int(anio)
+    if anio >= date.today().year:
+        raise ValueError("Solo se pueden cerrar años anteriores al actual")
+    lote = lote or config.PARTICIONES_LOTE
+    destino, nombre = ruta(anio), esquema(anio)
+
+    conn = get_connection()
+    try:
+        particion = cerradas(conn).get(anio)
+        if particion is not None and particion['estado'] != 'cerrando':
+            raise ValueError(f"El año {anio} ya está cerrado (estado {particion['estado']})")
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        if destino.exists():
+            # Un cierre que se continúa puede encontrar la partición ya en solo lectura
+            os.chmod(destino, 0o644)
+        conn.execute(f"ATTACH DATABASE ? AS {nombre}", (str(destino),))
+        _crear_tabla(conn, nombre)
+        with replica.movimiento():
+            # Se registra antes de mover: desde aquí no se admiten altas en el
+            # año y las lecturas del año ya consultan la partición
+            conn.execute("INSERT OR IGNORE INTO Particiones_Asistencias (anio, archivo) VALUES (?, ?)",
+                         (anio, destino.name))
+            conn.commit()
+            movidas = _mover(conn, f"main.{TABLA}", f"{nombre}.{TABLA}", anio, lote, progreso)
+
+            filas, id_min, id_max = conn.execute(f"""
+                SELECT COUNT(*), MIN(id_asistencia), MAX(id_asistencia) FROM {nombre}.{TABLA}
+            """).fetchone()
+            conn.execute(f"ANALYZE {nombre}")
+            conn.execute("""
+                UPDATE Particiones_Asistencias
+                SET estado = 'cerrada', filas = ?, id_min = ?, id_max = ?, cerrada_en = CURRENT_TIMESTAMP
+                WHERE anio = ?
+            """, (filas, id_min, id_max, anio))
+            conn.commit()
+        conn.execute(f"DETACH DATABASE {nombre}")
+    finally:
+        conn.close()
+
+    os.chmod(destino, 0o444)
+    return {'anio': anio, 'archivo': str(destino), 'filas': filas, 'movidas': movidas}
+
+
+def abrir(anio: int, lote: Optional[int] = None,
+          progreso: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """
+    Reabre un año cerrado: devuelve sus asistencias a la tabla principal y
+    elimina la partición. Mientras dura el proceso el año sigue siendo de
+    solo lectura.
+
+    Returns:
+        Dict con el año y las filas devueltas a la tabla principal
+    """
+    motor.requiere_sqlite("La reapertura de años de asistencias")
+    anio = int(anio)
+    lote = lote or config.PARTICIONES_LOTE
+    origen, nombre = ruta(anio), esquema(anio)
+
+    conn = get_connection()
+    try:
+        particion = cerradas(conn).get(anio)
+        if particion is None:
+            raise ValueError(f"El año {anio} no está cerrado")
+        movidas = 0
+        with replica.movimiento():
+            if origen.exists():
+                os.chmod(origen, 0o644)
+                conn.execute("UPDATE Particiones_Asistencias SET estado = 'abriendo' WHERE anio = ?", (anio,))
+                conn.commit()
+                conn.execute(f"ATTACH DATABASE ? AS {nombre}", (str(origen),))
+                movidas = _mover(conn, f"{nombre}.{TABLA}", f"main.{TABLA}", anio, lote, progreso)
+                restantes = conn.execute(f"SELECT COUNT(*) FROM {nombre}.{TABLA}").fetchone()[0]
+                conn.execute(f"DETACH DATABASE {nombre}")
+                if restantes:
+                    raise RuntimeError(f"La partición de {anio} conserva {restantes} filas fuera del año; "
+                                       f"revísela con 'verificar' antes de reabrirlo")
+            conn.execute("DELETE FROM Particiones_Asistencias WHERE anio = ?", (anio,))
+            conn.commit()
+    finally:
+        conn.close()
+
+    if origen.exists():
+        origen.unlink()
+    return {'anio': anio, 'movidas': movidas}
+
+
+def listar() -> Dict:
+    """Años cerrados (con su partición) y años abiertos en la tabla principal."""
+    conn = get_connection()
+    try:
+        abiertos = {row[0]: row[1] for row in conn.execute(f"""
+            SELECT COALESCE(substr(fecha, 1, 4), '-'), COUNT(*) FROM main.{TABLA}
+            GROUP BY 1 ORDER BY 1
+        """).fetchall()}
+        return {
+            'directorio': str(rutas().particiones),
+            'cerrados': [{
+                'anio': anio,
+                'estado': particion['estado'],
+                'filas': particion['filas'],
+                'archivo': particion['archivo'],
+                'bytes': ruta(anio).stat().st_size if ruta(anio).exists() else None,
+                'cerrada_en': particion['cerrada_en'],
+            } for anio, particion in cerradas(conn).items()],
+            'abiertos': abiertos,
+        }
+    finally:
+        conn.close()
+
+
+def verificar() -> Dict[int, List[str]]:
+    """
+    Comprueba cada partición registrada (archivo presente e íntegro, solo
+    lectura, filas y fechas del año, ninguna fila del año en la tabla
+    principal) y busca archivos de partición sin registrar.
+
+    Returns:
+        Dict año -> lista de problemas (vacía si la partición está bien)
+    """
+    resultado: Dict[int, List[str]] = {}
+    conn = get_connection()
+    try:
+        particiones = cerradas(conn)
+        for anio, particion in particiones.items():
+            problemas = resultado.setdefault(anio, [])
+            inicio, fin = _limites(anio)
+            if particion['estado'] != 'cerrada':
+                problemas.append(f"proceso sin terminar (estado {particion['estado']})")
+            en_principal = conn.execute(f"""
+                SELECT COUNT(*) FROM main.{TABLA} WHERE fecha >= ? AND fecha < ?
+            """, (inicio, fin)).fetchone()[0]
+            if en_principal and particion['estado'] == 'cerrada':
+                problemas.append(f"{en_principal} filas del año en la tabla principal")
+            if not ruta(anio).exists():
+                problemas.append(f"falta el archivo {ruta(anio)}")
+                continue
+            if ruta(anio).stat().st_mode & 0o222 and particion['estado'] == 'cerrada':
+                problemas.append("el archivo admite escritura")
+
+            nombre = adjuntar(conn, [anio])[0]
+            chequeo = conn.execute(f"PRAGMA {nombre}.quick_check").fetchone()[0]
+            if chequeo != 'ok':
+                problemas.append(f"quick_check: {chequeo}")
+            filas, fuera = conn.execute(f"""
+                SELECT COUNT(*), COALESCE(SUM(fecha IS NULL OR fecha < ? OR fecha >= ?), 0)
+                FROM {nombre}.{TABLA}
+            """, (inicio, fin)).fetchone()
+            if particion['filas'] is not None and filas != particion['filas']:
+                problemas.append(f"{filas} filas en la partición y {particion['filas']} registradas")
+            if fuera:
+                problemas.append(f"{fuera} filas con fecha fuera del año")
+        adjuntar(conn, [])
+
+        directorio = rutas().particiones
+        if directorio.exists():
+            for archivo in sorted(directorio.glob(f"{_PREFIJO}*.db")):
+                sufijo = archivo.stem[len(_PREFIJO):]
+                if not sufijo.isdigit() or int(sufijo) not in particiones:
+                    resultado.setdefault(int(sufijo) if sufijo.isdigit() else 0, []).append(
+                        f"archivo sin registrar: {archivo.name}")
+    finally:
+        conn.close()
+    return resultado
+
+
+def main(argv=None) -> bool:
+    """Punto de entrada de la línea de comandos."""
+    argv = sys.argv[1:] if argv is None else argv
+    comando = argv[0] if argv and not argv[0].startswith('--') else 'listar'
+
+    print("=" * 60)
+    print("PARTICIONES ANUALES DE ASISTENCIAS")
+    print("=" * 60)
+
+    try:
+        motor.requiere_sqlite("Las particiones de asistencias")
+        lote = int(argv[argv.index('--lote') + 1]) if '--lote' in argv else None
+        if comando in ('cerrar', 'abrir'):
+            if len(argv) < 2 or not argv[1].isdigit():
+                print(f"[ERROR] Uso: python particiones.py {comando} AAAA [--lote N]")
+                return False
+            if comando == 'cerrar':
+                r = cerrar(int(argv[1]), lote)
+                print(f"[OK] Año {r['anio']} cerrado: {r['filas']} filas en {r['archivo']}")
+            else:
+                r = abrir(int(argv[1]), lote)
+                print(f"[OK] Año {r['anio']} reabierto: {r['movidas']} filas devueltas a la tabla principal")
+        elif comando == 'listar':
+            r = listar()
+            print(f"[INFO] Directorio: {r['directorio']}")
+            for p in r['cerrados']:
+                print(f"  {p['anio']}  {p['estado']:<9} filas={p['filas'] if p['filas'] is not None else '-':>10}"
+                      f" bytes={p['bytes'] if p['bytes'] is not None else '-':>12}  {p['archivo']}")
+            for anio, filas in r['abiertos'].items():
+                print(f"  {anio}  {'abierto':<9} filas={filas:>10}  (tabla principal)")
+        elif comando == 'verificar':
+            r = verificar()
+            errores = 0
+            for anio, problemas in r.items():
+                if not problemas:
+                    print(f"[OK] {anio}")
+                for problema in problemas:
+                    errores += 1
+                    print(f"[ERROR] {anio}: {problema}")
+            if not r:
+                print("[INFO] No hay años cerrados")
+            return errores == 0
+        else:
+            print(f"[ERROR] Comando desconocido: {comando}")
+            return False
+    except Exception as e:
+        print(f"[ERROR] {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
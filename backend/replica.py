@@ -0,0 +1,327 @@
+"""
+Réplica de solo lectura para los informes.
+
+Los informes y las exportaciones recorren tablas enteras y compiten con las
+escrituras de asistencias en rrhh.db. Con Config.REPLICA_ACTIVA, un hilo
+Replicador copia cada Config.REPLICA_INTERVALO segundos la base de datos
+principal a Config.REPLICA_PATH con la API de backup (a un archivo
+temporal que después sustituye a la réplica anterior) y las rutas de
+informes (lecturas(), iterar()) abren sus conexiones contra esa copia en
+modo de solo lectura.
+
+La réplica solo se usa si su copia tiene menos de Config.REPLICA_MAX_RETRASO
+segundos y si desde entonces no se han movido filas al archivo o a las
+particiones (Replica_Control.movimientos): esas tablas se adjuntan desde
+sus archivos actuales y una copia anterior al traslado leería filas dos
+veces. En cualquier otro caso se lee la base de datos principal. Con
+PostgreSQL no hay réplica por copia (se usan las réplicas del servidor).
+
+Uso:
+    python replica.py [estado]
+    python replica.py refrescar [--desbloquear]
+"""
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+from database import get_connection, config, motor, ruta_lecturas, rutas
+from respaldo import _copiar_con_backup
+import empresas
+
+logger = logging.getLogger(__name__)
+
+# Ruta de cada réplica -> ((inodo, mtime) de la réplica, su fila de Replica_Control)
+_control_cache: Dict[Path, Tuple[Tuple[int, int], Dict]] = {}
+
+
+def _ruta() -> Path:
+    return rutas().replica
+
+
+def _control_replica() -> Optional[Dict]:
+    """Fila de Replica_Control de la réplica actual (None si no hay réplica)."""
+    ruta = _ruta()
+    try:
+        info = ruta.stat()
+    except FileNotFoundError:
+        return None
+    clave = (info.st_ino, info.st_mtime_ns)
+    cache = _control_cache.get(ruta)
+    if cache is not None and cache[0] == clave:
+        return cache[1]
+    conn = sqlite3.connect(f"{ruta.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        row = conn.execute("SELECT movimientos, en_curso, copiada_en FROM Replica_Control").fetchone()
+    finally:
+        conn.close()
+    control = {'movimientos': row[0], 'en_curso': row[1], 'copiada_en': row[2]}
+    _control_cache[ruta] = (clave, control)
+    return control
+
+
+def _control_principal() -> Dict:
+    conn = get_connection()
+    try:
+        row = conn.execute("SELECT movimientos, en_curso FROM Replica_Control").fetchone()
+        return {'movimientos': row[0], 'en_curso': row[1]}
+    finally:
+        conn.close()
+
+
+def comprobar() -> Tuple[Optional[float], str]:
+    """
+    Indica si la réplica se puede usar ahora.
+
+    Returns:
+        (retraso en segundos, '') si se puede usar, o (None, motivo) si no
+    """
+    if not config.REPLICA_ACTIVA:
+        return None, 'réplica desactivada (REPLICA_ACTIVA)'
+    if not motor.sqlite:
+        return None, f'la réplica por copia solo existe con SQLite (motor {motor.nombre})'
+    replica = _control_replica()
+    if replica is None or replica['copiada_en'] is None:
+        return None, 'todavía no hay réplica'
+    retraso = time.time() - replica['copiada_en']
+    if retraso > config.REPLICA_MAX_RETRASO:
+        return None, f'réplica con {int(retraso)} s de antigüedad (máximo {config.REPLICA_MAX_RETRASO})'
+    principal = _control_principal()
+    if principal['en_curso'] or replica['en_curso']:
+        return None, 'traslado al archivo o a las particiones en curso'
+    if principal['movimientos'] != replica['movimientos']:
+        return None, 'traslado al archivo o a las particiones posterior a la copia'
+    return retraso, ''
+
+
+@contextmanager
+def lecturas() -> Iterator[Optional[float]]:
+    """
+    Dirige a la réplica, si se puede usar, las conexiones que se abran dentro
+    del bloque. Devuelve el retraso de la réplica o None si se lee la
+    base de datos principal.
+    """
+    try:
+        retraso, motivo = comprobar()
+    except Exception:
+        logger.exception("No se pudo comprobar la réplica de lectura")
+        retraso, motivo = None, 'error al comprobar la réplica'
+    if retraso is None:
+        if config.REPLICA_ACTIVA:
+            logger.debug("Informe en la base de datos principal: %s", motivo)
+        yield None
+        return
+    token = ruta_lecturas.set(_ruta())
+    try:
+        yield retraso
+    finally:
+        ruta_lecturas.reset(token)
+
+
+def iterar(generador: Iterator, replica: bool) -> Iterator:
+    """
+    Recorre un generador (respuesta en streaming) con sus conexiones
+    dirigidas a la réplica si 'replica' es True. La elección se fija solo
+    mientras avanza el generador y no se filtra a quien lo consume.
+    """
+    @contextmanager
+    def dirigido():
+        token = ruta_lecturas.set(_ruta() if replica else None)
+        try:
+            yield
+        finally:
+            ruta_lecturas.reset(token)
+
+    try:
+        while True:
+            with dirigido():
+                try:
+                    valor = next(generador)
+                except StopIteration:
+                    return
+            yield valor
+    finally:
+        close = getattr(generador, 'close', None)
+        if close:
+            with dirigido():
+                close()
+
+
+@contextmanager
+def movimiento():
+    """
+    Marca un traslado de filas al archivo o a las particiones: mientras dura
+    y después, hasta la siguiente copia, no se usa la réplica.
+    """
+    conn = get_connection()
+    try:
+        conn.execute("UPDATE Replica_Control SET movimientos = movimientos + 1, en_curso = en_curso + 1")
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.execute("""
+                UPDATE Replica_Control
+                SET movimientos = movimientos + 1, en_curso = MAX(en_curso - 1, 0)
+            """)
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def refrescar(desbloquear: bool = False) -> Dict:
+    """
+    Copia la base de datos principal a la réplica con la API de backup (por
+    lotes de Config.RESPALDOS_PAGINAS_POR_PASO páginas) y sustituye la
+    réplica anterior. Las lecturas que ya estaban abiertas terminan con la
+    copia anterior.
+
+    Args:
+        desbloquear: Poner a cero los traslados en curso antes de copiar (si
+            un proceso terminó a la fuerza durante un traslado)
+
+    Returns:
+        Dict con el archivo, páginas, bytes, duración y fecha de la copia
+    """
+    motor.requiere_sqlite("La réplica de lectura")
+    destino = _ruta()
+    temporal = destino.with_name(f"{destino.name}.{os.getpid()}.tmp")
+    inicio = time.perf_counter()
+
+    try:
+        origen = get_connection()
+        copia = sqlite3.connect(str(temporal))
+        try:
+            if desbloquear:
+                origen.execute("UPDATE Replica_Control SET en_curso = 0")
+                origen.commit()
+            # La copia refleja la base de datos como mínimo desde este instante
+            copiada_en = time.time()
+            paginas = _copiar_con_backup(origen, copia, config.RESPALDOS_PAGINAS_POR_PASO,
+                                         config.RESPALDOS_PAUSA)
+            # Un único archivo sin -wal: se puede abrir en modo de solo lectura
+            copia.execute("PRAGMA journal_mode = DELETE")
+            copia.execute("UPDATE Replica_Control SET copiada_en = ?", (copiada_en,))
+            copia.commit()
+        finally:
+            copia.close()
+            origen.close()
+        os.replace(temporal, destino)
+    except Exception:
+        if temporal.exists():
+            temporal.unlink()
+        raise
+
+    return {
+        'archivo': str(destino),
+        'paginas': paginas,
+        'bytes': destino.stat().st_size,
+        'duracion_ms': int((time.perf_counter() - inicio) * 1000),
+        'copiada_en': datetime.fromtimestamp(copiada_en).isoformat(timespec='seconds')
+    }
+
+
+def estado() -> Dict:
+    """Configuración, antigüedad de la réplica y si se puede usar ahora."""
+    replica = _control_replica()
+    retraso, motivo = comprobar()
+    copiada_en = replica['copiada_en'] if replica else None
+    return {
+        'activa': config.REPLICA_ACTIVA,
+        'archivo': str(_ruta()),
+        'copiada_en': datetime.fromtimestamp(copiada_en).isoformat(timespec='seconds') if copiada_en else None,
+        'antiguedad_s': round(time.time() - copiada_en, 1) if copiada_en else None,
+        'max_retraso_s': config.REPLICA_MAX_RETRASO,
+        'intervalo_s': config.REPLICA_INTERVALO,
+        'utilizable': retraso is not None,
+        'motivo': motivo or None
+    }
+
+
+class Replicador(threading.Thread):
+    """Hilo que refresca la réplica cada Config.REPLICA_INTERVALO segundos."""
+
+    def __init__(self, intervalo: Optional[int] = None):
+        super().__init__(name='replica-db', daemon=True)
+        self.intervalo = intervalo or config.REPLICA_INTERVALO
+        self._detener = threading.Event()
+
+    def detener(self) -> None:
+        """Pide al hilo que termine en la siguiente iteración."""
+        self._detener.set()
+
+    def paso(self) -> Optional[Dict]:
+        """Refresca la réplica si es más antigua que el intervalo; devuelve el resultado o None."""
+        try:
+            # Con varios procesos, otro puede haberla refrescado hace poco
+            replica = _control_replica()
+            if replica and replica['copiada_en'] and time.time() - replica['copiada_en'] < self.intervalo:
+                return None
+            return refrescar()
+        except Exception:
+            logger.exception("Error al refrescar la réplica de lectura")
+        return None
+
+    def run(self) -> None:
+        while not self._detener.is_set():
+            # Con bases de datos por empresa, la réplica de cada una
+            for empresa in empresas.ambitos():
+                try:
+                    with empresas.visitar(empresa):
+                        self.paso()
+                except Exception:
+                    logger.exception("No se pudo abrir la empresa %s para refrescar su réplica", empresa)
+            self._detener.wait(max(1, self.intervalo / 4))
+
+
+_replicador: Optional[Replicador] = None
+
+
+def iniciar_replicador() -> Replicador:
+    """Arranca (una sola vez por proceso) el hilo que refresca la réplica."""
+    global _replicador
+    if _replicador is None or not _replicador.is_alive():
+        _replicador = Replicador()
+        _replicador.start()
+    return _replicador
+
+
+def main(argv=None) -> bool:
+    """Punto de entrada de la línea de comandos."""
+    argv = sys.argv[1:] if argv is None else argv
+    comando = argv[0] if argv and not argv[0].startswith('--') else 'estado'
+
+    print("=" * 60)
+    print("RÉPLICA DE LECTURA")
+    print("=" * 60)
+
+    try:
+        if comando == 'refrescar':
+            r = refrescar(desbloquear='--desbloquear' in argv)
+            print(f"[OK] Réplica copiada: {r['archivo']} ({r['paginas']} páginas, {r['bytes']} bytes) "
+                  f"en {r['duracion_ms']} ms")
+        elif comando == 'estado':
+            r = estado()
+            print(f"[INFO] Archivo: {r['archivo']}")
+            print(f"  Activa:        {r['activa']}")
+            print(f"  Copiada en:    {r['copiada_en'] or '-'}")
+            print(f"  Antigüedad:    {r['antiguedad_s'] if r['antiguedad_s'] is not None else '-'} s "
+                  f"(máximo {r['max_retraso_s']} s)")
+            print(f"  Utilizable:    {'sí' if r['utilizable'] else 'no, ' + r['motivo']}")
+        else:
+            print(f"[ERROR] Comando desconocido: {comando}")
+            return False
+    except Exception as e:
+        print(f"[ERROR] {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,461 @@
+"""
+Informes de plantilla, costes de nómina y evaluaciones de desempeño.
+
+Las columnas necesarias se leen en bloque con una sola consulta por informe
+(las fechas ya convertidas a índice de mes en SQL) y las series por
+departamento y mes se calculan de forma vectorizada con NumPy si está
+instalado, o con un algoritmo lineal equivalente en Python puro si no lo
+está. Los costes de nómina se agregan directamente con GROUP BY en SQLite.
+
+Los resultados se guardan en una caché en proceso cuya clave incluye la
+versión de las tablas de origen (Versiones_Tabla, mantenida por triggers),
+de modo que cualquier escritura en las tablas de origen la invalida en
+todos los procesos. Los informes usan funciones de fecha y triggers de
+SQLite: solo están disponibles con el motor SQLite.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from database import get_db, id_empresa, motor
+import archivo
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+# Estados de empleado que indican que ya no forma parte de la plantilla
+ESTADOS_BAJA = ('Retirado', 'Inactivo', 'Baja')
+
+# Máximo de años que cubre un informe
+MAX_ANIOS = 10
+
+# Entradas máximas de la caché de informes (LRU)
+_CACHE_MAX = 32
+
+_cache: 'OrderedDict[tuple, Dict]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+# Índice de mes (anio * 12 + mes - 1) de una fecha YYYY-MM-DD, calculado en SQL
+_INDICE_MES = "(CAST(strftime('%Y', {0}) AS INTEGER) * 12 + CAST(strftime('%m', {0}) AS INTEGER) - 1)"
+
+# Índice de mes usado para "sin fecha de salida"
+_SIN_SALIDA = 1 << 40
+
+
+def _etiqueta(mes: int) -> str:
+    return f"{mes // 12:04d}-{mes % 12 + 1:02d}"
+
+
+def _rango_meses(anios: int, hasta: Optional[str]) -> Tuple[int, int]:
+    """Devuelve (primer, último) índice de mes del informe."""
+    if not 1 <= anios <= MAX_ANIOS:
+        raise ValueError(f"anios debe estar entre 1 y {MAX_ANIOS}")
+    try:
+        fin = datetime.strptime(hasta, '%Y-%m').date() if hasta else date.today()
+    except ValueError:
+        raise ValueError("hasta debe tener el formato YYYY-MM")
+    ultimo = fin.year * 12 + fin.month - 1
+    return ultimo - anios * 12 + 1, ultimo
+
+
+def _versiones(conn, tablas: Sequence[str]) -> Tuple:
+    """Versión actual de cada tabla según Versiones_Tabla."""
+    motor.requiere_sqlite("Los informes")
+    cursor = conn.execute(f"""
+        SELECT tabla, version FROM Versiones_Tabla
+        WHERE tabla IN ({', '.join('?' * len(tablas))})
+        ORDER BY tabla
+    """, tuple(tablas))
+    return tuple((row['tabla'], row['version']) for row in cursor.fetchall())
+
+
+def _invalidar_cache() -> None:
+    """
+    Vacía la caché de informes. Hace falta cuando la base de datos se
+    sustituye (restauración de un respaldo): sus versiones de tabla pueden
+    coincidir con las de la caché aunque los datos sean otros.
+    """
+    with _cache_lock:
+        _cache.clear()
+
+
+def _con_cache(clave: tuple, calcular: Callable[[], Dict]) -> Dict:
+    """Devuelve el resultado en caché para la clave o lo calcula y lo guarda."""
+    clave = (id_empresa(),) + clave
+    with _cache_lock:
+        if clave in _cache:
+            _cache.move_to_end(clave)
+            return _cache[clave]
+    resultado = calcular()
+    with _cache_lock:
+        _cache[clave] = resultado
+        while len(_cache) > _CACHE_MAX:
+            _cache.popitem(last=False)
+    return resultado
+
+
+def _departamentos(conn) -> Dict[int, str]:
+    nombres = {row['id_departamento']: row['nombre_departamento'] for row in conn.execute(
+        "SELECT id_departamento, nombre_departamento FROM Departamentos").fetchall()}
+    nombres[0] = 'Sin departamento'
+    return nombres
+
+
+def pendiente(valores: Sequence[float]) -> float:
+    """Pendiente de la recta de mínimos cuadrados de una serie equiespaciada."""
+    n = len(valores)
+    if n < 2:
+        return 0.0
+    if np is not None:
+        return float(np.polyfit(np.arange(n), np.asarray(valores, dtype=float), 1)[0])
+    media_x, media_y = (n - 1) / 2, sum(valores) / n
+    numerador = sum((i - media_x) * (v - media_y) for i, v in enumerate(valores))
+    denominador = sum((i - media_x) ** 2 for i in range(n))
+    return numerador / denominador
+
+
+def _series_numpy(filas: List[Tuple], primero: int, meses: int):
+    """Altas, bajas y plantilla por departamento y mes con NumPy."""
+    datos = np.array(filas, dtype=np.int64).reshape(-1, 3)
+    deps, dep_idx = np.unique(datos[:, 0], return_inverse=True)
+    ingreso, salida = datos[:, 1], datos[:, 2]
+    altas = np.zeros((len(deps), meses), dtype=np.int64)
+    bajas = np.zeros((len(deps), meses), dtype=np.int64)
+    for destino, columna in ((altas, ingreso), (bajas, salida)):
+        dentro = (columna >= primero) & (columna < primero + meses)
+        np.add.at(destino, (dep_idx[dentro], columna[dentro] - primero), 1)
+    base = (np.bincount(dep_idx[ingreso < primero], minlength=len(deps))
+            - np.bincount(dep_idx[salida < primero], minlength=len(deps)))
+    plantilla = base[:, None] + np.cumsum(altas - bajas, axis=1)
+    return deps.tolist(), base.tolist(), altas.tolist(), bajas.tolist(), plantilla.tolist()
+
+
+def _series_python(filas: List[Tuple], primero: int, meses: int):
+    """Mismo cálculo que _series_numpy en Python puro (lineal en filas)."""
+    deps = sorted({fila[0] for fila in filas})
+    indice = {dep: i for i, dep in enumerate(deps)}
+    altas = [[0] * meses for _ in deps]
+    bajas = [[0] * meses for _ in deps]
+    base = [0] * len(deps)
+    for dep, ingreso, salida in filas:
+        i = indice[dep]
+        for destino, mes, signo in ((altas, ingreso, 1), (bajas, salida, -1)):
+            if mes < primero:
+                base[i] += signo
+            elif mes < primero + meses:
+                destino[i][mes - primero] += 1
+    plantilla = []
+    for i in range(len(deps)):
+        actual, serie = base[i], []
+        for m in range(meses):
+            actual += altas[i][m] - bajas[i][m]
+            serie.append(actual)
+        plantilla.append(serie)
+    return deps, base, altas, bajas, plantilla
+
+
+def _rotacion(base: int, plantilla: List[int], bajas: List[int]) -> List[float]:
+    """Bajas del mes divididas por la plantilla media del mes."""
+    rotacion, anterior = [], base
+    for actual, salidas in zip(plantilla, bajas):
+        media = (anterior + actual) / 2
+        rotacion.append(round(salidas / media, 4) if media > 0 else 0.0)
+        anterior = actual
+    return rotacion
+
+
+def plantilla(anios: int = 5, id_departamento: Optional[int] = None,
+              hasta: Optional[str] = None) -> Dict:
+    """
+    Plantilla a fin de mes, altas, bajas y rotación por departamento y mes.
+
+    La fecha de baja de un empleado en un estado de ESTADOS_BAJA es la
+    fecha_fin más reciente de sus contratos; los que no tienen ninguna se
+    excluyen y se informan en 'sin_fecha_baja'.
+
+    Args:
+        anios: Años hacia atrás que cubre el informe (1-10)
+        id_departamento: Limitar a un departamento (opcional)
+        hasta: Último mes del informe (YYYY-MM, por defecto el actual)
+
+    Returns:
+        Dict con 'meses', 'departamentos', 'total' y 'motor' ('numpy' o 'python')
+    """
+    primero, ultimo = _rango_meses(anios, hasta)
+    meses = ultimo - primero + 1
+
+    with get_db() as conn:
+        clave = ('plantilla', primero, ultimo, id_departamento,
+                 _versiones(conn, ('Contratos', 'Departamentos', 'Empleados')))
+
+        def calcular() -> Dict:
+            estados = ', '.join('?' * len(ESTADOS_BAJA))
+            query = f"""
+                SELECT COALESCE(e.id_departamento, 0) AS dep,
+                       {_INDICE_MES.format('e.fecha_ingreso')} AS ingreso,
+                       CASE WHEN e.estado IN ({estados}) THEN (
+                           SELECT {_INDICE_MES.format('MAX(c.fecha_fin)')}
+                           FROM Contratos c WHERE c.id_empleado = e.id_empleado
+                       ) ELSE {_SIN_SALIDA} END AS salida
+                FROM Empleados e
+                WHERE julianday(e.fecha_ingreso) IS NOT NULL
+            """
+            params: List = list(ESTADOS_BAJA)
+            if id_departamento is not None:
+                query += " AND e.id_departamento = ?"
+                params.append(id_departamento)
+            filas = [tuple(row) for row in conn.execute(query, params).fetchall()]
+            validas = [fila for fila in filas if fila[2] is not None]
+
+            calculo = _series_numpy if np is not None else _series_python
+            deps, base, altas, bajas, serie = calculo(validas, primero, meses) if validas \
+                else ([], [], [], [], [])
+            nombres = _departamentos(conn)
+
+            departamentos = [{
+                'id_departamento': dep or None,
+                'nombre_departamento': nombres.get(dep),
+                'plantilla': serie[i],
+                'altas': altas[i],
+                'bajas': bajas[i],
+                'rotacion': _rotacion(base[i], serie[i], bajas[i])
+            } for i, dep in enumerate(deps)]
+
+            total = {
+                'plantilla': [sum(col) for col in zip(*serie)] if serie else [0] * meses,
+                'altas': [sum(col) for col in zip(*altas)] if altas else [0] * meses,
+                'bajas': [sum(col) for col in zip(*bajas)] if bajas else [0] * meses
+            }
+            total['rotacion'] = _rotacion(sum(base), total['plantilla'], total['bajas'])
+            ultimos = total['plantilla'][-12:]
+            total['rotacion_anual'] = round(
+                sum(total['bajas'][-12:]) / (sum(ultimos) / len(ultimos)), 4
+            ) if ultimos and sum(ultimos) else 0.0
+
+            return {
+                'meses': [_etiqueta(m) for m in range(primero, ultimo + 1)],
+                'departamentos': departamentos,
+                'total': total,
+                'sin_fecha_baja': len(filas) - len(validas),
+                'motor': 'numpy' if np is not None else 'python'
+            }
+
+        return _con_cache(clave, calcular)
+
+
+def costos(anios: int = 5, id_departamento: Optional[int] = None,
+           hasta: Optional[str] = None) -> Dict:
+    """
+    Coste mensual de nómina por departamento y total, con su tendencia.
+
+    Args:
+        anios: Años hacia atrás que cubre el informe (1-10)
+        id_departamento: Limitar a un departamento (opcional)
+        hasta: Último mes del informe (YYYY-MM, por defecto el actual)
+
+    Returns:
+        Dict con 'meses', 'departamentos' y 'total'; cada serie incluye
+        salario_base, bonificaciones, deducciones, salario_neto y empleados
+        pagados por mes, y el total además la pendiente mensual del neto
+    """
+    primero, ultimo = _rango_meses(anios, hasta)
+    meses = ultimo - primero + 1
+    campos = ('salario_base', 'bonificaciones', 'deducciones', 'salario_neto', 'empleados')
+
+    with get_db() as conn:
+        clave = ('costos', primero, ultimo, id_departamento,
+                 _versiones(conn, ('Departamentos', 'Empleados', 'Nomina')))
+
+        def calcular() -> Dict:
+            # anio BETWEEN usa idx_nomina_periodo; el filtro fino va por índice de mes.
+            # Los meses anteriores al horizonte de archivo se leen también del archivo
+            nomina = archivo.fuente(conn, 'Nomina', f"{primero // 12:04d}-{primero % 12 + 1:02d}-01")
+            # El alias no puede llamarse 'mes': en GROUP BY, SQLite resolvería
+            # 'mes' como la columna n.mes y sumaría el mismo mes de años distintos
+            query = f"""
+                SELECT COALESCE(e.id_departamento, 0) AS dep,
+                       n.anio * 12 + n.mes - 1 AS periodo,
+                       SUM(COALESCE(n.salario_base, 0)),
+                       SUM(COALESCE(n.bonificaciones, 0)),
+                       SUM(COALESCE(n.deducciones, 0)),
+                       SUM(COALESCE(n.salario_neto, 0)),
+                       COUNT(DISTINCT n.id_empleado)
+                FROM {nomina} n
+                LEFT JOIN Empleados e ON e.id_empleado = n.id_empleado
+                WHERE n.anio BETWEEN ? AND ?
+                  AND n.anio * 12 + n.mes - 1 BETWEEN ? AND ?
+                  AND n.eliminado_en IS NULL
+            """
+            params: List = [primero // 12, ultimo // 12, primero, ultimo]
+            if id_departamento is not None:
+                query += " AND e.id_departamento = ?"
+                params.append(id_departamento)
+            query += " GROUP BY dep, periodo"
+
+            series: Dict[int, Dict[str, List[float]]] = {}
+            for row in conn.execute(query, params).fetchall():
+                serie = series.setdefault(row[0], {campo: [0] * meses for campo in campos})
+                for j, campo in enumerate(campos):
+                    serie[campo][row[1] - primero] = round(row[2 + j], 2)
+            nombres = _departamentos(conn)
+
+            total = {campo: [round(sum(s[campo][m] for s in series.values()), 2)
+                             for m in range(meses)] for campo in campos}
+            total['tendencia_mensual_neto'] = round(pendiente(total['salario_neto']), 2)
+
+            return {
+                'meses': [_etiqueta(m) for m in range(primero, ultimo + 1)],
+                'departamentos': [dict(
+                    {'id_departamento': dep or None, 'nombre_departamento': nombres.get(dep)},
+                    **series[dep]
+                ) for dep in sorted(series)],
+                'total': total
+            }
+
+        return _con_cache(clave, calcular)
+
+
+# Agrupaciones admitidas por el informe de evaluaciones: expresión SQL del grupo
+AGRUPACIONES_EVALUACIONES = {
+    'departamento': 'COALESCE(e.id_departamento, 0)',
+    'puesto': 'COALESCE(e.id_puesto, 0)',
+    'empleado': 'ev.id_empleado',
+    'total': '0'
+}
+
+# Percentiles que devuelve el informe de evaluaciones
+_PERCENTILES = {'p10': 0.1, 'mediana': 0.5, 'p90': 0.9}
+
+
+def _nombres_grupo(conn, agrupar: str) -> Dict[int, str]:
+    if agrupar == 'departamento':
+        return _departamentos(conn)
+    if agrupar == 'puesto':
+        nombres = {row[0]: row[1] for row in conn.execute(
+            "SELECT id_puesto, nombre_puesto FROM Puestos").fetchall()}
+        nombres[0] = 'Sin puesto'
+        return nombres
+    if agrupar == 'empleado':
+        return {row[0]: f"{row[1]} {row[2]}" for row in conn.execute(
+            "SELECT id_empleado, nombre, apellido FROM Empleados").fetchall()}
+    return {0: 'Total'}
+
+
+def evaluaciones(agrupar: str = 'departamento', anio: Optional[int] = None) -> Dict:
+    """
+    Estadísticas de puntaje de las evaluaciones por grupo.
+
+    Todo se calcula en SQLite: media, mínimo, máximo y la pendiente de la
+    recta de mínimos cuadrados (puntos por año) con agregados; la mediana y
+    los percentiles 10 y 90 (interpolación lineal) con ROW_NUMBER() y
+    COUNT(*) OVER, leyendo solo las dos filas que rodean cada percentil. Con
+    agrupar='empleado' se añade el percentil de cada empleado dentro de su
+    departamento (PERCENT_RANK sobre su media).
+
+    Args:
+        agrupar: 'departamento', 'puesto', 'empleado' o 'total'
+        anio: Limitar a las evaluaciones de un año (opcional)
+
+    Returns:
+        Dict con 'agrupar', 'anio', 'grupos' y 'total'
+    """
+    if agrupar not in AGRUPACIONES_EVALUACIONES:
+        raise ValueError(f"agrupar debe ser uno de: {', '.join(AGRUPACIONES_EVALUACIONES)}")
+    if anio is not None and not 1900 <= anio <= 9999:
+        raise ValueError("anio no es válido")
+
+    with get_db() as conn:
+        clave = ('evaluaciones', agrupar, anio,
+                 _versiones(conn, ('Departamentos', 'Empleados', 'Evaluaciones', 'Puestos')))
+
+        def calcular() -> Dict:
+            grupos = _estadisticas_evaluaciones(conn, agrupar, anio)
+            total = _estadisticas_evaluaciones(conn, 'total', anio)
+            return {
+                'agrupar': agrupar,
+                'anio': anio,
+                'grupos': grupos,
+                'total': total[0] if total else None
+            }
+
+        return _con_cache(clave, calcular)
+
+
+def _estadisticas_evaluaciones(conn, agrupar: str, anio: Optional[int]) -> List[Dict]:
+    grupo = AGRUPACIONES_EVALUACIONES[agrupar]
+    filtro, params = "ev.puntaje IS NOT NULL", []
+    if anio is not None:
+        # Rango sobre fecha para usar idx_evaluaciones_fecha
+        filtro += " AND ev.fecha >= ? AND ev.fecha < ?"
+        params += [f"{anio:04d}-01-01", f"{anio + 1:04d}-01-01"]
+    base = f"""
+        SELECT {grupo} AS grupo, ev.id_empleado, e.id_departamento, ev.puntaje,
+               (julianday(ev.fecha) - julianday('2000-01-01')) / 365.25 AS x
+        FROM Evaluaciones ev
+        LEFT JOIN Empleados e ON e.id_empleado = ev.id_empleado
+        WHERE {filtro}
+    """
+
+    resultado: Dict[int, Dict] = {}
+    for row in conn.execute(f"""
+        SELECT grupo, COUNT(*) AS n, AVG(puntaje) AS media, MIN(puntaje) AS minimo,
+               MAX(puntaje) AS maximo, COUNT(x) AS nx, SUM(x) AS sx, SUM(x * x) AS sxx,
+               SUM(x * puntaje) AS sxy, SUM(CASE WHEN x IS NOT NULL THEN puntaje END) AS sy
+        FROM ({base})
+        GROUP BY grupo
+    """, params).fetchall():
+        denominador = row['nx'] * row['sxx'] - row['sx'] ** 2 if row['nx'] > 1 else 0
+        resultado[row['grupo']] = {
+            'grupo': row['grupo'],
+            'evaluaciones': row['n'],
+            'media': round(row['media'], 2),
+            'minimo': row['minimo'],
+            'maximo': row['maximo'],
+            'tendencia_anual': round((row['nx'] * row['sxy'] - row['sx'] * row['sy']) / denominador, 4)
+            if denominador > 1e-9 else 0.0
+        }
+
+    # Solo las filas que rodean cada percentil: rn = floor(h) y floor(h) + 1
+    posiciones = ' OR '.join(
+        f"rn BETWEEN CAST(1 + {p} * (n - 1) AS INTEGER) AND CAST(1 + {p} * (n - 1) AS INTEGER) + 1"
+        for p in _PERCENTILES.values())
+    valores: Dict[int, Dict[int, float]] = {}
+    tamanos: Dict[int, int] = {}
+    for row in conn.execute(f"""
+        SELECT grupo, rn, n, puntaje FROM (
+            SELECT grupo, puntaje,
+                   ROW_NUMBER() OVER (PARTITION BY grupo ORDER BY puntaje) AS rn,
+                   COUNT(*) OVER (PARTITION BY grupo) AS n
+            FROM ({base})
+        )
+        WHERE {posiciones}
+    """, params).fetchall():
+        valores.setdefault(row['grupo'], {})[row['rn']] = row['puntaje']
+        tamanos[row['grupo']] = row['n']
+    for g, filas in valores.items():
+        n = tamanos[g]
+        for nombre, p in _PERCENTILES.items():
+            h = 1 + p * (n - 1)
+            bajo = int(h)
+            alto = filas.get(bajo + 1, filas[bajo])
+            resultado[g][nombre] = round(filas[bajo] + (h - bajo) * (alto - filas[bajo]), 2)
+
+    if agrupar == 'empleado':
+        for row in conn.execute(f"""
+            SELECT grupo, PERCENT_RANK() OVER (
+                PARTITION BY id_departamento ORDER BY AVG(puntaje)
+            ) AS percentil
+            FROM ({base})
+            GROUP BY grupo
+        """, params).fetchall():
+            resultado[row['grupo']]['percentil_departamento'] = round(row['percentil'], 4)
+
+    nombres = _nombres_grupo(conn, agrupar)
+    grupos = []
+    for g in sorted(resultado):
+        estadisticas = resultado.pop(g)
+        del estadisticas['grupo']
+        grupos.append(dict({'id': g or None, 'nombre': nombres.get(g)}, **estadisticas))
+    return grupos
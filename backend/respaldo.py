@@ -0,0 +1,296 @@
+"""
+Respaldos en caliente de la base de datos con la API de backup de SQLite.
+
+La copia se hace por lotes de páginas con una pausa entre lotes, de modo que
+la aplicación puede seguir escribiendo mientras se respalda. Cada respaldo
+puede comprimirse con gzip, se verifica abriéndolo y ejecutando
+PRAGMA integrity_check, y los más antiguos se eliminan según la retención
+configurada.
+
+Uso:
+    python respaldo.py [crear] [--sin-comprimir] [--sin-verificar]
+    python respaldo.py listar
+    python respaldo.py verificar <archivo>
+    python respaldo.py restaurar <archivo>
+"""
+import gzip
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from database import get_connection, config, motor, rutas
+
+
+def _directorio() -> Path:
+    directorio = rutas().respaldos
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def _archivos_respaldo() -> List[Path]:
+    """Respaldos existentes (.db y .db.gz), del más reciente al más antiguo."""
+    directorio = _directorio()
+    archivos = list(directorio.glob('rrhh-*.db')) + list(directorio.glob('rrhh-*.db.gz'))
+    return sorted(archivos, key=lambda archivo: archivo.name, reverse=True)
+
+
+def _reservar_archivo(directorio: Path) -> Path:
+    """
+    Crea vacío, en exclusiva, el archivo de un respaldo nuevo. El nombre lleva
+    microsegundos; si aun así ya existe (o su .gz), se prueba con el siguiente
+    instante en lugar de sobrescribirlo.
+    """
+    while True:
+        nombre = f"rrhh-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.db"
+        if (directorio / f"{nombre}.gz").exists():
+            continue
+        try:
+            with open(directorio / nombre, 'xb'):
+                pass
+        except FileExistsError:
+            continue
+        return directorio / nombre
+
+
+def _copiar_con_backup(origen: sqlite3.Connection, destino: sqlite3.Connection,
+                       paginas: int, pausa: float) -> int:
+    """Copia origen en destino por lotes de páginas; devuelve las páginas copiadas."""
+    total = {'paginas': 0}
+
+    def progreso(status, restantes, total_paginas):
+        total['paginas'] = total_paginas
+        # Ceder el bloqueo entre lotes para no bloquear a los escritores
+        if restantes and pausa:
+            time.sleep(pausa)
+
+    origen.backup(destino, pages=paginas, progress=progreso)
+    return total['paginas']
+
+
+def verificar_respaldo(ruta: Path) -> Dict:
+    """
+    Comprueba que un respaldo se puede abrir y está íntegro.
+
+    Args:
+        ruta: Archivo .db o .db.gz
+
+    Returns:
+        Dict con 'valido', el resultado de integrity_check, las tablas y la
+        versión del esquema del respaldo
+    """
+    ruta = Path(ruta)
+    with tempfile.TemporaryDirectory() as tmp:
+        archivo = ruta
+        if ruta.suffix == '.gz':
+            archivo = Path(tmp) / ruta.stem
+            with gzip.open(ruta, 'rb') as entrada, open(archivo, 'wb') as salida:
+                shutil.copyfileobj(entrada, salida)
+
+        conn = sqlite3.connect(f"file:{archivo}?mode=ro", uri=True)
+        try:
+            integridad = conn.execute("PRAGMA integrity_check").fetchone()[0]
+            tablas = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name"
+            ).fetchall()]
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+
+    return {
+        'valido': integridad == 'ok',
+        'integrity_check': integridad,
+        'tablas': tablas,
+        'version_esquema': version
+    }
+
+
+def rotar_respaldos(retencion: Optional[int] = None) -> List[str]:
+    """
+    Elimina los respaldos más antiguos dejando los 'retencion' más recientes.
+
+    Returns:
+        Lista de archivos eliminados
+    """
+    retencion = config.RESPALDOS_RETENCION if retencion is None else retencion
+    eliminados = []
+    for archivo in _archivos_respaldo()[retencion:]:
+        archivo.unlink()
+        eliminados.append(archivo.name)
+    return eliminados
+
+
+def crear_respaldo(comprimir: bool = True, verificar: bool = True,
+                   paginas: Optional[int] = None, pausa: Optional[float] = None) -> Dict:
+    """
+    Crea un respaldo consistente de la base de datos en caliente.
+
+    Args:
+        comprimir: Si es True, guarda el respaldo comprimido con gzip
+        verificar: Si es True, verifica la integridad del respaldo creado
+        paginas: Páginas por lote (por defecto Config.RESPALDOS_PAGINAS_POR_PASO)
+        pausa: Segundos entre lotes (por defecto Config.RESPALDOS_PAUSA)
+
+    Returns:
+        Dict con el archivo creado, tamaños, duración, rendimiento, resultado
+        de la verificación y respaldos eliminados por la rotación
+    """
+    motor.requiere_sqlite("Los respaldos")
+    paginas = paginas or config.RESPALDOS_PAGINAS_POR_PASO
+    pausa = config.RESPALDOS_PAUSA if pausa is None else pausa
+    directorio = _directorio()
+    destino_db = _reservar_archivo(directorio)
+    nombre = destino_db.name
+
+    inicio = time.perf_counter()
+    origen = get_connection()
+    destino = sqlite3.connect(str(destino_db))
+    try:
+        total_paginas = _copiar_con_backup(origen, destino, paginas, pausa)
+        # El respaldo debe ser un único archivo autocontenido, sin -wal
+        destino.execute("PRAGMA journal_mode = DELETE")
+    except Exception:
+        destino.close()
+        destino_db.unlink(missing_ok=True)
+        raise
+    finally:
+        destino.close()
+        origen.close()
+    duracion_copia = time.perf_counter() - inicio
+    bytes_db = destino_db.stat().st_size
+
+    archivo = destino_db
+    if comprimir:
+        archivo = directorio / f"{nombre}.gz"
+        with open(destino_db, 'rb') as entrada, gzip.open(archivo, 'wb', compresslevel=6) as salida:
+            shutil.copyfileobj(entrada, salida)
+        destino_db.unlink()
+
+    resultado = {
+        'archivo': archivo.name,
+        'paginas': total_paginas,
+        'bytes_db': bytes_db,
+        'bytes_archivo': archivo.stat().st_size,
+        'duracion_copia_ms': int(duracion_copia * 1000),
+        'mb_por_segundo': round(bytes_db / 1_048_576 / duracion_copia, 2) if duracion_copia else None
+    }
+
+    if verificar:
+        verificacion = verificar_respaldo(archivo)
+        resultado['verificacion'] = verificacion
+        if not verificacion['valido']:
+            raise RuntimeError(f"El respaldo {archivo.name} no superó la verificación: "
+                               f"{verificacion['integrity_check']}")
+
+    resultado['eliminados'] = rotar_respaldos()
+    resultado['duracion_ms'] = int((time.perf_counter() - inicio) * 1000)
+    return resultado
+
+
+def listar_respaldos() -> List[Dict]:
+    """Devuelve los respaldos existentes, del más reciente al más antiguo."""
+    return [{
+        'archivo': archivo.name,
+        'bytes': archivo.stat().st_size,
+        'creado': datetime.fromtimestamp(archivo.stat().st_mtime).isoformat(timespec='seconds')
+    } for archivo in _archivos_respaldo()]
+
+
+def _vaciar_caches() -> None:
+    """Vacía las cachés en proceso con datos leídos de la base de datos (informes, contratos y cursos)."""
+    import reportes
+    from models import contrato, curso
+    for modulo in (reportes, contrato, curso):
+        modulo._invalidar_cache()
+
+
+def restaurar_respaldo(nombre: str) -> Dict:
+    """
+    Restaura un respaldo sobre la base de datos activa con la API de backup,
+    después de verificarlo. Las conexiones abiertas verán los datos
+    restaurados y las cachés en proceso se vacían.
+
+    Las particiones de asistencias no forman parte del respaldo: después de
+    restaurar se comprueba que el registro de años cerrados coincide con
+    sus archivos y los problemas se devuelven en 'particiones'.
+    """
+    ruta = _directorio() / Path(nombre).name
+    if not ruta.exists():
+        raise ValueError(f"El respaldo {nombre} no existe")
+    verificacion = verificar_respaldo(ruta)
+    if not verificacion['valido']:
+        raise ValueError(f"El respaldo {nombre} no superó la verificación")
+
+    inicio = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        archivo = ruta
+        if ruta.suffix == '.gz':
+            archivo = Path(tmp) / ruta.stem
+            with gzip.open(ruta, 'rb') as entrada, open(archivo, 'wb') as salida:
+                shutil.copyfileobj(entrada, salida)
+        origen = sqlite3.connect(str(archivo))
+        destino = sqlite3.connect(str(rutas().datos))
+        try:
+            origen.backup(destino)
+        finally:
+            destino.close()
+            origen.close()
+    _vaciar_caches()
+
+    resultado = {'archivo': ruta.name, 'duracion_ms': int((time.perf_counter() - inicio) * 1000),
+                 'particiones': {}}
+    if motor.sqlite:
+        import particiones
+        resultado['particiones'] = {anio: problemas for anio, problemas in particiones.verificar().items()
+                                    if problemas}
+    return resultado
+
+
+def main(argv=None) -> bool:
+    """Punto de entrada de la línea de comandos."""
+    argv = sys.argv[1:] if argv is None else argv
+    comando = argv[0] if argv and not argv[0].startswith('--') else 'crear'
+
+    print("=" * 60)
+    print("RESPALDO DE LA BASE DE DATOS")
+    print("=" * 60)
+
+    try:
+        if comando == 'crear':
+            r = crear_respaldo(comprimir='--sin-comprimir' not in argv,
+                               verificar='--sin-verificar' not in argv)
+            print(f"[OK] Respaldo creado: {r['archivo']}")
+            print(f"     {r['paginas']} páginas, {r['bytes_db']} bytes -> {r['bytes_archivo']} bytes")
+            print(f"     Copia: {r['duracion_copia_ms']} ms ({r['mb_por_segundo']} MB/s), "
+                  f"total: {r['duracion_ms']} ms")
+            for eliminado in r['eliminados']:
+                print(f"     Eliminado por retención: {eliminado}")
+        elif comando == 'listar':
+            for respaldo in listar_respaldos():
+                print(f"  - {respaldo['archivo']:32} {respaldo['bytes']:>12} bytes  {respaldo['creado']}")
+        elif comando == 'verificar' and len(argv) > 1:
+            r = verificar_respaldo(_directorio() / Path(argv[1]).name)
+            print(f"[{'OK' if r['valido'] else 'ERROR'}] integrity_check: {r['integrity_check']}, "
+                  f"{len(r['tablas'])} tablas, versión {r['version_esquema']}")
+            return r['valido']
+        elif comando == 'restaurar' and len(argv) > 1:
+            r = restaurar_respaldo(argv[1])
+            print(f"[OK] Respaldo {r['archivo']} restaurado ({r['duracion_ms']} ms)")
+            for anio, problemas in r['particiones'].items():
+                for problema in problemas:
+                    print(f"[!] Partición {anio}: {problema}")
+        else:
+            print(f"[ERROR] Comando desconocido o incompleto: {' '.join(argv)}")
+            return False
+    except Exception as e:
+        print(f"[ERROR] Error durante el respaldo: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
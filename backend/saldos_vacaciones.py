@@ -0,0 +1,38 @@
+"""
+Reconstrucción de los saldos de vacaciones.
+
+Recalcula en una sola pasada, por lotes de empleados, el libro de
+movimientos (devengos mensuales y consumos de vacaciones aprobadas) y el
+saldo de cada empleado. Útil tras cambiar VACACIONES_DIAS_ANUALES, corregir
+fechas de ingreso o importar solicitudes directamente en la base de datos.
+
+Uso:
+    python saldos_vacaciones.py [--lote N]
+"""
+import sys
+from database import init_db
+from models.saldo_vacaciones import SaldoVacaciones
+
+
+def main(argv=None) -> bool:
+    """Punto de entrada de la línea de comandos."""
+    argv = sys.argv[1:] if argv is None else argv
+    lote = int(argv[argv.index('--lote') + 1]) if '--lote' in argv else None
+
+    print("=" * 60)
+    print("RECONSTRUCCION DE SALDOS DE VACACIONES")
+    print("=" * 60)
+
+    try:
+        init_db()
+        r = SaldoVacaciones.reconstruir(lote)
+    except Exception as e:
+        print(f"[ERROR] Error al reconstruir los saldos: {str(e)}")
+        return False
+
+    print(f"[OK] {r['empleados']} empleados, {r['movimientos']} movimientos en {r['lotes']} lotes")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
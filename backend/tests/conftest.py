@@ -0,0 +1,83 @@
+"""
+Configuración común de las pruebas del backend.
+
+Las pruebas usan la configuración de testing (bases de datos en /tmp/test_rrhh*)
+y cada una parte de una base de datos recién creada.
+
+Uso (desde backend/):
+    python -m pytest -q tests
+
+Con DATABASE_ENGINE distinto de sqlite solo corren las pruebas marcadas
+con 'motores' (tests/test_conformidad_motores.py); las demás cubren
+funciones que solo existen con SQLite.
+"""
+import os
+import shutil
+import sys
+from glob import glob
+from pathlib import Path
+
+os.environ['FLASK_ENV'] = 'testing'
+# config.py valida la configuración de producción al importarse
+os.environ.setdefault('SECRET_KEY', 'clave-de-pruebas')
+os.environ.setdefault('CORS_ORIGINS', '*')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest  # noqa: E402
+
+import database  # noqa: E402
+import empresas  # noqa: E402
+import reportes  # noqa: E402
+from models import contrato, curso  # noqa: E402
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'motores: pruebas que corren con cualquier motor de almacenamiento')
+
+
+def pytest_collection_modifyitems(config, items):
+    if database.motor.sqlite:
+        return
+    omitir = pytest.mark.skip(reason=f"solo con SQLite (motor {database.motor.nombre})")
+    for item in items:
+        if 'motores' not in item.keywords:
+            item.add_marker(omitir)
+
+
+def _borrar_archivos_prueba() -> None:
+    """Elimina las bases de datos, particiones y empresas de prueba de /tmp."""
+    for ruta in glob('/tmp/test_rrhh*'):
+        if os.path.isdir(ruta):
+            shutil.rmtree(ruta, ignore_errors=True)
+        else:
+            os.remove(ruta)
+
+
+def _limpiar_estado() -> None:
+    """Vacía las cachés en proceso y cierra las empresas abiertas."""
+    for modulo in (reportes, contrato, curso):
+        modulo._invalidar_cache()
+    with empresas._abiertas_lock:
+        for empresa in empresas._abiertas.values():
+            empresa.motor.cerrar()
+        empresas._abiertas.clear()
+    empresas._inicializadas.clear()
+
+
+@pytest.fixture
+def bd():
+    """Base de datos de pruebas vacía con el esquema completo."""
+    _limpiar_estado()
+    _borrar_archivos_prueba()
+    database.init_db()
+    yield database
+    _limpiar_estado()
+    _borrar_archivos_prueba()
+
+
+@pytest.fixture
+def cliente(bd):
+    """Cliente de pruebas de la API sobre la base de datos de pruebas."""
+    from app import app
+    app.config['TESTING'] = True
+    return app.test_client()
@@ -0,0 +1,51 @@
+"""Pruebas del archivo de nóminas antiguas (archivo.py)."""
+import pytest
+
+import archivo
+from database import get_connection
+from models.empleado import Empleado
+from models.nomina import Nomina
+
+
+def _crear_nominas():
+    id_empleado = Empleado.create('Ana', 'López')['id_empleado']
+    antigua = Nomina.create(id_empleado, mes=1, anio=2020, salario_base=1000)['id_nomina']
+    reciente = Nomina.create(id_empleado, mes=9, anio=2026, salario_base=1200)['id_nomina']
+    return antigua, reciente
+
+
+def test_archivar_mueve_las_antiguas_y_siguen_legibles(bd):
+    antigua, reciente = _crear_nominas()
+
+    resultado = archivo.archivar(meses=12)
+
+    assert resultado['Nomina']['archivadas'] == 1
+    assert archivo.estado()['tablas']['Nomina']['principal'] == 1
+    assert Nomina.get_by_id(antigua)['anio'] == 2020
+    assert {n['id_nomina'] for n in Nomina.get_all()} == {antigua, reciente}
+    assert [n['id_nomina'] for n in Nomina.get_all(anio=2026)] == [reciente]
+
+
+def test_nomina_archivada_es_de_solo_lectura(bd):
+    antigua, _ = _crear_nominas()
+    archivo.archivar(meses=12)
+
+    with pytest.raises(ValueError):
+        Nomina.update(antigua, salario_base=1)
+    with pytest.raises(ValueError):
+        Nomina.delete(antigua)
+
+
+def test_adjuntar_deja_la_transaccion_al_llamador(bd):
+    conn = get_connection()
+    try:
+        archivo.adjuntar(conn)
+        assert not conn.in_transaction
+        conn.execute("INSERT INTO Departamentos (nombre_departamento) VALUES ('Ventas')")
+        archivo.adjuntar(conn)
+        # Ya adjunto: no toca la transacción en curso
+        assert conn.in_transaction
+        conn.rollback()
+        assert conn.execute("SELECT COUNT(*) FROM Departamentos").fetchone()[0] == 0
+    finally:
+        conn.close()
@@ -0,0 +1,41 @@
+"""Pruebas del registro de cambios (cambios.py)."""
+import cambios
+from database import get_db
+from models.empleado import Empleado
+
+
+def test_cambios_en_orden_y_paginados(bd):
+    empleado = Empleado.create('Ana', 'López')
+    with get_db() as conn:
+        conn.execute("UPDATE Empleados SET apellido = 'García' WHERE id_empleado = ?",
+                     (empleado['id_empleado'],))
+    Empleado.delete(empleado['id_empleado'])
+
+    primera = cambios.listar(0, limite=2, tablas=['Empleados'])
+    assert [c['operacion'] for c in primera['cambios']] == ['INSERT', 'UPDATE']
+    assert primera['cambios'][1]['datos']['apellido'] == 'García'
+    assert primera['hay_mas'] and not primera['reiniciar']
+
+    segunda = cambios.listar(primera['ultimo'], limite=2, tablas=['Empleados'])
+    assert [c['operacion'] for c in segunda['cambios']] == ['DELETE']
+    assert not segunda['hay_mas']
+    assert cambios.listar(segunda['ultimo'])['cambios'] == []
+
+
+def test_filtro_por_tabla_avanza_el_cursor(bd):
+    Empleado.create('Ana', 'López')
+
+    resultado = cambios.listar(0, tablas=['Nomina'])
+
+    assert resultado['cambios'] == []
+    assert resultado['ultimo'] > 0
+
+
+def test_consumidor_atrasado_tras_purgar_debe_reiniciar(bd):
+    Empleado.create('Ana', 'López')
+    Empleado.create('Luis', 'Gil')
+
+    assert cambios.purgar(dias=-1)['eliminados'] > 0
+
+    assert cambios.listar(0)['reiniciar']
+    assert not cambios.listar(cambios.listar(0)['ultimo'])['reiniciar']
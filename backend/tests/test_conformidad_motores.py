@@ -0,0 +1,268 @@
+"""
+Pruebas de conformidad de los motores de almacenamiento (motores.py).
+
+Las mismas comprobaciones (traducción de marcadores, claves con RETURNING,
+CRUD de los modelos, transacciones y pool de conexiones) corren con el
+motor configurado. Por defecto es SQLite; con PostgreSQL solo se ejecutan
+estas pruebas (las demás son de funciones solo de SQLite) y deben correr
+contra una base de datos desechable:
+
+    DATABASE_ENGINE=postgresql DATABASE_URL=postgresql://postgres@localhost:5432/rrhh_pruebas \\
+        python -m pytest -q tests/test_conformidad_motores.py
+"""
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import pytest
+
+import database
+import migraciones
+import motores
+from database import config, get_db, motor
+from motores import traducir
+from models import Capacitacion, Contrato, Curso, Empleado, Nomina, VacacionPermiso
+
+pytestmark = pytest.mark.motores
+
+# Tablas de las migraciones que solo usan funciones de SQLite
+# (requiere_sqlite()) y no están en database._ESQUEMA_OTROS_MOTORES
+_SOLO_SQLITE = {
+    'schema_version', 'migracion_progreso', 'Notificaciones_Salida', 'Versiones_Tabla',
+    'Trabajos', 'Cambios', 'Archivo_Horizontes', 'Particiones_Asistencias', 'Replica_Control'
+}
+# Índices solo de los demás motores (sustituye al R*Tree de Vacaciones_Permisos)
+_SOLO_OTROS_MOTORES = {'idx_vacaciones_periodo'}
+
+
+@pytest.fixture
+def creados(bd):
+    """IDs de los empleados creados; sus registros se borran al terminar."""
+    ids = []
+    yield ids
+    if ids:
+        marcas = ', '.join('?' * len(ids))
+        with get_db() as conn:
+            for tabla in ('Vacaciones_Saldo_Movimientos', 'Vacaciones_Saldos', 'Vacaciones_Permisos',
+                          'Capacitaciones', 'Nomina', 'Contratos', 'Eventos', 'Empleados'):
+                conn.execute(f"DELETE FROM {tabla} WHERE id_empleado IN ({marcas})", ids)
+    motor.cerrar()
+
+
+@pytest.fixture
+def empleado(creados):
+    """Crea un empleado de prueba y lo apunta para borrarlo al terminar."""
+    def crear(**campos):
+        nuevo = Empleado.create(campos.pop('nombre', 'Prueba'), campos.pop('apellido', 'Conformidad'),
+                                **campos)
+        creados.append(nuevo['id_empleado'])
+        return nuevo
+    return crear
+
+
+@pytest.mark.parametrize('entrada, esperado', [
+    ("SELECT * FROM T WHERE a = ? AND b = ?", "SELECT * FROM T WHERE a = %s AND b = %s"),
+    ("SELECT :fecha, :fecha", "SELECT %(fecha)s, %(fecha)s"),
+    ("SELECT '?', ':x', 'a%' FROM T WHERE c LIKE ?", "SELECT '?', ':x', 'a%%' FROM T WHERE c LIKE %s"),
+    ("SELECT 'it''s ?' , x::text FROM T", "SELECT 'it''s ?' , x::text FROM T"),
+    ("SELECT 10 % 3", "SELECT 10 %% 3"),
+])
+def test_traduccion_de_marcadores(entrada, esperado):
+    assert traducir(entrada) == esperado
+
+
+def test_parametros_posicionales_y_con_nombre(bd):
+    with get_db() as conn:
+        row = conn.execute("SELECT ? AS a, ? AS b, '50%' AS c", (1, 'x')).fetchone()
+        assert (row['a'], row['b'], row['c']) == (1, 'x', '50%')
+        assert row[0] == 1 and dict(row)['c'] == '50%'
+        row = conn.execute("SELECT :n AS n, :n AS m", {'n': 7}).fetchone()
+        assert (row['n'], row['m']) == (7, 7)
+
+
+def test_returning_devuelve_claves_crecientes(empleado):
+    primero = empleado()
+    segundo = empleado()
+    assert isinstance(primero['id_empleado'], int)
+    assert segundo['id_empleado'] > primero['id_empleado']
+
+
+def test_crud_de_empleado(empleado):
+    id_empleado = empleado(nombre='Ana', correo='ana@prueba.test', fecha_ingreso='2024-02-01',
+                           estado='Activo')['id_empleado']
+
+    assert Empleado.get_by_id(id_empleado)['correo'] == 'ana@prueba.test'
+    actualizado = Empleado.update(id_empleado, estado='Suspendido')
+    assert (actualizado['estado'], actualizado['nombre']) == ('Suspendido', 'Ana')
+    assert any(e['id_empleado'] == id_empleado for e in Empleado.get_all())
+    assert Empleado.delete(id_empleado) is True
+    assert Empleado.get_by_id(id_empleado) is None
+    assert Empleado.delete(id_empleado) is False
+
+
+def test_nomina_con_salario_del_contrato_vigente(empleado):
+    id_empleado = empleado()['id_empleado']
+    Contrato.create(id_empleado, 'Permanente', '2024-01-01', None, 1234.5)
+    nomina = Nomina.create(id_empleado, 3, 2024, fecha_pago='2024-03-31', bonificaciones=10.25)
+    Nomina.create(id_empleado, 3, 2023, salario_base=1000, fecha_pago='2023-03-31')
+
+    assert nomina['salario_base'] == 1234.5 and isinstance(nomina['salario_base'], float)
+    assert len(Nomina.get_by_empleado(id_empleado)) == 2
+    assert [n['anio'] for n in Nomina.get_by_empleado(id_empleado, 2024)] == [2024]
+    assert Nomina.update(nomina['id_nomina'], deducciones=5)['deducciones'] == 5
+    assert Nomina.delete(nomina['id_nomina']) is True
+    assert Nomina.get_by_id(nomina['id_nomina']) is None
+    assert all(n['id_nomina'] != nomina['id_nomina'] for n in Nomina.get_all())
+
+
+def test_aritmetica_de_fechas(empleado):
+    id_empleado = empleado()['id_empleado']
+    hoy = date(2030, 1, 10)
+    contrato = Contrato.create(id_empleado, 'Temporal', '2029-01-01',
+                               (hoy + timedelta(days=12)).isoformat(), 900)
+
+    por_vencer = {c['id_contrato']: c for c in Contrato.get_por_vencer(30, hoy.isoformat())}
+    assert por_vencer[contrato['id_contrato']]['dias_restantes'] == 12
+    assert contrato['id_contrato'] not in {c['id_contrato'] for c in
+                                           Contrato.get_por_vencer(7, hoy.isoformat())}
+    assert Contrato.get_vigente(id_empleado, '2029-06-01')['id_contrato'] == contrato['id_contrato']
+
+
+def test_catalogo_de_cursos_sin_duplicados(empleado):
+    id_empleado = empleado()['id_empleado']
+    primera = Capacitacion.create(id_empleado, 'Curso de conformidad', 'Instituto', '2024-01-01', '2024-01-31')
+    segunda = Capacitacion.create(id_empleado, '  curso de CONFORMIDAD ', 'instituto', '2024-02-01', '2024-02-28')
+
+    assert primera['id_curso'] is not None
+    assert primera['id_curso'] == segunda['id_curso']
+
+
+def test_tasas_de_certificacion_por_departamento(empleado):
+    marca = f"Conformidad-{threading.get_ident()}"
+    with get_db() as conn:
+        id_departamento = database.insertar(conn.cursor(), "INSERT INTO Departamentos (nombre_departamento) VALUES (?)",
+                                            (marca,), 'id_departamento')
+    try:
+        certificada = empleado(id_departamento=id_departamento)['id_empleado']
+        empleado(id_departamento=id_departamento)
+        Capacitacion.create(certificada, 'Curso de tasas', 'Instituto', '2024-01-01', '2024-01-31',
+                            certificado=1)
+
+        tasas = {t['id_departamento']: t for t in Curso.get_tasas_departamento()}
+        assert tasas[id_departamento] == {'id_departamento': id_departamento, 'nombre_departamento': marca,
+                                          'empleados': 2, 'certificados': 1, 'tasa': 0.5}
+    finally:
+        with get_db() as conn:
+            conn.execute("UPDATE Empleados SET id_departamento = NULL WHERE id_departamento = ?",
+                         (id_departamento,))
+            conn.execute("DELETE FROM Departamentos WHERE id_departamento = ?", (id_departamento,))
+
+
+def test_vacaciones_solapadas_rechazadas(empleado):
+    id_empleado = empleado(fecha_ingreso='2020-01-01')['id_empleado']
+    VacacionPermiso.create(id_empleado, 'Vacaciones', '2031-01-01', '2031-07-01', '2031-07-10', 'Aprobado')
+
+    with pytest.raises(ValueError):
+        VacacionPermiso.create(id_empleado, 'Vacaciones', '2031-01-02', '2031-07-05', '2031-07-12', 'Aprobado')
+
+
+def test_error_en_get_db_deshace_la_transaccion(bd):
+    marca = f"transaccion-{threading.get_ident()}"
+    with pytest.raises(RuntimeError):
+        with get_db() as conn:
+            conn.execute("INSERT INTO Departamentos (nombre_departamento) VALUES (?)", (marca,))
+            raise RuntimeError("fallo provocado")
+
+    with get_db() as conn:
+        row = conn.execute("SELECT COUNT(*) FROM Departamentos WHERE nombre_departamento = ?",
+                           (marca,)).fetchone()
+    assert row[0] == 0
+
+
+def test_mas_hilos_que_conexiones_del_pool(empleado):
+    ids = [empleado()['id_empleado'] for _ in range(3)]
+    hilos = max(8, config.DB_POOL_MAX * 3)
+
+    def leer(i: int) -> int:
+        return Empleado.get_by_id(ids[i % len(ids)])['id_empleado']
+
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        resultados = list(ejecutor.map(leer, range(hilos * 5)))
+
+    assert len(resultados) == hilos * 5 and set(resultados) == set(ids)
+    if not motor.sqlite:
+        with get_db() as conn:
+            activas = conn.execute("""
+                SELECT COUNT(*) FROM pg_stat_activity WHERE datname = current_database()
+                AND application_name = current_setting('application_name')
+            """).fetchone()[0]
+        assert activas <= config.DB_POOL_MAX
+
+
+def _esquema_sqlite(ruta):
+    """Columnas de cada tabla y tabla de cada índice de una base de datos SQLite."""
+    conn = sqlite3.connect(str(ruta))
+    try:
+        tablas = {t: {c[1] for c in conn.execute(f"PRAGMA table_info('{t}')")}
+                  for (t,) in conn.execute("""
+                      SELECT name FROM sqlite_master
+                      WHERE type = 'table' AND name NOT LIKE 'sqlite_%' AND name NOT LIKE '%_rtree%'
+                  """)}
+        indices = dict(conn.execute("SELECT name, tbl_name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"))
+        return tablas, indices
+    finally:
+        conn.close()
+
+
+def _esquema_otros_motores():
+    """Tablas, columnas e índices que declara database._ESQUEMA_OTROS_MOTORES."""
+    tablas, columnas, indices = {}, set(), {}
+    for sentencia in database._ESQUEMA_OTROS_MOTORES:
+        sentencia = ' '.join(sentencia.split())
+        if m := re.match(r"ALTER TABLE (\w+) ADD COLUMN IF NOT EXISTS (\w+)", sentencia):
+            columnas.add(m.groups())
+        elif m := re.match(r"CREATE TABLE IF NOT EXISTS (\w+) \((.*)\)$", sentencia):
+            definiciones = [d.split()[0] for d in re.split(r",(?![^()]*\))", m.group(2))]
+            tablas[m.group(1)] = {d for d in definiciones
+                                  if d.upper() not in ('FOREIGN', 'UNIQUE', 'PRIMARY', 'CHECK')}
+        elif m := re.match(r"CREATE INDEX IF NOT EXISTS (\w+) ON (\w+)", sentencia):
+            indices[m.group(1)] = m.group(2)
+        else:
+            raise AssertionError(f"Sentencia no reconocida: {sentencia}")
+    return tablas, columnas, indices
+
+
+@pytest.mark.skipif(not motor.sqlite, reason="compara con el esquema de las migraciones de SQLite")
+def test_esquema_de_otros_motores_coincide_con_las_migraciones(bd, monkeypatch):
+    migradas, indices_migrados = _esquema_sqlite(config.DATABASE_PATH)
+    # Las tablas base de init_db() sin las migraciones, como en PostgreSQL
+    monkeypatch.setattr(database, 'motor', motores.MotorSQLite('/tmp/test_rrhh_base.db'))
+    monkeypatch.setattr(migraciones, 'aplicar_migraciones', lambda: None)
+    database.init_db()
+    base, indices_base = _esquema_sqlite('/tmp/test_rrhh_base.db')
+    tablas, columnas, indices = _esquema_otros_motores()
+
+    # Lo que declara el esquema directo existe igual tras las migraciones
+    for tabla, nombres in tablas.items():
+        assert migradas.get(tabla) == nombres, tabla
+    for tabla, columna in columnas:
+        assert columna in migradas[tabla], (tabla, columna)
+    for indice, tabla in indices.items():
+        if indice in _SOLO_OTROS_MOTORES:
+            continue
+        assert indices_migrados.get(indice, indices_base.get(indice)) == tabla, indice
+
+    # Y todo lo que añaden las migraciones está en el esquema directo
+    for tabla, nombres in migradas.items():
+        if tabla in _SOLO_SQLITE:
+            continue
+        if tabla not in base:
+            assert tabla in tablas, f"{tabla} falta en _ESQUEMA_OTROS_MOTORES"
+        else:
+            for columna in nombres - base[tabla]:
+                assert (tabla, columna) in columnas, f"{tabla}.{columna} falta en _ESQUEMA_OTROS_MOTORES"
+    for indice, tabla in indices_migrados.items():
+        if indice not in indices_base and tabla not in _SOLO_SQLITE:
+            assert indice in indices, f"{indice} falta en _ESQUEMA_OTROS_MOTORES"
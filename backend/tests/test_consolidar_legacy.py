@@ -0,0 +1,107 @@
+"""Pruebas de la consolidación de las tablas antiguas (consolidar_legacy.py)."""
+import pytest
+
+import consolidar_legacy
+from database import get_connection
+
+
+@pytest.fixture
+def conn(bd):
+    conn = get_connection()
+    conn.isolation_level = None
+    conn.execute("""
+        CREATE TABLE employees (
+            id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT, email TEXT,
+            phone TEXT, hire_date TEXT, department_id INTEGER, position TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE attendance (
+            id INTEGER PRIMARY KEY, employee_id INTEGER, date TEXT,
+            check_in TEXT, check_out TEXT, status TEXT, notes TEXT
+        )
+    """)
+    yield conn
+    conn.close()
+
+
+def _empleado_existente(conn, correo, nombre='Ana'):
+    return conn.execute(
+        "INSERT INTO Empleados (nombre, apellido, correo) VALUES (?, 'Existente', ?)",
+        (nombre, correo)
+    ).lastrowid
+
+
+def test_fusion_con_datos_distintos_verifica_y_retira(conn):
+    id_existente = _empleado_existente(conn, 'ana@example.com')
+    conn.execute("INSERT INTO employees VALUES (1, 'Anita', 'Legacy', 'ana@example.com', '555', "
+                 "'2020-01-01', NULL, NULL)")
+    conn.execute("INSERT INTO employees VALUES (2, 'Luis', 'Nuevo', 'luis@example.com', NULL, "
+                 "'2021-01-01', NULL, NULL)")
+    conn.execute("INSERT INTO attendance VALUES (1, 1, '2024-01-02', '09:00', '17:00', 'present', NULL)")
+
+    consolidar_legacy.iniciar(conn)
+    consolidar_legacy.backfill(conn, lote=1, pausa=0)
+    resultado = consolidar_legacy.verificar(conn)
+
+    assert resultado['consistente']
+    assert resultado['employees']['fusionadas'] == 1
+    assert resultado['employees']['sin_correspondencia']['filas'] == 0
+    # La fila existente conserva sus datos
+    assert conn.execute("SELECT nombre FROM Empleados WHERE id_empleado = ?",
+                        (id_existente,)).fetchone()[0] == 'Ana'
+    assert conn.execute("SELECT COUNT(*) FROM Asistencias WHERE id_empleado = ?",
+                        (id_existente,)).fetchone()[0] == 1
+    assert consolidar_legacy.retirar(conn)
+    assert not consolidar_legacy.hay_tablas_legacy(conn)
+
+
+def test_asistencias_sin_correspondencia_se_informan_aparte(conn):
+    conn.execute("INSERT INTO employees VALUES (1, 'Luis', 'Nuevo', 'luis@example.com', NULL, "
+                 "'2021-01-01', NULL, NULL)")
+    conn.execute("INSERT INTO attendance VALUES (1, 1, '2024-01-02', '09:00', '17:00', NULL, NULL)")
+    conn.execute("INSERT INTO attendance VALUES (2, 99, '2024-01-02', '09:00', '17:00', NULL, NULL)")
+
+    consolidar_legacy.iniciar(conn)
+    consolidar_legacy.backfill(conn, pausa=0)
+    resultado = consolidar_legacy.verificar(conn)
+
+    assert resultado['consistente']
+    assert resultado['attendance']['sin_correspondencia'] == {'filas': 1, 'ids': [2]}
+    assert consolidar_legacy.filas_sin_correspondencia(resultado) == 1
+    assert not consolidar_legacy.retirar(conn)
+    assert consolidar_legacy.retirar(conn, descartar_sin_correspondencia=True)
+
+
+def test_diferencia_en_fila_copiada_no_es_consistente(conn):
+    conn.execute("INSERT INTO employees VALUES (1, 'Luis', 'Nuevo', 'luis@example.com', NULL, "
+                 "'2021-01-01', NULL, NULL)")
+    consolidar_legacy.iniciar(conn)
+    consolidar_legacy.backfill(conn, pausa=0)
+    conn.execute("UPDATE Empleados SET nombre = 'Otro' WHERE correo = 'luis@example.com'")
+
+    resultado = consolidar_legacy.verificar(conn)
+
+    assert not resultado['consistente']
+    assert not consolidar_legacy.retirar(conn)
+
+
+def test_doble_escritura_fusiona_con_fila_existente(conn):
+    id_existente = _empleado_existente(conn, 'ana@example.com')
+    consolidar_legacy.iniciar(conn)
+
+    conn.execute("INSERT INTO employees VALUES (1, 'Anita', 'Legacy', 'ana@example.com', NULL, "
+                 "NULL, NULL, NULL)")
+    conn.execute("INSERT INTO employees VALUES (2, 'Sin', 'Correo', NULL, NULL, NULL, NULL, NULL)")
+    conn.execute("INSERT INTO attendance VALUES (1, 1, '2024-01-02', '09:00', NULL, NULL, NULL)")
+    conn.execute("INSERT INTO attendance VALUES (2, 1, '2024-01-02', '10:00', NULL, NULL, NULL)")
+
+    mapa = dict(conn.execute("SELECT id_legacy, fusionado FROM consolidacion_empleados").fetchall())
+    assert mapa == {1: 1, 2: 0}
+    assert conn.execute("SELECT id_empleado FROM consolidacion_empleados WHERE id_legacy = 1"
+                        ).fetchone()[0] == id_existente
+    # La segunda asistencia del mismo día se fusiona con la primera
+    assert conn.execute("SELECT COUNT(*) FROM Asistencias").fetchone()[0] == 1
+    resultado = consolidar_legacy.verificar(conn)
+    assert resultado['consistente']
+    assert resultado['attendance']['fusionadas'] == 1
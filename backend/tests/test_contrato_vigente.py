@@ -0,0 +1,66 @@
+"""Pruebas del contrato vigente y su caché en proceso (models/contrato.py)."""
+from contextlib import contextmanager
+
+from models import contrato
+from models.contrato import Contrato
+from models.empleado import Empleado
+
+
+def _empleado_con_contratos():
+    id_empleado = Empleado.create('Ana', 'López')['id_empleado']
+    Contrato.create(id_empleado, 'Temporal', '2023-01-01', '2023-12-31', 1000)
+    vigente = Contrato.create(id_empleado, 'Indefinido', '2024-01-01', None, 1500)
+    return id_empleado, vigente['id_contrato']
+
+
+def test_vigente_por_fecha(bd):
+    id_empleado, _ = _empleado_con_contratos()
+    otro = Empleado.create('Luis', 'Pérez')['id_empleado']
+
+    vigentes = Contrato.get_vigentes([id_empleado, otro], '2023-06-01')
+
+    assert vigentes[id_empleado]['salario'] == 1000
+    assert vigentes[otro] is None
+    assert Contrato.get_vigente(id_empleado, '2024-06-01')['salario'] == 1500
+
+
+def test_escritura_invalida_la_cache(bd):
+    id_empleado, id_contrato = _empleado_con_contratos()
+    assert Contrato.get_vigente(id_empleado, '2024-06-01')['salario'] == 1500
+
+    Contrato.update(id_contrato, salario=1800)
+
+    assert Contrato.get_vigente(id_empleado, '2024-06-01')['salario'] == 1800
+
+
+def test_lectura_anterior_a_una_escritura_no_se_guarda(bd, monkeypatch):
+    id_empleado, id_contrato = _empleado_con_contratos()
+    get_db = contrato.get_db
+
+    @contextmanager
+    def get_db_con_escritura_concurrente():
+        with get_db() as conn:
+            yield conn
+        # Otro hilo escribe e invalida entre la consulta y el guardado en caché
+        with get_db() as conn:
+            conn.execute("UPDATE Contratos SET salario = 2000 WHERE id_contrato = ?", (id_contrato,))
+        contrato._invalidar_cache()
+
+    monkeypatch.setattr(contrato, 'get_db', get_db_con_escritura_concurrente)
+    assert Contrato.get_vigente(id_empleado, '2024-06-01')['salario'] == 1500
+    monkeypatch.setattr(contrato, 'get_db', get_db)
+
+    assert contrato._cache_vigentes == {}
+    assert Contrato.get_vigente(id_empleado, '2024-06-01')['salario'] == 2000
+
+
+def test_fecha_no_valida_es_400_y_no_se_guarda(cliente):
+    id_empleado, _ = _empleado_con_contratos()
+    contrato._invalidar_cache()
+
+    respuesta = cliente.get(f'/api/contratos/empleado/{id_empleado}/vigente?fecha=basura')
+
+    assert respuesta.status_code == 400
+    assert 'YYYY-MM-DD' in respuesta.get_json()['message']
+    assert contrato._cache_vigentes == {}
+    assert cliente.get(f'/api/contratos/empleado/{id_empleado}/vigente?fecha=2024-06-01').status_code == 200
@@ -0,0 +1,43 @@
+"""Pruebas del calendario de vencimiento de contratos (/api/contratos/por-vencer y avisos_contratos.py)."""
+import avisos_contratos
+from models.contrato import Contrato
+from models.empleado import Empleado
+
+
+def _contratos():
+    id_empleado = Empleado.create('Ana', 'López', correo='ana@example.com')['id_empleado']
+    Contrato.create(id_empleado, 'Temporal', '2024-01-01', '2024-06-10', 1000)
+    Contrato.create(id_empleado, 'Temporal', '2024-06-11', '2024-09-30', 1000)
+    Contrato.create(id_empleado, 'Indefinido', '2024-10-01', None, 1200)
+
+
+def test_por_vencer_en_la_ventana(cliente):
+    _contratos()
+
+    respuesta = cliente.get('/api/contratos/por-vencer?dias=30&fecha=2024-06-01')
+
+    assert respuesta.status_code == 200
+    datos = respuesta.get_json()['data']
+    assert [(c['fecha_fin'], c['dias_restantes']) for c in datos] == [('2024-06-10', 9)]
+
+
+def test_fecha_no_valida_responde_400(cliente):
+    _contratos()
+
+    for fecha in ('2024-13-01', '01/06/2024', 'mañana'):
+        respuesta = cliente.get(f'/api/contratos/por-vencer?fecha={fecha}')
+        assert respuesta.status_code == 400
+        assert respuesta.get_json() == {'status': 'error',
+                                         'message': 'fecha debe tener el formato YYYY-MM-DD'}
+    assert cliente.get('/api/contratos/por-vencer?dias=0').status_code == 400
+
+
+def test_avisos_idempotentes_por_umbral(bd):
+    _contratos()
+
+    primero = avisos_contratos.generar_avisos('2024-06-01', [30, 60, 90])
+    repetido = avisos_contratos.generar_avisos('2024-06-01', [30, 60, 90])
+    mas_tarde = avisos_contratos.generar_avisos('2024-07-15', [30, 60, 90])
+
+    assert (primero['avisos_nuevos'], repetido['avisos_nuevos'], mas_tarde['avisos_nuevos']) == (1, 0, 1)
+    assert len(avisos_contratos.listar_pendientes()) == 2
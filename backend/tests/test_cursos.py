@@ -0,0 +1,45 @@
+"""Pruebas del catálogo de cursos y el índice de certificaciones (models/curso.py)."""
+from database import get_db
+from models.capacitacion import Capacitacion
+from models.curso import clave_curso
+from models.empleado import Empleado
+
+
+def test_clave_normalizada():
+    assert clave_curso('  Python  Básico ', 'ACME') == clave_curso('python basico', 'acme') == 'python basico|acme'
+    assert clave_curso('', 'ACME') is None
+
+
+def test_variantes_del_mismo_curso_comparten_catalogo(cliente):
+    ana = Empleado.create('Ana', 'López')['id_empleado']
+    luis = Empleado.create('Luis', 'Pérez')['id_empleado']
+    Capacitacion.create(ana, 'Python Básico', 'ACME', '2024-01-01', '2024-02-01', True)
+    Capacitacion.create(luis, 'python  basico', 'acme', '2024-01-01', None, False)
+    Capacitacion.create(luis, 'Excel', None)
+
+    cursos = cliente.get('/api/capacitaciones/cursos').get_json()['data']
+
+    assert [(c['nombre_curso'], c['capacitaciones'], c['certificados']) for c in cursos] == \
+        [('Excel', 1, 0), ('Python Básico', 2, 1)]
+    id_python = cursos[1]['id_curso']
+    completados = cliente.get(f'/api/capacitaciones/cursos/{id_python}/completados').get_json()['data']
+    pendientes = cliente.get(f'/api/capacitaciones/cursos/{id_python}/completados?certificado=false'
+                             ).get_json()['data']
+    assert [e['id_empleado'] for e in completados] == [ana]
+    assert [e['id_empleado'] for e in pendientes] == [luis]
+    assert cliente.get('/api/capacitaciones/cursos/999/completados').status_code == 404
+
+
+def test_tasas_por_departamento(cliente):
+    with get_db() as conn:
+        ventas = conn.execute("INSERT INTO Departamentos (nombre_departamento) VALUES ('Ventas')").lastrowid
+    ana = Empleado.create('Ana', 'López', id_departamento=ventas)['id_empleado']
+    Empleado.create('Luis', 'Pérez', id_departamento=ventas)
+    Empleado.create('Eva', 'Ruiz')
+    Capacitacion.create(ana, 'Python', None, certificado=True)
+    Capacitacion.create(ana, 'Excel', None, certificado=True)
+
+    tasas = cliente.get('/api/capacitaciones/tasas-departamento').get_json()['data']
+
+    por_departamento = {t['nombre_departamento']: (t['empleados'], t['certificados'], t['tasa']) for t in tasas}
+    assert por_departamento == {None: (1, 0, 0.0), 'Ventas': (2, 1, 0.5)}
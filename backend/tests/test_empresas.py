@@ -0,0 +1,82 @@
+"""Pruebas de las bases de datos por empresa (empresas.py)."""
+import pytest
+
+import empresas
+from app import app
+from models.empleado import Empleado
+from trabajos import WorkerTrabajos
+
+
+@pytest.fixture
+def multiempresa(bd, monkeypatch):
+    """EMPRESAS_ACTIVAS con las empresas 'acme' y 'beta'."""
+    monkeypatch.setattr(empresas.config, 'EMPRESAS_ACTIVAS', True)
+    monkeypatch.setitem(app.config, 'EMPRESAS_ACTIVAS', True)
+    for nombre in ('acme', 'beta'):
+        empresas.crear(nombre)
+    return empresas
+
+
+def test_cada_empresa_usa_su_base_de_datos(multiempresa, cliente):
+    respuesta = cliente.post('/api/empleados', json={'nombre': 'Ana', 'apellido': 'López'},
+                             headers={'X-Empresa': 'acme'})
+    assert respuesta.status_code == 201
+    assert respuesta.headers['X-Empresa'] == 'acme'
+
+    assert len(cliente.get('/api/empleados', headers={'X-Empresa': 'acme'}).get_json()['data']) == 1
+    assert cliente.get('/api/empleados', headers={'X-Empresa': 'beta'}).get_json()['data'] == []
+    assert cliente.get('/api/empleados').status_code == 400
+    assert cliente.get('/api/empleados', headers={'X-Empresa': 'otra'}).status_code == 404
+
+
+def test_el_subdominio_manda_y_una_cabecera_distinta_es_400(multiempresa, cliente, monkeypatch):
+    monkeypatch.setattr(empresas.config, 'EMPRESAS_DOMINIO', 'rrhh.example.com')
+
+    assert empresas.resolver(None, 'acme.rrhh.example.com:5000') == 'acme'
+    assert empresas.resolver('ACME', 'acme.rrhh.example.com') == 'acme'
+    assert empresas.resolver('beta', 'rrhh.example.com') == 'beta'
+    with pytest.raises(ValueError):
+        empresas.resolver('beta', 'acme.rrhh.example.com')
+
+    respuesta = cliente.get('/api/empleados', base_url='http://acme.rrhh.example.com')
+    assert respuesta.headers['X-Empresa'] == 'acme'
+    respuesta = cliente.get('/api/empleados', base_url='http://acme.rrhh.example.com',
+                            headers={'X-Empresa': 'beta'})
+    assert respuesta.status_code == 400
+
+
+def test_las_tareas_en_segundo_plano_no_desplazan_a_las_abiertas(multiempresa, monkeypatch):
+    monkeypatch.setattr(empresas.config, 'EMPRESAS_ABIERTAS', 1)
+    empresas._abiertas.clear()
+    acme = empresas.obtener('acme')
+
+    with empresas.visitar('beta') as beta:
+        assert beta is not acme
+        assert list(empresas._abiertas) == ['acme']
+        Empleado.create('Luis', 'Pérez')
+    assert beta.motor.libres == 0
+    assert WorkerTrabajos(1)._procesar('beta') is False
+    assert list(empresas._abiertas) == ['acme']
+
+    # Tampoco cuentan como uso reciente de las que ya estaban abiertas
+    monkeypatch.setattr(empresas.config, 'EMPRESAS_ABIERTAS', 2)
+    empresas.obtener('beta')
+    with empresas.visitar('acme') as visitada:
+        assert visitada is acme
+    assert list(empresas._abiertas) == ['acme', 'beta']
+
+    with empresas.usar('beta'):
+        assert [e['nombre'] for e in Empleado.get_all()] == ['Luis']
+
+
+def test_resumen_cuenta_el_wal(multiempresa):
+    with empresas.usar('acme') as acme:
+        Empleado.create('Ana', 'López', estado='Activo')
+        wal = acme.rutas.datos.with_name(f"{acme.rutas.datos.name}-wal")
+        assert wal.exists()
+        cifras = empresas.resumen()
+
+    assert cifras['empleados_activos'] == 1
+    assert cifras['bytes'] == acme.rutas.datos.stat().st_size + wal.stat().st_size
+    agregado = empresas.resumen_agregado()
+    assert agregado['total']['empleados'] == 1 and agregado['errores'] == {}
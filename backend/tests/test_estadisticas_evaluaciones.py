@@ -0,0 +1,49 @@
+"""Pruebas de las estadísticas de evaluaciones (/api/evaluaciones/estadisticas)."""
+from database import get_db
+from models.empleado import Empleado
+
+
+def _evaluaciones(puntajes, id_departamento=None, anio=2024):
+    id_empleado = Empleado.create('Ana', 'López', id_departamento=id_departamento)['id_empleado']
+    with get_db() as conn:
+        conn.executemany("INSERT INTO Evaluaciones (id_empleado, fecha, puntaje) VALUES (?, ?, ?)",
+                         [(id_empleado, f"{anio}-{i % 12 + 1:02d}-01", p) for i, p in enumerate(puntajes)])
+    return id_empleado
+
+
+def test_percentiles_por_departamento(cliente):
+    with get_db() as conn:
+        id_departamento = conn.execute(
+            "INSERT INTO Departamentos (nombre_departamento) VALUES ('Ventas')").lastrowid
+    _evaluaciones([50, 10, 40, 20, 30], id_departamento)
+
+    respuesta = cliente.get('/api/evaluaciones/estadisticas?agrupar=departamento')
+
+    assert respuesta.status_code == 200
+    grupo = respuesta.get_json()['data']['grupos'][0]
+    assert grupo['nombre'] == 'Ventas'
+    assert (grupo['evaluaciones'], grupo['media'], grupo['minimo'], grupo['maximo']) == (5, 30, 10, 50)
+    assert (grupo['p10'], grupo['mediana'], grupo['p90']) == (14, 30, 46)
+
+
+def test_percentil_de_cada_empleado_y_filtro_por_anio(cliente):
+    _evaluaciones([60, 70])
+    _evaluaciones([90])
+    _evaluaciones([10], anio=2023)
+
+    datos = cliente.get('/api/evaluaciones/estadisticas?agrupar=empleado&anio=2024').get_json()['data']
+
+    assert [g['percentil_departamento'] for g in datos['grupos']] == [0, 1]
+    assert datos['total']['evaluaciones'] == 3
+
+
+def test_nuevas_evaluaciones_invalidan_la_cache(cliente):
+    id_empleado = _evaluaciones([10])
+    assert cliente.get('/api/evaluaciones/estadisticas?agrupar=total').get_json()['data']['total']['media'] == 10
+
+    with get_db() as conn:
+        conn.execute("INSERT INTO Evaluaciones (id_empleado, fecha, puntaje) VALUES (?, '2024-05-01', 30)",
+                     (id_empleado,))
+
+    assert cliente.get('/api/evaluaciones/estadisticas?agrupar=total').get_json()['data']['total']['media'] == 20
+    assert cliente.get('/api/evaluaciones/estadisticas?agrupar=otro').status_code == 400
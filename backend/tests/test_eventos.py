@@ -0,0 +1,58 @@
+"""Pruebas del stream de eventos en vivo (eventos.py)."""
+import json
+
+import eventos
+from database import get_db
+
+
+def _publicar(n):
+    with get_db() as conn:
+        cursor = conn.cursor()
+        for i in range(n):
+            eventos.publicar(cursor, 'asistencia.creada', {'i': i})
+
+
+def _hasta_conectado(flujo):
+    mensajes = []
+    for mensaje in flujo:
+        if mensaje == ": conectado\n\n":
+            return mensajes
+        mensajes.append(mensaje)
+
+
+def test_reanudar_envia_todo_el_historial_por_paginas(bd, monkeypatch):
+    monkeypatch.setattr(eventos.config, 'EVENTOS_BUFFER', 2)
+    _publicar(45)
+
+    flujo = eventos.stream(desde=3, latido=0.1)
+    mensajes = _hasta_conectado(flujo)
+    flujo.close()
+
+    seqs = [json.loads(m.split('data: ', 1)[1])['seq'] for m in mensajes]
+    assert seqs == list(range(4, 46))
+
+
+def test_reanudar_tras_purgar_envia_reiniciar(bd):
+    _publicar(3)
+    with get_db() as conn:
+        conn.execute("DELETE FROM Eventos WHERE seq < 3")
+
+    flujo = eventos.stream(desde=0, latido=0.1)
+    mensajes = _hasta_conectado(flujo)
+    flujo.close()
+
+    assert mensajes[0].startswith("event: reiniciar")
+    assert len(mensajes) == 2
+
+
+def test_distribuidor_se_detiene_sin_clientes(bd):
+    flujo = eventos.stream(latido=0.1)
+    next(flujo)
+    repartidor = eventos._distribuidores[None]
+    assert repartidor.clientes() == 1
+
+    flujo.close()
+
+    repartidor.join(timeout=2)
+    assert not repartidor.is_alive()
+    assert None not in eventos._distribuidores
@@ -0,0 +1,42 @@
+"""Pruebas de la exportación en streaming (exportacion.py)."""
+import csv
+import gzip
+import io
+
+import exportacion
+from models.empleado import Empleado
+
+
+def _leer_csv(datos: bytes):
+    return list(csv.reader(io.StringIO(datos.decode('utf-8-sig'))))
+
+
+def test_csv_incluye_todas_las_filas_leidas_por_bloques(cliente):
+    for i in range(5):
+        Empleado.create(f'Nombre{i}', 'Apellido', fecha_ingreso=f'2024-01-0{i + 1}')
+
+    bloques = list(exportacion.filas('empleados', lote=2))
+    assert [len(b) for b in bloques] == [2, 2, 1]
+
+    respuesta = cliente.get('/api/empleados/export?format=csv&desde=2024-01-03')
+    assert respuesta.status_code == 200
+    assert respuesta.headers['Content-Disposition'] == 'attachment; filename="empleados.csv"'
+    filas = _leer_csv(respuesta.data)
+    assert filas[0] == list(exportacion.RECURSOS['empleados'][1])
+    assert [f[1] for f in filas[1:]] == ['Nombre2', 'Nombre3', 'Nombre4']
+
+
+def test_csv_comprimido_con_gzip(cliente):
+    Empleado.create('Ana', 'López')
+
+    respuesta = cliente.get('/api/empleados/export', headers={'Accept-Encoding': 'gzip'})
+
+    assert respuesta.headers['Content-Encoding'] == 'gzip'
+    assert _leer_csv(gzip.decompress(respuesta.data))[1][1] == 'Ana'
+
+
+def test_recurso_desconocido_es_400(cliente):
+    respuesta = cliente.get('/api/usuarios/export')
+
+    assert respuesta.status_code == 400
+    assert respuesta.get_json()['status'] == 'error'
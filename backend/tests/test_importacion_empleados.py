@@ -0,0 +1,47 @@
+"""Pruebas de la importación masiva de empleados (importacion_empleados.py)."""
+import glob
+import io
+import os
+import tempfile
+
+import importacion_empleados
+from database import get_db
+from models.empleado import Empleado
+
+
+def _temporales():
+    return set(glob.glob(os.path.join(tempfile.gettempdir(), 'importacion-*')))
+
+
+def test_correo_existente_con_otras_mayusculas_es_error(bd):
+    Empleado.create('Ana', 'López', correo='Ana@Empresa.com')
+    archivo = io.BytesIO("nombre,apellido,correo\nAna,Ruiz,ana@empresa.COM\n".encode('utf-8'))
+
+    resultado = importacion_empleados.importar(importacion_empleados.leer_csv(archivo))
+
+    assert resultado['insertadas'] == 0
+    assert resultado['errores'][0]['campo'] == 'correo'
+    assert len(Empleado.get_all()) == 1
+
+
+def test_endpoint_importa_cuerpo_y_borra_el_temporal(cliente):
+    antes = _temporales()
+
+    respuesta = cliente.post('/api/empleados/import', data="nombre;apellido\nAna;López\nLuis;Gil\n",
+                             content_type='text/csv')
+
+    assert respuesta.status_code == 201
+    assert respuesta.get_json()['data']['insertadas'] == 2
+    assert _temporales() == antes
+    with get_db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM Empleados").fetchone()[0] == 2
+
+
+def test_endpoint_dry_run_no_inserta(cliente):
+    respuesta = cliente.post('/api/empleados/import?dry_run=true',
+                             data={'archivo': (io.BytesIO(b"nombre,apellido\nAna,L\n"), 'e.csv')})
+
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['data']['validas'] == 1
+    with get_db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM Empleados").fetchone()[0] == 0
@@ -0,0 +1,37 @@
+"""Pruebas de las estadísticas de la base de datos (inspeccion_db.py y /api/database/estadisticas)."""
+import inspeccion_db
+from database import get_db
+
+
+def test_get_no_ejecuta_analyze(cliente):
+    with get_db() as conn:
+        conn.execute("DROP TABLE IF EXISTS sqlite_stat1")
+
+    respuesta = cliente.get('/api/database/estadisticas')
+
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['data']['estadisticas_disponibles'] is False
+    assert cliente.get('/api/database/estadisticas?analizar=true').status_code == 400
+
+
+def test_post_ejecuta_analyze(cliente):
+    with get_db() as conn:
+        conn.execute("INSERT INTO Departamentos (nombre_departamento) VALUES ('Ventas')")
+
+    respuesta = cliente.post('/api/database/estadisticas')
+
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['data']['estadisticas_disponibles'] is True
+
+
+def test_tamanos_solo_si_se_piden(bd, capsys):
+    with get_db() as conn:
+        tablas = inspeccion_db.inspeccionar(conn)['tablas']
+        assert all('paginas' not in t for t in tablas)
+        con_tamanos = inspeccion_db.inspeccionar(conn, tamanos=True)['tablas']
+
+    if any('paginas' in t for t in con_tamanos):  # dbstat depende de cómo se compiló SQLite
+        assert inspeccion_db.main(['--tamanos'])
+        assert ' filas, ' in capsys.readouterr().out
+    assert inspeccion_db.main([])
+    assert ' filas, ' not in capsys.readouterr().out
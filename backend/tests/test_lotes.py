@@ -0,0 +1,101 @@
+"""Pruebas de las operaciones por lotes (lotes.py)."""
+import lotes
+from database import get_db
+from models.empleado import Empleado
+
+
+def _crear_empleados(n):
+    return [Empleado.create(f'Nombre{i}', 'Apellido')['id_empleado'] for i in range(n)]
+
+
+def test_batch_get_en_el_orden_pedido_con_no_encontrados(cliente, monkeypatch):
+    monkeypatch.setattr(lotes.config, 'LOTES_BLOQUE', 2)
+    a, b, c = _crear_empleados(3)
+
+    respuesta = cliente.post('/api/empleados/batch-get', json={'ids': [c, 999, a, c, b]})
+
+    cuerpo = respuesta.get_json()
+    assert respuesta.status_code == 200
+    assert [r['id_empleado'] for r in cuerpo['data']['registros']] == [c, a, c, b]
+    assert cuerpo['data']['no_encontrados'] == [999]
+    assert cuerpo['count'] == 4
+
+
+def test_batch_get_por_consulta_y_validacion(cliente):
+    a, = _crear_empleados(1)
+
+    assert cliente.get(f'/api/empleados/batch-get?ids={a}').get_json()['count'] == 1
+    assert cliente.get('/api/empleados/batch-get?ids=1,x').status_code == 400
+    assert cliente.get('/api/no-existe/batch-get?ids=1').status_code == 400
+
+
+def test_bulk_informa_las_asistencias_de_anios_cerrados(cliente):
+    import particiones
+    from models.asistencia import Asistencia
+
+    a, = _crear_empleados(1)
+    antigua = Asistencia.create(a, fecha='2020-03-02')['id_asistencia']
+    actual = Asistencia.create(a, fecha='2025-03-02')['id_asistencia']
+    particiones.cerrar(2020)
+
+    respuesta = cliente.patch('/api/asistencias/bulk', json={
+        'filtro': {'id_empleado': a}, 'cambios': {'observaciones': 'revisada'}})
+    assert respuesta.get_json()['data'] == {'afectadas': 1, 'omitidas': {'filas': 1, 'ids': [antigua]}}
+
+    resultado = lotes.eliminar('asistencias', ids=[antigua, actual])
+    assert resultado == {'afectadas': 1, 'omitidas': {'filas': 1, 'ids': [antigua]}}
+
+
+def test_bulk_sin_returning_lee_las_filas_en_la_transaccion(bd, monkeypatch):
+    monkeypatch.setattr(lotes.motor, 'returning', False)
+    a, b, c = _crear_empleados(3)
+
+    actualizadas = lotes.actualizar('empleados', {'estado': 'Baja'}, ids=[a, b], devolver=True)
+    assert sorted(r['id_empleado'] for r in actualizadas['registros']) == [a, b]
+    assert {r['estado'] for r in actualizadas['registros']} == {'Baja'}
+
+    eliminadas = lotes.eliminar('empleados', filtro={'estado': 'Baja'}, devolver=True)
+    assert eliminadas['afectadas'] == 2
+    assert {r['nombre'] for r in eliminadas['registros']} == {'Nombre0', 'Nombre1'}
+    assert lotes.obtener_varios('empleados', [a, b, c])['no_encontrados'] == [a, b]
+
+
+def test_bulk_aprueba_solicitudes_antiguas_con_hora(cliente):
+    id_empleado, = _crear_empleados(1)
+    with get_db() as conn:
+        id_permiso = conn.execute("""
+            INSERT INTO Vacaciones_Permisos (id_empleado, tipo, fecha_inicio, fecha_fin, estado)
+            VALUES (?, 'Permiso', '2024-01-05 00:00:00', '2024-01-06 00:00:00', 'Pendiente')
+        """, (id_empleado,)).lastrowid
+
+    respuesta = cliente.patch('/api/vacaciones-permisos/bulk',
+                              json={'ids': [id_permiso], 'cambios': {'estado': 'Aprobado'}})
+
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['data']['afectadas'] == 1
+    respuesta = cliente.patch('/api/vacaciones-permisos/bulk',
+                              json={'ids': [id_permiso], 'cambios': {'fecha_fin': '06/01/2024'}})
+    assert respuesta.status_code == 400
+
+
+def test_bulk_rechaza_estados_desconocidos_sin_tocar_el_saldo(cliente):
+    id_empleado = Empleado.create('Ana', 'López', fecha_ingreso='2020-01-01')['id_empleado']
+    aprobada = cliente.post('/api/vacaciones-permisos', json={
+        'id_empleado': id_empleado, 'tipo': 'Vacación', 'estado': 'Aprobado',
+        'fecha_inicio': '2023-07-03', 'fecha_fin': '2023-07-07'}).get_json()['data']['id_permiso']
+    pendiente = cliente.post('/api/vacaciones-permisos', json={
+        'id_empleado': id_empleado, 'tipo': 'Vacación', 'estado': 'Pendiente',
+        'fecha_inicio': '2023-08-01', 'fecha_fin': '2023-08-02'}).get_json()['data']['id_permiso']
+    saldo = cliente.get(f'/api/vacaciones-permisos/saldo/{id_empleado}').get_json()['data']['saldo']
+
+    respuesta = cliente.patch('/api/vacaciones-permisos/bulk', json={
+        'filtro': {'desde': '2023-01-01', 'hasta': '2023-12-31'}, 'cambios': {'estado': 'Archivado'}})
+    assert respuesta.status_code == 400
+    assert cliente.get(f'/api/vacaciones-permisos/saldo/{id_empleado}').get_json()['data']['saldo'] == saldo
+
+    respuesta = cliente.patch('/api/vacaciones-permisos/bulk', json={
+        'filtro': {'estado': 'Pendiente', 'desde': '2023-01-01', 'hasta': '2023-12-31'},
+        'cambios': {'estado': 'Cancelado'}, 'devolver': True})
+    assert [r['id_permiso'] for r in respuesta.get_json()['data']['registros']] == [pendiente]
+    assert cliente.get(f'/api/vacaciones-permisos/{aprobada}').get_json()['data']['estado'] == 'Aprobado'
+    assert cliente.get(f'/api/vacaciones-permisos/saldo/{id_empleado}').get_json()['data']['saldo'] == saldo
@@ -0,0 +1,39 @@
+"""Pruebas del mantenimiento programado de la base de datos (mantenimiento.py)."""
+from datetime import datetime
+
+import mantenimiento
+from database import get_db
+
+
+def test_ventana_que_cruza_medianoche():
+    assert mantenimiento.en_ventana(datetime(2024, 1, 1, 23, 30), '23:00-05:00')
+    assert mantenimiento.en_ventana(datetime(2024, 1, 2, 4, 59), '23:00-05:00')
+    assert not mantenimiento.en_ventana(datetime(2024, 1, 2, 12, 0), '23:00-05:00')
+    assert mantenimiento.en_ventana(datetime(2024, 1, 2, 3, 0), '02:00-04:00')
+
+
+def test_mantenimiento_libera_paginas(bd):
+    with get_db() as conn:
+        conn.execute("CREATE TABLE relleno (datos TEXT)")
+        conn.executemany("INSERT INTO relleno VALUES (?)", [('x' * 2000,) for _ in range(500)])
+    with get_db() as conn:
+        conn.execute("DROP TABLE relleno")
+
+    resultado = mantenimiento.ejecutar_mantenimiento()
+
+    assert resultado['vacuum']['paginas_liberadas'] > 0
+    assert not resultado['checkpoint']['bloqueado']
+    assert resultado['optimize']['duracion_ms'] >= 0
+
+
+def test_programador_completo_una_vez_por_ventana(bd, monkeypatch):
+    llamadas = []
+    monkeypatch.setattr(mantenimiento, 'ejecutar_mantenimiento', lambda **pasos: llamadas.append(pasos) or {})
+    programador = mantenimiento.ProgramadorMantenimiento(ventana='02:00-04:00', intervalo_checkpoint=3600)
+
+    assert programador.paso(datetime(2024, 1, 1, 12, 0)) is None
+    programador.paso(datetime(2024, 1, 1, 2, 30))
+    programador.paso(datetime(2024, 1, 1, 3, 0))  # misma ventana, checkpoint aún no toca
+    programador.paso(datetime(2024, 1, 2, 2, 30))
+
+    assert llamadas == [{}, {}]
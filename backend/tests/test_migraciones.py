@@ -0,0 +1,69 @@
+"""Pruebas del sistema de migraciones (migraciones.py)."""
+import pytest
+
+import migraciones
+from database import get_connection, get_db
+
+
+def _version():
+    with get_db() as conn:
+        return migraciones.version_actual(conn)
+
+
+def test_init_db_aplica_todas(bd):
+    with get_db() as conn:
+        assert migraciones.version_actual(conn) == max(migraciones.MIGRACIONES)
+        assert migraciones.pendientes(conn) == []
+        filas = conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0]
+    assert filas == len(migraciones.MIGRACIONES)
+
+
+def test_migracion_fallida_no_deja_cambios(bd, monkeypatch):
+    version = max(migraciones.MIGRACIONES) + 1
+
+    def fallar(conn):
+        conn.execute("CREATE TABLE prueba_fallida (id INTEGER)")
+        raise RuntimeError("fallo")
+
+    monkeypatch.setitem(migraciones.MIGRACIONES, version, ('prueba', fallar))
+    with pytest.raises(RuntimeError):
+        migraciones.aplicar_migraciones()
+
+    assert _version() == version - 1
+    with get_db() as conn:
+        assert not migraciones.existe_tabla(conn, 'prueba_fallida')
+
+
+def test_copia_en_lotes_se_reanuda(bd, monkeypatch):
+    with get_db() as conn:
+        conn.execute("CREATE TABLE origen (id INTEGER PRIMARY KEY, valor TEXT)")
+        conn.execute("CREATE TABLE destino (id INTEGER PRIMARY KEY, valor TEXT)")
+        conn.executemany("INSERT INTO origen VALUES (?, ?)", [(i, f"v{i}") for i in range(1, 11)])
+    version = max(migraciones.MIGRACIONES) + 1
+    # La segunda sentencia falla (desbordamiento de abs()) en el tercer lote
+    sentencias = ["INSERT INTO destino SELECT id, valor FROM origen WHERE id > {desde} AND id <= {hasta}",
+                  "SELECT CASE WHEN {hasta} > 6 AND (SELECT COUNT(*) FROM destino) > 6 "
+                  "THEN abs(-9223372036854775808) END"]
+
+    def copiar(conn):
+        migraciones.copiar_en_lotes(conn, version, 'origen', 'origen', 'id', sentencias, lote=3)
+
+    monkeypatch.setitem(migraciones.MIGRACIONES, version, ('copia', copiar))
+    with pytest.raises(Exception):
+        migraciones.aplicar_migraciones()
+
+    # Los lotes confirmados se conservan junto con su punto de control
+    conn = get_connection()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM destino").fetchone()[0] == 6
+        assert conn.execute("SELECT ultima_clave FROM migracion_progreso WHERE version = ?",
+                            (version,)).fetchone()[0] == 6
+    finally:
+        conn.close()
+
+    sentencias.pop()
+    assert migraciones.aplicar_migraciones() == [version]
+    with get_db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM destino").fetchone()[0] == 10
+        assert conn.execute("SELECT COUNT(*) FROM migracion_progreso").fetchone()[0] == 0
+    assert _version() == version
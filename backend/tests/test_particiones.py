@@ -0,0 +1,79 @@
+"""Pruebas de las particiones anuales de Asistencias (particiones.py)."""
+import csv
+import io
+import sqlite3
+
+import lotes
+import migraciones
+import particiones
+import respaldo
+from database import get_db, rutas
+from models.asistencia import Asistencia
+from models.empleado import Empleado
+
+# Más años cerrados de los que SQLite adjunta a la vez (10 por defecto)
+_ANIOS = range(2009, 2021)
+
+
+def _cerrar_anios():
+    id_empleado = Empleado.create('Ana', 'López')['id_empleado']
+    ids = [Asistencia.create(id_empleado, fecha=f'{anio}-05-04')['id_asistencia'] for anio in _ANIOS]
+    ids.append(Asistencia.create(id_empleado, fecha='2025-05-04')['id_asistencia'])
+    for anio in _ANIOS:
+        particiones.cerrar(anio)
+    return id_empleado, ids
+
+
+def test_mas_anios_cerrados_que_el_limite_de_attach(cliente):
+    id_empleado, ids = _cerrar_anios()
+
+    respuesta = cliente.get('/api/asistencias')
+    assert respuesta.status_code == 200
+    fechas = [a['fecha'] for a in respuesta.get_json()['data']]
+    assert fechas == sorted(fechas, reverse=True) and len(fechas) == len(ids)
+    assert len(Asistencia.get_by_empleado(id_empleado, desde='2010-01-01')) == len(ids) - 1
+    assert Asistencia.get_by_id(ids[0])['fecha'] == '2009-05-04'
+    assert lotes.obtener_varios('asistencias', ids)['no_encontrados'] == []
+
+    exportadas = list(csv.reader(io.StringIO(
+        cliente.get('/api/asistencias/export').data.decode('utf-8-sig'))))
+    assert sorted(int(f[0]) for f in exportadas[1:]) == sorted(ids)
+
+
+def test_asistencias_archivadas_vuelven_a_la_tabla_principal(bd):
+    id_empleado = Empleado.create('Ana', 'López')['id_empleado']
+    # Archivo con el formato anterior a las particiones
+    archivo = sqlite3.connect(str(rutas().archivo))
+    archivo.execute("""
+        CREATE TABLE Asistencias (id_asistencia INTEGER PRIMARY KEY, id_empleado, fecha,
+                                  hora_entrada, hora_salida, observaciones, eliminado_en, archivado_en)
+    """)
+    archivo.execute("INSERT INTO Asistencias (id_asistencia, id_empleado, fecha) VALUES (50, ?, '2019-02-01')",
+                    (id_empleado,))
+    archivo.commit()
+    archivo.close()
+    with get_db() as conn:
+        conn.execute("INSERT INTO Archivo_Horizontes (tabla, hasta) VALUES ('Asistencias', '2020-01-01')")
+        conn.execute("DELETE FROM schema_version WHERE version >= 17")
+        conn.execute("PRAGMA user_version = 16")
+
+    assert migraciones.aplicar_migraciones()[0] == 17
+
+    assert Asistencia.get_by_id(50)['fecha'] == '2019-02-01'
+    with get_db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM Archivo_Horizontes").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM Cambios WHERE tabla = 'Asistencias'").fetchone()[0] == 0
+    archivo = sqlite3.connect(str(rutas().archivo))
+    assert archivo.execute("SELECT name FROM sqlite_master WHERE name = 'Asistencias'").fetchone() is None
+    archivo.close()
+
+
+def test_restaurar_un_respaldo_anterior_al_cierre_informa_la_particion(bd):
+    id_empleado = Empleado.create('Ana', 'López')['id_empleado']
+    Asistencia.create(id_empleado, fecha='2020-05-04')
+    nombre = respaldo.crear_respaldo(verificar=False)['archivo']
+    particiones.cerrar(2020)
+
+    resultado = respaldo.restaurar_respaldo(nombre)
+
+    assert resultado['particiones'] == {2020: ['archivo sin registrar: asistencias_2020.db']}
@@ -0,0 +1,69 @@
+"""Pruebas de la réplica de lectura para los informes (replica.py)."""
+import csv
+import io
+
+import replica
+from models.empleado import Empleado
+
+
+def _nombres_exportados(respuesta):
+    filas = list(csv.reader(io.StringIO(respuesta.data.decode('utf-8-sig'))))
+    return [f[1] for f in filas[1:]]
+
+
+def test_sin_replica_activa_se_lee_la_principal(cliente):
+    Empleado.create('Ana', 'López')
+
+    respuesta = cliente.get('/api/empleados/export')
+
+    assert respuesta.headers['X-Origen-Datos'] == 'principal'
+    assert 'X-Retraso-Replica' not in respuesta.headers
+    assert _nombres_exportados(respuesta) == ['Ana']
+
+
+def test_los_informes_leen_la_copia_de_la_replica(cliente, monkeypatch):
+    monkeypatch.setattr(replica.config, 'REPLICA_ACTIVA', True)
+    Empleado.create('Ana', 'López')
+    replica.refrescar()
+    # Escrita después de la copia: no está en la réplica
+    Empleado.create('Luis', 'Pérez')
+
+    respuesta = cliente.get('/api/empleados/export')
+
+    assert respuesta.status_code == 200
+    assert respuesta.headers['X-Origen-Datos'] == 'replica'
+    assert int(respuesta.headers['X-Retraso-Replica']) >= 0
+    assert _nombres_exportados(respuesta) == ['Ana']
+    # Las rutas que no son de informes siguen en la principal
+    assert len(cliente.get('/api/empleados').get_json()['data']) == 2
+
+
+def test_traslado_posterior_a_la_copia_desactiva_la_replica(cliente, monkeypatch):
+    monkeypatch.setattr(replica.config, 'REPLICA_ACTIVA', True)
+    Empleado.create('Ana', 'López')
+    replica.refrescar()
+
+    with replica.movimiento():
+        retraso, motivo = replica.comprobar()
+        assert retraso is None
+        assert 'en curso' in motivo
+    retraso, motivo = replica.comprobar()
+    assert retraso is None
+    assert 'posterior a la copia' in motivo
+    assert cliente.get('/api/empleados/export').headers['X-Origen-Datos'] == 'principal'
+
+    replica.refrescar()
+    assert replica.comprobar()[0] is not None
+    assert cliente.get('/api/empleados/export').headers['X-Origen-Datos'] == 'replica'
+
+
+def test_replica_antigua_no_se_usa(cliente, monkeypatch):
+    monkeypatch.setattr(replica.config, 'REPLICA_ACTIVA', True)
+    replica.refrescar()
+    monkeypatch.setattr(replica.config, 'REPLICA_MAX_RETRASO', -1)
+
+    retraso, motivo = replica.comprobar()
+
+    assert retraso is None
+    assert 'antigüedad' in motivo
+    assert replica.estado()['utilizable'] is False
@@ -0,0 +1,40 @@
+"""Pruebas de los informes de plantilla y costes (reportes.py y /api/reportes/*)."""
+import reportes
+import respaldo
+from models.empleado import Empleado
+from models.nomina import Nomina
+
+
+def _nomina(id_empleado, mes, anio, neto):
+    Nomina.create(id_empleado, mes, anio, salario_base=neto, salario_neto=neto,
+                  fecha_pago=f"{anio:04d}-{mes:02d}-28")
+
+
+def test_costos_no_mezcla_el_mismo_mes_de_anios_distintos(cliente):
+    id_empleado = Empleado.create('Ana', 'López', fecha_ingreso='2020-01-01')['id_empleado']
+    _nomina(id_empleado, 3, 2023, 100)
+    _nomina(id_empleado, 3, 2024, 200)
+
+    respuesta = cliente.get('/api/reportes/costos?anios=2&hasta=2024-12')
+
+    assert respuesta.status_code == 200
+    datos = respuesta.get_json()['data']
+    netos = dict(zip(datos['meses'], datos['total']['salario_neto']))
+    assert (netos['2023-03'], netos['2024-03']) == (100, 200)
+    assert sum(netos.values()) == 300
+
+
+def test_restaurar_respaldo_vacia_la_cache(bd):
+    id_empleado = Empleado.create('Ana', 'López', fecha_ingreso='2020-01-01')['id_empleado']
+    copia = respaldo.crear_respaldo(comprimir=False, verificar=False)['archivo']
+    _nomina(id_empleado, 3, 2024, 100)
+    antes = reportes.costos(1, hasta='2024-12')['total']['salario_neto']
+
+    # Tras restaurar, otra escritura deja las versiones de tabla igual que
+    # cuando se guardó el informe anterior, con datos distintos
+    respaldo.restaurar_respaldo(copia)
+    _nomina(id_empleado, 3, 2024, 700)
+    despues = reportes.costos(1, hasta='2024-12')['total']['salario_neto']
+
+    assert sum(antes) == 100
+    assert sum(despues) == 700
@@ -0,0 +1,48 @@
+"""Pruebas de los respaldos en caliente (respaldo.py y /api/database/respaldos)."""
+import respaldo
+from database import get_db
+
+
+def test_respaldos_en_el_mismo_segundo_no_se_sobrescriben(bd):
+    nombres = {respaldo.crear_respaldo(comprimir=comprimir, verificar=False)['archivo']
+               for comprimir in (True, True, False, False)}
+
+    assert len(nombres) == 4
+    assert {r['archivo'] for r in respaldo.listar_respaldos()} == nombres
+
+
+def test_reservar_archivo_no_reutiliza_un_nombre_existente(bd, monkeypatch):
+    class RelojParado:
+        llamadas = 0
+
+        @classmethod
+        def now(cls):
+            cls.llamadas += 1
+            from datetime import datetime
+            return datetime(2024, 1, 1, 12, 0, 0, 0 if cls.llamadas <= 2 else cls.llamadas)
+
+    directorio = respaldo._directorio()
+    monkeypatch.setattr(respaldo, 'datetime', RelojParado)
+    primero = respaldo._reservar_archivo(directorio)
+    primero.write_bytes(b'datos')
+    segundo = respaldo._reservar_archivo(directorio)
+
+    assert primero != segundo
+    assert primero.read_bytes() == b'datos'
+
+
+def test_crear_verificar_y_restaurar(cliente):
+    with get_db() as conn:
+        conn.execute("INSERT INTO Departamentos (nombre_departamento) VALUES ('Ventas')")
+    respuesta = cliente.post('/api/database/respaldos', json={})
+    assert respuesta.status_code == 201
+    datos = respuesta.get_json()['data']
+    assert datos['verificacion']['valido']
+
+    with get_db() as conn:
+        conn.execute("DELETE FROM Departamentos")
+    respaldo.restaurar_respaldo(datos['archivo'])
+
+    with get_db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM Departamentos").fetchone()[0] == 1
+    assert cliente.get('/api/database/respaldos').get_json()['count'] == 1
@@ -0,0 +1,74 @@
+"""Pruebas del libro de saldos de vacaciones (models/saldo_vacaciones.py)."""
+from datetime import date
+
+from database import get_db
+from models.empleado import Empleado
+from models.saldo_vacaciones import SaldoVacaciones, _sumar_meses
+
+
+def _empleado_con_antiguedad(meses: int) -> int:
+    ingreso = _sumar_meses(date.today(), -meses).isoformat()
+    return Empleado.create('Ana', 'López', fecha_ingreso=ingreso)['id_empleado']
+
+
+def test_devengo_mensual(bd):
+    id_empleado = _empleado_con_antiguedad(12)
+
+    saldo = SaldoVacaciones.get_saldo(id_empleado)
+
+    assert saldo['meses_devengados'] == 12
+    assert saldo['saldo'] == 15
+    assert SaldoVacaciones.get_saldo(999) is None
+
+
+def test_consumo_y_reverso_al_cambiar_el_estado(cliente):
+    id_empleado = _empleado_con_antiguedad(6)
+    respuesta = cliente.post('/api/vacaciones-permisos', json={
+        'id_empleado': id_empleado, 'tipo': 'Vacación', 'estado': 'Aprobado',
+        'fecha_inicio': '2024-07-01', 'fecha_fin': '2024-07-05'})
+    id_permiso = respuesta.get_json()['data']['id_permiso']
+
+    saldo = cliente.get(f'/api/vacaciones-permisos/saldo/{id_empleado}').get_json()['data']
+    assert saldo['dias_consumidos'] == 5
+
+    cliente.put(f'/api/vacaciones-permisos/{id_permiso}', json={'estado': 'Cancelado'})
+    saldo = cliente.get(f'/api/vacaciones-permisos/saldo/{id_empleado}?movimientos=1').get_json()['data']
+    assert saldo['dias_consumidos'] == 0
+    assert saldo['movimientos'][0]['tipo'] == 'Reverso'
+
+
+def test_reconstruir_coincide_con_el_libro_incremental(bd):
+    id_empleado = _empleado_con_antiguedad(8)
+    with get_db() as conn:
+        conn.execute("""
+            INSERT INTO Vacaciones_Permisos (id_empleado, tipo, fecha_inicio, fecha_fin, estado)
+            VALUES (?, 'Vacación', '2024-03-04', '2024-03-06', 'Aprobado')
+        """, (id_empleado,))
+        cursor = conn.cursor()
+        SaldoVacaciones.sincronizar(cursor, cursor.execute("SELECT MAX(id_permiso) FROM Vacaciones_Permisos"
+                                                           ).fetchone()[0])
+    incremental = SaldoVacaciones.get_saldo(id_empleado)
+
+    SaldoVacaciones.reconstruir(lote=1)
+    reconstruido = SaldoVacaciones.get_saldo(id_empleado)
+
+    campos = ('dias_devengados', 'dias_consumidos', 'saldo', 'meses_devengados')
+    assert [incremental[c] for c in campos] == [reconstruido[c] for c in campos]
+    assert reconstruido['saldo'] == 7
+
+
+def test_solicitud_antigua_con_hora_consume_dias(cliente):
+    id_empleado = _empleado_con_antiguedad(8)
+    with get_db() as conn:
+        cursor = conn.execute("""
+            INSERT INTO Vacaciones_Permisos (id_empleado, tipo, fecha_inicio, fecha_fin, estado)
+            VALUES (?, 'Vacación', '2024-03-04 00:00:00', '2024-03-06 00:00:00', 'Aprobado')
+        """, (id_empleado,))
+        SaldoVacaciones.sincronizar(conn.cursor(), cursor.lastrowid)
+
+    assert SaldoVacaciones.get_saldo(id_empleado)['dias_consumidos'] == 3
+    SaldoVacaciones.reconstruir(lote=1)
+    assert SaldoVacaciones.get_saldo(id_empleado)['dias_consumidos'] == 3
+    # La ocupación cuenta la misma solicitud esos tres días
+    ocupacion = cliente.get('/api/vacaciones-permisos/ocupacion?desde=2024-03-03&hasta=2024-03-07')
+    assert [dia['total'] for dia in ocupacion.get_json()['data']] == [0, 1, 1, 1, 0]
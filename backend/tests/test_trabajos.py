@@ -0,0 +1,53 @@
+"""Pruebas de la cola de trabajos en segundo plano (trabajos.py)."""
+import pytest
+
+import trabajos
+from database import get_db
+
+
+def _registrar(monkeypatch, funcion, max_intentos=None):
+    monkeypatch.setitem(trabajos.TAREAS, 'prueba', (funcion, max_intentos, True))
+
+
+def test_trabajo_completado_guarda_resultado_y_progreso(bd, monkeypatch):
+    def funcion(trabajo, total):
+        trabajo.progreso(0.5, 'A medias')
+        return {'total': total}
+    _registrar(monkeypatch, funcion)
+
+    id_trabajo = trabajos.encolar('prueba', {'total': 3})
+    assert trabajos.procesar_uno('w1') == 'completado'
+    assert trabajos.procesar_uno('w1') is None
+
+    trabajo = trabajos.obtener(id_trabajo)
+    assert (trabajo['estado'], trabajo['progreso'], trabajo['resultado']) == ('completado', 1, {'total': 3})
+    assert trabajo['mensaje'] == 'A medias'
+
+
+def test_fallo_se_reintenta_con_espera_y_luego_falla(bd, monkeypatch):
+    def funcion(trabajo):
+        raise RuntimeError('sin conexión')
+    _registrar(monkeypatch, funcion, max_intentos=2)
+
+    id_trabajo = trabajos.encolar('prueba')
+    assert trabajos.procesar_uno('w1') == 'pendiente'
+    # El reintento espera: todavía no se puede reclamar
+    assert trabajos.procesar_uno('w1') is None
+
+    with get_db() as conn:
+        conn.execute("UPDATE Trabajos SET disponible_en = datetime('now') WHERE id_trabajo = ?",
+                     (id_trabajo,))
+    assert trabajos.procesar_uno('w1') == 'fallido'
+    trabajo = trabajos.obtener(id_trabajo)
+    assert (trabajo['intentos'], trabajo['error']) == (2, 'sin conexión')
+
+
+def test_cancelar_pendiente_y_tipo_desconocido(bd, monkeypatch):
+    _registrar(monkeypatch, lambda trabajo: None)
+
+    id_trabajo = trabajos.encolar('prueba')
+    assert trabajos.cancelar(id_trabajo)['estado'] == 'cancelado'
+    assert trabajos.procesar_uno('w1') is None
+
+    with pytest.raises(ValueError):
+        trabajos.encolar('no-existe')
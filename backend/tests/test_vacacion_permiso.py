@@ -0,0 +1,83 @@
+"""Pruebas de la detección de solapamientos y la ocupación de vacaciones (models/vacacion_permiso.py)."""
+import migraciones
+from database import get_db
+from models.empleado import Empleado
+
+
+def _empleado():
+    return Empleado.create('Ana', 'López', fecha_ingreso='2020-01-01')['id_empleado']
+
+
+def test_solapamiento_del_mismo_empleado(cliente):
+    id_empleado = _empleado()
+    datos = {'id_empleado': id_empleado, 'tipo': 'Vacación', 'estado': 'Aprobado',
+             'fecha_inicio': '2024-07-01', 'fecha_fin': '2024-07-10'}
+    assert cliente.post('/api/vacaciones-permisos', json=datos).status_code == 201
+
+    respuesta = cliente.post('/api/vacaciones-permisos',
+                             json={**datos, 'fecha_inicio': '2024-07-10', 'fecha_fin': '2024-07-12'})
+
+    assert respuesta.status_code == 400
+    assert 'solapa' in respuesta.get_json()['message']
+
+
+def test_ocupacion_admite_fechas_antiguas_con_hora(cliente):
+    id_empleado = _empleado()
+    with get_db() as conn:
+        conn.execute("""
+            INSERT INTO Vacaciones_Permisos (id_empleado, tipo, fecha_inicio, fecha_fin, estado)
+            VALUES (?, 'Vacación', '2024-07-02 00:00:00', '2024-07-03 00:00:00', 'Aprobado')
+        """, (id_empleado,))
+        conn.execute("""
+            INSERT INTO Vacaciones_Permisos (id_empleado, tipo, fecha_inicio, fecha_fin, estado)
+            VALUES (?, 'Permiso', '2460494.5', '2460494.5', 'Aprobado')
+        """, (id_empleado,))
+
+    respuesta = cliente.get('/api/vacaciones-permisos/ocupacion?desde=2024-07-01&hasta=2024-07-05')
+
+    assert respuesta.status_code == 200
+    totales = [dia['total'] for dia in respuesta.get_json()['data']]
+    assert totales == [0, 1, 1, 0, 0]
+
+
+def test_ocupacion_parametros_no_validos(cliente):
+    assert cliente.get('/api/vacaciones-permisos/ocupacion?desde=2024-07-01').status_code == 400
+    respuesta = cliente.get('/api/vacaciones-permisos/ocupacion?desde=01/07/2024&hasta=2024-07-05')
+    assert respuesta.status_code == 400
+    assert 'desde' in respuesta.get_json()['message']
+
+
+def test_aprobar_solicitud_antigua_con_hora(cliente):
+    id_empleado = _empleado()
+    with get_db() as conn:
+        cursor = conn.execute("""
+            INSERT INTO Vacaciones_Permisos (id_empleado, tipo, fecha_inicio, fecha_fin, estado)
+            VALUES (?, 'Permiso', '2024-01-05 00:00:00', '2024-01-06 00:00:00', 'Pendiente')
+        """, (id_empleado,))
+        id_permiso = cursor.lastrowid
+
+    respuesta = cliente.put(f'/api/vacaciones-permisos/{id_permiso}', json={'estado': 'Aprobado'})
+
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['data']['estado'] == 'Aprobado'
+    # Las fechas que envía el cliente se siguen validando
+    respuesta = cliente.put(f'/api/vacaciones-permisos/{id_permiso}', json={'fecha_fin': '06/01/2024'})
+    assert respuesta.status_code == 400
+
+
+def test_fecha_antigua_de_tarde_cuenta_en_su_dia(cliente):
+    id_empleado = _empleado()
+    with get_db() as conn:
+        conn.execute("""
+            INSERT INTO Vacaciones_Permisos (id_empleado, tipo, fecha_inicio, fecha_fin, estado)
+            VALUES (?, 'Permiso', '2024-07-02 13:30:00', '2024-07-02 18:00:00', 'Aprobado')
+        """, (id_empleado,))
+
+    url = '/api/vacaciones-permisos/ocupacion?desde=2024-07-02&hasta=2024-07-02'
+    assert [dia['total'] for dia in cliente.get(url).get_json()['data']] == [1]
+
+    # La migración 18 rehace el índice que dejaron los triggers anteriores
+    with get_db() as conn:
+        conn.execute("UPDATE Vacaciones_Permisos_rtree SET inicio = inicio + 1, fin = fin + 1")
+        migraciones.MIGRACIONES[18][1](conn)
+    assert [dia['total'] for dia in cliente.get(url).get_json()['data']] == [1]
@@ -0,0 +1,57 @@
+"""Pruebas del modelo de lectura empleados_vista (vista_empleados.py)."""
+import vista_empleados
+from database import get_db
+from models.empleado import Empleado
+
+
+def _crear_datos():
+    with get_db() as conn:
+        id_departamento = conn.execute(
+            "INSERT INTO Departamentos (nombre_departamento) VALUES ('Ventas')").lastrowid
+        id_puesto = conn.execute(
+            "INSERT INTO Puestos (nombre_puesto, nivel, salario_base) VALUES ('Vendedor', 'Junior', 1000)"
+        ).lastrowid
+    empleado = Empleado.create('Ana', 'López', fecha_ingreso='2024-01-01',
+                               id_departamento=id_departamento, id_puesto=id_puesto)
+    return empleado['id_empleado'], id_departamento, id_puesto
+
+
+def test_listado_incluye_departamento_y_puesto(bd):
+    _crear_datos()
+
+    empleados = Empleado.get_all()
+
+    assert len(empleados) == 1
+    assert empleados[0]['nombre_departamento'] == 'Ventas'
+    assert empleados[0]['nombre_puesto'] == 'Vendedor'
+    assert empleados[0]['salario_base'] == 1000
+
+
+def test_triggers_mantienen_la_vista(bd):
+    id_empleado, id_departamento, id_puesto = _crear_datos()
+
+    with get_db() as conn:
+        conn.execute("UPDATE Departamentos SET nombre_departamento = 'Comercial' WHERE id_departamento = ?",
+                     (id_departamento,))
+        conn.execute("UPDATE Puestos SET salario_base = 1200 WHERE id_puesto = ?", (id_puesto,))
+        conn.execute("UPDATE Empleados SET apellido = 'García' WHERE id_empleado = ?", (id_empleado,))
+
+    empleado = Empleado.get_all()[0]
+    assert (empleado['nombre_departamento'], empleado['salario_base'], empleado['apellido']) == \
+        ('Comercial', 1200, 'García')
+
+    Empleado.delete(id_empleado)
+    assert Empleado.get_all() == []
+
+
+def test_verificar_detecta_y_reconstruir_repara(bd):
+    id_empleado, _, _ = _crear_datos()
+    with get_db() as conn:
+        conn.execute("UPDATE empleados_vista SET nombre = 'Otro' WHERE id_empleado = ?", (id_empleado,))
+        cursor = conn.cursor()
+        resultado = vista_empleados.verificar_vista_empleados(cursor)
+        assert not resultado['consistente']
+        assert resultado['diferentes'] == [id_empleado]
+
+        assert vista_empleados.reconstruir_vista_empleados(cursor) == 1
+        assert vista_empleados.verificar_vista_empleados(cursor)['consistente']
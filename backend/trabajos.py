@@ -0,0 +1,540 @@
+"""
+Cola de trabajos en segundo plano respaldada por SQLite.
+
+Las operaciones largas (respaldos, importaciones, reconstrucción de saldos,
+avisos, mantenimiento, archivo, cierre de años, réplica de lectura) se
+encolan en la tabla Trabajos y las ejecuta un grupo de hilos
+(WorkerTrabajos) en este proceso o en un proceso aparte
+(python trabajos.py worker). Cada worker reclama un trabajo con un único
+UPDATE ... RETURNING, de modo que varios procesos pueden compartir la cola
+sin ejecutar dos veces el mismo trabajo. Con bases de datos por empresa
+(empresas.py) cada empresa tiene su propia cola y los workers las recorren
+todas.
+
+Los trabajos informan de su progreso con Contexto.progreso(), que además
+comprueba si se pidió cancelarlos. Si un trabajo falla se reintenta con
+espera exponencial hasta max_intentos; si su worker deja de dar señales de
+vida durante Config.TRABAJOS_EXPIRACION segundos vuelve a la cola.
+
+Uso:
+    python trabajos.py worker [--hilos N]
+    python trabajos.py encolar <tipo> [json_parametros]
+    python trabajos.py listar [estado]
+"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from database import get_db, config, empresa_actual, id_empresa, motor
+import empresas
+
+logger = logging.getLogger(__name__)
+
+ESTADOS = ('pendiente', 'en_curso', 'completado', 'fallido', 'cancelado')
+ESTADOS_FINALES = ('completado', 'fallido', 'cancelado')
+
+# Tipo de trabajo -> (función, máximo de intentos, se puede encolar desde la API)
+TAREAS: Dict[str, tuple] = {}
+
+# Avisa a los workers de este proceso de que hay trabajo nuevo
+_hay_trabajo = threading.Event()
+
+# Última recuperación de trabajos abandonados en cada base de datos (por empresa)
+_ultima_recuperacion: Dict[Optional[str], float] = {}
+
+# Trabajos que se están ejecutando en este proceso, por (empresa, id_trabajo)
+_en_ejecucion: Dict[tuple, 'Contexto'] = {}
+
+# Espera máxima por el bloqueo de escritura al guardar progreso y latidos
+_ESPERA_BLOQUEO_MS = 100
+
+
+class TrabajoCancelado(Exception):
+    """Se lanza dentro de un trabajo cuando se pidió su cancelación."""
+
+
+def tarea(tipo: str, max_intentos: Optional[int] = None, publica: bool = True):
+    """
+    Decorador que registra una función como tipo de trabajo.
+
+    La función recibe un Contexto y los parámetros del trabajo como
+    argumentos con nombre, y devuelve un resultado serializable a JSON.
+    Las tareas no públicas solo se pueden encolar desde el código.
+    """
+    def decorador(funcion: Callable) -> Callable:
+        if tipo in TAREAS:
+            raise ValueError(f"El tipo de trabajo {tipo} ya está registrado")
+        TAREAS[tipo] = (funcion, max_intentos, publica)
+        return funcion
+    return decorador
+
+
+def _fila_a_dict(row) -> Dict:
+    trabajo = dict(row)
+    trabajo['parametros'] = json.loads(trabajo['parametros'] or '{}')
+    trabajo['resultado'] = json.loads(trabajo['resultado']) if trabajo['resultado'] else None
+    trabajo['cancelar'] = bool(trabajo['cancelar'])
+    return trabajo
+
+
+def encolar(tipo: str, parametros: Optional[Dict] = None, max_intentos: Optional[int] = None,
+            cursor=None) -> int:
+    """
+    Encola un trabajo.
+
+    Args:
+        tipo: Tipo de trabajo registrado con @tarea
+        parametros: Argumentos con nombre de la tarea (serializables a JSON)
+        max_intentos: Intentos antes de darlo por fallido (por defecto el de
+            la tarea o Config.TRABAJOS_REINTENTOS)
+        cursor: Cursor de una transacción en curso, para encolar el trabajo
+            solo si esa transacción se confirma
+
+    Returns:
+        ID del trabajo creado
+    """
+    motor.requiere_sqlite("La cola de trabajos")
+    if tipo not in TAREAS:
+        raise ValueError(f"Tipo de trabajo desconocido: {tipo}. Disponibles: {', '.join(sorted(TAREAS))}")
+    max_intentos = max_intentos or TAREAS[tipo][1] or config.TRABAJOS_REINTENTOS
+    sql = "INSERT INTO Trabajos (tipo, parametros, max_intentos) VALUES (?, ?, ?)"
+    valores = (tipo, json.dumps(parametros or {}, default=str), max_intentos)
+
+    if cursor is not None:
+        cursor.execute(sql, valores)
+        id_trabajo = cursor.lastrowid
+    else:
+        with get_db() as conn:
+            id_trabajo = conn.execute(sql, valores).lastrowid
+    _hay_trabajo.set()
+    return id_trabajo
+
+
+def obtener(id_trabajo: int) -> Optional[Dict]:
+    """Obtiene el estado, progreso y resultado de un trabajo."""
+    with get_db() as conn:
+        row = conn.execute("SELECT * FROM Trabajos WHERE id_trabajo = ?", (id_trabajo,)).fetchone()
+    if row is None:
+        return None
+    trabajo = _fila_a_dict(row)
+    # Si se ejecuta en este proceso, el progreso en memoria puede ir por
+    # delante del guardado (p. ej. mientras la tarea retiene el bloqueo de escritura)
+    contexto = _en_ejecucion.get((id_empresa(), id_trabajo))
+    if contexto is not None and trabajo['estado'] == 'en_curso':
+        trabajo['progreso'] = max(trabajo['progreso'], contexto.fraccion)
+        trabajo['mensaje'] = contexto.mensaje or trabajo['mensaje']
+        trabajo['cancelar'] = trabajo['cancelar'] or contexto.cancelado()
+    return trabajo
+
+
+def listar(estado: Optional[str] = None, limite: int = 50) -> List[Dict]:
+    """Lista los trabajos más recientes, opcionalmente de un estado."""
+    if estado is not None and estado not in ESTADOS:
+        raise ValueError(f"Estado no válido: {estado}. Opciones: {', '.join(ESTADOS)}")
+    with get_db() as conn:
+        if estado:
+            rows = conn.execute("""
+                SELECT * FROM Trabajos WHERE estado = ? ORDER BY id_trabajo DESC LIMIT ?
+            """, (estado, limite)).fetchall()
+        else:
+            rows = conn.execute("SELECT * FROM Trabajos ORDER BY id_trabajo DESC LIMIT ?",
+                                (limite,)).fetchall()
+        return [_fila_a_dict(row) for row in rows]
+
+
+def cancelar(id_trabajo: int) -> Optional[Dict]:
+    """
+    Cancela un trabajo. Un trabajo pendiente se cancela de inmediato; uno en
+    curso se marca y se detiene en su siguiente llamada a progreso().
+
+    Returns:
+        El trabajo actualizado, o None si no existe
+    """
+    contexto = _en_ejecucion.get((id_empresa(), id_trabajo))
+    if contexto is not None:
+        contexto._cancelado.set()
+    try:
+        with get_db() as conn:
+            if contexto is not None:
+                conn.execute(f"PRAGMA busy_timeout = {_ESPERA_BLOQUEO_MS}")
+            conn.execute("""
+                UPDATE Trabajos
+                SET estado = 'cancelado', terminado_en = datetime('now')
+                WHERE id_trabajo = ? AND estado = 'pendiente'
+            """, (id_trabajo,))
+            conn.execute("""
+                UPDATE Trabajos SET cancelar = 1 WHERE id_trabajo = ? AND estado = 'en_curso'
+            """, (id_trabajo,))
+    except sqlite3.OperationalError:
+        # La tarea en curso de este proceso retiene el bloqueo de escritura;
+        # la cancelación ya le llegó en memoria
+        if contexto is None:
+            raise
+    return obtener(id_trabajo)
+
+
+class Contexto:
+    """Acceso de un trabajo en ejecución a su progreso y a su cancelación."""
+
+    def __init__(self, id_trabajo: int, worker: str):
+        self.id_trabajo = id_trabajo
+        self.worker = worker
+        self.fraccion = 0.0
+        self.mensaje: Optional[str] = None
+        self._cancelado = threading.Event()
+
+    def _guardar(self, progreso: bool) -> None:
+        """
+        Guarda el progreso o el latido sin esperar por el bloqueo de escritura:
+        si la propia tarea tiene una transacción abierta (p. ej. una
+        importación), el valor queda en memoria y se guarda en el siguiente intento.
+        """
+        try:
+            with get_db() as conn:
+                conn.execute(f"PRAGMA busy_timeout = {_ESPERA_BLOQUEO_MS}")
+                if progreso:
+                    conn.execute("""
+                        UPDATE Trabajos
+                        SET progreso = ?, mensaje = COALESCE(?, mensaje), actualizado_en = datetime('now')
+                        WHERE id_trabajo = ? AND worker = ?
+                    """, (self.fraccion, self.mensaje, self.id_trabajo, self.worker))
+                else:
+                    conn.execute("""
+                        UPDATE Trabajos SET actualizado_en = datetime('now')
+                        WHERE id_trabajo = ? AND worker = ?
+                    """, (self.id_trabajo, self.worker))
+        except sqlite3.OperationalError:
+            pass
+        # Con WAL la lectura no espera a los escritores
+        with get_db() as conn:
+            row = conn.execute("SELECT cancelar, worker FROM Trabajos WHERE id_trabajo = ?",
+                               (self.id_trabajo,)).fetchone()
+        if row is None or row['cancelar'] or row['worker'] not in (self.worker, None):
+            self._cancelado.set()
+
+    def progreso(self, fraccion: float, mensaje: Optional[str] = None) -> None:
+        """
+        Guarda el progreso (0 a 1) y un mensaje opcional.
+
+        Raises:
+            TrabajoCancelado: Si se pidió cancelar el trabajo
+        """
+        self.fraccion = max(0.0, min(1.0, fraccion))
+        self.mensaje = mensaje or self.mensaje
+        self._guardar(progreso=True)
+        self.comprobar()
+
+    def latido(self) -> None:
+        """Renueva la señal de vida del trabajo y lee la petición de cancelación."""
+        self._guardar(progreso=False)
+
+    def cancelado(self) -> bool:
+        """Indica si se pidió cancelar el trabajo."""
+        return self._cancelado.is_set()
+
+    def comprobar(self) -> None:
+        """Lanza TrabajoCancelado si se pidió cancelar el trabajo."""
+        if self._cancelado.is_set():
+            raise TrabajoCancelado()
+
+
+def _recuperar_abandonados(conn) -> int:
+    """Devuelve a la cola (o da por fallidos) los trabajos de workers sin señal de vida."""
+    return conn.execute("""
+        UPDATE Trabajos
+        SET estado = CASE WHEN intentos < max_intentos THEN 'pendiente' ELSE 'fallido' END,
+            terminado_en = CASE WHEN intentos < max_intentos THEN NULL ELSE datetime('now') END,
+            error = 'El worker dejó de responder', worker = NULL
+        WHERE estado = 'en_curso' AND actualizado_en < datetime('now', ?)
+    """, (f"-{config.TRABAJOS_EXPIRACION} seconds",)).rowcount
+
+
+def _reclamar(worker: str) -> Optional[Dict]:
+    """Reclama de forma atómica el siguiente trabajo pendiente."""
+    with get_db() as conn:
+        if time.monotonic() - _ultima_recuperacion.get(id_empresa(), 0.0) >= 60:
+            _ultima_recuperacion[id_empresa()] = time.monotonic()
+            _recuperar_abandonados(conn)
+        row = conn.execute("""
+            UPDATE Trabajos
+            SET estado = 'en_curso', worker = ?, intentos = intentos + 1,
+                iniciado_en = COALESCE(iniciado_en, datetime('now')),
+                actualizado_en = datetime('now')
+            WHERE id_trabajo = (
+                SELECT id_trabajo FROM Trabajos
+                WHERE estado = 'pendiente' AND disponible_en <= datetime('now')
+                ORDER BY disponible_en, id_trabajo
+                LIMIT 1
+            )
+            RETURNING id_trabajo, tipo, parametros, intentos, max_intentos
+        """, (worker,)).fetchone()
+        return dict(row) if row else None
+
+
+def _terminar(id_trabajo: int, worker: str, sql: str, params: tuple) -> None:
+    with get_db() as conn:
+        # worker IS NULL: el trabajo se dio por abandonado pero nadie lo ha reclamado aún
+        conn.execute(f"{sql} WHERE id_trabajo = ? AND (worker = ? OR worker IS NULL)",
+                     params + (id_trabajo, worker))
+
+
+def ejecutar(trabajo: Dict, worker: str) -> str:
+    """
+    Ejecuta un trabajo reclamado y guarda su resultado, error o reintento.
+
+    Returns:
+        Estado en que queda el trabajo
+    """
+    id_trabajo = trabajo['id_trabajo']
+    clave = (id_empresa(), id_trabajo)
+    contexto = Contexto(id_trabajo, worker)
+    funcion = TAREAS[trabajo['tipo']][0] if trabajo['tipo'] in TAREAS else None
+
+    # Latido en paralelo para que una tarea sin llamadas a progreso() no
+    # se considere abandonada
+    detener_latido = threading.Event()
+    empresa = empresa_actual.get()
+
+    def latir():
+        empresa_actual.set(empresa)  # el hilo nuevo no hereda el contexto
+        while not detener_latido.wait(max(1, config.TRABAJOS_EXPIRACION // 3)):
+            try:
+                contexto.latido()
+            except Exception:
+                logger.exception("Error al renovar el latido del trabajo %s", id_trabajo)
+
+    threading.Thread(target=latir, name=f'latido-{id_trabajo}', daemon=True).start()
+    _en_ejecucion[clave] = contexto
+    try:
+        if funcion is None:
+            raise ValueError(f"Tipo de trabajo desconocido: {trabajo['tipo']}")
+        resultado = funcion(contexto, **json.loads(trabajo['parametros'] or '{}'))
+        _terminar(id_trabajo, worker, """
+            UPDATE Trabajos
+            SET estado = 'completado', progreso = 1, resultado = ?, error = NULL,
+                terminado_en = datetime('now'), actualizado_en = datetime('now')
+        """, (json.dumps(resultado, default=str),))
+        return 'completado'
+    except TrabajoCancelado:
+        _terminar(id_trabajo, worker, """
+            UPDATE Trabajos
+            SET estado = 'cancelado', terminado_en = datetime('now'), actualizado_en = datetime('now')
+        """, ())
+        return 'cancelado'
+    except Exception as e:
+        logger.exception("Error en el trabajo %s (%s)", id_trabajo, trabajo['tipo'])
+        if funcion is not None and trabajo['intentos'] < trabajo['max_intentos']:
+            espera = config.TRABAJOS_REINTENTO_ESPERA * 2 ** (trabajo['intentos'] - 1)
+            _terminar(id_trabajo, worker, """
+                UPDATE Trabajos
+                SET estado = 'pendiente', error = ?, worker = NULL,
+                    disponible_en = datetime('now', ?), actualizado_en = datetime('now')
+            """, (str(e), f"+{espera} seconds"))
+            return 'pendiente'
+        _terminar(id_trabajo, worker, """
+            UPDATE Trabajos
+            SET estado = 'fallido', error = ?, terminado_en = datetime('now'),
+                actualizado_en = datetime('now')
+        """, (str(e),))
+        return 'fallido'
+    finally:
+        detener_latido.set()
+        _en_ejecucion.pop(clave, None)
+
+
+def procesar_uno(worker: Optional[str] = None) -> Optional[str]:
+    """
+    Reclama y ejecuta un trabajo pendiente.
+
+    Returns:
+        Estado en que queda el trabajo, o None si no había ninguno
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+    trabajo = _reclamar(worker)
+    if trabajo is None:
+        return None
+    return ejecutar(trabajo, worker)
+
+
+class WorkerTrabajos(threading.Thread):
+    """Hilo que ejecuta trabajos de la cola mientras los haya."""
+
+    def __init__(self, numero: int, intervalo: Optional[float] = None):
+        super().__init__(name=f'trabajos-{numero}', daemon=True)
+        self.intervalo = intervalo or config.TRABAJOS_INTERVALO
+        self.worker = f"{socket.gethostname()}:{os.getpid()}:{self.name}"
+        self._detener = threading.Event()
+
+    def detener(self) -> None:
+        """Pide al hilo que termine al acabar el trabajo en curso."""
+        self._detener.set()
+        _hay_trabajo.set()
+
+    def _procesar(self, empresa: Optional[str]) -> bool:
+        """Ejecuta un trabajo de la cola de la base de datos de la empresa (None: la única)."""
+        try:
+            with empresas.visitar(empresa):
+                return procesar_uno(self.worker) is not None
+        except sqlite3.OperationalError as e:
+            # Otro trabajo retiene el bloqueo de escritura; se reintenta luego
+            logger.debug("Cola de trabajos no disponible: %s", e)
+        except Exception:
+            logger.exception("Error en el worker %s (empresa %s)", self.worker, empresa)
+        return False
+
+    def run(self) -> None:
+        while not self._detener.is_set():
+            # Con bases de datos por empresa, cada una tiene su cola
+            procesados = [self._procesar(empresa) for empresa in empresas.ambitos()]
+            if any(procesados):
+                continue
+            _hay_trabajo.wait(self.intervalo)
+            _hay_trabajo.clear()
+
+
+_workers: List[WorkerTrabajos] = []
+
+
+def iniciar_workers(hilos: Optional[int] = None) -> List[WorkerTrabajos]:
+    """Arranca (una sola vez por proceso) el grupo de workers."""
+    hilos = config.TRABAJOS_WORKERS if hilos is None else hilos
+    vivos = [w for w in _workers if w.is_alive()]
+    for numero in range(len(vivos), hilos):
+        worker = WorkerTrabajos(numero + 1)
+        worker.start()
+        vivos.append(worker)
+    _workers[:] = vivos
+    return _workers
+
+
+# ==================== TAREAS ====================
+
+@tarea('respaldo', max_intentos=2)
+def _tarea_respaldo(trabajo: Contexto, comprimir: bool = True, verificar: bool = True) -> Dict:
+    from respaldo import crear_respaldo
+    trabajo.progreso(0, 'Copiando la base de datos')
+    return crear_respaldo(comprimir=comprimir, verificar=verificar)
+
+
+@tarea('importar_empleados', max_intentos=1, publica=False)
+def _tarea_importar_empleados(trabajo: Contexto, ruta: str, formato: str = 'csv',
+                              dry_run: bool = False, omitir_errores: bool = False) -> Dict:
+    import importacion_empleados
+    try:
+        tamano = os.path.getsize(ruta) or 1
+        with open(ruta, 'rb') as archivo:
+            lector = importacion_empleados.leer_xlsx if formato == 'xlsx' else importacion_empleados.leer_csv
+
+            def progreso(filas: int) -> None:
+                trabajo.progreso(archivo.tell() / tamano, f'{filas} filas procesadas')
+
+            return importacion_empleados.importar(lector(archivo), dry_run=dry_run,
+                                                  omitir_errores=omitir_errores, progreso=progreso)
+    finally:
+        os.remove(ruta)
+
+
+@tarea('saldos_vacaciones')
+def _tarea_saldos_vacaciones(trabajo: Contexto, lote: Optional[int] = None) -> Dict:
+    from models.saldo_vacaciones import SaldoVacaciones
+    return SaldoVacaciones.reconstruir(lote)
+
+
+@tarea('avisos_contratos')
+def _tarea_avisos_contratos(trabajo: Contexto, fecha: Optional[str] = None) -> Dict:
+    from avisos_contratos import generar_avisos
+    return generar_avisos(fecha)
+
+
+@tarea('mantenimiento', max_intentos=1)
+def _tarea_mantenimiento(trabajo: Contexto, optimize: bool = True, vacuum: bool = True,
+                         wal: bool = True) -> Dict:
+    from mantenimiento import ejecutar_mantenimiento
+    return ejecutar_mantenimiento(optimize=optimize, vacuum=vacuum, wal=wal)
+
+
+@tarea('purgar_cambios', max_intentos=1)
+def _tarea_purgar_cambios(trabajo: Contexto, dias: Optional[int] = None) -> Dict:
+    import cambios
+    return cambios.purgar(dias)
+
+
+@tarea('archivar', max_intentos=1)
+def _tarea_archivar(trabajo: Contexto, meses: Optional[int] = None, lote: Optional[int] = None) -> Dict:
+    import archivo
+    tablas = list(archivo.TABLAS)
+
+    def progreso(tabla: str, filas: int) -> None:
+        # Cada lote ya está confirmado: cancelar entre lotes no deja nada a medias
+        trabajo.progreso(tablas.index(tabla) / len(tablas), f'{tabla}: {filas} filas archivadas')
+
+    return archivo.archivar(meses, lote, progreso=progreso)
+
+
+@tarea('cerrar_anio', max_intentos=1)
+def _tarea_cerrar_anio(trabajo: Contexto, anio: int, lote: Optional[int] = None) -> Dict:
+    import particiones
+
+    def progreso(filas: int, total: int) -> None:
+        # Si se cancela, el año queda 'cerrando' y otro cierre lo continúa
+        trabajo.progreso(filas / total if total else 1, f'{filas} de {total} asistencias movidas')
+
+    return particiones.cerrar(anio, lote, progreso=progreso)
+
+
+@tarea('refrescar_replica', max_intentos=2)
+def _tarea_refrescar_replica(trabajo: Contexto) -> Dict:
+    import replica
+    trabajo.progreso(0, 'Copiando la base de datos a la réplica')
+    return replica.refrescar()
+
+
+def main(argv=None) -> bool:
+    """Punto de entrada de la línea de comandos."""
+    argv = sys.argv[1:] if argv is None else argv
+    comando = argv[0] if argv else 'worker'
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    print("=" * 60)
+    print("COLA DE TRABAJOS")
+    print("=" * 60)
+
+    try:
+        if comando == 'worker':
+            hilos = int(argv[argv.index('--hilos') + 1]) if '--hilos' in argv else max(1, config.TRABAJOS_WORKERS)
+            workers = iniciar_workers(hilos)
+            print(f"[INFO] {len(workers)} workers en ejecución (Ctrl+C para detener)")
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                for worker in workers:
+                    worker.detener()
+                print("[OK] Workers detenidos")
+        elif comando == 'encolar':
+            if len(argv) < 2:
+                print("[ERROR] Uso: python trabajos.py encolar <tipo> [json_parametros]")
+                return False
+            parametros = json.loads(argv[2]) if len(argv) > 2 else {}
+            print(f"[OK] Trabajo {encolar(argv[1], parametros)} encolado")
+        elif comando == 'listar':
+            for trabajo in listar(argv[1] if len(argv) > 1 else None):
+                print(f"  - #{trabajo['id_trabajo']} {trabajo['tipo']} {trabajo['estado']} "
+                      f"{int(trabajo['progreso'] * 100)}% {trabajo['error'] or ''}")
+        else:
+            print(f"[ERROR] Comando desconocido: {comando}")
+            return False
+    except Exception as e:
+        print(f"[ERROR] {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -3,6 +3,7 @@ Script para verificar la conexión y estructura de la base de datos SQLite.
 Útil para verificar antes de abrir en DB Browser for SQLite.
 """
 from database import get_db, init_db, DB_PATH
+from inspeccion_db import inspeccionar
 import os
 import sys
 
@@ -12,8 +13,14 @@ if sys.platform == 'win32':
     sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
     sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
 
-def verificar_base_datos():
-    """Verifica la conexión y muestra la estructura de la base de datos."""
+def verificar_base_datos(exacto=False):
+    """
+    Verifica la conexión y muestra la estructura de la base de datos.
+    
+    Args:
+        exacto: Si es True, cuenta los registros con COUNT(*) en lugar de
+            usar los conteos aproximados de sqlite_stat1
+    """
     
     print("=" * 60)
     print("VERIFICACION DE BASE DE DATOS SQLite")
@@ -37,36 +44,45 @@ def verificar_base_datos():
         with get_db() as conn:
             cursor = conn.cursor()
             
-            # Obtener todas las tablas
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-            tables = cursor.fetchall()
+            # Columnas de todas las tablas en una sola consulta
+            cursor.execute("""
+                SELECT m.name, p.name, p.type, p."notnull", p.dflt_value, p.pk
+                FROM sqlite_master m
+                JOIN pragma_table_info(m.name) p
+                WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+                ORDER BY m.name, p.cid
+            """)
+            columnas_por_tabla = {}
+            for row in cursor.fetchall():
+                columnas_por_tabla.setdefault(row[0], []).append(row[1:])
+            
+            # Conteos aproximados (sqlite_stat1) salvo que se pida --exacto
+            info = inspeccionar(conn, exacto=exacto, tamanos=False)
+            filas_por_tabla = {t['nombre']: t for t in info['tablas']}
             
             print(f"[OK] Conexion exitosa a la base de datos")
-            print(f"[OK] Tablas encontradas: {len(tables)}")
+            print(f"[OK] Tablas encontradas: {len(columnas_por_tabla)}")
             print()
             
             # Mostrar información de cada tabla
-            for table_row in tables:
-                table_name = table_row[0]
+            for table_name, columns in columnas_por_tabla.items():
                 print(f"Tabla: {table_name}")
                 print("-" * 60)
                 
-                # Obtener información de columnas
-                cursor.execute(f"PRAGMA table_info({table_name})")
-                columns = cursor.fetchall()
-                
                 print(f"  Columnas ({len(columns)}):")
-                for col in columns:
-                    col_id, col_name, col_type, not_null, default_val, pk = col
+                for col_name, col_type, not_null, default_val, pk in columns:
                     null_text = "NOT NULL" if not_null else "NULL"
                     pk_text = " (PRIMARY KEY)" if pk else ""
                     default_text = f" DEFAULT {default_val}" if default_val else ""
                     print(f"    - {col_name:20} {col_type:15} {null_text}{default_text}{pk_text}")
                 
-                # Contar registros
-                cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                count = cursor.fetchone()[0]
-                print(f"  Registros: {count}")
+                tabla = filas_por_tabla.get(table_name, {})
+                if tabla.get('filas') is None:
+                    print("  Registros: ? (ejecuta inspeccion_db.py --analizar o usa --exacto)")
+                elif tabla['fuente_filas'] == 'exacto':
+                    print(f"  Registros: {tabla['filas']}")
+                else:
+                    print(f"  Registros: ~{tabla['filas']}")
                 
                 print()
             
@@ -85,5 +101,5 @@ def verificar_base_datos():
 
 
 if __name__ == "__main__":
-    verificar_base_datos()
+    verificar_base_datos(exacto='--exacto' in sys.argv[1:])
 
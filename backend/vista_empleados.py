@@ -0,0 +1,307 @@
+"""
+Modelo de lectura desnormalizado de empleados (tabla empleados_vista).
+
+La tabla empleados_vista guarda cada empleado junto con el nombre de su
+departamento y los datos de su puesto (nombre, nivel y salario base), de modo
+que el listado de empleados se resuelve con un único recorrido indexado sin
+JOIN contra Departamentos y Puestos. Se mantiene mediante triggers sobre
+Empleados, Departamentos y Puestos.
+"""
+import sys
+from database import get_db
+
+
+# Columnas de la tabla empleados_vista, en el orden en que se almacenan
+COLUMNAS_VISTA = [
+    'id_empleado', 'nombre', 'apellido', 'fecha_nacimiento', 'genero',
+    'estado_civil', 'direccion', 'telefono', 'correo', 'fecha_ingreso',
+    'estado', 'id_departamento', 'nombre_departamento', 'id_puesto',
+    'nombre_puesto', 'nivel_puesto', 'salario_base'
+]
+
+# Consulta sobre las tablas origen que produce las filas del modelo de lectura
+SELECT_ORIGEN = """
+    SELECT e.id_empleado, e.nombre, e.apellido, e.fecha_nacimiento, e.genero,
+           e.estado_civil, e.direccion, e.telefono, e.correo, e.fecha_ingreso,
+           e.estado, e.id_departamento, d.nombre_departamento, e.id_puesto,
+           p.nombre_puesto, p.nivel, p.salario_base
+    FROM Empleados e
+    LEFT JOIN Departamentos d ON d.id_departamento = e.id_departamento
+    LEFT JOIN Puestos p ON p.id_puesto = e.id_puesto
+"""
+
+TRIGGERS_VISTA = [
+    'trg_empleados_vista_ins', 'trg_empleados_vista_upd', 'trg_empleados_vista_del',
+    'trg_departamentos_vista_ins', 'trg_departamentos_vista_upd', 'trg_departamentos_vista_del',
+    'trg_puestos_vista_ins', 'trg_puestos_vista_upd', 'trg_puestos_vista_del'
+]
+
+
+def _sql_refrescar_departamento(ids: str) -> str:
+    """SQL que recalcula nombre_departamento para los departamentos indicados."""
+    return f"""
+        UPDATE empleados_vista
+        SET nombre_departamento = (
+            SELECT nombre_departamento FROM Departamentos
+            WHERE id_departamento = empleados_vista.id_departamento
+        )
+        WHERE id_departamento IN ({ids});
+    """
+
+
+def _sql_refrescar_puesto(ids: str) -> str:
+    """SQL que recalcula los datos del puesto para los puestos indicados."""
+    return f"""
+        UPDATE empleados_vista
+        SET nombre_puesto = (SELECT nombre_puesto FROM Puestos
+                             WHERE id_puesto = empleados_vista.id_puesto),
+            nivel_puesto = (SELECT nivel FROM Puestos
+                            WHERE id_puesto = empleados_vista.id_puesto),
+            salario_base = (SELECT salario_base FROM Puestos
+                            WHERE id_puesto = empleados_vista.id_puesto)
+        WHERE id_puesto IN ({ids});
+    """
+
+
+def crear_vista_empleados(cursor) -> None:
+    """
+    Crea la tabla empleados_vista, sus índices y los triggers que la mantienen.
+    Si la tabla no existía, la rellena a partir de las tablas origen.
+
+    Args:
+        cursor: Cursor de una conexión abierta
+    """
+    cursor.execute("""
+        SELECT name FROM sqlite_master
+        WHERE type='table' AND name='empleados_vista'
+    """)
+    existia = cursor.fetchone() is not None
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS empleados_vista (
+            id_empleado INTEGER PRIMARY KEY,
+            nombre TEXT NOT NULL,
+            apellido TEXT NOT NULL,
+            fecha_nacimiento DATE,
+            genero TEXT,
+            estado_civil TEXT,
+            direccion TEXT,
+            telefono TEXT,
+            correo TEXT,
+            fecha_ingreso DATE,
+            estado TEXT,
+            id_departamento INTEGER,
+            nombre_departamento TEXT,
+            id_puesto INTEGER,
+            nombre_puesto TEXT,
+            nivel_puesto TEXT,
+            salario_base REAL
+        )
+    """)
+
+    # Índice que cubre el orden del listado y los usados por los triggers
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_empleados_vista_fecha_ingreso
+        ON empleados_vista (fecha_ingreso DESC)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_empleados_vista_departamento
+        ON empleados_vista (id_departamento)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_empleados_vista_puesto
+        ON empleados_vista (id_puesto)
+    """)
+
+    # Triggers sobre Empleados
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_empleados_vista_ins
+        AFTER INSERT ON Empleados
+        BEGIN
+            INSERT OR REPLACE INTO empleados_vista
+            {SELECT_ORIGEN}
+            WHERE e.id_empleado = NEW.id_empleado;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_empleados_vista_upd
+        AFTER UPDATE ON Empleados
+        BEGIN
+            DELETE FROM empleados_vista WHERE id_empleado = OLD.id_empleado;
+            INSERT OR REPLACE INTO empleados_vista
+            {SELECT_ORIGEN}
+            WHERE e.id_empleado = NEW.id_empleado;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_empleados_vista_del
+        AFTER DELETE ON Empleados
+        BEGIN
+            DELETE FROM empleados_vista WHERE id_empleado = OLD.id_empleado;
+        END
+    """)
+
+    # Triggers sobre Departamentos
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_departamentos_vista_ins
+        AFTER INSERT ON Departamentos
+        BEGIN
+            {_sql_refrescar_departamento('NEW.id_departamento')}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_departamentos_vista_upd
+        AFTER UPDATE ON Departamentos
+        BEGIN
+            {_sql_refrescar_departamento('OLD.id_departamento, NEW.id_departamento')}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_departamentos_vista_del
+        AFTER DELETE ON Departamentos
+        BEGIN
+            {_sql_refrescar_departamento('OLD.id_departamento')}
+        END
+    """)
+
+    # Triggers sobre Puestos
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_puestos_vista_ins
+        AFTER INSERT ON Puestos
+        BEGIN
+            {_sql_refrescar_puesto('NEW.id_puesto')}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_puestos_vista_upd
+        AFTER UPDATE ON Puestos
+        BEGIN
+            {_sql_refrescar_puesto('OLD.id_puesto, NEW.id_puesto')}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_puestos_vista_del
+        AFTER DELETE ON Puestos
+        BEGIN
+            {_sql_refrescar_puesto('OLD.id_puesto')}
+        END
+    """)
+
+    if not existia:
+        reconstruir_vista_empleados(cursor)
+
+
+def eliminar_vista_empleados(cursor) -> None:
+    """
+    Elimina la tabla empleados_vista y sus triggers, de modo que las escrituras
+    sobre las tablas origen no paguen el coste de mantenerla.
+
+    Args:
+        cursor: Cursor de una conexión abierta
+    """
+    for trigger in TRIGGERS_VISTA:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("DROP TABLE IF EXISTS empleados_vista")
+
+
+def reconstruir_vista_empleados(cursor) -> int:
+    """
+    Reconstruye por completo empleados_vista a partir de las tablas origen.
+
+    Args:
+        cursor: Cursor de una conexión abierta
+
+    Returns:
+        Número de filas escritas en el modelo de lectura
+    """
+    cursor.execute("DELETE FROM empleados_vista")
+    cursor.execute(f"INSERT INTO empleados_vista {SELECT_ORIGEN}")
+    return cursor.rowcount
+
+
+def verificar_vista_empleados(cursor) -> dict:
+    """
+    Comprueba que empleados_vista coincide con las tablas origen.
+
+    Args:
+        cursor: Cursor de una conexión abierta
+
+    Returns:
+        Dict con 'consistente' y las listas de IDs 'faltantes' (en origen pero
+        no en la vista), 'sobrantes' (en la vista pero no en origen) y
+        'diferentes' (presentes en ambas con datos distintos)
+    """
+    columnas = ', '.join(COLUMNAS_VISTA)
+
+    cursor.execute(f"""
+        SELECT * FROM ({SELECT_ORIGEN})
+        EXCEPT
+        SELECT {columnas} FROM empleados_vista
+    """)
+    ids_origen_distintos = {row[0] for row in cursor.fetchall()}
+
+    cursor.execute(f"""
+        SELECT {columnas} FROM empleados_vista
+        EXCEPT
+        SELECT * FROM ({SELECT_ORIGEN})
+    """)
+    ids_vista_distintos = {row[0] for row in cursor.fetchall()}
+
+    cursor.execute("""
+        SELECT id_empleado FROM Empleados
+        WHERE id_empleado NOT IN (SELECT id_empleado FROM empleados_vista)
+    """)
+    faltantes = sorted(row[0] for row in cursor.fetchall())
+
+    cursor.execute("""
+        SELECT id_empleado FROM empleados_vista
+        WHERE id_empleado NOT IN (SELECT id_empleado FROM Empleados)
+    """)
+    sobrantes = sorted(row[0] for row in cursor.fetchall())
+
+    diferentes = sorted((ids_origen_distintos | ids_vista_distintos)
+                        - set(faltantes) - set(sobrantes))
+
+    return {
+        'consistente': not (faltantes or sobrantes or diferentes),
+        'faltantes': faltantes,
+        'sobrantes': sobrantes,
+        'diferentes': diferentes
+    }
+
+
+def main(argv=None) -> bool:
+    """Verifica el modelo de lectura y, con --reparar, lo reconstruye."""
+    argv = sys.argv[1:] if argv is None else argv
+    reparar = '--reparar' in argv
+
+    print("=" * 60)
+    print("VERIFICACION DE empleados_vista")
+    print("=" * 60)
+
+    try:
+        with get_db() as conn:
+            cursor = conn.cursor()
+            resultado = verificar_vista_empleados(cursor)
+
+            print(f"  Faltantes:  {len(resultado['faltantes'])}")
+            print(f"  Sobrantes:  {len(resultado['sobrantes'])}")
+            print(f"  Diferentes: {len(resultado['diferentes'])}")
+
+            if resultado['consistente']:
+                print("[OK] El modelo de lectura coincide con las tablas origen")
+            elif reparar:
+                filas = reconstruir_vista_empleados(cursor)
+                print(f"[OK] Modelo de lectura reconstruido ({filas} filas)")
+            else:
+                print("[!] Inconsistencias encontradas. Ejecuta con --reparar para reconstruir.")
+                return False
+    except Exception as e:
+        print(f"[ERROR] Error al verificar empleados_vista: {str(e)}")
+        return False
+
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)